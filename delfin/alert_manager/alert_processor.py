@@ -39,7 +39,7 @@ class AlertProcessor(object):
     def process_alert_info(self, alert):
         """Fills alert model using driver manager interface."""
         ctxt = context.get_admin_context()
-        storage = db.storage_get(ctxt, alert['storage_id'])
+        storage = db.storage_get_cached(ctxt, alert['storage_id'])
         alert_model = {}
 
         try:
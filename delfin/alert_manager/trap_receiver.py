@@ -229,6 +229,11 @@ class TrapReceiver(manager.Manager):
     def _cb_fun(self, state_reference, context_engine_id, context_name,
                 var_binds, cb_ctx):
         """Callback function to process the incoming trap."""
+        # One connection serves every database lookup of the trap
+        with db.session_scope():
+            self._process_trap(context_name, var_binds)
+
+    def _process_trap(self, context_name, var_binds):
         exec_context = self.snmp_engine.observer.getExecutionContext(
             'rfc3412.receiveMessage:request')
         LOG.debug("Get notification from: %s" %
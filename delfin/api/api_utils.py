@@ -36,6 +36,10 @@ CONF.register_opts(api_common_opts)
 
 LOG = log.getLogger(__name__)
 
+# Default sort of the storage resource lists, which lets the database page
+# them on the (storage_id, id) index instead of an offset scan
+RESOURCE_SORT_KEYS = ('storage_id', 'id')
+
 
 def remove_invalid_options(context, search_options, allowed_search_options):
     """Remove search options that are not valid for API/context."""
@@ -157,3 +161,15 @@ def get_sort_params(params, default_key='created_at', default_dir='desc'):
         sort_keys.append(sort_key.strip())
         sort_dirs.append(sort_dir.strip())
     return sort_keys, sort_dirs
+
+
+def get_resource_sort_params(params, default_dir='desc'):
+    """Retrieves sort keys/directions parameters of a resource list.
+
+    Same as get_sort_params, except that the rows are sorted by
+    RESOURCE_SORT_KEYS when no sort key is supplied.
+    """
+    if 'sort' in params or 'sort_key' in params:
+        return get_sort_params(params, default_dir=default_dir)
+    sort_dir = params.pop('sort_dir', default_dir).strip()
+    return list(RESOURCE_SORT_KEYS), [sort_dir] * len(RESOURCE_SORT_KEYS)
@@ -22,6 +22,7 @@ import six
 import webob
 import webob.exc
 
+from delfin import db
 from delfin import exception
 from delfin.i18n import _
 from delfin.wsgi import common as wsgi
@@ -811,7 +812,9 @@ class Resource(wsgi.Application):
     def dispatch(self, method, request, action_args):
         """Dispatch a call to the action-specific method."""
 
-        return method(req=request, **action_args)
+        # The database calls of one request share a single connection
+        with db.session_scope():
+            return method(req=request, **action_args)
 
 
 def action(name):
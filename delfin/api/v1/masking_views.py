@@ -39,7 +39,7 @@ class MaskingViewController(wsgi.Controller):
         query_params = {"storage_id": id}
         query_params.update(req.GET)
         # Update options  other than filters
-        sort_keys, sort_dirs = api_utils.get_sort_params(query_params)
+        sort_keys, sort_dirs = api_utils.get_resource_sort_params(query_params)
         marker, limit, offset = api_utils.get_pagination_params(query_params)
         # Strip out options except supported search  options
         api_utils.remove_invalid_options(
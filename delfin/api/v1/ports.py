@@ -34,7 +34,7 @@ class PortController(wsgi.Controller):
         query_params = {}
         query_params.update(req.GET)
         # update options  other than filters
-        sort_keys, sort_dirs = api_utils.get_sort_params(query_params)
+        sort_keys, sort_dirs = api_utils.get_resource_sort_params(query_params)
         marker, limit, offset = api_utils.get_pagination_params(query_params)
         # strip out options except supported search  options
         api_utils.remove_invalid_options(ctxt, query_params,
@@ -160,12 +160,7 @@ class StorageController(wsgi.Controller):
                             % (storage['id'], e.msg))
                 continue
             else:
-                for subclass in \
-                        resources.StorageResourceTask.__subclasses__():
-                    self.task_rpcapi.sync_storage_resource(
-                        ctxt,
-                        storage['id'],
-                        subclass.__module__ + '.' + subclass.__name__)
+                self._sync_storage(ctxt, storage['id'])
 
     @wsgi.response(202)
     def sync(self, req, id):
@@ -178,11 +173,18 @@ class StorageController(wsgi.Controller):
         storage = db.storage_get(ctxt, id)
         resource_count = len(resources.StorageResourceTask.__subclasses__())
         _set_synced_if_ok(ctxt, storage['id'], resource_count)
-        for subclass in resources.StorageResourceTask.__subclasses__():
-            self.task_rpcapi.sync_storage_resource(
-                ctxt,
-                storage['id'],
-                subclass.__module__ + '.' + subclass.__name__)
+        self._sync_storage(ctxt, storage['id'])
+
+    def _sync_storage(self, context, storage_id):
+        resource_tasks = [subclass.__module__ + '.' + subclass.__name__
+                          for subclass in
+                          resources.StorageResourceTask.__subclasses__()]
+        if CONF.storage_sync_batched:
+            self.task_rpcapi.sync_storage(context, storage_id, resource_tasks)
+            return
+        for resource_task in resource_tasks:
+            self.task_rpcapi.sync_storage_resource(context, storage_id,
+                                                   resource_task)
 
     def _storage_exist(self, context, access_info):
         access_info_dict = copy.deepcopy(access_info)
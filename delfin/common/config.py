@@ -92,6 +92,22 @@ global_opts = [
     cfg.IntOpt('sync_task_expiration',
                default=1800,
                help='Sync task expiration in seconds.'),
+    cfg.BoolOpt('storage_sync_batched',
+                default=True,
+                help='Sync all the resources of a storage with one task '
+                     'manager job instead of one job per resource type.'),
+    cfg.IntOpt('storage_sync_workers',
+               default=4,
+               min=1,
+               help='Number of resource types synced at once by one '
+                    'storage sync job.'),
+    cfg.IntOpt('full_sync_interval',
+               default=86400,
+               min=0,
+               help='Interval in seconds between two full syncs of the '
+                    'resources whose driver lists their changes, the '
+                    'syncs in between only get the changes. 0 disables '
+                    'the incremental sync.'),
     cfg.BoolOpt('snmp_validation_enabled',
                 default=True,
                 help='Whether alert source configuration to be validated '
@@ -150,6 +166,63 @@ telemetry_opts = [
     cfg.IntOpt('node_weight',
                default=100,
                help='Weight for the node in the Hash Ring'),
+    cfg.FloatOpt('placement_load_factor',
+                 default=1.25,
+                 min=0,
+                 help='Max collection load of a node relative to its share '
+                      'of the total load, by node weight, when placing '
+                      'jobs. Load is measured from the previous collection '
+                      'cycles. 0 places jobs on the hash ring only.'),
+    cfg.IntOpt('placement_vnodes',
+               default=128,
+               min=1,
+               help='Virtual nodes of a node on the placement ring'),
+    cfg.FloatOpt('placement_metric_cost',
+                 default=0.001,
+                 min=0,
+                 help='Seconds added to the collection duration of a job '
+                      'per collected metric point when measuring its load'),
+    cfg.BoolOpt('job_phase_spread',
+                default=True,
+                help='Start the collection jobs of a node at a phase of '
+                     'their interval derived from their storage id, '
+                     'instead of one interval after they are scheduled'),
+    cfg.FloatOpt('job_phase_jitter',
+                 default=0.0,
+                 min=0,
+                 max=0.5,
+                 help='Window after its phase, as a part of its interval, '
+                      'in which a spread job takes the second used by the '
+                      'fewest jobs of the node. 0 disables the jitter.'),
+    cfg.IntOpt('job_metrics_report_interval',
+               default=60,
+               min=0,
+               help='Interval in seconds of the export of the metrics of '
+                    'the collection jobs of the node, the max number of '
+                    'jobs started in one second and the wait and run '
+                    'times of the jobs. 0 disables the export.'),
+    cfg.StrOpt('collection_pool_by',
+               default='driver',
+               choices=['none', 'driver', 'storage'],
+               help='none: collection jobs share the default pool of the '
+                    'scheduler, driver: jobs of the storages of one driver '
+                    'share a pool, storage: jobs of one storage have their '
+                    'own pool'),
+    cfg.IntOpt('collection_pool_size',
+               default=5,
+               min=1,
+               help='Max collection jobs run at once by one pool'),
+    cfg.IntOpt('collection_timeout',
+               default=0,
+               min=0,
+               help='Seconds after which a collection is cancelled and '
+                    'recorded as failed. 0 uses the interval of the job.'),
+    cfg.IntOpt('backfill_pool_size',
+               default=1,
+               min=1,
+               help='Max backfills of failed collection windows run at once '
+                    'by the node, in a pool apart from the collection '
+                    'pools'),
 ]
 
 CONF.register_opts(telemetry_opts, "telemetry")
@@ -387,6 +387,8 @@ class TelemetryCollection(object):
     FAILED_JOB_SCHEDULE_INTERVAL = 900
     """Failed Performance monitoring retry count"""
     MAX_FAILED_JOB_RETRY_COUNT = 5
+    """Failed Performance monitoring runs deferred in a row at most"""
+    MAX_FAILED_JOB_DEFERRALS = 3
     """Default performance collection interval"""
     DEF_PERFORMANCE_COLLECTION_INTERVAL = 900
     DEF_PERFORMANCE_HISTORY_ON_RESCHEDULE = 1800
@@ -0,0 +1,158 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from array import array
+
+from delfin.common.constants import metric_struct
+
+
+class MetricBatch(object):
+    """Columnar container for performance metrics of one collection.
+
+    Drivers return a list of ``metric_struct(name, labels, values)`` where
+    every series owns a labels dict and a ``{timestamp: value}`` dict. A
+    batch keeps the same data column wise instead:
+
+    - label sets are interned, series with equal labels share one dict
+    - timestamps and values of all series live in two contiguous arrays,
+      series ``i`` owning the slice ``[offsets[i], offsets[i + 1])``
+
+    Missing points (``None``) are stored as NaN and series whose values are
+    all integers are flagged, so both are given back as ``None`` and ``int``
+    when the batch is read.
+
+    Iterating a batch yields legacy ``metric_struct`` items, so exporters
+    which are not batch aware keep working unchanged.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.label_sets = []
+        self.label_ids = array('l')
+        self.offsets = array('l', [0])
+        self.timestamps = array('q')
+        self.values = array('d')
+        self.integral = array('b')
+        self._label_index = {}
+
+    @classmethod
+    def from_metrics(cls, metrics):
+        """Build a batch from a list of legacy metric_struct items."""
+        if isinstance(metrics, MetricBatch):
+            return metrics
+        batch = cls()
+        for metric in metrics or []:
+            batch.add_series(metric.name, metric.labels, metric.values)
+        return batch
+
+    def to_metrics(self):
+        """Convert the batch back to a list of legacy metric_struct items."""
+        return list(self)
+
+    def _intern_labels(self, labels):
+        labels = labels or {}
+        try:
+            key = tuple(sorted(labels.items()))
+        except TypeError:
+            # Unhashable or unorderable label values cannot be shared
+            self.label_sets.append(dict(labels))
+            return len(self.label_sets) - 1
+        label_id = self._label_index.get(key)
+        if label_id is None:
+            label_id = len(self.label_sets)
+            self.label_sets.append(dict(labels))
+            self._label_index[key] = label_id
+        return label_id
+
+    def add_series(self, name, labels, values):
+        """Append one series.
+
+        :param name: metric name
+        :param labels: dict of labels of the series
+        :param values: dict of {timestamp: value}
+        """
+        self.names.append(name)
+        self.label_ids.append(self._intern_labels(labels))
+        values = values or {}
+        points = [v for v in values.values() if v is not None]
+        self.integral.append(bool(points) and all(
+            isinstance(v, int) and not isinstance(v, bool) for v in points))
+        self.timestamps.extend(int(ts) for ts in values.keys())
+        self.values.extend(float('nan') if v is None else float(v)
+                           for v in values.values())
+        self.offsets.append(len(self.values))
+
+    @staticmethod
+    def _decode(values, integral):
+        # NaN is the only value not equal to itself
+        if integral:
+            return [None if v != v else int(v) for v in values]
+        return [None if v != v else v for v in values]
+
+    def extend(self, other):
+        """Append all series of another batch or metric_struct list."""
+        if not isinstance(other, MetricBatch):
+            for metric in other or []:
+                self.add_series(metric.name, metric.labels, metric.values)
+            return
+        label_map = {}
+        for label_id in other.label_ids:
+            if label_id not in label_map:
+                label_map[label_id] = self._intern_labels(
+                    other.label_sets[label_id])
+            self.label_ids.append(label_map[label_id])
+        base = len(self.values)
+        self.names.extend(other.names)
+        self.integral.extend(other.integral)
+        self.offsets.extend(base + offset for offset in other.offsets[1:])
+        self.timestamps.extend(other.timestamps)
+        self.values.extend(other.values)
+
+    def update_labels(self, labels):
+        """Add or overwrite labels on every series of the batch.
+
+        Cost is proportional to the number of distinct label sets, not to
+        the number of series or points.
+        """
+        for label_set in self.label_sets:
+            label_set.update(labels)
+        # Interned keys are stale once labels change, start a new index
+        self._label_index = {}
+
+    def iter_series(self):
+        """Yield (name, labels, timestamps, values) for every series.
+
+        ``timestamps`` is an array slice, ``values`` a list holding ``None``
+        for missing points and ints for integer series.
+        """
+        offsets = self.offsets
+        for i, name in enumerate(self.names):
+            start, end = offsets[i], offsets[i + 1]
+            yield (name, self.label_sets[self.label_ids[i]],
+                   self.timestamps[start:end],
+                   self._decode(self.values[start:end], self.integral[i]))
+
+    @property
+    def point_count(self):
+        return len(self.values)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def __iter__(self):
+        for name, labels, timestamps, values in self.iter_series():
+            yield metric_struct(name=name, labels=dict(labels),
+                                values=dict(zip(timestamps, values)))
@@ -171,3 +171,54 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
         query = query.offset(offset)
 
     return query
+
+
+def keyset_paginate_query(query, model, limit, keys, marker_values=None,
+                          sort_dir='asc'):
+    """Returns a query ordered by keys, with rows after the marker values.
+
+    Unlike paginate_query, the marker is given as the values of the keys of
+    the last row of the previous page and the criteria compare the columns
+    directly, so an index on keys serves every page at the same cost.
+
+    :param query: the query object to which we should add paging/sorting
+    :param model: the ORM model class
+    :param limit: maximum number of items to return
+    :param keys: attributes identifying a row, in index order, the last one
+                 must be unique
+    :param marker_values: values of keys of the last row of the previous
+                          page, None for the first page
+    :param sort_dir: direction in which results should be sorted (asc, desc)
+
+    :rtype: sqlalchemy.orm.query.Query
+    :return: The query with sorting/pagination added.
+    """
+    if sort_dir not in ('asc', 'desc'):
+        raise ValueError(_("Unknown sort direction, "
+                           "must be 'desc' or 'asc'"))
+    columns = [getattr(model, key) for key in keys]
+    sort_dir_func = sqlalchemy.asc if sort_dir == 'asc' else sqlalchemy.desc
+    query = query.order_by(*[sort_dir_func(column) for column in columns])
+
+    if marker_values is not None:
+        # (k1, k2) > (X1, X2) written as k1 >= X1 and (k1 > X1 or k2 > X2),
+        # the leading bound keeps the index range scan
+        criteria_list = []
+        for i, column in enumerate(columns):
+            crit_attrs = [columns[j] == marker_values[j] for j in range(i)]
+            if sort_dir == 'asc':
+                crit_attrs.append(column > marker_values[i])
+            else:
+                crit_attrs.append(column < marker_values[i])
+            criteria_list.append(sqlalchemy.sql.and_(*crit_attrs))
+        criteria = sqlalchemy.sql.or_(*criteria_list)
+        if len(columns) > 1:
+            bound = (columns[0] >= marker_values[0] if sort_dir == 'asc'
+                     else columns[0] <= marker_values[0])
+            criteria = sqlalchemy.sql.and_(bound, criteria)
+        query = query.filter(criteria)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
@@ -342,11 +342,31 @@ class ConsistentHashing(Coordinator):
             LOG.info('Member %s already in partitioner_group' % CONF.host)
 
     def get_task_executor(self, task_id):
+        executor = self.get_task_executors([task_id]).get(task_id)
+        LOG.info('For task id %s, host should be %s' % (task_id, executor))
+        return executor
+
+    def get_task_executors(self, task_ids):
+        """Return {task id: executor} of task_ids, reading the ring once."""
         part = partitioner.Partitioner(self.coordinator, self.GROUP_NAME)
-        members = part.members_for_object(task_id)
-        for member in members:
-            LOG.info('For task id %s, host should be %s' % (task_id, member))
-            return member.decode('utf-8')
+        try:
+            executors = {}
+            for task_id in task_ids:
+                for member in part.members_for_object(task_id):
+                    executors[task_id] = member.decode('utf-8')
+                    break
+            return executors
+        finally:
+            part.stop()
+
+    def get_member_weights(self):
+        """Return {member: weight} of the members of the group."""
+        members = self.coordinator.get_members(self.GROUP_NAME).get()
+        capabilities = [(member, self.coordinator.get_member_capabilities(
+            self.GROUP_NAME, member)) for member in members]
+        return dict((member.decode('utf-8'),
+                     capability.get().get('weight', 1))
+                    for member, capability in capabilities)
 
     def register_watcher_func(self, on_node_join, on_node_leave):
         self.coordinator.watch_join_group(self.GROUP_NAME, on_node_join)
@@ -63,6 +63,74 @@ def register_db():
     IMPL.register_db()
 
 
+def session_scope(transaction=False):
+    """Context manager running its database calls on a single connection.
+
+    Use it around a burst of database calls, one sync run or one trap,
+    rather than around long calls to storage backends. With transaction,
+    the calls are also committed together, or not at all.
+    """
+    return IMPL.session_scope(transaction)
+
+
+def connection_pool_stats():
+    """Return the connection checkout wait statistics of this process."""
+    return IMPL.connection_pool_stats()
+
+
+def resources_upsert(context, table_name, values):
+    """Create or update, by id, multiple rows of a resource table.
+
+    :param table_name: name of the table, 'volumes' for instance
+    :param values: list of dict of the rows, with their id when they
+                   may already exist
+    """
+    return IMPL.resources_upsert(context, table_name, values)
+
+
+def resources_get_all_iter(context, table_name, filters=None,
+                           page_size=None):
+    """Iterate over the rows of a resource table, as dicts.
+
+    Rows are read by pages of page_size rows, in (storage_id, id) order,
+    so memory does not grow with the number of rows.
+
+    :param table_name: name of the table, 'volumes' for instance
+    :param filters: dictionary of filters, as for the *_get_all functions
+    :param page_size: rows read per query
+    """
+    return IMPL.resources_get_all_iter(context, table_name, filters,
+                                       page_size)
+
+
+def resources_get_by_native_ids(context, table_name, storage_id, key,
+                                native_ids):
+    """Return the rows of a storage whose key column is in native_ids.
+
+    :param table_name: name of the table, 'volumes' for instance
+    :param key: native id column, 'native_volume_id' for instance
+    :returns: list of rows, as dicts
+    """
+    return IMPL.resources_get_by_native_ids(context, table_name, storage_id,
+                                            key, native_ids)
+
+
+def sync_watermark_get(context, storage_id, resource):
+    """Get the sync watermark of a resource of a storage, or raise
+    SyncWatermarkNotFound.
+    """
+    return IMPL.sync_watermark_get(context, storage_id, resource)
+
+
+def sync_watermark_set(context, storage_id, resource, values):
+    """Create or update the sync watermark of a resource of a storage.
+
+    :param resource: name of the resources, 'volumes' for instance
+    :param values: dict of watermark and full_synced_at
+    """
+    return IMPL.sync_watermark_set(context, storage_id, resource, values)
+
+
 def storage_get(context, storage_id):
     """Retrieve a storage device."""
     return IMPL.storage_get(context, storage_id)
@@ -93,6 +161,26 @@ def storage_get_all(context, marker=None, limit=None, sort_keys=None,
                                 filters, offset)
 
 
+def storage_get_cached(context, storage_id):
+    """Retrieve a storage device, through the process cache.
+
+    The record may be up to [database] record_cache_ttl seconds old when
+    it was changed by another process, use storage_get() to read, modify
+    and write a storage.
+    """
+    return IMPL.storage_get_cached(context, storage_id)
+
+
+def storage_cache_invalidate(storage_id=None):
+    """Drop the cached records of a storage, or of every storage."""
+    return IMPL.storage_cache_invalidate(storage_id)
+
+
+def storage_cache_stats():
+    """Return the hit and miss statistics of the record caches."""
+    return IMPL.storage_cache_stats()
+
+
 def storage_create(context, values):
     """Add a storage device from the values dictionary."""
     return IMPL.storage_create(context, values)
@@ -653,6 +741,11 @@ def access_info_get(context, storage_id):
     return IMPL.access_info_get(context, storage_id)
 
 
+def access_info_get_cached(context, storage_id):
+    """Get a storage access information, through the process cache."""
+    return IMPL.access_info_get_cached(context, storage_id)
+
+
 def access_info_delete(context, storage_id):
     """Delete a storage access information."""
     return IMPL.access_info_delete(context, storage_id)
@@ -742,6 +835,11 @@ def task_update(context, task_id, values):
     return IMPL.task_update(context, task_id, values)
 
 
+def tasks_update(context, values_list):
+    """Update multiple tasks, each values dict carries the id of its task."""
+    return IMPL.tasks_update(context, values_list)
+
+
 def task_get(context, task_id):
     """Get a task or raise an exception if it does not exist."""
     return IMPL.task_get(context, task_id)
@@ -794,6 +892,13 @@ def failed_task_update(context, failed_task_id, values):
     return IMPL.failed_task_update(context, failed_task_id, values)
 
 
+def failed_tasks_update(context, values_list):
+    """Update multiple failed tasks, each values dict carries the id of its
+    failed task.
+    """
+    return IMPL.failed_tasks_update(context, values_list)
+
+
 def failed_task_get(context, failed_task_id):
     """Get a failed task or raise an exception if it does not exist."""
     return IMPL.failed_task_get(context, failed_task_id)
@@ -836,6 +941,11 @@ def failed_task_delete(context, failed_task_id):
     return IMPL.failed_task_delete(context, failed_task_id)
 
 
+def failed_tasks_delete(context, failed_task_ids):
+    """Delete multiple failed tasks."""
+    return IMPL.failed_tasks_delete(context, failed_task_ids)
+
+
 def failed_task_delete_by_storage(context, storage_id):
     """Delete all failed tasks of given storage or raise an exception if it
     does not exist.
@@ -19,27 +19,62 @@
 
 """Implementation of SQLAlchemy backend."""
 
+import collections
+import contextlib
 import sys
+import threading
+import time
 
 import six
 import sqlalchemy
 from oslo_config import cfg
 from oslo_db import options as db_options
+from oslo_db.sqlalchemy import engines
 from oslo_db.sqlalchemy import session
 from oslo_db.sqlalchemy import utils as db_utils
 from oslo_log import log
 from oslo_utils import uuidutils, timeutils
 from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 
 from delfin import exception
 from delfin.common import sqlalchemyutils
 from delfin.db.sqlalchemy import models
+from delfin.db.sqlalchemy.migration import migration
 from delfin.db.sqlalchemy.models import Storage, AccessInfo
 from delfin.i18n import _
 
+pool_opts = [
+    cfg.BoolOpt('pool_pre_ping',
+                default=True,
+                help='Ping the database when a connection is checked out of '
+                     'the pool, and transparently reconnect stale ones.'),
+    cfg.IntOpt('record_cache_ttl',
+               default=600,
+               min=0,
+               help='Seconds a storage or access info record read through '
+                    'the process cache is served before being read again. '
+                    '0 disables the cache.'),
+    cfg.IntOpt('record_cache_size',
+               default=1024,
+               min=1,
+               help='Maximum number of records kept by each process cache, '
+                    'the least recently used are dropped first.'),
+    cfg.FloatOpt('pool_checkout_warning_time',
+                 default=1.0,
+                 min=0,
+                 help='Log a warning when waiting for a connection of the '
+                      'pool takes longer than this, in seconds. '
+                      '0 disables the warning.'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(pool_opts, 'database')
 LOG = log.getLogger(__name__)
 _FACADE = None
+# Connection shared by the sessions of the current session_scope()
+_SCOPE = threading.local()
 
 _DEFAULT_SQL_CONNECTION = 'sqlite:///'
 db_options.set_defaults(cfg.CONF,
@@ -65,29 +100,309 @@ def get_engine():
 
 def get_session(**kwargs):
     facade = _create_facade_lazily()
+    scope = getattr(_SCOPE, 'scope', None)
+    if scope is not None and 'bind' not in kwargs:
+        kwargs['bind'] = scope.connection(facade.get_engine())
     return facade.get_session(**kwargs)
 
 
 def _create_facade_lazily():
     global _FACADE
     if _FACADE is None:
-        _FACADE = session.EngineFacade.from_config(cfg.CONF)
+        facade = session.EngineFacade.from_config(cfg.CONF)
+        _configure_engine(facade.get_engine())
+        _FACADE = facade
     return _FACADE
 
 
+class ConnectionPoolStats(object):
+    """Time spent by callers waiting for a connection of the pool.
+
+    A checkout includes the wait for a free connection and, when the pool
+    grows, opening the new connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.slow_checkouts = 0
+
+    def record(self, wait, slow=False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if slow:
+                self.slow_checkouts += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_total': self.wait_total,
+                'wait_max': self.wait_max,
+                'wait_avg': (self.wait_total / self.checkouts
+                             if self.checkouts else 0.0),
+                'slow_checkouts': self.slow_checkouts,
+            }
+
+
+POOL_STATS = ConnectionPoolStats()
+
+
+def _configure_engine(engine):
+    """Apply the pool options oslo.db does not handle to a new engine."""
+    if not CONF.database.pool_pre_ping and event.contains(
+            engine, 'engine_connect', engines._connect_ping_listener):
+        event.remove(engine, 'engine_connect',
+                     engines._connect_ping_listener)
+
+    # Wrap the engine rather than its pool, the pool is replaced when the
+    # engine is disposed
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        begin = time.monotonic()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            wait = time.monotonic() - begin
+            threshold = CONF.database.pool_checkout_warning_time
+            slow = bool(threshold) and wait > threshold
+            POOL_STATS.record(wait, slow)
+            if slow:
+                LOG.warning('Waited %.3fs for a database connection, pool '
+                            'status: %s', wait, engine.pool.status())
+
+    engine.raw_connection = timed_raw_connection
+
+
+def connection_pool_stats():
+    """Return the checkout wait statistics and the state of the pool."""
+    stats = POOL_STATS.to_dict()
+    if _FACADE is not None:
+        stats['pool_status'] = _FACADE.get_engine().pool.status()
+    return stats
+
+
+class _SessionScope(object):
+    """Connection of a session_scope(), checked out on first use."""
+
+    def __init__(self, transaction=False):
+        self.transaction = transaction
+        self._connection = None
+        self._transaction = None
+
+    def connection(self, engine):
+        if self._connection is None or self._connection.closed:
+            self._connection = engine.connect()
+        if self.transaction and self._transaction is None:
+            self._transaction = self._connection.begin()
+        return self._connection
+
+    def end_transaction(self, commit):
+        transaction, self._transaction = self._transaction, None
+        if transaction is None or not transaction.is_active:
+            return
+        if commit:
+            transaction.commit()
+        else:
+            transaction.rollback()
+
+    def close(self, commit=True):
+        try:
+            self.end_transaction(commit)
+        finally:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+@contextlib.contextmanager
+def session_scope(transaction=False):
+    """Run every database call of the block on a single connection.
+
+    The connection is checked out of the pool at the first database call
+    and returned when the block ends, instead of once per call. With
+    transaction, the calls of the block also run in one transaction,
+    committed when the block ends and rolled back if it raises.
+
+    Scopes are local to the current thread or greenthread, nested scopes
+    share the connection of the outermost one.
+    """
+    scope = getattr(_SCOPE, 'scope', None)
+    if scope is not None:
+        if not transaction or scope.transaction:
+            yield
+            return
+        # Transaction nested in a scope without one, ends with the block
+        scope.transaction = True
+        try:
+            yield
+        except Exception:
+            scope.end_transaction(commit=False)
+            raise
+        else:
+            scope.end_transaction(commit=True)
+        finally:
+            scope.transaction = False
+        return
+    scope = _SessionScope(transaction)
+    _SCOPE.scope = scope
+    commit = False
+    try:
+        yield
+        commit = True
+    finally:
+        _SCOPE.scope = None
+        scope.close(commit)
+
+
 def get_backend():
     """The backend is this module itself."""
     return sys.modules[__name__]
 
 
 def register_db():
-    """Create database and tables."""
+    """Create database and tables, and upgrade the schema of existing ones."""
     models = (Storage,
               AccessInfo
               )
     engine = create_engine(CONF.database.connection, echo=False)
     for model in models:
         model.metadata.create_all(engine)
+    migration.db_sync(engine)
+
+
+# Rows read per query by the streaming reads
+_STREAM_PAGE_SIZE = 1000
+# Keys of the keyset pagination of resources, indexed on every resource table
+KEYSET_KEYS = ('storage_id', 'id')
+# Rows handled per statement by the bulk helpers, under the SQLite limit
+# of 999 bound parameters
+_BULK_CHUNK_SIZE = 500
+
+
+def _chunks(items, size=_BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing_ids(context, session, model, ids):
+    """Return the ids among ids that have a row, one query per chunk."""
+    existing = set()
+    for chunk in _chunks(list(set(ids))):
+        query = model_query(context, model, session=session) \
+            .with_entities(model.id).filter(model.id.in_(chunk))
+        existing.update(row[0] for row in query)
+    return existing
+
+
+def _bulk_update(context, session, model, values_list, not_found):
+    """Update rows by id, with one executemany statement per chunk.
+
+    Each values dict carries the id of its row and the columns to change,
+    rows may change different columns. Ids without row are logged with the
+    not_found exception and skipped.
+
+    :return: ids of the updated rows
+    """
+    existing = _existing_ids(context, session, model,
+                             [values.get('id') for values in values_list])
+    mappings = []
+    for values in values_list:
+        if values.get('id') in existing:
+            mappings.append(values)
+        else:
+            LOG.error(not_found(values.get('id')))
+    for chunk in _chunks(mappings):
+        session.bulk_update_mappings(model, chunk)
+    return [values['id'] for values in mappings]
+
+
+def _bulk_delete(context, session, model, id_list, not_found):
+    """Delete rows by id, with one DELETE ... WHERE id IN per chunk."""
+    existing = _existing_ids(context, session, model, id_list)
+    for row_id in id_list:
+        if row_id not in existing:
+            LOG.error(not_found(row_id))
+    for chunk in _chunks(list(existing)):
+        model_query(context, model, session=session) \
+            .filter(model.id.in_(chunk)).delete(synchronize_session=False)
+
+
+def _upsert_statement(dialect, table, columns):
+    """Return an INSERT of columns updating them on id conflict."""
+    updates = [column for column in columns
+               if column not in ('id', 'created_at')]
+    if dialect == 'mysql':
+        statement = mysql.insert(table)
+        values = dict((column, statement.inserted[column])
+                      for column in updates)
+        values['updated_at'] = timeutils.utcnow()
+        return statement.on_duplicate_key_update(values)
+    insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+    statement = insert(table)
+    values = dict((column, statement.excluded[column]) for column in updates)
+    values['updated_at'] = timeutils.utcnow()
+    return statement.on_conflict_do_update(index_elements=['id'],
+                                           set_=values)
+
+
+def _bulk_upsert(context, session, model, values_list):
+    """Insert rows, or update them when their id already exists.
+
+    Uses INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE where the
+    dialect has it, one executemany statement per column set and chunk.
+    Other dialects get a bulk update of the existing ids and a bulk
+    insert of the others.
+    """
+    table = model.__table__
+    for values in values_list:
+        if not values.get('id'):
+            values['id'] = uuidutils.generate_uuid()
+    dialect = session.get_bind().dialect.name
+    if dialect in ('mysql', 'postgresql', 'sqlite'):
+        groups = {}
+        for values in values_list:
+            columns = tuple(sorted(key for key in values if key in table.c))
+            groups.setdefault(columns, []).append(
+                dict((column, values[column]) for column in columns))
+        for columns, rows in groups.items():
+            statement = _upsert_statement(dialect, table, columns)
+            for chunk in _chunks(rows):
+                session.execute(statement, chunk)
+        return
+    existing = _existing_ids(context, session, model,
+                             [values['id'] for values in values_list])
+    for chunk in _chunks([values for values in values_list
+                          if values['id'] in existing]):
+        session.bulk_update_mappings(model, chunk)
+    for chunk in _chunks([values for values in values_list
+                          if values['id'] not in existing]):
+        session.bulk_insert_mappings(model, chunk)
+
+
+def _model_of_table(table_name):
+    for mapper in models.BASE.registry.mappers:
+        if mapper.class_.__tablename__ == table_name:
+            return mapper.class_
+    raise exception.InvalidInput(
+        _('Unknown resource table: %s') % table_name)
+
+
+def resources_upsert(context, table_name, resources):
+    """Create or update, by id, multiple rows of the table_name table."""
+    model = _model_of_table(table_name)
+    session = get_session()
+    with session.begin():
+        _bulk_upsert(context, session, model, resources)
 
 
 def _process_model_like_filter(model, query, filters):
@@ -155,6 +470,106 @@ def is_valid_model_filters(model, filters, exclude_list=None):
     return True
 
 
+# Cache lookups between two logs of the cache statistics
+_CACHE_STATS_LOG_INTERVAL = 1000
+
+
+class RecordCache(object):
+    """Process local read-through cache of records, by key.
+
+    Records are kept as dicts of column values for record_cache_ttl
+    seconds, at most record_cache_size of them, the least recently used
+    are dropped first. Records are invalidated by the writes of this
+    process, other processes rely on the TTL or on explicit invalidation.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidations, loads started before one are not kept
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, load):
+        """Return the cached values of key, or those returned by load()."""
+        ttl = CONF.database.record_cache_ttl
+        if not ttl:
+            return load()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._log_stats()
+                return entry[0]
+            self.misses += 1
+            self._log_stats()
+            generation = self._generation
+        values = load()
+        with self._lock:
+            if generation == self._generation:
+                self._entries.pop(key, None)
+                self._entries[key] = (values, time.monotonic())
+                while len(self._entries) > CONF.database.record_cache_size:
+                    self._entries.popitem(last=False)
+        return values
+
+    def invalidate(self, key=None):
+        """Drop the record of key, or every record."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0,
+                    'size': len(self._entries)}
+
+    def _log_stats(self):
+        lookups = self.hits + self.misses
+        if lookups % _CACHE_STATS_LOG_INTERVAL == 0:
+            LOG.info('%s cache: %d hits, %d misses, %d records',
+                     self.name, self.hits, self.misses, len(self._entries))
+
+
+_STORAGE_CACHE = RecordCache('storage')
+_ACCESS_INFO_CACHE = RecordCache('access_info')
+
+
+def _record_values(record):
+    return dict((column.name, getattr(record, column.name))
+                for column in record.__table__.columns)
+
+
+def _record_from_values(model, values):
+    record = model()
+    record.update(values)
+    return record
+
+
+def storage_cache_invalidate(storage_id=None):
+    """Drop the cached records of a storage, or of every storage."""
+    _STORAGE_CACHE.invalidate(storage_id)
+    _ACCESS_INFO_CACHE.invalidate(storage_id)
+
+
+def storage_cache_stats():
+    """Return the hit and miss statistics of the record caches."""
+    return {'storage': _STORAGE_CACHE.stats(),
+            'access_info': _ACCESS_INFO_CACHE.stats()}
+
+
 def access_info_create(context, values):
     """Create a storage access information."""
     if not values.get('storage_id'):
@@ -177,13 +592,16 @@ def access_info_update(context, storage_id, values):
     session = get_session()
     with session.begin():
         _access_info_get(context, storage_id, session).update(values)
-        return _access_info_get(context, storage_id, session)
+        result = _access_info_get(context, storage_id, session)
+    _ACCESS_INFO_CACHE.invalidate(storage_id)
+    return result
 
 
 def access_info_delete(context, storage_id):
     """Delete a storage access information."""
     _access_info_get_query(context). \
         filter_by(storage_id=storage_id).delete()
+    _ACCESS_INFO_CACHE.invalidate(storage_id)
 
 
 def access_info_get(context, storage_id):
@@ -191,6 +609,14 @@ def access_info_get(context, storage_id):
     return _access_info_get(context, storage_id)
 
 
+def access_info_get_cached(context, storage_id):
+    """Get a storage access information, through the process cache."""
+    values = _ACCESS_INFO_CACHE.get(
+        storage_id,
+        lambda: _record_values(_access_info_get(context, storage_id)))
+    return _record_from_values(models.AccessInfo, values)
+
+
 def _access_info_get(context, storage_id, session=None):
     result = (_access_info_get_query(context, session=session)
               .filter_by(storage_id=storage_id)
@@ -217,7 +643,7 @@ def access_info_get_all(context, marker=None, limit=None, sort_keys=None,
                                          )
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.AccessInfo)
@@ -254,6 +680,7 @@ def storage_update(context, storage_id, values):
     with session.begin():
         query = _storage_get_query(context, session)
         result = query.filter_by(id=storage_id).update(values)
+    _STORAGE_CACHE.invalidate(storage_id)
     return result
 
 
@@ -262,6 +689,32 @@ def storage_get(context, storage_id):
     return _storage_get(context, storage_id)
 
 
+def storage_get_cached(context, storage_id):
+    """Retrieve a storage device, through the process cache.
+
+    The record is cached whether it is deleted or not, context.read_deleted
+    is applied to the cached record.
+    """
+    def load():
+        record = (model_query(context, models.Storage, session=None)
+                  .filter_by(id=storage_id).first())
+        if not record:
+            raise exception.StorageNotFound(storage_id)
+        return _record_values(record)
+
+    values = _STORAGE_CACHE.get(storage_id, load)
+    read_deleted = context.read_deleted
+    if read_deleted in ('no', 'n', False):
+        found = not values['deleted']
+    elif read_deleted in ('yes', 'y', True):
+        found = bool(values['deleted'])
+    else:
+        found = True
+    if not found:
+        raise exception.StorageNotFound(storage_id)
+    return _record_from_values(models.Storage, values)
+
+
 def _storage_get(context, storage_id, session=None):
     result = (_storage_get_query(context, session=session)
               .filter_by(id=storage_id)
@@ -297,7 +750,7 @@ def storage_get_all(context, marker=None, limit=None, sort_keys=None,
         # No storages   match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Storage)
@@ -314,6 +767,9 @@ def storage_delete(context, storage_id):
     """Delete a storage device."""
     delete_info = {'deleted': True, 'deleted_at': timeutils.utcnow()}
     _storage_get_query(context).filter_by(id=storage_id).update(delete_info)
+    model_query(context, models.SyncWatermark, session=None).filter_by(
+        storage_id=storage_id).delete()
+    _STORAGE_CACHE.invalidate(storage_id)
 
 
 def _volume_get_query(context, session=None):
@@ -373,14 +829,8 @@ def volumes_delete(context, volumes_id_list):
     """Delete multiple volumes."""
     session = get_session()
     with session.begin():
-        for vol_id in volumes_id_list:
-            LOG.debug('deleting volume {0}:'.format(vol_id))
-            query = _volume_get_query(context, session)
-            result = query.filter_by(id=vol_id).delete()
-
-            if not result:
-                LOG.error(exception.VolumeNotFound(vol_id))
-    return
+        _bulk_delete(context, session, models.Volume, volumes_id_list,
+                     exception.VolumeNotFound)
 
 
 def volume_update(context, vol_id, values):
@@ -395,14 +845,8 @@ def volumes_update(context, volumes):
     """Update multiple volumes."""
     session = get_session()
     with session.begin():
-        for vol in volumes:
-            LOG.debug('updating volume {0}:'.format(vol.get('id')))
-            query = _volume_get_query(context, session)
-            result = query.filter_by(id=vol.get('id')
-                                     ).update(vol)
-
-            if not result:
-                LOG.error(exception.VolumeNotFound(vol.get('id')))
+        _bulk_update(context, session, models.Volume, volumes,
+                     exception.VolumeNotFound)
 
 
 def volume_get(context, volume_id):
@@ -422,7 +866,7 @@ def volume_get_all(context, marker=None, limit=None, sort_keys=None,
         # No volume would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Volume)
@@ -498,15 +942,8 @@ def storage_pools_delete(context, storage_pools_id_list):
     """Delete multiple storage_pools with the storage_pools dictionary."""
     session = get_session()
     with session.begin():
-        for storage_pool_id in storage_pools_id_list:
-            LOG.debug('deleting storage_pool {0}:'.format(storage_pool_id))
-            query = _storage_pool_get_query(context, session)
-            result = query.filter_by(id=storage_pool_id).delete()
-
-            if not result:
-                LOG.error(exception.StoragePoolNotFound(storage_pool_id))
-
-    return
+        _bulk_delete(context, session, models.StoragePool,
+                     storage_pools_id_list, exception.StoragePoolNotFound)
 
 
 def storage_pool_update(context, storage_pool_id, values):
@@ -526,24 +963,9 @@ def storage_pool_update(context, storage_pool_id, values):
 def storage_pools_update(context, storage_pools):
     """Update multiple storage_pools withe the storage_pools dictionary."""
     session = get_session()
-
     with session.begin():
-        storage_pool_refs = []
-
-        for storage_pool in storage_pools:
-            LOG.debug('updating storage_pool {0}:'.format(
-                storage_pool.get('id')))
-            query = _storage_pool_get_query(context, session)
-            result = query.filter_by(id=storage_pool.get('id')
-                                     ).update(storage_pool)
-
-            if not result:
-                LOG.error(exception.StoragePoolNotFound(storage_pool.get(
-                    'id')))
-            else:
-                storage_pool_refs.append(result)
-
-    return storage_pool_refs
+        return _bulk_update(context, session, models.StoragePool,
+                            storage_pools, exception.StoragePoolNotFound)
 
 
 def storage_pool_get(context, storage_pool_id):
@@ -564,7 +986,7 @@ def storage_pool_get_all(context, marker=None, limit=None, sort_keys=None,
         # No storage_pool would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 def storage_pool_delete_by_storage(context, storage_id):
@@ -607,39 +1029,17 @@ def controllers_create(context, controllers):
 def controllers_update(context, controllers):
     """Update multiple controllers."""
     session = get_session()
-
     with session.begin():
-        controller_refs = []
-
-        for controller in controllers:
-            LOG.debug('updating controller {0}:'.format(
-                controller.get('id')))
-            query = _controller_get_query(context, session)
-            result = query.filter_by(id=controller.get('id')
-                                     ).update(controller)
-
-            if not result:
-                LOG.error(exception.ControllerNotFound(controller.get(
-                    'id')))
-            else:
-                controller_refs.append(result)
-
-    return controller_refs
+        return _bulk_update(context, session, models.Controller, controllers,
+                            exception.ControllerNotFound)
 
 
 def controllers_delete(context, controllers_id_list):
     """Delete multiple controllers."""
     session = get_session()
     with session.begin():
-        for controller_id in controllers_id_list:
-            LOG.debug('deleting controller {0}:'.format(controller_id))
-            query = _controller_get_query(context, session)
-            result = query.filter_by(id=controller_id).delete()
-
-            if not result:
-                LOG.error(exception.ControllerNotFound(controller_id))
-
-    return
+        _bulk_delete(context, session, models.Controller, controllers_id_list,
+                     exception.ControllerNotFound)
 
 
 def _controller_get_query(context, session=None):
@@ -711,7 +1111,7 @@ def controller_get_all(context, marker=None, limit=None, sort_keys=None,
         # No Controller would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Controller)
@@ -749,38 +1149,17 @@ def ports_create(context, ports):
 def ports_update(context, ports):
     """Update multiple ports."""
     session = get_session()
-
     with session.begin():
-        port_refs = []
-
-        for port in ports:
-            LOG.debug('updating port {0}:'.format(
-                port.get('id')))
-            query = _port_get_query(context, session)
-            result = query.filter_by(id=port.get('id')
-                                     ).update(port)
-
-            if not result:
-                LOG.error(exception.PortNotFound(port.get(
-                    'id')))
-            else:
-                port_refs.append(result)
-
-    return port_refs
+        return _bulk_update(context, session, models.Port, ports,
+                            exception.PortNotFound)
 
 
 def ports_delete(context, ports_id_list):
     """Delete multiple ports."""
     session = get_session()
     with session.begin():
-        for port_id in ports_id_list:
-            LOG.debug('deleting port {0}:'.format(port_id))
-            query = _port_get_query(context, session)
-            result = query.filter_by(id=port_id).delete()
-
-            if not result:
-                LOG.error(exception.PortNotFound(port_id))
-    return
+        _bulk_delete(context, session, models.Port, ports_id_list,
+                     exception.PortNotFound)
 
 
 def _port_get_query(context, session=None):
@@ -853,7 +1232,7 @@ def port_get_all(context, marker=None, limit=None, sort_keys=None,
         # No Port would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Port)
@@ -891,39 +1270,17 @@ def disks_create(context, disks):
 def disks_update(context, disks):
     """Update multiple disks."""
     session = get_session()
-
     with session.begin():
-        disk_refs = []
-
-        for disk in disks:
-            LOG.debug('updating disk {0}:'.format(
-                disk.get('id')))
-            query = _disk_get_query(context, session)
-            result = query.filter_by(id=disk.get('id')
-                                     ).update(disk)
-
-            if not result:
-                LOG.error(exception.DiskNotFound(disk.get(
-                    'id')))
-            else:
-                disk_refs.append(result)
-
-    return disk_refs
+        return _bulk_update(context, session, models.Disk, disks,
+                            exception.DiskNotFound)
 
 
 def disks_delete(context, disks_id_list):
     """Delete multiple disks."""
     session = get_session()
     with session.begin():
-        for disk_id in disks_id_list:
-            LOG.debug('deleting disk {0}:'.format(disk_id))
-            query = _disk_get_query(context, session)
-            result = query.filter_by(id=disk_id).delete()
-
-            if not result:
-                LOG.error(exception.DiskNotFound(disk_id))
-
-    return
+        _bulk_delete(context, session, models.Disk, disks_id_list,
+                     exception.DiskNotFound)
 
 
 def _disk_get_query(context, session=None):
@@ -996,7 +1353,7 @@ def disk_get_all(context, marker=None, limit=None, sort_keys=None,
         # No Disk would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Disk)
@@ -1034,38 +1391,17 @@ def filesystems_create(context, filesystems):
 def filesystems_update(context, filesystems):
     """Update multiple filesystems."""
     session = get_session()
-
     with session.begin():
-        filesystem_refs = []
-
-        for filesystem in filesystems:
-            LOG.debug('updating filesystem {0}:'.format(
-                filesystem.get('id')))
-            query = _filesystem_get_query(context, session)
-            result = query.filter_by(id=filesystem.get('id')
-                                     ).update(filesystem)
-
-            if not result:
-                LOG.error(exception.FilesystemNotFound(filesystem.get(
-                    'id')))
-            else:
-                filesystem_refs.append(result)
-
-    return filesystem_refs
+        return _bulk_update(context, session, models.Filesystem, filesystems,
+                            exception.FilesystemNotFound)
 
 
 def filesystems_delete(context, filesystems_id_list):
     """Delete multiple filesystems."""
     session = get_session()
     with session.begin():
-        for filesystem_id in filesystems_id_list:
-            LOG.debug('deleting filesystem {0}:'.format(filesystem_id))
-            query = _filesystem_get_query(context, session)
-            result = query.filter_by(id=filesystem_id).delete()
-
-            if not result:
-                LOG.error(exception.FilesystemNotFound(filesystem_id))
-    return
+        _bulk_delete(context, session, models.Filesystem, filesystems_id_list,
+                     exception.FilesystemNotFound)
 
 
 def _filesystem_get_query(context, session=None):
@@ -1138,7 +1474,7 @@ def filesystem_get_all(context, marker=None, limit=None, sort_keys=None,
         # No Filesystem would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Filesystem)
@@ -1176,38 +1512,17 @@ def quotas_create(context, quotas):
 def quotas_update(context, quotas):
     """Update multiple quotas."""
     session = get_session()
-
     with session.begin():
-        quota_refs = []
-
-        for quota in quotas:
-            LOG.debug('updating quota {0}:'.format(
-                quota.get('id')))
-            query = _quota_get_query(context, session)
-            result = query.filter_by(id=quota.get('id')
-                                     ).update(quota)
-
-            if not result:
-                LOG.error(exception.QuotaNotFound(quota.get(
-                    'id')))
-            else:
-                quota_refs.append(result)
-
-    return quota_refs
+        return _bulk_update(context, session, models.Quota, quotas,
+                            exception.QuotaNotFound)
 
 
 def quotas_delete(context, quotas_id_list):
     """Delete multiple quotas."""
     session = get_session()
     with session.begin():
-        for quota_id in quotas_id_list:
-            LOG.debug('deleting quota {0}:'.format(quota_id))
-            query = _quota_get_query(context, session)
-            result = query.filter_by(id=quota_id).delete()
-
-            if not result:
-                LOG.error(exception.QuotaNotFound(quota_id))
-    return
+        _bulk_delete(context, session, models.Quota, quotas_id_list,
+                     exception.QuotaNotFound)
 
 
 def _quota_get_query(context, session=None):
@@ -1280,7 +1595,7 @@ def quota_get_all(context, marker=None, limit=None, sort_keys=None,
         # No Quota would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Quota)
@@ -1318,38 +1633,17 @@ def qtrees_create(context, qtrees):
 def qtrees_update(context, qtrees):
     """Update multiple qtrees."""
     session = get_session()
-
     with session.begin():
-        qtree_refs = []
-
-        for qtree in qtrees:
-            LOG.debug('updating qtree {0}:'.format(
-                qtree.get('id')))
-            query = _qtree_get_query(context, session)
-            result = query.filter_by(id=qtree.get('id')
-                                     ).update(qtree)
-
-            if not result:
-                LOG.error(exception.QtreeNotFound(qtree.get(
-                    'id')))
-            else:
-                qtree_refs.append(result)
-
-    return qtree_refs
+        return _bulk_update(context, session, models.Qtree, qtrees,
+                            exception.QtreeNotFound)
 
 
 def qtrees_delete(context, qtrees_id_list):
     """Delete multiple qtrees."""
     session = get_session()
     with session.begin():
-        for qtree_id in qtrees_id_list:
-            LOG.debug('deleting qtree {0}:'.format(qtree_id))
-            query = _qtree_get_query(context, session)
-            result = query.filter_by(id=qtree_id).delete()
-
-            if not result:
-                LOG.error(exception.QtreeNotFound(qtree_id))
-    return
+        _bulk_delete(context, session, models.Qtree, qtrees_id_list,
+                     exception.QtreeNotFound)
 
 
 def _qtree_get_query(context, session=None):
@@ -1422,7 +1716,7 @@ def qtree_get_all(context, marker=None, limit=None, sort_keys=None,
         # No Qtree would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Qtree)
@@ -1460,38 +1754,17 @@ def shares_create(context, shares):
 def shares_update(context, shares):
     """Update multiple shares."""
     session = get_session()
-
     with session.begin():
-        share_refs = []
-
-        for share in shares:
-            LOG.debug('updating share {0}:'.format(
-                share.get('id')))
-            query = _share_get_query(context, session)
-            result = query.filter_by(id=share.get('id')
-                                     ).update(share)
-
-            if not result:
-                LOG.error(exception.ShareNotFound(share.get(
-                    'id')))
-            else:
-                share_refs.append(result)
-
-    return share_refs
+        return _bulk_update(context, session, models.Share, shares,
+                            exception.ShareNotFound)
 
 
 def shares_delete(context, shares_id_list):
     """Delete multiple shares."""
     session = get_session()
     with session.begin():
-        for share_id in shares_id_list:
-            LOG.debug('deleting share {0}:'.format(share_id))
-            query = _share_get_query(context, session)
-            result = query.filter_by(id=share_id).delete()
-
-            if not result:
-                LOG.error(exception.ShareNotFound(share_id))
-    return
+        _bulk_delete(context, session, models.Share, shares_id_list,
+                     exception.ShareNotFound)
 
 
 def _share_get_query(context, session=None):
@@ -1564,7 +1837,7 @@ def share_get_all(context, marker=None, limit=None, sort_keys=None,
         # No Share would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Share)
@@ -1672,7 +1945,7 @@ def alert_source_get_all(context, marker=None, limit=None, sort_keys=None,
                                          filters, offset)
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 def task_create(context, values):
@@ -1716,6 +1989,14 @@ def _task_get_query(context, session=None):
     return model_query(context, models.Task, session=session)
 
 
+def tasks_update(context, values_list):
+    """Update multiple tasks, each values dict carries its id."""
+    session = get_session()
+    with session.begin():
+        _bulk_update(context, session, models.Task, values_list,
+                     exception.TaskNotFound)
+
+
 def task_get(context, tasks_id):
     """Get a task  or raise an exception if it does not exist."""
     return _task_get(context, tasks_id)
@@ -1746,7 +2027,7 @@ def task_get_all(context, marker=None, limit=None, sort_keys=None,
         # No task entry would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.Task)
@@ -1786,6 +2067,14 @@ def failed_task_update(context, failed_task_id, values):
     return result
 
 
+def failed_tasks_update(context, values_list):
+    """Update multiple failed tasks, each values dict carries its id."""
+    session = get_session()
+    with session.begin():
+        _bulk_update(context, session, models.FailedTask, values_list,
+                     exception.FailedTaskNotFound)
+
+
 def _failed_tasks_get(context, failed_task_id, session=None):
     result = (_failed_tasks_get_query(context, session=session)
               .filter_by(id=failed_task_id)
@@ -1824,6 +2113,14 @@ def failed_task_delete(context, failed_task_id):
     _failed_tasks_get_query(context).filter_by(id=failed_task_id).delete()
 
 
+def failed_tasks_delete(context, failed_task_ids):
+    """Delete multiple failed tasks."""
+    session = get_session()
+    with session.begin():
+        _bulk_delete(context, session, models.FailedTask, failed_task_ids,
+                     exception.FailedTaskNotFound)
+
+
 def failed_task_get_all(context, marker=None, limit=None, sort_keys=None,
                         sort_dirs=None, filters=None, offset=None):
     """Retrieves all failed tasks."""
@@ -1837,7 +2134,7 @@ def failed_task_get_all(context, marker=None, limit=None, sort_keys=None,
         # No failed task would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.FailedTask)
@@ -1894,31 +2191,18 @@ def storage_host_initiators_delete(context, storage_host_initiators_id_list):
     """Delete multiple storage initiators."""
     session = get_session()
     with session.begin():
-        for initiator_id in storage_host_initiators_id_list:
-            LOG.debug('Deleting storage host initiator{0}:'
-                      .format(initiator_id))
-            query = _storage_host_initiators_get_query(context, session)
-            result = query.filter_by(id=initiator_id).delete()
-
-            if not result:
-                LOG.error(exception.StorageHostInitiatorNotFound(initiator_id))
-    return
+        _bulk_delete(context, session, models.StorageHostInitiator,
+                     storage_host_initiators_id_list,
+                     exception.StorageHostInitiatorNotFound)
 
 
 def storage_host_initiators_update(context, storage_host_initiators):
     """Update multiple storage initiators."""
     session = get_session()
     with session.begin():
-        for initiator in storage_host_initiators:
-            LOG.debug('Updating storage host initiator{0}:'
-                      .format(initiator.get('id')))
-            query = _storage_host_initiators_get_query(context, session)
-            result = query.filter_by(id=initiator.get('id')
-                                     ).update(initiator)
-
-            if not result:
-                LOG.error(exception.StorageHostInitiatorNotFound(initiator
-                                                                 .get('id')))
+        _bulk_update(context, session, models.StorageHostInitiator,
+                     storage_host_initiators,
+                     exception.StorageHostInitiatorNotFound)
 
 
 def storage_host_initiators_get(context, storage_host_initiator_id):
@@ -1943,7 +2227,7 @@ def storage_host_initiators_get_all(context, marker=None, limit=None,
         # No storage host initiator would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.StorageHostInitiator)
@@ -2004,29 +2288,16 @@ def storage_hosts_delete(context, storage_hosts_id_list):
     """Delete multiple storage hosts."""
     session = get_session()
     with session.begin():
-        for host_id in storage_hosts_id_list:
-            LOG.debug('Deleting volume {0}:'.format(host_id))
-            query = _storage_hosts_get_query(context, session)
-            result = query.filter_by(id=host_id).delete()
-
-            if not result:
-                LOG.error(exception.StorageHostNotFound(host_id))
-    return
+        _bulk_delete(context, session, models.StorageHost,
+                     storage_hosts_id_list, exception.StorageHostNotFound)
 
 
 def storage_hosts_update(context, storage_hosts):
     """Update multiple storage hosts."""
     session = get_session()
     with session.begin():
-        for host in storage_hosts:
-            LOG.debug('Updating storage hosts {0}:'.format(host.get('id')))
-            query = _storage_hosts_get_query(context, session)
-            result = query.filter_by(id=host.get('id')
-                                     ).update(host)
-
-            if not result:
-                LOG.error(exception.StorageHostNotFound(host
-                                                        .get('id')))
+        _bulk_update(context, session, models.StorageHost, storage_hosts,
+                     exception.StorageHostNotFound)
 
 
 def storage_hosts_get(context, storage_host_id):
@@ -2046,7 +2317,7 @@ def storage_hosts_get_all(context, marker=None, limit=None, sort_keys=None,
         # No storage host would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.StorageHost)
@@ -2107,30 +2378,17 @@ def storage_host_groups_delete(context, storage_host_groups_id_list):
     """Delete multiple storage host groups."""
     session = get_session()
     with session.begin():
-        for host_group_id in storage_host_groups_id_list:
-            LOG.debug('Deleting storage host group {0}:'.format(host_group_id))
-            query = _storage_host_groups_get_query(context, session)
-            result = query.filter_by(id=host_group_id).delete()
-
-            if not result:
-                LOG.error(exception.StorageHostGroupNotFound(host_group_id))
-    return
+        _bulk_delete(context, session, models.StorageHostGroup,
+                     storage_host_groups_id_list,
+                     exception.StorageHostGroupNotFound)
 
 
 def storage_host_groups_update(context, storage_host_groups):
     """Update multiple storage host groups."""
     session = get_session()
     with session.begin():
-        for host_group in storage_host_groups:
-            LOG.debug('Updating storage host groups {0}:'
-                      .format(host_group.get('id')))
-            query = _storage_host_groups_get_query(context, session)
-            result = query.filter_by(id=host_group.get('id')
-                                     ).update(host_group)
-
-            if not result:
-                LOG.error(exception.StorageHostGroupNotFound(host_group
-                                                             .get('id')))
+        _bulk_update(context, session, models.StorageHostGroup,
+                     storage_host_groups, exception.StorageHostGroupNotFound)
 
 
 def storage_host_groups_get(context, storage_host_group_id):
@@ -2152,7 +2410,7 @@ def storage_host_groups_get_all(context, marker=None, limit=None,
         # No storage host group would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.StorageHostGroup)
@@ -2213,30 +2471,16 @@ def port_groups_delete(context, port_groups_id_list):
     """Delete multiple port groups."""
     session = get_session()
     with session.begin():
-        for port_group_id in port_groups_id_list:
-            LOG.debug('Deleting port group {0}:'.format(port_group_id))
-            query = _port_groups_get_query(context, session)
-            result = query.filter_by(id=port_group_id).delete()
-
-            if not result:
-                LOG.error(exception.PortGroupNotFound(port_group_id))
-    return
+        _bulk_delete(context, session, models.PortGroup, port_groups_id_list,
+                     exception.PortGroupNotFound)
 
 
 def port_groups_update(context, port_groups):
     """Update multiple port groups."""
     session = get_session()
     with session.begin():
-        for port_group in port_groups:
-            LOG.debug('Updating port groups {0}:'
-                      .format(port_group.get('id')))
-            query = _port_groups_get_query(context, session)
-            result = query.filter_by(id=port_group.get('id')
-                                     ).update(port_group)
-
-            if not result:
-                LOG.error(exception.PortGroupNotFound(port_group
-                                                      .get('id')))
+        _bulk_update(context, session, models.PortGroup, port_groups,
+                     exception.PortGroupNotFound)
 
 
 def port_groups_get(context, port_group_id):
@@ -2258,7 +2502,7 @@ def port_groups_get_all(context, marker=None, limit=None,
         # No port group would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.PortGroup)
@@ -2318,30 +2562,16 @@ def volume_groups_delete(context, volume_groups_id_list):
     """Delete multiple volume groups."""
     session = get_session()
     with session.begin():
-        for volume_group_id in volume_groups_id_list:
-            LOG.debug('Deleting volume group {0}:'.format(volume_group_id))
-            query = _volume_groups_get_query(context, session)
-            result = query.filter_by(id=volume_group_id).delete()
-
-            if not result:
-                LOG.error(exception.VolumeGroupNotFound(volume_group_id))
-    return
+        _bulk_delete(context, session, models.VolumeGroup,
+                     volume_groups_id_list, exception.VolumeGroupNotFound)
 
 
 def volume_groups_update(context, volume_groups):
     """Update multiple volume groups."""
     session = get_session()
     with session.begin():
-        for volume_group in volume_groups:
-            LOG.debug('Updating volume groups {0}:'
-                      .format(volume_group.get('id')))
-            query = _volume_groups_get_query(context, session)
-            result = query.filter_by(id=volume_group.get('id')
-                                     ).update(volume_group)
-
-            if not result:
-                LOG.error(exception.VolumeGroupNotFound(volume_group
-                                                        .get('id')))
+        _bulk_update(context, session, models.VolumeGroup, volume_groups,
+                     exception.VolumeGroupNotFound)
 
 
 def volume_groups_get(context, volume_group_id):
@@ -2363,7 +2593,7 @@ def volume_groups_get_all(context, marker=None, limit=None,
         # No volume group would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.VolumeGroup)
@@ -2424,30 +2654,16 @@ def masking_views_delete(context, masking_views_id_list):
     """Delete multiple masking views."""
     session = get_session()
     with session.begin():
-        for masking_view_id in masking_views_id_list:
-            LOG.debug('Deleting masking view {0}:'.format(masking_view_id))
-            query = _masking_views_get_query(context, session)
-            result = query.filter_by(id=masking_view_id).delete()
-
-            if not result:
-                LOG.error(exception.MaskingViewNotFound(masking_view_id))
-    return
+        _bulk_delete(context, session, models.MaskingView,
+                     masking_views_id_list, exception.MaskingViewNotFound)
 
 
 def masking_views_update(context, masking_views):
     """Update multiple masking views."""
     session = get_session()
     with session.begin():
-        for masking_view in masking_views:
-            LOG.debug('Updating masking views {0}:'
-                      .format(masking_view.get('id')))
-            query = _masking_views_get_query(context, session)
-            result = query.filter_by(id=masking_view.get('id')
-                                     ).update(masking_view)
-
-            if not result:
-                LOG.error(exception.MaskingViewNotFound(masking_view
-                                                        .get('id')))
+        _bulk_update(context, session, models.MaskingView, masking_views,
+                     exception.MaskingViewNotFound)
 
 
 def masking_views_get(context, masking_view_id):
@@ -2469,7 +2685,7 @@ def masking_views_get_all(context, marker=None, limit=None,
         # No masking view would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.MaskingView)
@@ -2537,17 +2753,9 @@ def storage_host_grp_host_rels_delete(context,
     """Delete multiple storage host grp host relations."""
     session = get_session()
     with session.begin():
-        for host_grp_host_relation_id in host_grp_host_relations_list:
-            LOG.debug('deleting storage host grp host relation {0}:'.format(
-                host_grp_host_relation_id))
-            query = _storage_host_grp_host_rels_get_query(context,
-                                                          session)
-            result = query.filter_by(id=host_grp_host_relation_id).delete()
-
-            if not result:
-                LOG.error(exception.StorageHostGrpHostRelNotFound(
-                    host_grp_host_relation_id))
-    return
+        _bulk_delete(context, session, models.StorageHostGrpHostRel,
+                     host_grp_host_relations_list,
+                     exception.StorageHostGrpHostRelNotFound)
 
 
 def storage_host_grp_host_rels_update(context,
@@ -2555,17 +2763,9 @@ def storage_host_grp_host_rels_update(context,
     """Update multiple storage host grp host relations."""
     session = get_session()
     with session.begin():
-        for host_grp_host_relation in host_grp_host_relations_list:
-            LOG.debug('Updating storage host grp host relations {0}:'
-                      .format(host_grp_host_relation.get('id')))
-            query = _storage_host_grp_host_rels_get_query(context,
-                                                          session)
-            result = query.filter_by(id=host_grp_host_relation.get('id')
-                                     ).update(host_grp_host_relation)
-
-            if not result:
-                LOG.error(exception.StorageHostGrpHostRelNotFound(
-                    host_grp_host_relation.get('id')))
+        _bulk_update(context, session, models.StorageHostGrpHostRel,
+                     host_grp_host_relations_list,
+                     exception.StorageHostGrpHostRelNotFound)
 
 
 def storage_host_grp_host_rels_get(context, host_grp_host_relation_id):
@@ -2590,7 +2790,7 @@ def storage_host_grp_host_rels_get_all(context, marker=None, limit=None,
         # No storage host grp host relation would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.StorageHostGrpHostRel)
@@ -2656,16 +2856,8 @@ def port_grp_port_rels_delete(context,
     """Delete multiple port grp port relations."""
     session = get_session()
     with session.begin():
-        for port_grp_port_relation_id in port_grp_port_rels_list:
-            LOG.debug('deleting port grp port relation {0}:'.format(
-                port_grp_port_relation_id))
-            query = _port_grp_port_rels_get_query(context, session)
-            result = query.filter_by(id=port_grp_port_relation_id).delete()
-
-            if not result:
-                LOG.error(exception.PortGrpPortRelNotFound(
-                    port_grp_port_relation_id))
-    return
+        _bulk_delete(context, session, models.PortGrpPortRel,
+                     port_grp_port_rels_list, exception.PortGrpPortRelNotFound)
 
 
 def port_grp_port_rels_update(context,
@@ -2673,17 +2865,8 @@ def port_grp_port_rels_update(context,
     """Update multiple port grp port relations."""
     session = get_session()
     with session.begin():
-        for port_grp_port_relation in port_grp_port_rels_list:
-            LOG.debug('Updating port grp port relations {0}:'
-                      .format(port_grp_port_relation.get('id')))
-            query = _port_grp_port_rels_get_query(context,
-                                                  session)
-            result = query.filter_by(id=port_grp_port_relation.get('id')
-                                     ).update(port_grp_port_relation)
-
-            if not result:
-                LOG.error(exception.PortGrpPortRelNotFound(
-                    port_grp_port_relation.get('id')))
+        _bulk_update(context, session, models.PortGrpPortRel,
+                     port_grp_port_rels_list, exception.PortGrpPortRelNotFound)
 
 
 def port_grp_port_rels_get(context, port_grp_port_relation_id):
@@ -2708,7 +2891,7 @@ def port_grp_port_rels_get_all(context, marker=None, limit=None,
         # No port grp port relation would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.PortGrpPortRel)
@@ -2776,16 +2959,9 @@ def vol_grp_vol_rels_delete(context,
     """Delete multiple volume grp volume relations."""
     session = get_session()
     with session.begin():
-        for volume_grp_volume_relation_id in vol_grp_vol_rels_list:
-            LOG.debug('deleting volume grp volume relation {0}:'.format(
-                volume_grp_volume_relation_id))
-            query = _vol_grp_vol_rels_get_query(context, session)
-            result = query.filter_by(id=volume_grp_volume_relation_id).delete()
-
-            if not result:
-                LOG.error(exception.VolGrpVolRelationNotFound(
-                    volume_grp_volume_relation_id))
-    return
+        _bulk_delete(context, session, models.VolGrpVolRel,
+                     vol_grp_vol_rels_list,
+                     exception.VolGrpVolRelationNotFound)
 
 
 def vol_grp_vol_rels_update(context,
@@ -2793,17 +2969,9 @@ def vol_grp_vol_rels_update(context,
     """Update multiple volume grp volume relations."""
     session = get_session()
     with session.begin():
-        for volume_grp_volume_relation in vol_grp_vol_rels_list:
-            LOG.debug('Updating volume grp volume relations {0}:'
-                      .format(volume_grp_volume_relation.get('id')))
-            query = _vol_grp_vol_rels_get_query(context,
-                                                session)
-            result = query.filter_by(id=volume_grp_volume_relation.get('id')
-                                     ).update(volume_grp_volume_relation)
-
-            if not result:
-                LOG.error(exception.VolGrpVolRelationNotFound(
-                    volume_grp_volume_relation.get('id')))
+        _bulk_update(context, session, models.VolGrpVolRel,
+                     vol_grp_vol_rels_list,
+                     exception.VolGrpVolRelationNotFound)
 
 
 def vol_grp_vol_rels_get(context, volume_grp_volume_relation_id):
@@ -2828,7 +2996,7 @@ def vol_grp_vol_rels_get_all(context, marker=None, limit=None,
         # No volume grp volume relation would match, return empty list
         if query is None:
             return []
-        return query.all()
+        return _query_all(query)
 
 
 @apply_like_filters(model=models.VolGrpVolRel)
@@ -2988,6 +3156,123 @@ def process_sort_params(sort_keys, sort_dirs, default_keys=None,
     return result_keys, result_dirs
 
 
+def _keyset_keys(model, filters):
+    """Keys to page rows of model on, id alone when filters pin a storage."""
+    keys = [key for key in KEYSET_KEYS if hasattr(model, key)]
+    if len(keys) > 1 and isinstance((filters or {}).get('storage_id'),
+                                    six.string_types):
+        keys.remove('storage_id')
+    return keys
+
+
+def _keyset_sort(model, filters, sort_keys, sort_dirs):
+    """Return (keys, sort_dir) when the sort can be paged on a keyset.
+
+    That is when the rows are sorted first by storage_id and id, or by id,
+    all in the same direction. Following sort keys do not change the order
+    as id is unique.
+    """
+    for keys in (list(KEYSET_KEYS), ['id']):
+        if sort_keys[:len(keys)] != keys or \
+                len(set(sort_dirs[:len(keys)])) != 1:
+            continue
+        if all(hasattr(model, key) for key in keys):
+            return _keyset_keys(model, filters), sort_dirs[0]
+    return None
+
+
+def _iter_rows(context, model, filters=None, page_size=None):
+    """Yield the rows of model matching filters, as dicts.
+
+    Rows are read one keyset page at a time, each in its own short
+    transaction, and only as column tuples, without ORM objects.
+    """
+    page_size = page_size or _STREAM_PAGE_SIZE
+    get_query, process_filters, _get = PAGINATION_HELPERS[model]
+    keys = _keyset_keys(model, filters)
+    marker_values = None
+    while True:
+        session = get_session()
+        with session.begin():
+            query = get_query(context, session=session)
+            if filters:
+                query = process_filters(query, filters)
+                if query is None:
+                    return
+            query = sqlalchemyutils.keyset_paginate_query(
+                query.with_entities(*model.__table__.columns), model,
+                page_size, keys, marker_values=marker_values)
+            rows = [dict(row._mapping) for row in query.yield_per(page_size)]
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        marker_values = [rows[-1][key] for key in keys]
+
+
+def resources_get_all_iter(context, table_name, filters=None,
+                           page_size=None):
+    """Iterate over the rows of the table_name table, as dicts."""
+    return _iter_rows(context, _model_of_table(table_name), filters,
+                      page_size)
+
+
+def resources_get_by_native_ids(context, table_name, storage_id, key,
+                                native_ids):
+    """Return the rows of a storage whose key column is in native_ids."""
+    model = _model_of_table(table_name)
+    column = getattr(model, key)
+    rows = []
+    session = get_session()
+    with session.begin():
+        for chunk in _chunks(list(set(native_ids))):
+            query = model_query(context, model, session=session) \
+                .with_entities(*model.__table__.columns) \
+                .filter_by(storage_id=storage_id).filter(column.in_(chunk))
+            rows.extend(dict(row._mapping) for row in query)
+    return rows
+
+
+def _sync_watermark_get(context, storage_id, resource, session=None):
+    result = model_query(context, models.SyncWatermark, session=session) \
+        .filter_by(storage_id=storage_id, resource=resource).first()
+    if not result:
+        raise exception.SyncWatermarkNotFound(resource, storage_id)
+    return result
+
+
+def sync_watermark_get(context, storage_id, resource):
+    """Get the sync watermark of a resource of a storage."""
+    return _sync_watermark_get(context, storage_id, resource)
+
+
+def sync_watermark_set(context, storage_id, resource, values):
+    """Create or update the sync watermark of a resource of a storage."""
+    session = get_session()
+    with session.begin():
+        try:
+            watermark_ref = _sync_watermark_get(context, storage_id,
+                                                resource, session=session)
+        except exception.SyncWatermarkNotFound:
+            watermark_ref = models.SyncWatermark()
+            watermark_ref.update({'storage_id': storage_id,
+                                  'resource': resource})
+            session.add(watermark_ref)
+        watermark_ref.update(values)
+    return watermark_ref
+
+
+def _query_all(query):
+    """Return all rows of a paginate query.
+
+    Keyset paged queries read column tuples, their rows are returned as
+    dicts instead of ORM objects.
+    """
+    if query.is_single_entity:
+        return query.all()
+    return [dict(row._mapping) for row in query]
+
+
 def _generate_paginate_query(context, session, paginate_type, marker,
                              limit, sort_keys, sort_dirs, filters,
                              offset=None
@@ -3030,6 +3315,19 @@ def _generate_paginate_query(context, session, paginate_type, marker,
     if marker is not None:
         marker_object = get(context, marker, session)
 
+    keyset = None if offset else _keyset_sort(paginate_type, filters,
+                                              sort_keys, sort_dirs)
+    if keyset:
+        # Keyset pages are read as column tuples, like _iter_rows
+        keys, sort_dir = keyset
+        marker_values = None
+        if marker_object is not None:
+            marker_values = [getattr(marker_object, key) for key in keys]
+        return sqlalchemyutils.keyset_paginate_query(
+            query.with_entities(*paginate_type.__table__.columns),
+            paginate_type, limit, keys, marker_values=marker_values,
+            sort_dir=sort_dir)
+
     return sqlalchemyutils.paginate_query(query, paginate_type, limit,
                                           sort_keys,
                                           marker=marker_object,
@@ -0,0 +1,39 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from alembic import context
+
+from delfin.db.sqlalchemy import models
+
+
+def run_migrations_offline():
+    """Emit the migration SQL, with sqlalchemy.url as dialect."""
+    context.configure(url=context.config.get_main_option('sqlalchemy.url'),
+                      target_metadata=models.BASE.metadata,
+                      literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run the migrations on the connection given by db_sync."""
+    context.configure(connection=context.config.attributes['connection'],
+                      target_metadata=models.BASE.metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,92 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Add indexes on the resource, task and alert source lookup columns
+
+Revision ID: 001
+Revises: None
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '001'
+down_revision = None
+
+# (table, index name, columns)
+INDEXES = (
+    ('volumes', 'volumes_native_id_idx',
+     ['storage_id', 'native_volume_id']),
+    ('storage_pools', 'storage_pools_native_id_idx',
+     ['storage_id', 'native_storage_pool_id']),
+    ('disks', 'disks_native_id_idx', ['storage_id', 'native_disk_id']),
+    ('controllers', 'controllers_native_id_idx',
+     ['storage_id', 'native_controller_id']),
+    ('controllers', 'controllers_mgmt_ip_idx', ['storage_id', 'mgmt_ip']),
+    ('ports', 'ports_native_id_idx', ['storage_id', 'native_port_id']),
+    ('filesystems', 'filesystems_native_id_idx',
+     ['storage_id', 'native_filesystem_id']),
+    ('qtrees', 'qtrees_native_id_idx', ['storage_id', 'native_qtree_id']),
+    ('quota', 'quota_native_id_idx', ['storage_id', 'native_quota_id']),
+    ('shares', 'shares_native_id_idx', ['storage_id', 'native_share_id']),
+    ('alert_source', 'alert_source_host_idx', ['host']),
+    ('tasks', 'tasks_storage_id_deleted_idx', ['storage_id', 'deleted']),
+    ('tasks', 'tasks_executor_deleted_idx', ['executor', 'deleted']),
+    ('failed_tasks', 'failed_tasks_storage_id_deleted_idx',
+     ['storage_id', 'deleted']),
+    ('failed_tasks', 'failed_tasks_executor_deleted_idx',
+     ['executor', 'deleted']),
+    ('storage_host_initiators', 'storage_host_initiators_native_id_idx',
+     ['storage_id', 'native_storage_host_initiator_id']),
+    ('storage_hosts', 'storage_hosts_native_id_idx',
+     ['storage_id', 'native_storage_host_id']),
+    ('storage_host_groups', 'storage_host_groups_native_id_idx',
+     ['storage_id', 'native_storage_host_group_id']),
+    ('port_groups', 'port_groups_native_id_idx',
+     ['storage_id', 'native_port_group_id']),
+    ('volume_groups', 'volume_groups_native_id_idx',
+     ['storage_id', 'native_volume_group_id']),
+    ('masking_views', 'masking_views_native_id_idx',
+     ['storage_id', 'native_masking_view_id']),
+    ('storage_host_grp_host_rels', 'storage_host_grp_host_rels_storage_id_idx',
+     ['storage_id', 'native_storage_host_group_id']),
+    ('port_grp_port_rels', 'port_grp_port_rels_storage_id_idx',
+     ['storage_id', 'native_port_group_id']),
+    ('vol_grp_vol_rels', 'vol_grp_vol_rels_storage_id_idx',
+     ['storage_id', 'native_volume_group_id']),
+)
+
+
+def _existing_indexes():
+    """Return {table: index names}, None when generating offline SQL."""
+    if op.get_context().as_sql:
+        return None
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    return dict((table, set(index['name']
+                            for index in inspector.get_indexes(table)))
+                for table in set(table for table, _, _ in INDEXES)
+                if table in tables)
+
+
+def upgrade():
+    # Tables created from the models already have their indexes
+    existing = _existing_indexes()
+    for table, name, columns in INDEXES:
+        if existing is not None and name in existing.get(table, (name,)):
+            continue
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for table, name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
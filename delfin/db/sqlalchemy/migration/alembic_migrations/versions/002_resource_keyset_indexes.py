@@ -0,0 +1,48 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Add (storage_id, id) indexes for the keyset pagination of resources
+
+Revision ID: 002
+Revises: 001
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002'
+down_revision = '001'
+
+TABLES = ('volumes', 'storage_pools', 'disks', 'controllers', 'ports',
+          'filesystems', 'qtrees', 'quota', 'shares',
+          'storage_host_initiators', 'storage_hosts', 'storage_host_groups',
+          'port_groups', 'volume_groups', 'masking_views')
+
+
+def _index_name(table):
+    return '%s_storage_id_idx' % table
+
+
+def upgrade():
+    # Tables created from the models already have their indexes
+    inspector = None if op.get_context().as_sql \
+        else sa.inspect(op.get_bind())
+    for table in TABLES:
+        if inspector is not None and _index_name(table) in set(
+                index['name'] for index in inspector.get_indexes(table)):
+            continue
+        op.create_index(_index_name(table), table, ['storage_id', 'id'])
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(_index_name(table), table_name=table)
@@ -0,0 +1,46 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Add the sync_watermarks table of the incremental resource sync
+
+Revision ID: 003
+Revises: 002
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '003'
+down_revision = '002'
+
+
+def upgrade():
+    # Databases created from the models already have the table
+    if not op.get_context().as_sql and \
+            sa.inspect(op.get_bind()).has_table('sync_watermarks'):
+        return
+    op.create_table(
+        'sync_watermarks',
+        sa.Column('created_at', sa.DateTime),
+        sa.Column('updated_at', sa.DateTime),
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('storage_id', sa.String(36)),
+        sa.Column('resource', sa.String(255)),
+        sa.Column('watermark', sa.String(255)),
+        sa.Column('full_synced_at', sa.DateTime),
+        mysql_engine='InnoDB')
+    op.create_index('sync_watermarks_storage_id_idx', 'sync_watermarks',
+                    ['storage_id', 'resource'], unique=True)
+
+
+def downgrade():
+    op.drop_table('sync_watermarks')
@@ -0,0 +1,44 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Add the collection cost of the last run of a task
+
+Revision ID: 004
+Revises: 003
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004'
+down_revision = '003'
+
+COLUMNS = (
+    ('last_duration', sa.Float),
+    ('last_metric_count', sa.Integer),
+)
+
+
+def upgrade():
+    existing = set()
+    # Databases created from the models already have the columns
+    if not op.get_context().as_sql:
+        existing = set(column['name'] for column in
+                       sa.inspect(op.get_bind()).get_columns('tasks'))
+    for name, column_type in COLUMNS:
+        if name not in existing:
+            op.add_column('tasks', sa.Column(name, column_type))
+
+
+def downgrade():
+    for name, _ in COLUMNS:
+        op.drop_column('tasks', name)
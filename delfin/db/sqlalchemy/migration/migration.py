@@ -0,0 +1,50 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Versioned schema migrations, run with alembic.
+
+Tables are still created from the models, the migrations bring the schema
+of existing deployments up to date with them.
+"""
+import os
+
+from alembic import command
+from alembic import config as alembic_config
+from alembic import migration as alembic_migration
+from oslo_log import log
+
+LOG = log.getLogger(__name__)
+
+_SCRIPT_LOCATION = os.path.join(os.path.dirname(__file__),
+                                'alembic_migrations')
+
+
+def _alembic_config(connection):
+    config = alembic_config.Config()
+    config.set_main_option('script_location', _SCRIPT_LOCATION)
+    config.attributes['connection'] = connection
+    return config
+
+
+def db_version(engine):
+    """Return the current schema revision of the database, or None."""
+    with engine.connect() as connection:
+        context = alembic_migration.MigrationContext.configure(connection)
+        return context.get_current_revision()
+
+
+def db_sync(engine, version='head'):
+    """Upgrade the schema of the database to version."""
+    LOG.info('Upgrading database schema to %s', version)
+    with engine.begin() as connection:
+        command.upgrade(_alembic_config(connection), version)
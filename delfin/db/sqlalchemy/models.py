@@ -24,7 +24,7 @@ from oslo_config import cfg
 from oslo_db.sqlalchemy import models
 from oslo_db.sqlalchemy.types import JsonEncodedDict
 from sqlalchemy import Column, Integer, String, Boolean, BigInteger, \
-    DateTime, BIGINT
+    DateTime, BIGINT, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 from delfin.common import constants
@@ -47,6 +47,11 @@ class DelfinBase(models.ModelBase,
         return model_dict
 
 
+def _table_args(*indexes):
+    """__table_args__ of a model with indexes, keeping the base options."""
+    return indexes + (dict(DelfinBase.__table_args__),)
+
+
 class AccessInfo(BASE, DelfinBase):
     """Represent access info required for storage accessing."""
     __tablename__ = "access_info"
@@ -87,6 +92,9 @@ class Storage(BASE, DelfinBase):
 class Volume(BASE, DelfinBase):
     """Represents a volume object."""
     __tablename__ = 'volumes'
+    __table_args__ = _table_args(
+        Index('volumes_native_id_idx', 'storage_id', 'native_volume_id'),
+        Index('volumes_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_volume_id = Column(String(255))
     name = Column(String(255))
@@ -106,6 +114,10 @@ class Volume(BASE, DelfinBase):
 class StoragePool(BASE, DelfinBase):
     """Represents a storage_pool object."""
     __tablename__ = 'storage_pools'
+    __table_args__ = _table_args(
+        Index('storage_pools_native_id_idx',
+              'storage_id', 'native_storage_pool_id'),
+        Index('storage_pools_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_storage_pool_id = Column(String(255))
     name = Column(String(255))
@@ -122,6 +134,9 @@ class StoragePool(BASE, DelfinBase):
 class Disk(BASE, DelfinBase):
     """Represents a disk object."""
     __tablename__ = 'disks'
+    __table_args__ = _table_args(
+        Index('disks_native_id_idx', 'storage_id', 'native_disk_id'),
+        Index('disks_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_disk_id = Column(String(255))
     name = Column(String(255))
@@ -143,6 +158,11 @@ class Disk(BASE, DelfinBase):
 class Controller(BASE, DelfinBase):
     """Represents a controller object."""
     __tablename__ = 'controllers'
+    __table_args__ = _table_args(
+        Index('controllers_native_id_idx',
+              'storage_id', 'native_controller_id'),
+        Index('controllers_mgmt_ip_idx', 'storage_id', 'mgmt_ip'),
+        Index('controllers_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_controller_id = Column(String(255))
     name = Column(String(255))
@@ -159,6 +179,9 @@ class Controller(BASE, DelfinBase):
 class Port(BASE, DelfinBase):
     """Represents a port object."""
     __tablename__ = 'ports'
+    __table_args__ = _table_args(
+        Index('ports_native_id_idx', 'storage_id', 'native_port_id'),
+        Index('ports_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_port_id = Column(String(255))
     name = Column(String(255))
@@ -182,6 +205,10 @@ class Port(BASE, DelfinBase):
 class Filesystem(BASE, DelfinBase):
     """Represents a filesystem object."""
     __tablename__ = 'filesystems'
+    __table_args__ = _table_args(
+        Index('filesystems_native_id_idx',
+              'storage_id', 'native_filesystem_id'),
+        Index('filesystems_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_filesystem_id = Column(String(255))
     name = Column(String(255))
@@ -201,6 +228,9 @@ class Filesystem(BASE, DelfinBase):
 class Qtree(BASE, DelfinBase):
     """Represents a qtree object."""
     __tablename__ = 'qtrees'
+    __table_args__ = _table_args(
+        Index('qtrees_native_id_idx', 'storage_id', 'native_qtree_id'),
+        Index('qtrees_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_qtree_id = Column(String(255))
     name = Column(String(255))
@@ -213,6 +243,9 @@ class Qtree(BASE, DelfinBase):
 class Quota(BASE, DelfinBase):
     """Represents a qtree object."""
     __tablename__ = 'quota'
+    __table_args__ = _table_args(
+        Index('quota_native_id_idx', 'storage_id', 'native_quota_id'),
+        Index('quota_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_quota_id = Column(String(255))
     type = Column(String(255))
@@ -231,6 +264,9 @@ class Quota(BASE, DelfinBase):
 class Share(BASE, DelfinBase):
     """Represents a share object."""
     __tablename__ = 'shares'
+    __table_args__ = _table_args(
+        Index('shares_native_id_idx', 'storage_id', 'native_share_id'),
+        Index('shares_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     native_share_id = Column(String(255))
     name = Column(String(255))
@@ -244,6 +280,8 @@ class Share(BASE, DelfinBase):
 class AlertSource(BASE, DelfinBase):
     """Represents an alert source configuration."""
     __tablename__ = 'alert_source'
+    __table_args__ = _table_args(
+        Index('alert_source_host_idx', 'host'))
     storage_id = Column(String(36), primary_key=True)
     host = Column(String(255))
     version = Column(String(255))
@@ -264,12 +302,17 @@ class AlertSource(BASE, DelfinBase):
 class Task(BASE, DelfinBase):
     """Represents a task attributes."""
     __tablename__ = 'tasks'
+    __table_args__ = _table_args(
+        Index('tasks_storage_id_deleted_idx', 'storage_id', 'deleted'),
+        Index('tasks_executor_deleted_idx', 'executor', 'deleted'))
     id = Column(Integer, primary_key=True, autoincrement=True)
     storage_id = Column(String(36))
     interval = Column(Integer)
     method = Column(String(255))
     args = Column(JsonEncodedDict)
     last_run_time = Column(Integer)
+    last_duration = Column(Float)
+    last_metric_count = Column(Integer)
     job_id = Column(String(36))
     executor = Column(String(255))
     deleted_at = Column(DateTime)
@@ -279,6 +322,9 @@ class Task(BASE, DelfinBase):
 class FailedTask(BASE, DelfinBase):
     """Represents a failed task attributes."""
     __tablename__ = 'failed_tasks'
+    __table_args__ = _table_args(
+        Index('failed_tasks_storage_id_deleted_idx', 'storage_id', 'deleted'),
+        Index('failed_tasks_executor_deleted_idx', 'executor', 'deleted'))
     id = Column(Integer, primary_key=True, autoincrement=True)
     storage_id = Column(String(36))
     task_id = Column(Integer)
@@ -297,6 +343,10 @@ class FailedTask(BASE, DelfinBase):
 class StorageHostInitiator(BASE, DelfinBase):
     """Represents the storage host initiator attributes."""
     __tablename__ = 'storage_host_initiators'
+    __table_args__ = _table_args(
+        Index('storage_host_initiators_native_id_idx',
+              'storage_id', 'native_storage_host_initiator_id'),
+        Index('storage_host_initiators_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -312,6 +362,10 @@ class StorageHostInitiator(BASE, DelfinBase):
 class StorageHost(BASE, DelfinBase):
     """Represents the storage host attributes."""
     __tablename__ = 'storage_hosts'
+    __table_args__ = _table_args(
+        Index('storage_hosts_native_id_idx',
+              'storage_id', 'native_storage_host_id'),
+        Index('storage_hosts_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -325,6 +379,10 @@ class StorageHost(BASE, DelfinBase):
 class StorageHostGroup(BASE, DelfinBase):
     """Represents the storage host group attributes."""
     __tablename__ = 'storage_host_groups'
+    __table_args__ = _table_args(
+        Index('storage_host_groups_native_id_idx',
+              'storage_id', 'native_storage_host_group_id'),
+        Index('storage_host_groups_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -335,6 +393,10 @@ class StorageHostGroup(BASE, DelfinBase):
 class PortGroup(BASE, DelfinBase):
     """Represents the port group attributes."""
     __tablename__ = 'port_groups'
+    __table_args__ = _table_args(
+        Index('port_groups_native_id_idx',
+              'storage_id', 'native_port_group_id'),
+        Index('port_groups_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -345,6 +407,10 @@ class PortGroup(BASE, DelfinBase):
 class VolumeGroup(BASE, DelfinBase):
     """Represents the volume group attributes."""
     __tablename__ = 'volume_groups'
+    __table_args__ = _table_args(
+        Index('volume_groups_native_id_idx',
+              'storage_id', 'native_volume_group_id'),
+        Index('volume_groups_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -355,6 +421,10 @@ class VolumeGroup(BASE, DelfinBase):
 class MaskingView(BASE, DelfinBase):
     """Represents the masking view attributes."""
     __tablename__ = 'masking_views'
+    __table_args__ = _table_args(
+        Index('masking_views_native_id_idx',
+              'storage_id', 'native_masking_view_id'),
+        Index('masking_views_storage_id_idx', 'storage_id', 'id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -372,6 +442,9 @@ class StorageHostGrpHostRel(BASE, DelfinBase):
     attributes.
     """
     __tablename__ = 'storage_host_grp_host_rels'
+    __table_args__ = _table_args(
+        Index('storage_host_grp_host_rels_storage_id_idx',
+              'storage_id', 'native_storage_host_group_id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -383,6 +456,9 @@ class StorageHostGrpHostRel(BASE, DelfinBase):
 class PortGrpPortRel(BASE, DelfinBase):
     """Represents port group and port relation attributes."""
     __tablename__ = 'port_grp_port_rels'
+    __table_args__ = _table_args(
+        Index('port_grp_port_rels_storage_id_idx',
+              'storage_id', 'native_port_group_id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
@@ -394,9 +470,25 @@ class PortGrpPortRel(BASE, DelfinBase):
 class VolGrpVolRel(BASE, DelfinBase):
     """Represents the volume group and volume relation attributes."""
     __tablename__ = 'vol_grp_vol_rels'
+    __table_args__ = _table_args(
+        Index('vol_grp_vol_rels_storage_id_idx',
+              'storage_id', 'native_volume_group_id'))
     id = Column(String(36), primary_key=True)
     storage_id = Column(String(36))
     name = Column(String(255))
     description = Column(String(255))
     native_volume_group_id = Column(String(255))
     native_volume_id = Column(String(255))
+
+
+class SyncWatermark(BASE, DelfinBase):
+    """Represents the point a resource of a storage is synced up to."""
+    __tablename__ = 'sync_watermarks'
+    __table_args__ = _table_args(
+        Index('sync_watermarks_storage_id_idx', 'storage_id', 'resource',
+              unique=True))
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    storage_id = Column(String(36))
+    resource = Column(String(255))
+    watermark = Column(String(255))
+    full_synced_at = Column(DateTime)
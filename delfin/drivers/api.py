@@ -18,8 +18,10 @@ from oslo_log import log
 from oslo_utils import uuidutils
 
 from delfin import db
+from delfin.drivers import driver as base_driver
 from delfin.drivers import helper
 from delfin.drivers import manager
+from delfin.drivers.utils import shared_calls
 
 LOG = log.getLogger(__name__)
 
@@ -72,53 +74,63 @@ class API(object):
         driver.delete_storage(context)
         self.driver_manager.remove_driver(storage_id)
 
+    @shared_calls.shared_call
     def get_storage(self, context, storage_id):
         """Get storage device information from storage system"""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.get_storage(context)
 
+    @shared_calls.shared_call
     def list_storage_pools(self, context, storage_id):
         """List all storage pools from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_storage_pools(context)
 
+    @shared_calls.shared_call
     def list_volumes(self, context, storage_id):
         """List all storage volumes from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_volumes(context)
 
+    @shared_calls.shared_call
     def list_controllers(self, context, storage_id):
         """List all storage controllers from storage system."""
 
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_controllers(context)
 
+    @shared_calls.shared_call
     def list_ports(self, context, storage_id):
         """List all ports from storage system."""
 
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_ports(context)
 
+    @shared_calls.shared_call
     def list_disks(self, context, storage_id):
         """List all disks from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_disks(context)
 
+    @shared_calls.shared_call
     def list_quotas(self, context, storage_id):
         """List all quotas from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_quotas(context)
 
+    @shared_calls.shared_call
     def list_filesystems(self, context, storage_id):
         """List all filesystems from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_filesystems(context)
 
+    @shared_calls.shared_call
     def list_qtrees(self, context, storage_id):
         """List all qtrees from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_qtrees(context)
 
+    @shared_calls.shared_call
     def list_shares(self, context, storage_id):
         """List all shares from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
@@ -134,7 +146,7 @@ class API(object):
 
     def parse_alert(self, context, storage_id, alert):
         """Parse alert data got from snmp trap server."""
-        access_info = db.access_info_get(context, storage_id)
+        access_info = db.access_info_get_cached(context, storage_id)
         driver = self.driver_manager.get_driver(context,
                                                 invoke_on_load=False,
                                                 **access_info)
@@ -165,36 +177,61 @@ class API(object):
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.get_capabilities(context, filters)
 
+    @shared_calls.shared_call
     def list_storage_host_initiators(self, context, storage_id):
         """List all storage initiators from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_storage_host_initiators(context)
 
+    @shared_calls.shared_call
     def list_storage_hosts(self, context, storage_id):
         """List all storage hosts from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_storage_hosts(context)
 
+    @shared_calls.shared_call
     def list_storage_host_groups(self, context, storage_id):
         """List all storage host groups from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_storage_host_groups(context)
 
+    @shared_calls.shared_call
     def list_port_groups(self, context, storage_id):
         """List all port groups from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_port_groups(context)
 
+    @shared_calls.shared_call
     def list_volume_groups(self, context, storage_id):
         """List all volume groups from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_volume_groups(context)
 
+    @shared_calls.shared_call
     def list_masking_views(self, context, storage_id):
         """List all masking views from storage system."""
         driver = self.driver_manager.get_driver(context, storage_id=storage_id)
         return driver.list_masking_views(context)
 
+    def supports_resource_changes(self, context, storage_id, resource):
+        """Return whether the driver of a storage lists the changes of a
+        resource, with its own list_<resource>_changes method.
+        """
+        driver = self.driver_manager.get_driver(context, storage_id=storage_id)
+        method = 'list_%s_changes' % resource
+        return getattr(type(driver), method, None) is not \
+            getattr(base_driver.StorageDriver, method, None)
+
+    @shared_calls.shared_call
+    def list_resource_changes(self, context, storage_id, resource, since):
+        """List the resources changed since a watermark.
+
+        :param resource: name of the resources, as in the list_<resource>
+            driver API, e.g. 'volumes'
+        """
+        driver = self.driver_manager.get_driver(context, storage_id=storage_id)
+        return getattr(driver, 'list_%s_changes' % resource)(context, since)
+
     def get_alert_sources(self, context, storage_id):
         access_info = db.access_info_get(context, storage_id)
         driver = self.driver_manager.get_driver(context,
@@ -22,6 +22,7 @@ from delfin.common import constants
 from delfin.drivers import driver
 from delfin.drivers.dell_emc.unity import rest_handler, alert_handler, consts
 from delfin.drivers.dell_emc.unity.alert_handler import AlertHandler
+from delfin.drivers.utils import concurrency
 
 LOG = log.getLogger(__name__)
 
@@ -883,28 +884,34 @@ class UnityStorDriver(driver.StorageDriver):
                 target, start_time, end_time, metrics, results, time_map)
             page += 1
 
-    def get_history_metrics(self, resource_type, targets,
-                            start_time, end_time):
+    def _get_target_history_metrics(self, resource_type, target,
+                                    start_time, end_time):
         metrics = []
-        for target in targets:
-            path = None
-            if resource_type == constants.ResourceType.VOLUME:
-                path = self.VOLUME_PERF_METRICS.get(target)
-            elif resource_type == constants.ResourceType.DISK:
-                path = self.DISK_PERF_METRICS.get(target)
-            elif resource_type == constants.ResourceType.FILESYSTEM:
-                path = self.FILESYSTEM_PERF_METRICS.get(target)
-            elif resource_type == constants.ResourceType.PORT:
-                self.get_metrics_loop(target, start_time, end_time, metrics,
-                                      self.ETHERNET_PORT_METRICS.get(target))
-                self.get_metrics_loop(target, start_time, end_time, metrics,
-                                      self.FC_PORT_METRICS.get(target))
-                continue
+        paths = []
+        if resource_type == constants.ResourceType.VOLUME:
+            paths = [self.VOLUME_PERF_METRICS.get(target)]
+        elif resource_type == constants.ResourceType.DISK:
+            paths = [self.DISK_PERF_METRICS.get(target)]
+        elif resource_type == constants.ResourceType.FILESYSTEM:
+            paths = [self.FILESYSTEM_PERF_METRICS.get(target)]
+        elif resource_type == constants.ResourceType.PORT:
+            paths = [self.ETHERNET_PORT_METRICS.get(target),
+                     self.FC_PORT_METRICS.get(target)]
+        for path in paths:
             if path:
                 self.get_metrics_loop(target, start_time, end_time,
                                       metrics, path)
         return metrics
 
+    def get_history_metrics(self, resource_type, targets,
+                            start_time, end_time):
+        # Each target is paged through on its own, targets run concurrently
+        results = concurrency.map_concurrently(
+            lambda target: self._get_target_history_metrics(
+                resource_type, target, start_time, end_time),
+            targets, key=self.storage_id)
+        return [metric for metrics in results for metric in metrics]
+
     @staticmethod
     def get_metric_value(target, start_time, end_time, metrics,
                          results, time_map):
@@ -1039,46 +1046,22 @@ class UnityStorDriver(driver.StorageDriver):
                              end_time):
         metrics = []
         try:
-            if resource_metrics.get(constants.ResourceType.VOLUME):
-                volume_metrics = self.get_history_metrics(
+            resource_types = [
+                resource_type for resource_type in (
                     constants.ResourceType.VOLUME,
-                    resource_metrics.get(constants.ResourceType.VOLUME),
-                    start_time,
-                    end_time)
-                UnityStorDriver.count_total_perf(volume_metrics)
-                UnityStorDriver.package_metrics(storage_id,
-                                                constants.ResourceType.VOLUME,
-                                                metrics, volume_metrics)
-            if resource_metrics.get(constants.ResourceType.DISK):
-                disk_metrics = self.get_history_metrics(
                     constants.ResourceType.DISK,
-                    resource_metrics.get(constants.ResourceType.DISK),
-                    start_time,
-                    end_time)
-                UnityStorDriver.count_total_perf(disk_metrics)
-                UnityStorDriver.package_metrics(storage_id,
-                                                constants.ResourceType.DISK,
-                                                metrics, disk_metrics)
-            if resource_metrics.get(constants.ResourceType.PORT):
-                port_metrics = self.get_history_metrics(
                     constants.ResourceType.PORT,
-                    resource_metrics.get(constants.ResourceType.PORT),
-                    start_time,
-                    end_time)
-                UnityStorDriver.count_total_perf(port_metrics)
-                UnityStorDriver.package_metrics(storage_id,
-                                                constants.ResourceType.PORT,
-                                                metrics, port_metrics)
-            if resource_metrics.get(constants.ResourceType.FILESYSTEM):
-                file_metrics = self.get_history_metrics(
-                    constants.ResourceType.FILESYSTEM,
-                    resource_metrics.get(constants.ResourceType.FILESYSTEM),
-                    start_time,
-                    end_time)
-                UnityStorDriver.count_total_perf(file_metrics)
-                UnityStorDriver.package_metrics(
-                    storage_id, constants.ResourceType.FILESYSTEM,
-                    metrics, file_metrics)
+                    constants.ResourceType.FILESYSTEM)
+                if resource_metrics.get(resource_type)]
+            results = concurrency.map_concurrently(
+                lambda resource_type: self.get_history_metrics(
+                    resource_type, resource_metrics.get(resource_type),
+                    start_time, end_time),
+                resource_types)
+            for resource_type, type_metrics in zip(resource_types, results):
+                UnityStorDriver.count_total_perf(type_metrics)
+                UnityStorDriver.package_metrics(storage_id, resource_type,
+                                                metrics, type_metrics)
         except Exception as err:
             err_msg = "Failed to collect metrics from Unity: %s" % \
                       (six.text_type(err))
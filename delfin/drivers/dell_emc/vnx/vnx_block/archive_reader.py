@@ -0,0 +1,120 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http:#www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Streaming reader of VNX Block performance archives dumped to csv.
+
+read_archive runs in worker processes, it only depends on the csv file
+and plain arguments and returns compact per resource arrays.
+"""
+import csv
+import re
+from array import array
+
+from delfin.drivers.dell_emc.vnx.vnx_block import consts
+from delfin.drivers.utils.tools import Tools
+
+_OUT_OF_WINDOW = -1
+
+
+def resource_obj_name(source_name):
+    """Return the resource name of a csv row, without its uid suffix."""
+    if 'Port ' in source_name:
+        return re.sub(r'(\[.*;)', '[', source_name)
+    elif '; ' in source_name:
+        return re.sub(r'(; .*])', ']', source_name)
+    return source_name
+
+
+class ResourceSeries(object):
+    """Samples of one resource, one array per csv column kept.
+
+    Sample ``i`` was collected at ``timestamps[i]``, truncated to the
+    minute, and has value ``columns[column][i]`` for each column.
+    """
+
+    __slots__ = ('timestamps', 'columns')
+
+    def __init__(self, columns):
+        self.timestamps = array('q')
+        self.columns = dict((column, array('d')) for column in columns)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp, row):
+        self.timestamps.append(timestamp)
+        size = len(row)
+        for column, values in self.columns.items():
+            value = row[column] if column < size else None
+            values.append(float(value) if value else 0.0)
+
+    def extend(self, other):
+        self.timestamps.extend(other.timestamps)
+        for column, values in self.columns.items():
+            values.extend(other.columns[column])
+
+
+def _collection_timestamp(tools, time_str, start_time, end_time):
+    timestamp = tools.time_str_to_timestamp(time_str, consts.TIME_PATTERN)
+    if not ((start_time + consts.TIME_INTERVAL_FLUCTUATION) <= timestamp
+            <= (end_time + consts.TIME_INTERVAL_FLUCTUATION)):
+        return _OUT_OF_WINDOW
+    minute_str = tools.timestamp_to_time_str(
+        timestamp, consts.COLLECTION_TIME_PATTERN)
+    return tools.time_str_to_timestamp(minute_str,
+                                       consts.COLLECTION_TIME_PATTERN)
+
+
+def read_archive(csv_path, resource_columns, start_time, end_time):
+    """Read the samples of the wanted resources in a time window.
+
+    Rows are consumed as the file is read and rows of other resources or
+    out of the window are skipped before their values are parsed. Resource
+    names and collection times repeat on many rows, they are resolved once.
+
+    :param csv_path: path of the archive dumped to csv
+    :param resource_columns: {resource name: [csv column]} of the resources
+        and columns to keep
+    :return: {resource name: ResourceSeries}
+    """
+    tools = Tools()
+    series = {}
+    names = {}
+    timestamps = {}
+    with open(csv_path) as file:
+        rows = csv.reader(file)
+        next(rows, None)
+        for row in rows:
+            if len(row) < 2:
+                continue
+            name = names.get(row[0], False)
+            if name is False:
+                name = resource_obj_name(row[0])
+                if name not in resource_columns:
+                    name = None
+                names[row[0]] = name
+            if name is None:
+                continue
+            timestamp = timestamps.get(row[1])
+            if timestamp is None:
+                timestamp = _collection_timestamp(tools, row[1], start_time,
+                                                  end_time)
+                timestamps[row[1]] = timestamp
+            if timestamp == _OUT_OF_WINDOW:
+                continue
+            resource_series = series.get(name)
+            if resource_series is None:
+                resource_series = ResourceSeries(resource_columns[name])
+                series[name] = resource_series
+            resource_series.append(timestamp, row)
+    return series
@@ -13,20 +13,34 @@
 # limitations under the License.
 import copy
 import csv
+import multiprocessing
 import os
 import re
 import time
+from concurrent import futures
 
 import six
+from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import units
 
 from delfin import exception
 from delfin.common import constants
+from delfin.drivers.dell_emc.vnx.vnx_block import archive_reader
 from delfin.drivers.dell_emc.vnx.vnx_block import consts
 from delfin.drivers.utils.tools import Tools
 
 LOG = log.getLogger(__name__)
+CONF = cfg.CONF
+
+vnx_block_opts = [
+    cfg.IntOpt('vnx_block_archive_workers',
+               default=4, min=0,
+               help='Maximum number of worker processes parsing VNX Block '
+                    'performance archives of one collection, 0 or 1 '
+                    'parses them in the collecting process'),
+]
+CONF.register_opts(vnx_block_opts, group='storage_driver')
 
 
 class ComponentHandler(object):
@@ -592,8 +606,10 @@ class ComponentHandler(object):
             if not resources_map or not resources_type_map:
                 LOG.warning("Resource object not found!")
                 return metrics
+            resource_columns = self._get_resource_columns(
+                resource_metrics, resources_map, resources_type_map)
             performance_lines_map = self._filter_performance_data(
-                archive_file_list, resources_map, start_time, end_time)
+                archive_file_list, resource_columns, start_time, end_time)
             if not performance_lines_map:
                 LOG.warning("The required performance data was not found!")
                 return metrics
@@ -655,41 +671,46 @@ class ComponentHandler(object):
                 break
         return archive_file_list
 
-    def _get_metric_model(self, metric_list, labels, metric_values, obj_cap,
-                          resources_type):
+    def _get_metric_model(self, metric_list, labels, resource_series,
+                          obj_cap, resources_type):
         metric_model_list = []
-        tools = Tools()
         for metric_name in (metric_list or []):
-            values = {}
             obj_labels = copy.copy(labels)
             obj_labels['unit'] = obj_cap.get(metric_name).get('unit')
-            for metric_value in metric_values:
-                metric_value_infos = metric_value
-                if not consts.METRIC_MAP.get(resources_type, {}).get(
-                        metric_name):
-                    continue
-                value = metric_value_infos[
-                    consts.METRIC_MAP.get(resources_type).get(metric_name)]
-                if not value:
-                    value = '0'
-                collection_timestamp = tools.time_str_to_timestamp(
-                    metric_value_infos[1], consts.TIME_PATTERN)
-                collection_time_str = tools.timestamp_to_time_str(
-                    collection_timestamp, consts.COLLECTION_TIME_PATTERN)
-                collection_timestamp = tools.time_str_to_timestamp(
-                    collection_time_str, consts.COLLECTION_TIME_PATTERN)
-                if "iops" == obj_cap.get(metric_name).get('unit').lower():
-                    value = int(float(value))
-                else:
-                    value = float('%.6f' % (float(value)))
-                values[collection_timestamp] = value
-            if values:
-                metric_model = constants.metric_struct(name=metric_name,
-                                                       labels=obj_labels,
-                                                       values=values)
-                metric_model_list.append(metric_model)
+            column = consts.METRIC_MAP.get(resources_type, {}).get(
+                metric_name)
+            if not column or not resource_series:
+                continue
+            if "iops" == obj_labels['unit'].lower():
+                metric_values = (int(value) for value in
+                                 resource_series.columns[column])
+            else:
+                metric_values = (float('%.6f' % value) for value in
+                                 resource_series.columns[column])
+            values = dict(zip(resource_series.timestamps, metric_values))
+            metric_model = constants.metric_struct(name=metric_name,
+                                                   labels=obj_labels,
+                                                   values=values)
+            metric_model_list.append(metric_model)
         return metric_model_list
 
+    @staticmethod
+    def _get_resource_columns(resource_metrics, resources_map,
+                              resources_type_map):
+        """Return {resource name: [csv column]} of the metrics to collect."""
+        type_columns = {}
+        for resource_type, metric_list in resource_metrics.items():
+            metric_map = consts.METRIC_MAP.get(resource_type, {})
+            type_columns[resource_type] = sorted(set(
+                metric_map.get(metric_name) for metric_name in
+                (metric_list or []) if metric_map.get(metric_name)))
+        resource_columns = {}
+        for resource_obj, resource_type in resources_type_map.items():
+            if resources_map.get(resource_obj) and \
+                    type_columns.get(resource_type):
+                resource_columns[resource_obj] = type_columns[resource_type]
+        return resource_columns
+
     def _get_resources_map(self, resource_metrics):
         resources_map = {}
         resources_type_map = {}
@@ -761,54 +782,64 @@ class ComponentHandler(object):
             resources_type_map[volume_name] = constants.ResourceType.VOLUME
         return resources_map, resources_type_map
 
-    def _filter_performance_data(self, archive_file_list, resources_map,
+    def _get_csv_file_path(self, archive_file):
+        archive_name_infos = archive_file.split('.')
+        return '%s%s.csv' % (self.navi_handler.get_local_file_path(),
+                             archive_name_infos[0])
+
+    def _filter_performance_data(self, archive_file_list, resource_columns,
                                  start_time, end_time):
+        """Read the samples of the wanted resources from the archives.
+
+        Archives are downloaded one after the other, the navi session being
+        exclusive, while the ones already downloaded are parsed by worker
+        processes. Each worker returns compact per resource arrays, so
+        memory does not depend on the size of the archives.
+
+        :return: {resource name: ResourceSeries}
+        """
         performance_lines_map = {}
+        if not resource_columns:
+            return performance_lines_map
+        workers = min(CONF.storage_driver.vnx_block_archive_workers,
+                      len(archive_file_list))
+        executor = None
         try:
-            tools = Tools()
+            if workers > 1:
+                executor = futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'))
+            results = []
             for archive_file in archive_file_list:
                 self.navi_handler.download_archives(archive_file)
-                archive_name_infos = archive_file.split('.')
-                file_path = '%s%s.csv' % (
-                    self.navi_handler.get_local_file_path(),
-                    archive_name_infos[0])
-                with open(file_path) as file:
-                    f_csv = csv.reader(file)
-                    next(f_csv)
-                    for row in f_csv:
-                        self._package_performance_data(row, resources_map,
-                                                       start_time, end_time,
-                                                       tools,
-                                                       performance_lines_map)
+                args = (self._get_csv_file_path(archive_file),
+                        resource_columns, start_time, end_time)
+                if executor:
+                    results.append(executor.submit(
+                        archive_reader.read_archive, *args))
+                else:
+                    results.append(archive_reader.read_archive(*args))
+            # Merged in archive order, so later samples of a minute win
+            for result in results:
+                if executor:
+                    result = result.result()
+                for resource_obj, resource_series in result.items():
+                    if resource_obj in performance_lines_map:
+                        performance_lines_map[resource_obj].extend(
+                            resource_series)
+                    else:
+                        performance_lines_map[resource_obj] = \
+                            resource_series
         except Exception as err:
             err_msg = "Failed to filter performance data: %s" % \
                       (six.text_type(err))
             LOG.error(err_msg)
             raise exception.StorageBackendException(err_msg)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
         return performance_lines_map
 
-    def _package_performance_data(self, row, resources_map, start_time,
-                                  end_time, tools, performance_lines_map):
-        resource_obj_name = row[0]
-        resource_obj_name = self._package_resource_obj_name(resource_obj_name)
-        if resource_obj_name in resources_map:
-            obj_collection_timestamp = tools.time_str_to_timestamp(
-                row[1], consts.TIME_PATTERN)
-            if (start_time + consts.TIME_INTERVAL_FLUCTUATION) \
-                    <= obj_collection_timestamp \
-                    and obj_collection_timestamp \
-                    <= (end_time + consts.TIME_INTERVAL_FLUCTUATION):
-                performance_lines_map.setdefault(resource_obj_name, []).append(
-                    row)
-
-    def _package_resource_obj_name(self, source_name):
-        target_name = source_name
-        if 'Port ' in target_name:
-            return re.sub(r'(\[.*;)', '[', target_name)
-        elif '; ' in target_name:
-            return re.sub(r'(; .*])', ']', target_name)
-        return target_name
-
     def _remove_archive_file(self, archive_file_list):
         try:
             for archive_file in archive_file_list:
@@ -335,6 +335,99 @@ class StorageDriver(object):
         raise NotImplementedError(
             "Driver API list_masking_views() is not Implemented")
 
+    def list_storage_pools_changes(self, context, since):
+        """List the storage pools changed since a watermark.
+
+        Optional, drivers of backends keeping modification times or change
+        logs implement the list_*_changes methods so that resources are
+        synced incrementally, the full list_* calls are still used for the
+        periodic full reconcile.
+
+        :param since: watermark returned by the previous call, None to list
+            all the resources
+        :return: a dict with following
+        'changed': <list of the resources created or modified since the
+                   watermark, all of them when since is None, same model as
+                   list_storage_pools>,
+        'deleted': <list of the native ids of the resources deleted since
+                   the watermark>,
+        'watermark': <str, to be passed as since to the next call>
+        """
+        raise NotImplementedError(
+            "Driver API list_storage_pools_changes() is not Implemented")
+
+    def list_volumes_changes(self, context, since):
+        """List the volumes changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_volumes_changes() is not Implemented")
+
+    def list_controllers_changes(self, context, since):
+        """List the controllers changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_controllers_changes() is not Implemented")
+
+    def list_ports_changes(self, context, since):
+        """List the ports changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_ports_changes() is not Implemented")
+
+    def list_disks_changes(self, context, since):
+        """List the disks changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_disks_changes() is not Implemented")
+
+    def list_quotas_changes(self, context, since):
+        """List the quotas changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_quotas_changes() is not Implemented")
+
+    def list_filesystems_changes(self, context, since):
+        """List the filesystems changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_filesystems_changes() is not Implemented")
+
+    def list_qtrees_changes(self, context, since):
+        """List the qtrees changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_qtrees_changes() is not Implemented")
+
+    def list_shares_changes(self, context, since):
+        """List the shares changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_shares_changes() is not Implemented")
+
+    def list_storage_hosts_changes(self, context, since):
+        """List the storage hosts changed since a watermark.
+
+        See list_storage_pools_changes.
+        """
+        raise NotImplementedError(
+            "Driver API list_storage_hosts_changes() is not Implemented")
+
     def get_alert_sources(self, context):
         return []
 
@@ -213,6 +213,19 @@ class FakeStorageDriver(driver.StorageDriver):
             volume_list = volume_list + vs
         return volume_list
 
+    def list_volumes_changes(self, ctx, since):
+        # Fake volumes are never deleted, some of them are modified since
+        # the watermark
+        watermark = str(int(time.time()))
+        if since is None:
+            return {'changed': self.list_volumes(ctx), 'deleted': [],
+                    'watermark': watermark}
+        start = random.randint(0, self.rd_volumes_count - 1)
+        end = min(start + random.randint(0, PAGE_LIMIT),
+                  self.rd_volumes_count)
+        return {'changed': self._get_volume_range(start, end),
+                'deleted': [], 'watermark': watermark}
+
     def list_controllers(self, ctx):
         rd_controllers_count = random.randint(MIN_CONTROLLERS, MAX_CONTROLLERS)
         LOG.info("###########fake_controllers for %s: %d" %
@@ -12,11 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+
 from oslo_config import cfg
 from oslo_log import log
 from delfin.common import constants
 from delfin.drivers.huawei.oceanstor import rest_client, consts, alert_handler
 from delfin.drivers import driver
+from delfin.drivers.utils import concurrency
 
 LOG = log.getLogger(__name__)
 CONF = cfg.CONF
@@ -557,42 +560,29 @@ class OceanStorDriver(driver.StorageDriver):
             LOG.error("Failed to configure collection in OceanStor")
             raise
 
-        metrics = []
+        metric_calls = []
         try:
-            # storage-pool metrics
-            if resource_metrics.get(constants.ResourceType.STORAGE_POOL):
-                pool_metrics = self.client.get_pool_metrics(
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.STORAGE_POOL))
-                metrics.extend(pool_metrics)
-
-            # volume metrics
-            if resource_metrics.get(constants.ResourceType.VOLUME):
-                volume_metrics = self.client.get_volume_metrics(
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.VOLUME))
-                metrics.extend(volume_metrics)
-
-            # controller metrics
-            if resource_metrics.get(constants.ResourceType.CONTROLLER):
-                controller_metrics = self.client.get_controller_metrics(
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.CONTROLLER))
-                metrics.extend(controller_metrics)
-
-            # port metrics
-            if resource_metrics.get(constants.ResourceType.PORT):
-                port_metrics = self.client.get_port_metrics(
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.PORT))
-                metrics.extend(port_metrics)
-
-            # disk metrics
-            if resource_metrics.get(constants.ResourceType.DISK):
-                disk_metrics = self.client.get_disk_metrics(
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.DISK))
-                metrics.extend(disk_metrics)
+            for resource_type, get_metrics in (
+                    (constants.ResourceType.STORAGE_POOL,
+                     self.client.get_pool_metrics),
+                    (constants.ResourceType.VOLUME,
+                     self.client.get_volume_metrics),
+                    (constants.ResourceType.CONTROLLER,
+                     self.client.get_controller_metrics),
+                    (constants.ResourceType.PORT,
+                     self.client.get_port_metrics),
+                    (constants.ResourceType.DISK,
+                     self.client.get_disk_metrics)):
+                if resource_metrics.get(resource_type):
+                    metric_calls.append(functools.partial(
+                        get_metrics, storage_id,
+                        resource_metrics.get(resource_type)))
+
+            # Resource types are fetched concurrently, the per resource
+            # calls of each type share the concurrency cap of the storage
+            metrics = []
+            for type_metrics in concurrency.run_concurrently(metric_calls):
+                metrics.extend(type_metrics)
 
         except Exception:
             LOG.error("Failed to collect metrics from OceanStor")
@@ -15,6 +15,7 @@
 #    under the License.
 
 import json
+import threading
 
 import requests
 import six
@@ -26,6 +27,8 @@ from delfin.common import constants
 from delfin import cryptor
 from delfin import exception
 from delfin.drivers.huawei.oceanstor import consts
+from delfin.drivers.utils import concurrency
+from delfin.drivers.utils import shared_calls
 from delfin.ssl_utils import HostNameIgnoreAdapter
 from delfin.i18n import _
 
@@ -71,13 +74,17 @@ class RestClient(object):
         self.url = None
         self.device_id = None
         self.verify = None
+        # Serializes logins, the generation counts the sessions opened so
+        # concurrent calls failing on the same session login only once
+        self._login_lock = threading.Lock()
+        self._session_generation = 0
         urllib3.disable_warnings(InsecureRequestWarning)
         self.reset_connection(**kwargs)
 
     def reset_connection(self, **kwargs):
         self.verify = kwargs.get('verify', False)
         try:
-            self.login()
+            self._relogin()
         except Exception as ex:
             msg = "Failed to login to OceanStor: {}".format(ex)
             LOG.error(msg)
@@ -195,6 +202,20 @@ class RestClient(object):
 
         return device_id
 
+    def _relogin(self, generation=None):
+        """Login again, unless the session changed since generation.
+
+        When another thread already replaced the session the request was
+        sent with, its session is reused instead of logging in again.
+        """
+        with self._login_lock:
+            if generation is not None \
+                    and generation != self._session_generation:
+                return self.device_id
+            device_id = self.login()
+            self._session_generation += 1
+            return device_id
+
     def call(self, url, data=None, method=None, log_filter_flag=False):
         """Send requests to server.
 
@@ -202,13 +223,14 @@ class RestClient(object):
         """
         device_id = None
         old_url = self.url
+        generation = self._session_generation
         result = self.do_call(url, data, method,
                               log_filter_flag=log_filter_flag)
         error_code = result['error']['code']
         if (error_code == consts.ERROR_CONNECT_TO_SERVER
                 or error_code == consts.ERROR_UNAUTHORIZED_TO_SERVER):
             LOG.error("Can't open the recent url, relogin.")
-            device_id = self.login()
+            device_id = self._relogin(generation)
 
         if device_id is not None:
             LOG.debug('Replace URL: \n'
@@ -368,6 +390,7 @@ class RestClient(object):
 
         return cifs + nfs + ftps
 
+    @shared_calls.shared_call
     def get_all_mapping_views(self):
         url = "/mappingview"
         view = self.paginated_call(url, None, "GET", log_filter_flag=True)
@@ -379,18 +402,22 @@ class RestClient(object):
         return self.paginated_call(url, None, "GET",
                                    params=params, log_filter_flag=True)
 
+    @shared_calls.shared_call
     def get_all_associate_mapping_views(self, obj_type, obj_id):
         url = "/mappingview/associate"
         return self.get_all_associate_resources(url, obj_type, obj_id)
 
+    @shared_calls.shared_call
     def get_all_associate_hosts(self, obj_type, obj_id):
         url = "/host/associate"
         return self.get_all_associate_resources(url, obj_type, obj_id)
 
+    @shared_calls.shared_call
     def get_all_associate_volumes(self, obj_type, obj_id):
         url = "/lun/associate"
         return self.get_all_associate_resources(url, obj_type, obj_id)
 
+    @shared_calls.shared_call
     def get_all_associate_ports(self, obj_type, obj_id):
         eth_ports = self.get_all_associate_resources(
             "/eth_port/associate", obj_type, obj_id)
@@ -415,16 +442,19 @@ class RestClient(object):
         ib_i = self.paginated_call(url, None, "GET", log_filter_flag=True)
         return fc_i + iscsi_i + ib_i
 
+    @shared_calls.shared_call
     def get_all_host_groups(self):
         url = "/hostgroup"
         hostg = self.paginated_call(url, None, "GET", log_filter_flag=True)
         return hostg
 
+    @shared_calls.shared_call
     def get_all_port_groups(self):
         url = "/portgroup"
         portg = self.paginated_call(url, None, "GET", log_filter_flag=True)
         return portg
 
+    @shared_calls.shared_call
     def get_all_volume_groups(self):
         url = "/lungroup"
         lungroup = self.paginated_call(url, None, "GET", log_filter_flag=True)
@@ -515,176 +545,77 @@ class RestClient(object):
                                        max_duration=0)
         self.enable_metrics_collection()
 
-    def get_pool_metrics(self, storage_id, selection):
-        pools = self.get_all_pools()
-        pool_metrics = []
+    def _get_resource_metrics(self, storage_id, resource, resource_type,
+                              get_name, caps, select_metrics, select_ids):
+        resource_metrics = []
+        try:
+            resource_name = get_name(resource)
+            metrics = self._get_metrics(resource['TYPE'], resource['ID'],
+                                        select_ids)
+            for metric in metrics:
+                data_list = metric['CMO_STATISTIC_DATA_LIST'].split(",")
+                for index, key in enumerate(select_metrics):
+                    data = int(data_list[index])
+                    if key in consts.CONVERT_TO_MILLI_SECOND_LIST:
+                        data = data * 1000
+                    labels = {
+                        'storage_id': storage_id,
+                        'resource_type': resource_type,
+                        'resource_id': resource['ID'],
+                        'resource_name': resource_name,
+                        'type': 'RAW',
+                        'unit': caps[key]['unit']
+                    }
+                    values = _get_timestamp_values(metric, data)
+                    m = constants.metric_struct(name=key, labels=labels,
+                                                values=values)
+                    resource_metrics.append(m)
+        except Exception as ex:
+            msg = "Failed to get metrics for {0}:{1} error: {2}" \
+                .format(resource_type, resource.get('ID'), ex)
+            LOG.error(msg)
+        return resource_metrics
 
+    def _get_resources_metrics(self, storage_id, resources, resource_type,
+                               caps, selection, get_name=None):
+        """Fetch metrics of all resources concurrently, one call each"""
+        get_name = get_name or (lambda resource: resource['NAME'])
         select_metrics, select_ids = _get_selection(selection)
-        for pool in pools:
-            try:
-                metrics = self._get_metrics(pool['TYPE'], pool['ID'],
-                                            select_ids)
-                for metric in metrics:
-                    data_list = metric['CMO_STATISTIC_DATA_LIST'].split(",")
-                    for index, key in enumerate(select_metrics):
-                        data = int(data_list[index])
-                        if key in consts.CONVERT_TO_MILLI_SECOND_LIST:
-                            data = data * 1000
-                        labels = {
-                            'storage_id': storage_id,
-                            'resource_type': 'pool',
-                            'resource_id': pool['ID'],
-                            'resource_name': pool['NAME'],
-                            'type': 'RAW',
-                            'unit': consts.POOL_CAP[key]['unit']
-                        }
-                        values = _get_timestamp_values(metric, data)
-                        m = constants.metric_struct(name=key, labels=labels,
-                                                    values=values)
-                        pool_metrics.append(m)
-            except Exception as ex:
-                msg = "Failed to get metrics for pool:{0} error: {1}" \
-                    .format(pool['NAME'], ex)
-                LOG.error(msg)
-        return pool_metrics
 
-    def get_volume_metrics(self, storage_id, selection):
-        volumes = self.get_all_volumes()
-        volume_metrics = []
+        def get_resource_metrics(resource):
+            return self._get_resource_metrics(
+                storage_id, resource, resource_type, get_name, caps,
+                select_metrics, select_ids)
 
-        select_metrics, select_ids = _get_selection(selection)
-        for volume in volumes:
-            try:
-                metrics = self._get_metrics(volume['TYPE'], volume['ID'],
-                                            select_ids)
-                for metric in metrics:
-                    data_list = metric['CMO_STATISTIC_DATA_LIST'].split(",")
-                    for index, key in enumerate(select_metrics):
-                        data = int(data_list[index])
-                        if key in consts.CONVERT_TO_MILLI_SECOND_LIST:
-                            data = data * 1000
-                        labels = {
-                            'storage_id': storage_id,
-                            'resource_type': 'volume',
-                            'resource_id': volume['ID'],
-                            'resource_name': volume['NAME'],
-                            'type': 'RAW',
-                            'unit': consts.VOLUME_CAP[key]['unit']
-                        }
-                        values = _get_timestamp_values(metric, data)
-                        m = constants.metric_struct(name=key, labels=labels,
-                                                    values=values)
-                        volume_metrics.append(m)
-            except Exception as ex:
-                msg = "Failed to get metrics for volume:{0} error: {1}" \
-                    .format(volume['NAME'], ex)
-                LOG.error(msg)
+        results = concurrency.map_concurrently(get_resource_metrics,
+                                               resources, key=storage_id)
+        return [m for resource_metrics in results for m in resource_metrics]
 
-        return volume_metrics
+    def get_pool_metrics(self, storage_id, selection):
+        pools = self.get_all_pools()
+        return self._get_resources_metrics(storage_id, pools, 'pool',
+                                           consts.POOL_CAP, selection)
+
+    def get_volume_metrics(self, storage_id, selection):
+        volumes = self.get_all_volumes()
+        return self._get_resources_metrics(storage_id, volumes, 'volume',
+                                           consts.VOLUME_CAP, selection)
 
     def get_controller_metrics(self, storage_id, selection):
         controllers = self.get_all_controllers()
-        controller_metrics = []
-
-        select_metrics, select_ids = _get_selection(selection)
-        for controller in controllers:
-            try:
-                metrics = self._get_metrics(controller['TYPE'],
-                                            controller['ID'],
-                                            select_ids)
-                for metric in metrics:
-                    data_list = metric['CMO_STATISTIC_DATA_LIST'].split(",")
-                    for index, key in enumerate(select_metrics):
-                        data = int(data_list[index])
-                        if key in consts.CONVERT_TO_MILLI_SECOND_LIST:
-                            data = data * 1000
-                        labels = {
-                            'storage_id': storage_id,
-                            'resource_type': 'controller',
-                            'resource_id': controller['ID'],
-                            'resource_name': controller['NAME'],
-                            'type': 'RAW',
-                            'unit': consts.CONTROLLER_CAP[key]['unit']
-                        }
-                        values = _get_timestamp_values(metric, data)
-                        m = constants.metric_struct(name=key, labels=labels,
-                                                    values=values)
-                        controller_metrics.append(m)
-            except Exception as ex:
-                msg = "Failed to get metrics for controller:{0} error: {1}" \
-                    .format(controller['NAME'], ex)
-                LOG.error(msg)
-
-        return controller_metrics
+        return self._get_resources_metrics(storage_id, controllers,
+                                           'controller',
+                                           consts.CONTROLLER_CAP, selection)
 
     def get_port_metrics(self, storage_id, selection):
-        ports = self.get_all_ports()
-        port_metrics = []
-
-        select_metrics, select_ids = _get_selection(selection)
-        for port in ports:
-            # ETH_PORT collection not supported
-            if port['TYPE'] == 213:
-                continue
-            try:
-                metrics = self._get_metrics(port['TYPE'], port['ID'],
-                                            select_ids)
-                for metric in metrics:
-                    data_list = metric['CMO_STATISTIC_DATA_LIST'].split(",")
-                    for index, key in enumerate(select_metrics):
-                        data = int(data_list[index])
-                        if key in consts.CONVERT_TO_MILLI_SECOND_LIST:
-                            data = data * 1000
-                        labels = {
-                            'storage_id': storage_id,
-                            'resource_type': 'port',
-                            'resource_id': port['ID'],
-                            'resource_name': port['NAME'],
-                            'type': 'RAW',
-                            'unit': consts.PORT_CAP[key]['unit']
-                        }
-                        values = _get_timestamp_values(metric, data)
-                        m = constants.metric_struct(name=key, labels=labels,
-                                                    values=values)
-                        port_metrics.append(m)
-            except Exception as ex:
-                msg = "Failed to get metrics for port:{0} error: {1}" \
-                    .format(port['NAME'], ex)
-                LOG.error(msg)
-
-        return port_metrics
+        # ETH_PORT collection not supported
+        ports = [port for port in self.get_all_ports()
+                 if port['TYPE'] != 213]
+        return self._get_resources_metrics(storage_id, ports, 'port',
+                                           consts.PORT_CAP, selection)
 
     def get_disk_metrics(self, storage_id, selection):
         disks = self.get_all_disks()
-        disk_metrics = []
-
-        select_metrics, select_ids = _get_selection(selection)
-        for disk in disks:
-            try:
-                metrics = self._get_metrics(disk['TYPE'], disk['ID'],
-                                            select_ids)
-                for metric in metrics:
-                    data_list = metric['CMO_STATISTIC_DATA_LIST'].split(",")
-                    for index, key in enumerate(select_metrics):
-                        data = int(data_list[index])
-                        if key in consts.CONVERT_TO_MILLI_SECOND_LIST:
-                            data = data * 1000
-                        labels = {
-                            'storage_id': storage_id,
-                            'resource_type': 'disk',
-                            'resource_id': disk['ID'],
-                            'type': 'RAW',
-                            'unit': consts.DISK_CAP[key]['unit'],
-                            'resource_name':
-                                disk['MODEL'] + ':' + disk['SERIALNUMBER']
-                        }
-                        values = _get_timestamp_values(metric, data)
-                        m = constants.metric_struct(name=key, labels=labels,
-                                                    values=values)
-                        disk_metrics.append(m)
-            except Exception as ex:
-                msg = "Failed to get metrics for disk:{0} error: {1}"\
-                    .format(disk['ID'], ex)
-                LOG.error(msg)
-
-        return disk_metrics
+        return self._get_resources_metrics(
+            storage_id, disks, 'disk', consts.DISK_CAP, selection,
+            get_name=lambda disk: disk['MODEL'] + ':' + disk['SERIALNUMBER'])
@@ -0,0 +1,341 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Column wise processing of Storwize/SVC iostats dump files.
+
+Every dump file (Nv, Nm, Nn) is loaded into a CounterFrame: one row per
+resource and one array per raw counter. Deltas and rates between two
+frames are then computed column by column in a single pass, instead of
+building a dict per sample.
+"""
+import collections
+import re
+import threading
+import time
+from array import array
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+from oslo_utils import units
+
+from delfin.common import constants
+
+BLOCK_SIZE = 512
+BYTES_TO_BIT = 8
+COUNTERS = ('rb', 'wb', 'ro', 'wo', 'tb', 'to',
+            'rh', 'wh', 'rht', 'wht', 'res_time')
+RESOURCE_TAG = {
+    constants.ResourceType.DISK: 'mdsk',
+    constants.ResourceType.VOLUME: 'vdsk',
+    constants.ResourceType.PORT: 'port',
+    constants.ResourceType.CONTROLLER: 'node'
+}
+_NAMESPACE = re.compile(u"\\{.*?}")
+# Counter states older than this are not used as baseline
+STATE_TTL = 3600
+# Maximum number of dump streams, of all storages, kept in the state cache
+STATE_CACHE_SIZE = 512
+
+
+def _sum(attrib, *names):
+    return sum(int(attrib.get(name)) for name in names)
+
+
+def read_counters(attrib, resource_type):
+    """Return the raw counters of one xml element, in COUNTERS order."""
+    rb = wb = res_time = rh = wh = rht = wht = 0
+    if resource_type == constants.ResourceType.PORT:
+        rb = _sum(attrib, 'cbr', 'hbr', 'lnbr', 'rmbr') * BYTES_TO_BIT
+        wb = _sum(attrib, 'cbt', 'hbt', 'lnbt', 'rmbt') * BYTES_TO_BIT
+        ro = _sum(attrib, 'cer', 'her', 'lner', 'rmer')
+        wo = _sum(attrib, 'cet', 'het', 'lnet', 'rmet')
+        res_time = int(attrib.get('dtdt', 0)) / units.Ki
+    else:
+        if resource_type == constants.ResourceType.VOLUME:
+            rb = int(attrib.get('rb')) * BLOCK_SIZE
+            wb = int(attrib.get('wb')) * BLOCK_SIZE
+            rh = int(attrib.get('ctrhs'))
+            wh = int(attrib.get('ctwhs'))
+            rht = int(attrib.get('ctrs'))
+            wht = int(attrib.get('ctws'))
+            res_time = int(attrib.get('xl'))
+        elif resource_type == constants.ResourceType.DISK:
+            rb = int(attrib.get('rb')) * BLOCK_SIZE
+            wb = int(attrib.get('wb')) * BLOCK_SIZE
+            res_time = _sum(attrib, 'rq', 'wq')
+        elif resource_type == constants.ResourceType.CONTROLLER:
+            rb = int(attrib.get('rb')) * BYTES_TO_BIT
+            wb = int(attrib.get('wb')) * BYTES_TO_BIT
+            res_time = _sum(attrib, 'rq', 'wq')
+        ro = int(attrib.get('ro'))
+        wo = int(attrib.get('wo'))
+    return (rb, wb, ro, wo, rb + wb, ro + wo, rh, wh, rht, wht, res_time)
+
+
+def resource_key(attrib, resource_type):
+    """Return the key identifying the resource of an element, or None."""
+    if resource_type == constants.ResourceType.PORT:
+        return attrib.get('fc_wwpn') or None
+    if resource_type == constants.ResourceType.CONTROLLER:
+        return '%s_%s' % (int(attrib.get('node_id'), 16), attrib.get('id'))
+    return '%s_%s' % (attrib.get('idx'), attrib.get('id'))
+
+
+class CounterFrame(object):
+    """Raw counters of one resource type, one array per counter.
+
+    Row ``i`` holds the counters of resource ``keys[i]`` sampled at
+    ``times[i]`` (milliseconds).
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.index = {}
+        self.times = array('q')
+        self.columns = dict((name, array('d')) for name in COUNTERS)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set(self, key, timestamp, counters):
+        row = self.index.get(key)
+        if row is None:
+            self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.times.append(timestamp)
+            for name, value in zip(COUNTERS, counters):
+                self.columns[name].append(value)
+        else:
+            self.times[row] = timestamp
+            for name, value in zip(COUNTERS, counters):
+                self.columns[name][row] = value
+
+    def row(self, row):
+        return tuple(self.columns[name][row] for name in COUNTERS)
+
+    def _load_rows(self, keys, rows, timestamp):
+        self.keys = keys
+        self.index = dict((key, row) for row, key in enumerate(keys))
+        self.times = array('q', [int(timestamp)]) * len(rows)
+        for name, column in zip(COUNTERS, zip(*rows)):
+            self.columns[name] = array('d', column)
+
+    @classmethod
+    def from_xml(cls, root, timestamp, resource_type):
+        """Load the elements of resource_type of a parsed dump file."""
+        return load_frames(root, timestamp, [resource_type])[resource_type]
+
+
+def load_frames(elements, timestamp, resource_types):
+    """Load dump file elements into one CounterFrame per resource type.
+
+    :param elements: iterable of the resource elements of one dump file,
+        the root element or iter_stats_file()
+    :return: {resource_type: CounterFrame}
+    """
+    tags = dict((RESOURCE_TAG.get(resource_type), resource_type)
+                for resource_type in resource_types)
+    rows = dict((resource_type, ({}, [])) for resource_type in resource_types)
+    for element in elements:
+        resource_type = tags.get(_NAMESPACE.sub("", element.tag))
+        if resource_type is None:
+            continue
+        key = resource_key(element.attrib, resource_type)
+        if key is None:
+            continue
+        counters = read_counters(element.attrib, resource_type)
+        index, type_rows = rows[resource_type]
+        row = index.get(key)
+        if row is None:
+            index[key] = len(type_rows)
+            type_rows.append(counters)
+        else:
+            type_rows[row] = counters
+    frames = {}
+    for resource_type, (index, type_rows) in rows.items():
+        frame = CounterFrame()
+        frame._load_rows(list(index), type_rows, timestamp)
+        frames[resource_type] = frame
+    return frames
+
+
+def iter_stats_file(source):
+    """Yield the resource elements of a dump file as it is parsed.
+
+    Elements are freed once consumed, so memory does not grow with the
+    size of the file.
+    """
+    root = None
+    depth = 0
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield element
+            root.clear()
+
+
+def _delta(now, last):
+    # Counters wrap or reset when a node restarts
+    return now if now < last else now - last
+
+
+def compute_metrics(last, frame, perf_map, targets, metric_map):
+    """Add the rates of frame against the counters in last to metric_map.
+
+    :param last: CounterFrame with the previous counters of every resource
+    :param frame: CounterFrame of the newer dump file
+    :param perf_map: {metric name: counter name} of the resource type
+    :param targets: metric names to compute
+    :param metric_map: {resource key: {metric: {timestamp: value}}}, values
+        of resources present in several dump files are summed
+    :return: CounterFrame with the latest counters of every resource, to be
+        passed as last for the next dump file
+    """
+    pairs = []
+    intervals = []
+    skipped = []
+    for row, key in enumerate(frame.keys):
+        last_row = last.index.get(key)
+        if last_row is None:
+            continue
+        interval = (frame.times[row] - last.times[last_row]) / units.k
+        if interval > 0:
+            pairs.append((row, last_row))
+            intervals.append(interval)
+        else:
+            skipped.append((row, last_row))
+    if pairs:
+        _compute_pairs(last, frame, pairs, intervals, perf_map, targets,
+                       metric_map)
+    if not skipped and len(pairs) == len(last):
+        # Usual case, frame holds every resource already known
+        return frame
+    # Keep counters of resources missing from frame, and the older counters
+    # of resources whose sample did not move forward
+    for row, last_row in skipped:
+        frame.set(frame.keys[row], last.times[last_row], last.row(last_row))
+    for last_row, key in enumerate(last.keys):
+        if key not in frame.index:
+            frame.set(key, last.times[last_row], last.row(last_row))
+    return frame
+
+
+def _compute_pairs(last, frame, pairs, intervals, perf_map, targets,
+                   metric_map):
+    deltas = {}
+
+    def delta_of(name):
+        if name not in deltas:
+            now_col = frame.columns[name]
+            last_col = last.columns[name]
+            deltas[name] = [_delta(now_col[row], last_col[last_row])
+                            for row, last_row in pairs]
+        return deltas[name]
+
+    ratios = None
+    values_of = {}
+    for target in targets:
+        counter = perf_map.get(target)
+        if not counter:
+            continue
+        name = target.upper()
+        if 'CACHEHITRATIO' in name:
+            if ratios is None:
+                rhr = [rh * 100 / rht if rht > 0 else 0 for rh, rht in
+                       zip(delta_of('rh'), delta_of('rht'))]
+                whr = [wh * 100 / wht if wht > 0 else 0 for wh, wht in
+                       zip(delta_of('wh'), delta_of('wht'))]
+                ratios = {'rhr': rhr, 'whr': whr,
+                          'hrt': [r + w for r, w in zip(rhr, whr)]}
+            values = ratios[counter]
+        else:
+            values = delta_of(counter)
+        if 'THROUGHPUT' in name:
+            values = [v / i / units.Mi for v, i in zip(values, intervals)]
+        elif 'IOSIZE' in name:
+            values = [v / units.Ki for v in values]
+        elif 'IOPS' in name:
+            values = [int(v / i) for v, i in zip(values, intervals)]
+        elif 'RESPONSETIME' in name:
+            values = [v / i for v, i in zip(values, intervals)]
+        values_of[target] = [round(v, 3) for v in values]
+
+    for index, (row, _) in enumerate(pairs):
+        timestamp = frame.times[row]
+        resource_metrics = metric_map.setdefault(frame.keys[row], {})
+        for target, values in values_of.items():
+            series = resource_metrics.setdefault(target, {})
+            series[timestamp] = series.get(timestamp, 0) + values[index]
+
+
+def average_response_time(resource_metrics):
+    """Turn the summed response time of a resource into time per IO."""
+    res_times = resource_metrics.get('responseTime')
+    iops = resource_metrics.get('iops') or {}
+    if not res_times:
+        return
+    for timestamp, res_time in res_times.items():
+        if timestamp in iops:
+            iops_value = iops[timestamp]
+            res_times[timestamp] = round(
+                res_time / iops_value if iops_value else 0, 3)
+
+
+class CounterStateCache(object):
+    """Latest counters of each dump stream, kept between collections.
+
+    An entry holds, for one (storage, dump stream), the time of the last
+    dump file processed and the CounterFrame per resource type after that
+    file. The next collection uses it as baseline instead of downloading
+    the files again. Entries expire after ttl seconds and the least
+    recently used are dropped beyond max_entries.
+    """
+
+    def __init__(self, max_entries=STATE_CACHE_SIZE, ttl=STATE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, storage_id, stream):
+        """Return (file_time, {resource_type: CounterFrame}) or None."""
+        key = (storage_id, stream)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            file_time, frames, stored_at = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return file_time, frames
+
+    def set(self, storage_id, stream, file_time, frames):
+        key = (storage_id, stream)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (file_time, frames, time.time())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
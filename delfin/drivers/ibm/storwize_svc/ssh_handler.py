@@ -12,8 +12,10 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import functools
 import os
-import re
+import shutil
+import tempfile
 import time
 from itertools import islice
 
@@ -24,7 +26,8 @@ from oslo_utils import units
 
 from delfin import exception, utils
 from delfin.common import constants, alert_util
-from delfin.drivers.ibm.storwize_svc import consts
+from delfin.drivers.ibm.storwize_svc import consts, iostats
+from delfin.drivers.utils import concurrency
 from delfin.drivers.utils.ssh_client import SSHPool
 from delfin.drivers.utils.tools import Tools
 
@@ -112,22 +115,24 @@ class SSHHandler(object):
         'responseTime': 'res_time',
         'iops': 'to'
     }
-    TARGET_RESOURCE_RELATION = {
-        constants.ResourceType.DISK: 'mdsk',
-        constants.ResourceType.VOLUME: 'vdsk',
-        constants.ResourceType.PORT: 'port',
-        constants.ResourceType.CONTROLLER: 'node'
-    }
     RESOURCE_PERF_MAP = {
-        constants.ResourceType.DISK: DISK_PERF_METRICS,
         constants.ResourceType.VOLUME: VOLUME_PERF_METRICS,
+        constants.ResourceType.DISK: DISK_PERF_METRICS,
         constants.ResourceType.PORT: PORT_PERF_METRICS,
         constants.ResourceType.CONTROLLER: CONTROLLER_PERF_METRICS
     }
+    # Resource types held by each iostats dump stream
+    STATS_FILE_RESOURCES = {
+        'Nv': [constants.ResourceType.VOLUME],
+        'Nm': [constants.ResourceType.DISK],
+        'Nn': [constants.ResourceType.PORT,
+               constants.ResourceType.CONTROLLER]
+    }
     SECONDS_TO_MS = 1000
+    # Counters after the last dump file processed, shared by all handlers
+    # of the process so they survive between collections
+    counter_states = iostats.CounterStateCache()
     ALERT_NOT_FOUND_CODE = 'CMMVC8275E'
-    BLOCK_SIZE = 512
-    BYTES_TO_BIT = 8
     OS_TYPE_MAP = {'generic': constants.HostOSTypes.UNKNOWN,
                    'hpux': constants.HostOSTypes.HP_UX,
                    'openvms': constants.HostOSTypes.OPEN_VMS,
@@ -747,270 +752,160 @@ class SSHHandler(object):
                                           key=lambda x: x[0], reverse=False)
 
     def packege_data(self, storage_id, resource_type, metrics, metric_map):
-        resource_id = None
-        resource_name = None
-        unit = None
+        perf_caps = {
+            constants.ResourceType.PORT: consts.PORT_CAP,
+            constants.ResourceType.VOLUME: consts.VOLUME_CAP,
+            constants.ResourceType.DISK: consts.DISK_CAP,
+            constants.ResourceType.CONTROLLER: consts.CONTROLLER_CAP
+        }.get(resource_type)
+        fc_ports = {}
+        if resource_type == constants.ResourceType.PORT and metric_map:
+            for fc_port in self.get_fc_port(storage_id) or []:
+                fc_ports[fc_port.get('wwn').upper()] = fc_port
         for resource_info in metric_map:
             if resource_type == constants.ResourceType.PORT:
-                port_info = self.get_fc_port(storage_id)
-                if port_info:
-                    for fc_port in port_info:
-                        if resource_info.strip('0x').upper() == fc_port.get(
-                                'wwn').upper():
-                            resource_id = fc_port.get('native_port_id')
-                            resource_name = fc_port.get('name')
-                            break
+                fc_port = fc_ports.get(resource_info.strip('0x').upper(), {})
+                resource_id = fc_port.get('native_port_id')
+                resource_name = fc_port.get('name')
             else:
                 resource_arr = resource_info.split('_')
                 resource_id = resource_arr[0]
                 resource_name = resource_arr[1]
-            for target in metric_map.get(resource_info):
-                if resource_type == constants.ResourceType.PORT:
-                    unit = consts.PORT_CAP[target]['unit']
-                elif resource_type == constants.ResourceType.VOLUME:
-                    unit = consts.VOLUME_CAP[target]['unit']
-                elif resource_type == constants.ResourceType.DISK:
-                    unit = consts.DISK_CAP[target]['unit']
-                elif resource_type == constants.ResourceType.CONTROLLER:
-                    unit = consts.CONTROLLER_CAP[target]['unit']
-                if 'responseTime' == target:
-                    for res_time in metric_map.get(resource_info).get(target):
-                        for iops_time in metric_map.get(resource_info).get(
-                                'iops'):
-                            if res_time == iops_time:
-                                res_value = metric_map.get(resource_info).get(
-                                    target).get(res_time)
-                                iops_value = metric_map.get(
-                                    resource_info).get('iops').get(iops_time)
-                                res_value = \
-                                    res_value / iops_value if iops_value else 0
-                                res_value = round(res_value, 3)
-                                metric_map[resource_info][target][res_time] = \
-                                    res_value
-                                break
+            resource_metrics = metric_map.get(resource_info)
+            iostats.average_response_time(resource_metrics)
+            for target in resource_metrics:
                 labels = {
                     'storage_id': storage_id,
                     'resource_type': resource_type,
                     'resource_id': resource_id,
                     'resource_name': resource_name,
                     'type': 'RAW',
-                    'unit': unit
+                    'unit': perf_caps[target]['unit']
                 }
-                metric_value = constants.metric_struct(name=target,
-                                                       labels=labels,
-                                                       values=metric_map.get(
-                                                           resource_info).get(
-                                                           target))
+                metric_value = constants.metric_struct(
+                    name=target, labels=labels,
+                    values=resource_metrics.get(target))
                 metrics.append(metric_value)
 
     @staticmethod
-    def count_metric_data(last_data, now_data, interval, target, metric_type,
-                          metric_map, res_id):
-        if not target:
-            return
-        if 'CACHEHITRATIO' not in metric_type.upper():
-            value = SSHHandler.count_difference(now_data.get(target),
-                                                last_data.get(target))
-        else:
-            value = now_data.get(
-                SSHHandler.VOLUME_PERF_METRICS.get(metric_type))
-        if 'THROUGHPUT' in metric_type.upper():
-            value = value / interval / units.Mi
-        elif 'IOSIZE' in metric_type.upper():
-            value = value / units.Ki
-        elif 'IOPS' in metric_type.upper():
-            value = int(value / interval)
-        elif 'RESPONSETIME' in metric_type.upper():
-            value = value / interval
-        value = round(value, 3)
-        if metric_map.get(res_id):
-            if metric_map.get(res_id).get(metric_type):
-                if metric_map.get(res_id).get(metric_type).get(
-                        now_data.get('time')):
-                    metric_map[res_id][metric_type][now_data.get('time')] \
-                        += value
-                else:
-                    metric_map[res_id][metric_type][now_data.get('time')] \
-                        = value
-            else:
-                metric_map[res_id][metric_type] = {now_data.get('time'): value}
-        else:
-            metric_map[res_id] = {metric_type: {now_data.get('time'): value}}
+    def get_window_files(file_list, start_time, end_time):
+        """Return the files of a dump stream needed for a window.
 
-    @staticmethod
-    def count_difference(now_value, last_value):
-        return now_value if now_value < last_value else now_value - last_value
+        These are the files in the window, plus the one just before it,
+        which gives the baseline counters of the first file.
+        """
+        window_files = []
+        recent_file = None
+        for file in file_list or []:
+            if start_time <= file[0] <= end_time:
+                if not window_files and recent_file:
+                    window_files.append(recent_file)
+                window_files.append(file)
+            recent_file = file
+        return window_files
+
+    def get_frames_from_file(self, local_dir, file, resource_types):
+        with self.ssh_pool.item() as ssh:
+            local_file = Tools.get_remote_file(ssh, file[1], local_dir,
+                                               consts.REMOTE_FILE_PATH)
+        if not local_file:
+            return {}
+        try:
+            return iostats.load_frames(iostats.iter_stats_file(local_file),
+                                       file[0], resource_types)
+        except Exception as err:
+            LOG.error("Failed to parse statics file %s: %s",
+                      file[1], six.text_type(err))
+            return {}
+        finally:
+            os.remove(local_file)
 
     @staticmethod
-    def handle_volume_cach_hit(now_data, last_data):
-        rh = SSHHandler.count_difference(now_data.get('rh'),
-                                         last_data.get('rh'))
-        wh = SSHHandler.count_difference(now_data.get('wh'),
-                                         last_data.get('wh'))
-        rht = SSHHandler.count_difference(now_data.get('rht'),
-                                          last_data.get('rht'))
-        wht = SSHHandler.count_difference(now_data.get('wht'),
-                                          last_data.get('wht'))
-        rhr = rh * 100 / rht if rht > 0 else 0
-        whr = wh * 100 / wht if wht > 0 else 0
-        hrt = rhr + whr
-        now_data['rhr'] = rhr
-        now_data['whr'] = whr
-        now_data['hrt'] = hrt
+    def get_stream_files(storage_id, file_type, file_list, resource_types,
+                         start_time, end_time):
+        """Return the files of a dump stream to download for a window.
 
-    def get_date_from_each_file(self, file, metric_map, target_list,
-                                resource_type, last_data):
-        with self.ssh_pool.item() as ssh:
-            local_path = '%s/%s' % (
-                os.path.abspath(os.path.join(os.getcwd())),
-                consts.LOCAL_FILE_PATH)
-            file_xml = Tools.get_remote_file_to_xml(
-                ssh, file[1], local_path,
-                consts.REMOTE_FILE_PATH)
-            if not file_xml:
-                return
-            for data in file_xml:
-                if re.sub(u"\\{.*?}", "", data.tag) == \
-                        SSHHandler.TARGET_RESOURCE_RELATION.get(
-                            resource_type):
-                    if resource_type == constants.ResourceType.PORT:
-                        if data.attrib.get('fc_wwpn'):
-                            resource_info = data.attrib.get('fc_wwpn')
-                        else:
-                            continue
-                    elif resource_type == constants. \
-                            ResourceType.CONTROLLER:
-                        resource_info = '%s_%s' % (
-                            int(data.attrib.get('node_id'), 16),
-                            data.attrib.get('id'))
-                    else:
-                        resource_info = '%s_%s' % (data.attrib.get('idx'),
-                                                   data.attrib.get('id'))
-                    now_data = SSHHandler.package_xml_data(data.attrib,
-                                                           file[0],
-                                                           resource_type)
-                    if last_data.get(resource_info):
-                        interval = (int(file[0]) - last_data.get(
-                            resource_info).get('time')) / units.k
-                        if interval <= 0:
-                            break
-                        if resource_type == constants.ResourceType.VOLUME:
-                            SSHHandler.handle_volume_cach_hit(
-                                now_data, last_data.get(resource_info))
-                        for target in target_list:
-                            device_target = SSHHandler. \
-                                RESOURCE_PERF_MAP.get(resource_type)
-                            SSHHandler.count_metric_data(
-                                last_data.get(resource_info),
-                                now_data, interval,
-                                device_target.get(target),
-                                target, metric_map, resource_info)
-                        last_data[resource_info] = now_data
-                    else:
-                        last_data[resource_info] = now_data
+        :return: (baseline, files), baseline being the cached
+            {resource_type: CounterFrame} after the last file processed by
+            a previous collection, or {} when files start with the one
+            giving the baseline counters
+        """
+        window_files = SSHHandler.get_window_files(file_list, start_time,
+                                                   end_time)
+        if not window_files:
+            return {}, []
+        state = SSHHandler.counter_states.get(storage_id, file_type)
+        if state:
+            state_time, frames = state
+            # Only files newer than the cached state are needed, provided
+            # it is not older than the baseline file of the window
+            if all(resource_type in frames
+                   for resource_type in resource_types) and \
+                    window_files[0][0] <= state_time < window_files[-1][0]:
+                return frames, [file for file in window_files
+                                if file[0] > state_time]
+        return {}, window_files
 
-    def get_stats_from_file(self, file_list, metric_map, target_list,
-                            resource_type, start_time, end_time):
-        if not file_list:
-            return
-        find_first_file = False
-        recent_file = None
-        last_data = {}
-        for file in file_list:
-            if file[0] >= start_time and file[0] <= end_time:
-                if find_first_file is False:
-                    if recent_file:
-                        self.get_date_from_each_file(recent_file, metric_map,
-                                                     target_list,
-                                                     resource_type,
-                                                     last_data)
-                    self.get_date_from_each_file(file, metric_map, target_list,
-                                                 resource_type, last_data)
-                    find_first_file = True
-                else:
-                    self.get_date_from_each_file(file, metric_map, target_list,
-                                                 resource_type, last_data)
-            recent_file = file
+    def get_stats_frames(self, storage_id, file_map, resource_types,
+                         start_time, end_time):
+        """Download and parse the dump files of a window.
 
-    @staticmethod
-    def package_xml_data(file_data, file_time, resource_type):
-        rb = 0
-        wb = 0
-        res_time = 0
-        rh = 0
-        wh = 0
-        rht = 0
-        wht = 0
-        if resource_type == constants.ResourceType.PORT:
-            rb = (int(file_data.get('cbr')) + int(file_data.get('hbr')) + int(
-                file_data.get('lnbr')) + int(
-                file_data.get('rmbr'))) * SSHHandler.BYTES_TO_BIT
-            wb = (int(file_data.get('cbt')) + int(file_data.get('hbt')) + int(
-                file_data.get('lnbt')) + int(
-                file_data.get('rmbt'))) * SSHHandler.BYTES_TO_BIT
-            ro = int(file_data.get('cer')) + int(file_data.get('her')) + int(
-                file_data.get('lner')) + int(file_data.get('rmer'))
-            wo = int(file_data.get('cet')) + int(file_data.get('het')) + int(
-                file_data.get('lnet')) + int(file_data.get('rmet'))
-            res_time = int(file_data.get('dtdt', 0)) / units.Ki
-        else:
-            if resource_type == constants.ResourceType.VOLUME:
-                rb = int(file_data.get('rb')) * SSHHandler.BLOCK_SIZE
-                wb = int(file_data.get('wb')) * SSHHandler.BLOCK_SIZE
-                rh = int(file_data.get('ctrhs'))
-                wh = int(file_data.get('ctwhs'))
-                rht = int(file_data.get('ctrs'))
-                wht = int(file_data.get('ctws'))
-                res_time = int(file_data.get('xl'))
-            elif resource_type == constants.ResourceType.DISK:
-                rb = int(file_data.get('rb')) * SSHHandler.BLOCK_SIZE
-                wb = int(file_data.get('wb')) * SSHHandler.BLOCK_SIZE
-                res_time = int(file_data.get('rq')) + int(file_data.get('wq'))
-            elif resource_type == constants.ResourceType.CONTROLLER:
-                rb = int(file_data.get('rb')) * SSHHandler.BYTES_TO_BIT
-                wb = int(file_data.get('wb')) * SSHHandler.BYTES_TO_BIT
-                res_time = int(file_data.get('rq')) + int(file_data.get('wq'))
-            ro = int(file_data.get('ro'))
-            wo = int(file_data.get('wo'))
-        now_data = {
-            'rb': rb,
-            'wb': wb,
-            'ro': ro,
-            'wo': wo,
-            'tb': rb + wb,
-            'to': ro + wo,
-            'rh': rh,
-            'wh': wh,
-            'rht': rht,
-            'wht': wht,
-            'res_time': res_time,
-            'time': int(file_time)
-        }
-        return now_data
+        Every file is downloaded once, whatever the number of resource
+        types it holds, and files are fetched concurrently over the ssh
+        pool connections.
+
+        :return: {file_type: (baseline, [(file, {resource_type: frame})])},
+            see get_stream_files for baseline, files are in time order
+        """
+        downloads = []
+        stats_frames = {}
+        for file_type, file_list in file_map.items():
+            file_types = [resource_type for resource_type in
+                          SSHHandler.STATS_FILE_RESOURCES.get(
+                              file_type.split('_')[0], [])
+                          if resource_type in resource_types]
+            if not file_types:
+                continue
+            baseline, files = SSHHandler.get_stream_files(
+                storage_id, file_type, file_list, file_types, start_time,
+                end_time)
+            stats_frames[file_type] = (baseline, [])
+            for file in files:
+                downloads.append((file_type, file, file_types))
+        local_dir = tempfile.mkdtemp(prefix='svc_stats_')
+        try:
+            results = concurrency.run_concurrently(
+                [functools.partial(self.get_frames_from_file, local_dir,
+                                   file, file_types)
+                 for _, file, file_types in downloads],
+                max_workers=self.ssh_pool.max_size)
+        finally:
+            shutil.rmtree(local_dir, ignore_errors=True)
+        for (file_type, file, _), frames in zip(downloads, results):
+            if frames:
+                stats_frames[file_type][1].append((file, frames))
+        return stats_frames
+
+    def get_stats_file_data(self, stats_frames, res_type, metrics, storage_id,
+                            target_list):
+        """Compute the metrics of res_type from the parsed dump files.
 
-    def get_stats_file_data(self, file_map, res_type, metrics, storage_id,
-                            target_list, start_time, end_time):
+        :return: {file_type: CounterFrame}, the latest counters of res_type
+            per dump stream
+        """
         metric_map = {}
-        for file_tye in file_map:
-            file_list = file_map.get(file_tye)
-            if 'Nv' in file_tye and res_type == constants.ResourceType.VOLUME:
-                self.get_stats_from_file(file_list, metric_map, target_list,
-                                         constants.ResourceType.VOLUME,
-                                         start_time, end_time)
-            elif 'Nm' in file_tye and res_type == constants.ResourceType.DISK:
-                self.get_stats_from_file(file_list, metric_map, target_list,
-                                         constants.ResourceType.DISK,
-                                         start_time, end_time)
-            elif 'Nn' in file_tye and res_type == constants.ResourceType.PORT:
-                self.get_stats_from_file(file_list, metric_map, target_list,
-                                         constants.ResourceType.PORT,
-                                         start_time, end_time)
-            elif 'Nn' in file_tye and res_type == \
-                    constants.ResourceType.CONTROLLER:
-                self.get_stats_from_file(file_list, metric_map, target_list,
-                                         constants.ResourceType.CONTROLLER,
-                                         start_time, end_time)
+        last_frames = {}
+        perf_map = SSHHandler.RESOURCE_PERF_MAP.get(res_type)
+        for file_type, (baseline, files) in stats_frames.items():
+            last_data = baseline.get(res_type, iostats.CounterFrame())
+            for _, frames in files:
+                frame = frames.get(res_type)
+                if frame is not None:
+                    last_data = iostats.compute_metrics(
+                        last_data, frame, perf_map, target_list, metric_map)
+            last_frames[file_type] = last_data
         self.packege_data(storage_id, res_type, metrics, metric_map)
+        return last_frames
 
     def collect_perf_metrics(self, storage_id, resource_metrics,
                              start_time, end_time):
@@ -1018,38 +913,25 @@ class SSHHandler(object):
         file_map = {}
         try:
             self.get_stats_filelist(file_map)
-            if resource_metrics.get(constants.ResourceType.VOLUME):
-                self.get_stats_file_data(
-                    file_map,
-                    constants.ResourceType.VOLUME,
-                    metrics,
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.VOLUME),
-                    start_time, end_time)
-            if resource_metrics.get(constants.ResourceType.DISK):
-                self.get_stats_file_data(
-                    file_map,
-                    constants.ResourceType.DISK,
-                    metrics,
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.DISK),
-                    start_time, end_time)
-            if resource_metrics.get(constants.ResourceType.PORT):
-                self.get_stats_file_data(
-                    file_map,
-                    constants.ResourceType.PORT,
-                    metrics,
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.PORT),
-                    start_time, end_time)
-            if resource_metrics.get(constants.ResourceType.CONTROLLER):
-                self.get_stats_file_data(
-                    file_map,
-                    constants.ResourceType.CONTROLLER,
-                    metrics,
-                    storage_id,
-                    resource_metrics.get(constants.ResourceType.CONTROLLER),
-                    start_time, end_time)
+            resource_types = [resource_type for resource_type in
+                              SSHHandler.RESOURCE_PERF_MAP
+                              if resource_metrics.get(resource_type)]
+            stats_frames = self.get_stats_frames(storage_id, file_map,
+                                                 resource_types, start_time,
+                                                 end_time)
+            states = {}
+            for resource_type in resource_types:
+                last_frames = self.get_stats_file_data(
+                    stats_frames, resource_type, metrics, storage_id,
+                    resource_metrics.get(resource_type))
+                for file_type, last_data in last_frames.items():
+                    states.setdefault(file_type, {})[resource_type] = \
+                        last_data
+            for file_type, (_, files) in stats_frames.items():
+                if files:
+                    SSHHandler.counter_states.set(
+                        storage_id, file_type, files[-1][0][0],
+                        states.get(file_type, {}))
         except Exception as err:
             err_msg = "Failed to collect metrics from svc: %s" % \
                       (six.text_type(err))
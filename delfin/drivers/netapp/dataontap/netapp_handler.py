@@ -12,6 +12,7 @@
 # WarrayANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import functools
 import re
 import time
 
@@ -29,6 +30,7 @@ from delfin.common import constants
 from delfin.drivers.netapp.dataontap.mapping_handler import MappingHandler
 from delfin.drivers.netapp.dataontap.performance_handler \
     import PerformanceHandler
+from delfin.drivers.utils import concurrency
 from delfin.drivers.utils.rest_client import RestClient
 from delfin.drivers.utils.ssh_client import SSHPool
 from delfin.drivers.utils.tools import Tools
@@ -1047,36 +1049,26 @@ class NetAppHandler(object):
             metrics = []
             if start_time and end_time:
                 metrics_keys = resource_metrics.keys()
-                # storage metrics
-                if constants.ResourceType.STORAGE in metrics_keys:
-                    metrics.extend(
-                        self.get_storage_perf(
-                            resource_metrics,
-                            storage_id, start_time, end_time))
-                # pool metrics
-                if constants.ResourceType.STORAGE_POOL in metrics_keys:
-                    metrics.extend(
-                        self.get_pool_perf(
-                            resource_metrics,
-                            storage_id, start_time, end_time))
-                # volume metrics
-                if constants.ResourceType.VOLUME in metrics_keys:
-                    metrics.extend(
-                        self.get_volume_perf(
-                            resource_metrics,
-                            storage_id, start_time, end_time))
-                # port metrics
-                if constants.ResourceType.PORT in metrics_keys:
-                    metrics.extend(
-                        self.get_port_perf(
-                            resource_metrics,
-                            storage_id, start_time, end_time))
-                # filesystem metrics
-                if constants.ResourceType.FILESYSTEM in metrics_keys:
-                    metrics.extend(
-                        self.get_fs_perf(
-                            resource_metrics,
-                            storage_id, start_time, end_time))
+                perf_calls = []
+                for resource_type, get_perf in (
+                        (constants.ResourceType.STORAGE,
+                         self.get_storage_perf),
+                        (constants.ResourceType.STORAGE_POOL,
+                         self.get_pool_perf),
+                        (constants.ResourceType.VOLUME,
+                         self.get_volume_perf),
+                        (constants.ResourceType.PORT, self.get_port_perf),
+                        (constants.ResourceType.FILESYSTEM,
+                         self.get_fs_perf)):
+                    if resource_type in metrics_keys:
+                        perf_calls.append(functools.partial(
+                            get_perf, resource_metrics, storage_id,
+                            start_time, end_time))
+                # Resource types are fetched concurrently, the per resource
+                # calls of each type share the concurrency cap of the storage
+                for type_metrics in \
+                        concurrency.run_concurrently(perf_calls):
+                    metrics.extend(type_metrics)
             return metrics
         except exception.DelfinException as e:
             err_msg = "Failed to get storage performance from " \
@@ -1109,96 +1101,73 @@ class NetAppHandler(object):
             return storage_metrics
         return []
 
+    def _get_resources_perf(self, metrics, storage_id, start_time,
+                            end_time, perf_url, resources, resource_type):
+        """Fetch performance of resources concurrently, one call each.
+
+        :param resources: list of (uuid, resource_id, resource_name)
+        """
+        def get_resource_perf(resource):
+            uuid, resource_id, resource_name = resource
+            json_info = self.do_rest_call(perf_url % uuid, None)
+            return PerformanceHandler.get_perf_value(
+                metrics, storage_id, start_time, end_time, json_info,
+                resource_id, resource_name, resource_type)
+
+        results = concurrency.map_concurrently(get_resource_perf, resources,
+                                               key=storage_id)
+        return [m for resource_metrics in results for m in resource_metrics]
+
     def get_pool_perf(self, metrics, storage_id, start_time, end_time):
         agg_info = self.ssh_pool.do_exec(
             constant.AGGREGATE_SHOW_DETAIL_COMMAND)
         agg_map_list = []
-        pool_metrics = []
         Tools.split_value_map_list(agg_info, agg_map_list, split=':')
-        for agg_map in agg_map_list:
-            if 'UUIDString' in agg_map:
-                uuid = agg_map['UUIDString']
-                json_info = self.do_rest_call(
-                    constant.POOL_PERF_URL % uuid, None)
-                pool_metrics.extend(
-                    PerformanceHandler.get_perf_value(
-                        metrics,
-                        storage_id,
-                        start_time,
-                        end_time,
-                        json_info,
-                        agg_map['UUIDString'],
-                        agg_map['Aggregate'],
-                        constants.ResourceType.STORAGE_POOL))
-        return pool_metrics
+        pools = [(agg_map['UUIDString'], agg_map['UUIDString'],
+                  agg_map['Aggregate'])
+                 for agg_map in agg_map_list if 'UUIDString' in agg_map]
+        return self._get_resources_perf(
+            metrics, storage_id, start_time, end_time,
+            constant.POOL_PERF_URL, pools,
+            constants.ResourceType.STORAGE_POOL)
 
     def get_volume_perf(self, metrics, storage_id, start_time, end_time):
         volume_info = \
             self.ssh_pool.do_exec(constant.LUN_SHOW_DETAIL_COMMAND)
         volume_map_list = []
-        volume_metrics = []
         Tools.split_value_map_list(volume_info, volume_map_list, split=':')
-        for volume in volume_map_list:
-            if 'LUNUUID' in volume:
-                uuid = volume['LUNUUID']
-                json_info = self.do_rest_call(
-                    constant.VOLUME_PERF_URL % uuid, None)
-                volume_metrics.extend(
-                    PerformanceHandler.get_perf_value(
-                        metrics, storage_id,
-                        start_time, end_time,
-                        json_info, volume['SerialNumber'],
-                        volume['LUNName'],
-                        constants.ResourceType.VOLUME))
-        return volume_metrics
+        volumes = [(volume['LUNUUID'], volume['SerialNumber'],
+                    volume['LUNName'])
+                   for volume in volume_map_list if 'LUNUUID' in volume]
+        return self._get_resources_perf(
+            metrics, storage_id, start_time, end_time,
+            constant.VOLUME_PERF_URL, volumes,
+            constants.ResourceType.VOLUME)
 
     def get_fs_perf(self, metrics, storage_id, start_time, end_time):
         fs_info = self.do_rest_call(
             constant.FS_INFO_URL, {})
-        fs_metrics = []
-        for fs in fs_info:
-            if 'uuid' in fs:
-                uuid = fs['uuid']
-                json_info = self.do_rest_call(
-                    constant.FS_PERF_URL % uuid, None)
-                fs_id = self.get_fs_id(
-                    fs['svm']['name'], fs['name'])
-                fs_metrics.extend(
-                    PerformanceHandler.get_perf_value(
-                        metrics, storage_id, start_time,
-                        end_time, json_info, fs_id,
-                        fs['name'],
-                        constants.ResourceType.FILESYSTEM))
-        return fs_metrics
+        filesystems = [(fs['uuid'], self.get_fs_id(fs['svm']['name'],
+                                                   fs['name']), fs['name'])
+                       for fs in fs_info if 'uuid' in fs]
+        return self._get_resources_perf(
+            metrics, storage_id, start_time, end_time,
+            constant.FS_PERF_URL, filesystems,
+            constants.ResourceType.FILESYSTEM)
 
     def get_port_perf(self, metrics, storage_id, start_time, end_time):
         fc_port = self.do_rest_call(constant.FC_INFO_URL, None)
-        port_metrics = []
-        for fc in fc_port:
-            if 'uuid' in fc:
-                uuid = fc['uuid']
-                json_info = self.do_rest_call(
-                    constant.FC_PERF_URL % uuid, None)
-                port_id = fc['node']['name'] + '_' + fc['name']
-                port_metrics.extend(
-                    PerformanceHandler.get_perf_value(
-                        metrics, storage_id,
-                        start_time, end_time,
-                        json_info, port_id,
-                        fc['name'], constants.ResourceType.PORT))
+        fc_ports = [(fc['uuid'], fc['node']['name'] + '_' + fc['name'],
+                     fc['name']) for fc in fc_port if 'uuid' in fc]
+        port_metrics = self._get_resources_perf(
+            metrics, storage_id, start_time, end_time,
+            constant.FC_PERF_URL, fc_ports, constants.ResourceType.PORT)
         eth_port = self.do_rest_call(constant.ETH_INFO_URL, {})
-        for eth in eth_port:
-            if 'uuid' in eth:
-                uuid = eth['uuid']
-                json_info = self.do_rest_call(
-                    constant.ETH_PERF_URL % uuid, None)
-                port_id = eth['node']['name'] + '_' + eth['name']
-                port_metrics.extend(
-                    PerformanceHandler.get_perf_value(
-                        metrics, storage_id,
-                        start_time, end_time,
-                        json_info, port_id,
-                        eth['name'], constants.ResourceType.PORT))
+        eth_ports = [(eth['uuid'], eth['node']['name'] + '_' + eth['name'],
+                      eth['name']) for eth in eth_port if 'uuid' in eth]
+        port_metrics.extend(self._get_resources_perf(
+            metrics, storage_id, start_time, end_time,
+            constant.ETH_PERF_URL, eth_ports, constants.ResourceType.PORT))
         return port_metrics
 
     def get_storage_version(self):
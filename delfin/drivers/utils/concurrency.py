@@ -0,0 +1,91 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import functools
+import threading
+from concurrent import futures
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from delfin.drivers.utils import shared_calls
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+concurrency_opts = [
+    cfg.IntOpt('max_concurrent_requests',
+               default=4, min=1,
+               help='Maximum number of requests a driver sends concurrently '
+                    'to one storage backend'),
+]
+CONF.register_opts(concurrency_opts, group='storage_driver')
+
+# One limiter per backend, shared by every caller in the process
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(key):
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = threading.BoundedSemaphore(
+                CONF.storage_driver.max_concurrent_requests)
+            _limiters[key] = limiter
+        return limiter
+
+
+def _limited(limiter, call):
+    with limiter:
+        return call()
+
+
+def run_concurrently(calls, key=None, max_workers=None):
+    """Run calls concurrently and return their results in order.
+
+    :param calls: list of callables taking no argument
+    :param key: backend key, e.g. the storage id. Calls sharing a key never
+        run more than CONF.storage_driver.max_concurrent_requests at once,
+        across all callers in the process. Calls must not start nested
+        calls with the same key, as the outer ones hold the permits.
+    :param max_workers: maximum number of calls run at once by this call
+    :return: list of results, in the order of calls. The first exception
+        raised by a call is raised once all calls are done.
+    """
+    calls = list(calls)
+    if not calls:
+        return []
+    max_workers = min(len(calls), max_workers or
+                      CONF.storage_driver.max_concurrent_requests)
+    if key is not None:
+        limiter = _get_limiter(key)
+        calls = [functools.partial(_limited, limiter, call)
+                 for call in calls]
+    if max_workers == 1:
+        return [call() for call in calls]
+    window = shared_calls.current_window()
+    if window is not None:
+        # Calls of the workers share the results of the caller's window
+        calls = [functools.partial(shared_calls.run_in, window, call)
+                 for call in calls]
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = [executor.submit(call) for call in calls]
+    return [result.result() for result in results]
+
+
+def map_concurrently(func, items, key=None, max_workers=None):
+    """Concurrent version of [func(item) for item in items]."""
+    return run_concurrently([functools.partial(func, item)
+                             for item in items],
+                            key=key, max_workers=max_workers)
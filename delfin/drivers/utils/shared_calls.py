@@ -0,0 +1,137 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Share the results of identical driver calls made during one sync.
+
+A SyncWindow is opened for the sync of one storage and activated in every
+thread running a task of that sync. Methods decorated with shared_call then
+run once per window for the same arguments: later calls get the result of
+the first one, concurrent calls wait for it. Results are shared between the
+callers and must not be modified.
+
+The instance is not part of the key of a call, a window covers a single
+storage. A shared call may wait for calls it makes itself, so calls made
+while another shared call runs must be of a lower level, e.g. rest client
+calls made by a driver API call, never the other way round.
+"""
+import collections
+import contextlib
+import functools
+import threading
+
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+_ACTIVE = threading.local()
+
+
+class _SharedCall(object):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SyncWindow(object):
+    """Results of the shared calls made by the tasks of one sync."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._requested = collections.Counter()
+        self._executed = collections.Counter()
+
+    def call(self, name, key, func, *args, **kwargs):
+        with self._lock:
+            self._requested[name] += 1
+            shared = self._calls.get(key)
+            owner = shared is None
+            if owner:
+                shared = self._calls[key] = _SharedCall()
+                self._executed[name] += 1
+        if not owner:
+            shared.done.wait()
+            if shared.error is not None:
+                raise shared.error
+            return shared.result
+        try:
+            shared.result = func(*args, **kwargs)
+        except Exception as e:
+            # Concurrent callers get the error, later ones call again
+            shared.error = e
+            with self._lock:
+                self._calls.pop(key, None)
+            raise
+        finally:
+            shared.done.set()
+        return shared.result
+
+    def report(self):
+        """Return {call name: (requested, executed)}."""
+        with self._lock:
+            return dict((name, (count, self._executed[name]))
+                        for name, count in self._requested.items())
+
+    def saved_calls(self):
+        """Return the number of calls answered from the window."""
+        return sum(requested - executed
+                   for requested, executed in self.report().values())
+
+
+def current_window():
+    """Return the window active in this thread, or None."""
+    return getattr(_ACTIVE, 'window', None)
+
+
+@contextlib.contextmanager
+def activate(window):
+    """Make shared calls of this thread use window, inside the block."""
+    previous = current_window()
+    _ACTIVE.window = window
+    try:
+        yield window
+    finally:
+        _ACTIVE.window = previous
+
+
+def run_in(window, call):
+    """Run call, taking no argument, with window active."""
+    with activate(window):
+        return call()
+
+
+def shared_call(func):
+    """Share the result of a method between the callers of a window.
+
+    Outside of a window, or when an argument is not hashable, the method
+    is simply called.
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def _shared_call(self, *args, **kwargs):
+        window = current_window()
+        if window is None:
+            return func(self, *args, **kwargs)
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            LOG.debug('Arguments of %s are not hashable, not shared', name)
+            return func(self, *args, **kwargs)
+        return window.call(name, key, func, self, *args, **kwargs)
+
+    return _shared_call
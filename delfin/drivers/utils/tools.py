@@ -144,6 +144,25 @@ class Tools(object):
                 local_file = '%s%s' % (file_path, file)
                 os.remove(local_file)
 
+    @staticmethod
+    def get_remote_file(ssh, file, local_path, remote_path):
+        """Copy a remote file into local_path, return its local path.
+
+        Returns None when the copy failed, the error is logged.
+        """
+        local_file = os.path.join(local_path, file)
+        try:
+            scp_client = SCPClient(ssh.get_transport(),
+                                   socket_timeout=15.0)
+            scp_client.get('%s%s' % (remote_path, file), local_file)
+            return local_file
+        except Exception as e:
+            LOG.error("Failed to copy statics file %s: %s",
+                      file, six.text_type(e))
+            if os.path.exists(local_file):
+                os.remove(local_file)
+        return None
+
     @staticmethod
     def get_remote_file_to_xml(ssh, file, local_path, remote_path):
         root_node = None
@@ -158,6 +158,10 @@ class StorageNotFound(NotFound):
     msg_fmt = _("Storage {0} could not be found.")
 
 
+class SyncWatermarkNotFound(NotFound):
+    msg_fmt = _("Sync watermark of {0} for storage {1} could not be found.")
+
+
 class StorageBackendNotFound(NotFound):
     msg_fmt = _("Storage backend could not be found.")
 
@@ -378,6 +382,10 @@ class TelemetryTaskExecError(DelfinException):
     msg_fmt = _("Failure in telemetry task execution")
 
 
+class TelemetryTaskTimeout(TelemetryTaskExecError):
+    msg_fmt = _("Telemetry task did not complete in {0} seconds")
+
+
 class ComponentNotFound(NotFound):
     msg_fmt = _("Component {0} could not be found.")
 
@@ -11,7 +11,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-
+import glob
+import os
+import pickle
+import queue
+import threading
+import time
+import uuid
 
 from oslo_config import cfg
 from oslo_log import log
@@ -19,6 +25,8 @@ import six
 from stevedore import extension
 
 from delfin import exception
+from delfin.common.constants import metric_struct
+from delfin.common.metric_batch import MetricBatch
 from delfin.i18n import _
 
 LOG = log.getLogger(__name__)
@@ -30,6 +38,25 @@ exporter_opts = [
     cfg.ListOpt('performance_exporters',
                 default=['PerformanceExporterExample'],
                 help="Which exporters for performance push."),
+    cfg.StrOpt('exporter_dispatch_mode', default='sync',
+               choices=['sync', 'async'],
+               help="sync: exporters are called in series by the caller, "
+                    "async: data is queued per exporter and pushed by a "
+                    "worker, the caller only pays for the enqueue."),
+    cfg.IntOpt('exporter_queue_size', default=100, min=1,
+               help="Maximum number of pending dispatches per exporter in "
+                    "async dispatch mode."),
+    cfg.StrOpt('exporter_queue_policy', default='drop_oldest',
+               choices=['block', 'drop_oldest', 'spill'],
+               help="What to do when an exporter queue is full, block: "
+                    "wait for room, drop_oldest: discard the oldest "
+                    "pending data, spill: write the data to "
+                    "exporter_spill_dir and replay it later."),
+    cfg.StrOpt('exporter_spill_dir', default='/var/lib/delfin/exporter',
+               help="Directory of spilled data of the spill queue policy."),
+    cfg.IntOpt('exporter_coalesce_size', default=10, min=1,
+               help="Maximum number of queued dispatches merged into one "
+                    "exporter call."),
 ]
 
 CONF = cfg.CONF
@@ -42,29 +69,201 @@ class BaseExporter(object):
     def dispatch(self, ctxt, data):
         """Dispatch data to the third platforms.
             :param ctxt: delfin.RequestContext
-            :param data: The data to be pushed, it's a list with dict item.
-            :type data: list
+            :param data: The data to be pushed, it's a list with dict item,
+                or a MetricBatch for performance data.
+            :type data: list or MetricBatch
         """
         raise NotImplementedError()
 
 
+def _export(exporter, ctxt, data):
+    try:
+        exporter.dispatch(ctxt, data)
+        return True
+    except exception.DelfinException as e:
+        err_msg = _("Failed to export data (%s).") % e.msg
+        LOG.exception(err_msg)
+    except Exception as e:
+        err_msg = six.text_type(e)
+        LOG.exception(err_msg)
+    return False
+
+
+class ExporterWorker(object):
+    """Pushes data to one exporter from a bounded queue in a worker thread.
+
+    Up to CONF.exporter_coalesce_size pending dispatches are merged into
+    one exporter call. When the queue is full CONF.exporter_queue_policy
+    decides between blocking the caller, dropping the oldest pending data
+    or spilling the data to disk.
+    """
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+        self.name = exporter.__class__.__name__
+        self.policy = CONF.exporter_queue_policy
+        self.coalesce_size = CONF.exporter_coalesce_size
+        self.spill_dir = os.path.join(CONF.exporter_spill_dir, self.name)
+        self.queue = queue.Queue(maxsize=CONF.exporter_queue_size)
+        self._stats_lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'dispatched': 0, 'failed': 0,
+                      'dropped': 0, 'spilled': 0, 'exports': 0,
+                      'export_time_total': 0.0, 'export_time_max': 0.0,
+                      'queue_wait_total': 0.0, 'queue_wait_max': 0.0}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _count(self, key, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _observe(self, key, value):
+        with self._stats_lock:
+            self.stats[key + '_total'] += value
+            self.stats[key + '_max'] = max(self.stats[key + '_max'], value)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self.queue.qsize()
+        return stats
+
+    def put(self, ctxt, data):
+        item = (time.time(), ctxt, data)
+        self._count('enqueued')
+        if self.policy == 'block':
+            self.queue.put(item)
+            return
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        if self.policy == 'spill':
+            self._spill(item)
+            return
+        try:
+            self.queue.get_nowait()
+            self._count('dropped')
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._count('dropped')
+
+    def _spill(self, item):
+        data = item[2]
+        if data and isinstance(data[0], metric_struct):
+            # metric_struct cannot be pickled, its class name is shadowed
+            # in delfin.common.constants
+            data = MetricBatch.from_metrics(data)
+        try:
+            if not os.path.exists(self.spill_dir):
+                os.makedirs(self.spill_dir)
+            file_name = os.path.join(self.spill_dir, '%f-%s.spill'
+                                     % (item[0], uuid.uuid4().hex))
+            with open(file_name + '.temp', 'wb') as f:
+                pickle.dump((item[0], data), f)
+            os.rename(file_name + '.temp', file_name)
+            self._count('spilled')
+        except Exception as e:
+            LOG.error("Failed to spill data of exporter %s: %s",
+                      self.name, six.text_type(e))
+            self._count('dropped')
+
+    def _unspill(self):
+        """Move spilled data back to the queue while there is room."""
+        files = sorted(glob.glob(os.path.join(self.spill_dir, '*.spill')))
+        for file_name in files:
+            if self.queue.full():
+                return
+            try:
+                with open(file_name, 'rb') as f:
+                    enqueue_time, data = pickle.load(f)
+                os.remove(file_name)
+            except Exception as e:
+                LOG.error("Failed to load spilled data %s: %s",
+                          file_name, six.text_type(e))
+                continue
+            try:
+                self.queue.put_nowait((enqueue_time, None, data))
+            except queue.Full:
+                self._spill((enqueue_time, None, data))
+                return
+
+    @staticmethod
+    def _coalesce(items):
+        if len(items) == 1:
+            return items[0][2]
+        if all(isinstance(item[2], MetricBatch) for item in items):
+            data = MetricBatch()
+        else:
+            data = []
+        for item in items:
+            data.extend(item[2])
+        return data
+
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            while len(items) < self.coalesce_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            now = time.time()
+            for item in items:
+                self._observe('queue_wait', now - item[0])
+            ctxt = next((item[1] for item in items if item[1] is not None),
+                        None)
+            if _export(self.exporter, ctxt, self._coalesce(items)):
+                self._count('dispatched', len(items))
+            else:
+                self._count('failed', len(items))
+            self._count('exports')
+            self._observe('export_time', time.time() - now)
+            if self.policy == 'spill' and self.queue.empty():
+                self._unspill()
+
+
+# Workers are shared by all managers of a namespace in a process, as
+# managers get created per collection task.
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def _get_workers(namespace, exporters):
+    key = (namespace, os.getpid())
+    with _workers_lock:
+        if key not in _workers:
+            _workers[key] = [ExporterWorker(exporter)
+                             for exporter in exporters]
+        return _workers[key]
+
+
 class BaseManager(BaseExporter):
     def __init__(self, namespace):
         self.extension_manager = extension.ExtensionManager(namespace)
         self.exporters = self._get_exporters()
+        self.workers = []
+        if CONF.exporter_dispatch_mode == 'async':
+            self.workers = _get_workers(namespace, self.exporters)
 
     def dispatch(self, ctxt, data):
-        if not isinstance(data, (list, tuple)):
+        if not isinstance(data, (list, tuple, MetricBatch)):
             data = [data]
+        if self.workers:
+            for worker in self.workers:
+                worker.put(ctxt, data)
+            return
         for exporter in self.exporters:
-            try:
-                exporter.dispatch(ctxt, data)
-            except exception.DelfinException as e:
-                err_msg = _("Failed to export data (%s).") % e.msg
-                LOG.exception(err_msg)
-            except Exception as e:
-                err_msg = six.text_type(e)
-                LOG.exception(err_msg)
+            _export(exporter, ctxt, data)
+
+    def get_stats(self):
+        """Queue depth and latency counters per exporter, async mode only.
+        """
+        return {worker.name: worker.get_stats() for worker in self.workers}
 
     def _get_exporters(self):
         """Get exporters from configuration file which
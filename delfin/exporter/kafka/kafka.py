@@ -12,11 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import atexit
 import json
+import threading
+
 from oslo_config import cfg
 from oslo_log import log
 from kafka import KafkaProducer
 
+from delfin.common.metric_batch import MetricBatch
+
 """"
 The metrics received from driver is should be in this format
 
@@ -51,6 +56,19 @@ kafka_opts = [
                help='The kafka server IP'),
     cfg.StrOpt('kafka_port', default='9092',
                help='The kafka server port'),
+    cfg.IntOpt('kafka_linger_ms', default=100, min=0,
+               help='Time in milliseconds the producer waits for more '
+                    'messages before sending a batch'),
+    cfg.IntOpt('kafka_batch_size', default=16384, min=0,
+               help='Maximum size in bytes of a producer batch per '
+                    'partition'),
+    cfg.StrOpt('kafka_compression_type', default='gzip',
+               choices=['none', 'gzip', 'snappy', 'lz4', 'zstd'],
+               help='Compression codec of the produced messages'),
+    cfg.IntOpt('kafka_max_series_per_message', default=1000, min=1,
+               help='Maximum number of metric series carried by one '
+                    'message, larger storages are split in several '
+                    'messages with the same key'),
 ]
 
 CONF.register_opts(kafka_opts, "KAFKA_EXPORTER")
@@ -58,14 +76,88 @@ kafka = CONF.KAFKA_EXPORTER
 
 
 class KafkaExporter(object):
+    """Pushes performance metrics to kafka.
+
+    One producer is shared by the whole process, so connections and
+    metadata are kept across collection cycles. Metrics are sent keyed by
+    storage id, which keeps the metrics of a storage in order on one
+    partition while spreading storages over all partitions.
+    """
+
+    _producer = None
+    _lock = threading.Lock()
+    stats = {'sent': 0, 'failed': 0}
+
+    @classmethod
+    def get_producer(cls):
+        with cls._lock:
+            if cls._producer is None:
+                compression = kafka.kafka_compression_type
+                cls._producer = KafkaProducer(
+                    bootstrap_servers=[kafka.kafka_ip + ':' +
+                                       kafka.kafka_port],
+                    key_serializer=lambda k: k.encode('utf-8'),
+                    value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                    linger_ms=kafka.kafka_linger_ms,
+                    batch_size=kafka.kafka_batch_size,
+                    compression_type=(None if compression == 'none'
+                                      else compression))
+            return cls._producer
+
+    @classmethod
+    def close_producer(cls, timeout=None):
+        with cls._lock:
+            producer, cls._producer = cls._producer, None
+        if producer is not None:
+            try:
+                producer.flush(timeout=timeout)
+                producer.close(timeout=timeout)
+            except Exception as e:
+                LOG.error("Failed to close kafka producer: %s", e)
+
+    @classmethod
+    def _on_send_success(cls, record_metadata):
+        with cls._lock:
+            cls.stats['sent'] += 1
+
+    @classmethod
+    def _on_send_error(cls, exc):
+        with cls._lock:
+            cls.stats['failed'] += 1
+        LOG.error("Failed to deliver metrics to kafka: %s", exc)
+
+    @staticmethod
+    def _build_messages(data, max_series):
+        """Group metrics into (key, value) messages per storage.
+
+        A message value has the same layout as a json dumped list of
+        metric_struct, so consumers decode it unchanged.
+        """
+        messages = {}
+        for name, labels, timestamps, values in \
+                MetricBatch.from_metrics(data).iter_series():
+            key = str(labels.get('storage_id'))
+            chunks = messages.setdefault(key, [[]])
+            if len(chunks[-1]) >= max_series:
+                chunks.append([])
+            chunks[-1].append([name, labels,
+                               dict(zip(timestamps, values))])
+        for key, chunks in messages.items():
+            for chunk in chunks:
+                yield key, chunk
 
     def push_to_kafka(self, data):
+        producer = self.get_producer()
         topic = kafka.kafka_topic_name
-        ip = kafka.kafka_ip
-        port = kafka.kafka_port
-        bootstrap_server = ip + ':' + port
-        producer = KafkaProducer(
-            bootstrap_servers=[bootstrap_server],
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'))
-
-        producer.send(topic, value=data)
+        for key, value in self._build_messages(
+                data, kafka.kafka_max_series_per_message):
+            try:
+                future = producer.send(topic, key=key, value=value)
+            except Exception as e:
+                self._on_send_error(e)
+                raise
+            future.add_callback(self._on_send_success)
+            future.add_errback(self._on_send_error)
+
+
+atexit.register(KafkaExporter.close_producer, 10)
@@ -11,10 +11,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import collections
+import itertools
+import threading
+import time
+
 import requests
 from oslo_config import cfg
 from oslo_log import log
 
+from delfin.common import constants
+
 LOG = log.getLogger(__name__)
 CONF = cfg.CONF
 alert_mngr_opts = [
@@ -23,23 +30,176 @@ alert_mngr_opts = [
                help='The prometheus alert manager host'),
     cfg.StrOpt('alert_manager_port', default='9093',
                help='The prometheus alert manager port'),
+    cfg.FloatOpt('alert_batch_window', default=1.0, min=0,
+                 help='Seconds alerts are coalesced before being pushed '
+                      'to the alert manager in one request'),
+    cfg.IntOpt('alert_batch_size', default=500, min=1,
+               help='Maximum number of alerts pushed in one request'),
+    cfg.IntOpt('alert_queue_size', default=10000, min=1,
+               help='Maximum number of alerts waiting to be pushed, the '
+                    'oldest are dropped first'),
+    cfg.IntOpt('alert_max_retries', default=3, min=0,
+               help='How many times a failed push of an alert is retried'),
+    cfg.IntOpt('alert_dedup_cache_size', default=10000, min=0,
+               help='Number of pushed alerts remembered to drop duplicates'),
 ]
 
 CONF.register_opts(alert_mngr_opts, "PROMETHEUS_ALERT_MANAGER_EXPORTER")
 alert_cfg = CONF.PROMETHEUS_ALERT_MANAGER_EXPORTER
 
+# First item of the keys of the alerts never deduplicated
+_NO_DEDUP = object()
+
+
+class AlertPusher(object):
+    """Pushes alerts to the alert manager in batches.
+
+    Alerts are coalesced for alert_batch_window seconds and pushed over one
+    pooled session. Alerts are deduplicated by storage_id, alert_id,
+    sequence_number and occur_time, both while pending and against recently
+    pushed ones. Alerts without sequence_number and recovery alerts are
+    never deduplicated.
+    Pending alerts are bounded by alert_queue_size, failed pushes are
+    retried up to alert_max_retries times.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.session = requests.Session()
+        # key -> [alert, attempts]
+        self.pending = collections.OrderedDict()
+        self.pushed_keys = collections.OrderedDict()
+        self.stats = {'pushed': 0, 'dropped': 0, 'retried': 0,
+                      'duplicated': 0}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._unique = itertools.count()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @staticmethod
+    def _get_key(alert):
+        """Return the dedup key of an alert, None when it is never
+        deduplicated.
+        """
+        labels = alert['labels']
+        if labels.get('sequence_number') in (None, 'None') or \
+                labels.get('category') == constants.Category.RECOVERY:
+            return None
+        return (labels.get('storage_id'), labels.get('alert_id'),
+                labels.get('sequence_number'), labels.get('occur_time'))
+
+    def add(self, alerts):
+        with self._cond:
+            for alert in alerts:
+                key = self._get_key(alert)
+                if key is None:
+                    key = (_NO_DEDUP, next(self._unique))
+                elif key in self.pending or key in self.pushed_keys:
+                    self.stats['duplicated'] += 1
+                    continue
+                self.pending[key] = [alert, 0]
+                self._trim()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _trim(self):
+        while len(self.pending) > alert_cfg.alert_queue_size:
+            self.pending.popitem(last=False)
+            self.stats['dropped'] += 1
+
+    def _take_batch(self):
+        batch = []
+        with self._cond:
+            while self.pending and len(batch) < alert_cfg.alert_batch_size:
+                batch.append(self.pending.popitem(last=False))
+        return batch
+
+    def _post(self, alerts):
+        url = 'http://%s:%s/api/v1/alerts' % (alert_cfg.alert_manager_host,
+                                              alert_cfg.alert_manager_port)
+        try:
+            response = self.session.post(url, json=alerts)
+            if response.status_code == 200:
+                return True
+            LOG.error("POST request to alert manager failed with status "
+                      "%s", response.status_code)
+        except Exception as e:
+            LOG.error("Exporting alerts to alert manager has been failed: "
+                      "%s", e)
+        return False
+
+    def flush(self):
+        """Push all pending alerts, returns False if a push failed."""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return True
+            if self._post([alert for _, (alert, _) in batch]):
+                self._on_pushed(batch)
+            else:
+                self._on_failed(batch)
+                return False
+
+    def _on_pushed(self, batch):
+        with self._cond:
+            self.stats['pushed'] += len(batch)
+            if not alert_cfg.alert_dedup_cache_size:
+                return
+            for key, _ in batch:
+                if key[0] is not _NO_DEDUP:
+                    self.pushed_keys[key] = None
+            while len(self.pushed_keys) > alert_cfg.alert_dedup_cache_size:
+                self.pushed_keys.popitem(last=False)
+
+    def _on_failed(self, batch):
+        with self._cond:
+            retry = collections.OrderedDict()
+            for key, (alert, attempts) in batch:
+                if attempts >= alert_cfg.alert_max_retries:
+                    LOG.error("Dropping alert %s after %s failed pushes",
+                              alert['labels'].get('alert_id'), attempts + 1)
+                    self.stats['dropped'] += 1
+                    continue
+                self.stats['retried'] += 1
+                retry[key] = [alert, attempts + 1]
+            # Retried alerts go first, newer alerts may push them out
+            for key, value in self.pending.items():
+                if key not in retry:
+                    retry[key] = value
+            self.pending = retry
+            self._trim()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self.pending:
+                    self._cond.wait()
+            # Give following alerts a chance to join this batch
+            time.sleep(alert_cfg.alert_batch_window)
+            if not self.flush():
+                # Back off before retrying a failed push
+                time.sleep(max(alert_cfg.alert_batch_window, 1))
+
 
 class PrometheusAlertExporter(object):
-    alerts = []
     model_key = ['alert_id', 'alert_name', 'sequence_number', 'category',
                  'severity', 'type', 'location', 'recovery_advice',
                  'storage_id', 'storage_name', 'vendor',
                  'model', 'serial_number', 'occur_time']
 
     def push_prometheus_alert(self, alerts):
-
-        host = alert_cfg.alert_manager_host
-        port = alert_cfg.alert_manager_port
+        prometheus_alerts = []
         for alert in alerts:
             dict = {}
             dict["labels"] = {}
@@ -48,15 +208,5 @@ class PrometheusAlertExporter(object):
                 dict["labels"][key] = str(alert.get(key))
 
             dict["annotations"]["summary"] = alert.get("description")
-
-            self.alerts.append(dict)
-            try:
-                response = requests.post('http://' + host + ":" + port +
-                                         '/api/v1/alerts',
-                                         json=self.alerts)
-                if response.status_code != 200:
-                    LOG.error("POST request failed for alert %s ",
-                              alert.get('alert_id'))
-            except Exception:
-                LOG.error("Exporting alert to alert manager has been failed "
-                          "for alert %s ", alert.get('alert_id'))
+            prometheus_alerts.append(dict)
+        AlertPusher.get_instance().add(prometheus_alerts)
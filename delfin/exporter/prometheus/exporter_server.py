@@ -15,11 +15,13 @@ import glob
 import os
 
 import six
-from flask import Flask
+from flask import Flask, Response, request
 from oslo_config import cfg
 import sys
 from oslo_log import log
 
+from delfin.exporter.prometheus import registry
+
 LOG = log.getLogger(__name__)
 
 app = Flask(__name__)
@@ -38,12 +40,29 @@ prometheus_opts = [
 cfg.CONF.register_opts(prometheus_opts, group=grp)
 cfg.CONF(sys.argv[1:])
 
+# Filled by the task process in memory exporter mode
+metric_registry = registry.MetricRegistry(
+    cfg.CONF.PROMETHEUS_EXPORTER.max_series)
+
+
+def get_registry_metrics():
+    """Stream the whole in memory registry, gzipped when accepted"""
+    chunks = metric_registry.render()
+    headers = {}
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        chunks = registry.gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(chunks, mimetype='text/plain; version=0.0.4',
+                    headers=headers)
+
 
 @app.route("/metrics", methods=['GET'])
 def getfile():
     """Read the earliest metric file from the
     available *.prom files
     """
+    if cfg.CONF.PROMETHEUS_EXPORTER.exporter_mode == 'memory':
+        return get_registry_metrics()
     try:
         if not os.path.exists(cfg.CONF.PROMETHEUS_EXPORTER.metrics_dir):
             LOG.error('No metrics cache folder exists')
@@ -76,5 +95,8 @@ def getfile():
 
 
 if __name__ == '__main__':
+    if cfg.CONF.PROMETHEUS_EXPORTER.exporter_mode == 'memory':
+        registry.start_socket_server(
+            metric_registry, cfg.CONF.PROMETHEUS_EXPORTER.metrics_socket)
     app.run(host=cfg.CONF.PROMETHEUS_EXPORTER.metric_server_ip,
             port=cfg.CONF.PROMETHEUS_EXPORTER.metric_server_port)
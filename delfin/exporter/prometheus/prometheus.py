@@ -19,6 +19,9 @@ import six
 from oslo_config import cfg
 from oslo_log import log
 
+from delfin.common.metric_batch import MetricBatch
+from delfin.exporter.prometheus import registry
+
 LOG = log.getLogger(__name__)
 
 grp = cfg.OptGroup('PROMETHEUS_EXPORTER')
@@ -71,15 +74,16 @@ class PrometheusExporter(object):
 
     # Print metrics in Prometheus format.
     def _write_to_prometheus_format(self, f, metric,
-                                    labels, prom_labels, values):
+                                    labels, prom_labels, timestamps, values):
         f.write("# HELP %s  metric for resource %s and instance %s\n"
                 % (metric, labels.get('resource_type'),
                    labels.get('resource_id')))
         f.write("# TYPE %s gauge\n" % metric)
 
-        for timestamp, value in values.items():
-            f.write("%s{%s} %f %d\n" % (metric, prom_labels,
-                                        value, timestamp))
+        prefix = "%s{%s}" % (metric, prom_labels)
+        f.writelines("%s %f %d\n" % (prefix, value, timestamp)
+                     for timestamp, value in zip(timestamps, values)
+                     if value is not None)
 
     def get_file_age(self, path):
         # Getting ctime of the file/folder
@@ -99,7 +103,51 @@ class PrometheusExporter(object):
                          " as it crossed the retention period", file)
                 os.remove(file)
 
+    @staticmethod
+    def _get_prom_labels(labels):
+        return (
+            "storage_id=\"%s\","
+            "storage_name=\"%s\","
+            "storage_sn=\"%s\","
+            "resource_type=\"%s\","
+            "resource_id=\"%s\","
+            "type=\"%s\","
+            "unit=\"%s\","
+            "value_type=\"%s\"" %
+            (labels.get('storage_id'), labels.get('name'),
+             labels.get('serial_number'), labels.get('resource_type'),
+             labels.get('resource_id'), labels.get('type', 'RAW'),
+             labels.get('unit'), labels.get('value_type', 'gauge')))
+
     def push_to_prometheus(self, storage_metrics):
+        storage_metrics = MetricBatch.from_metrics(storage_metrics)
+        if cfg.CONF.PROMETHEUS_EXPORTER.exporter_mode == 'memory':
+            self._push_to_registry(storage_metrics)
+        else:
+            self._push_to_file(storage_metrics)
+
+    def _push_to_registry(self, storage_metrics):
+        # Only the latest sample of each series is kept by the registry
+        samples = []
+        for name, labels, timestamps, values in \
+                storage_metrics.iter_series():
+            points = [i for i, value in enumerate(values) if value is not None]
+            if not points:
+                continue
+            latest = max(points, key=timestamps.__getitem__)
+            samples.append([labels.get('resource_type') + '_' + name,
+                            self._get_prom_labels(labels),
+                            "metric for resource %s"
+                            % labels.get('resource_type'),
+                            timestamps[latest], values[latest]])
+        try:
+            registry.send_samples(
+                cfg.CONF.PROMETHEUS_EXPORTER.metrics_socket, samples)
+        except Exception as e:
+            LOG.error('Error while sending metrics to exporter server: %s',
+                      six.text_type(e))
+
+    def _push_to_file(self, storage_metrics):
         if not self.check_metrics_dir_exists(self.metrics_dir):
             return
         try:
@@ -113,33 +161,12 @@ class PrometheusExporter(object):
                                         time_stamp + ".prom")
         # make a temp  file with current timestamp
         with open(temp_file_name, "w") as f:
-            for metric in storage_metrics:
-                name = metric.name
-                labels = metric.labels
-                values = metric.values
-                storage_id = labels.get('storage_id')
-                storage_name = labels.get('name')
-                storage_sn = labels.get('serial_number')
-                resource_type = labels.get('resource_type')
-                resource_id = labels.get('resource_id')
-                unit = labels.get('unit')
-                m_type = labels.get('type', 'RAW')
-                value_type = labels.get('value_type', 'gauge')
-                prom_labels = (
-                    "storage_id=\"%s\","
-                    "storage_name=\"%s\","
-                    "storage_sn=\"%s\","
-                    "resource_type=\"%s\","
-                    "resource_id=\"%s\","
-                    "type=\"%s\","
-                    "unit=\"%s\","
-                    "value_type=\"%s\"" %
-                    (storage_id, storage_name, storage_sn, resource_type,
-                        resource_id,
-                        m_type, unit, value_type))
+            for name, labels, timestamps, values in \
+                    storage_metrics.iter_series():
+                prom_labels = self._get_prom_labels(labels)
                 name = labels.get('resource_type') + '_' + name
                 self._write_to_prometheus_format(f, name, labels, prom_labels,
-                                                 values)
+                                                 timestamps, values)
         # this is done so that the exporter server never see an incomplete file
         try:
             f.close()
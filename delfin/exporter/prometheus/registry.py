@@ -0,0 +1,172 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""In memory metric registry shared by the task process and exporter server.
+
+The task process sends the latest sample of every series over a unix
+socket, the exporter server keeps them in a bounded registry and renders
+the whole registry on each scrape of /metrics.
+"""
+import collections
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+import zlib
+
+from oslo_config import cfg
+from oslo_log import log
+
+LOG = log.getLogger(__name__)
+
+grp = cfg.OptGroup('PROMETHEUS_EXPORTER')
+METRICS_SOCKET = '/var/lib/delfin/metrics.sock'
+# Series not updated for this long are dropped from the registry
+SERIES_RETENTION_SEC = 3600
+# Size of the text chunks streamed to the scraper
+RENDER_CHUNK_SIZE = 64 * 1024
+registry_opts = [
+    cfg.StrOpt('exporter_mode', default='file',
+               choices=['file', 'memory'],
+               help='How metrics are handed to the exporter server, '
+                    'file: one .prom file per dispatch in metrics_dir, '
+                    'memory: latest samples kept in the exporter server '
+                    'and sent over metrics_socket'),
+    cfg.StrOpt('metrics_socket', default=METRICS_SOCKET,
+               help='The unix socket used in memory exporter mode'),
+    cfg.IntOpt('max_series', default=500000, min=1,
+               help='Maximum number of series kept in memory exporter '
+                    'mode, the least recently updated are dropped first'),
+]
+cfg.CONF.register_opts(registry_opts, group=grp)
+
+_HEADER = struct.Struct('!I')
+
+
+class MetricRegistry(object):
+    """Keeps the latest sample per series, bounded in number of series."""
+
+    def __init__(self, max_series, retention=SERIES_RETENTION_SEC):
+        self.max_series = max_series
+        self.retention = retention
+        self._series = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._series)
+
+    def update(self, samples):
+        """Store samples of [name, prom_labels, help, timestamp, value]."""
+        now = time.time()
+        with self._lock:
+            for name, prom_labels, help_text, timestamp, value in samples:
+                key = (name, prom_labels)
+                self._series.pop(key, None)
+                self._series[key] = (help_text, timestamp, value, now)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+
+    def _snapshot(self):
+        expire_before = time.time() - self.retention
+        with self._lock:
+            while self._series:
+                key, sample = next(iter(self._series.items()))
+                if sample[3] >= expire_before:
+                    break
+                del self._series[key]
+            items = list(self._series.items())
+        items.sort(key=lambda item: item[0][0])
+        return items
+
+    def render(self):
+        """Yield the registry in Prometheus text format, in chunks."""
+        chunk = []
+        size = 0
+        last_name = None
+        for (name, prom_labels), (help_text, timestamp, value, _) in \
+                self._snapshot():
+            if name != last_name:
+                line = "# HELP %s %s\n# TYPE %s gauge\n" % (
+                    name, help_text, name)
+                chunk.append(line)
+                size += len(line)
+                last_name = name
+            line = "%s{%s} %f %d\n" % (name, prom_labels, value, timestamp)
+            chunk.append(line)
+            size += len(line)
+            if size >= RENDER_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+        if chunk:
+            yield ''.join(chunk)
+
+
+def gzip_chunks(chunks):
+    """Compress an iterable of text chunks into a gzip stream."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def send_samples(path, samples):
+    """Send samples to the exporter server listening on the unix socket."""
+    payload = json.dumps(samples).encode('utf-8')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(rfile, size):
+    data = rfile.read(size)
+    if len(data) < size:
+        return None
+    return data
+
+
+class _SampleHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            header = _recv_exactly(self.rfile, _HEADER.size)
+            if header is None:
+                return
+            payload = _recv_exactly(self.rfile, _HEADER.unpack(header)[0])
+            if payload is None:
+                return
+            try:
+                self.server.registry.update(json.loads(payload))
+            except Exception as e:
+                LOG.error('Invalid metric samples received: %s', e)
+
+
+def start_socket_server(registry, path):
+    """Listen on the unix socket in a daemon thread, filling registry."""
+    if os.path.exists(path):
+        os.remove(path)
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    server = socketserver.ThreadingUnixStreamServer(path, _SampleHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    LOG.info('Metric socket server listening on %s', path)
+    return server
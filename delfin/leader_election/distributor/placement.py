@@ -0,0 +1,145 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Placement of collection jobs on executors by their measured cost.
+
+The load of a job is the part of its interval spent collecting, measured
+in its previous cycles. Jobs are placed with consistent hashing with
+bounded loads: a job goes to the first node of its ring walk whose load
+stays under the bound of the node, load_factor times its weighted share
+of the total load. A job only moves when the nodes before it on the ring
+change or get full, so few jobs move when nodes join or leave.
+"""
+import bisect
+import collections
+
+from oslo_utils import secretutils
+
+# Load of a job never measured, when no job is measured either
+DEFAULT_COST = 1.0
+
+
+def _hash(key):
+    digest = secretutils.md5(str(key).encode('utf-8'),
+                             usedforsecurity=False).hexdigest()
+    return int(digest, 16)
+
+
+def task_cost(task, metric_cost):
+    """Return the load of a task from its last collection, or None.
+
+    :param task: task, with its interval, last_duration and
+        last_metric_count
+    :param metric_cost: seconds added per collected metric point
+    """
+    duration = task['last_duration']
+    if duration is None:
+        return None
+    cost = duration + (task['last_metric_count'] or 0) * metric_cost
+    return cost / task['interval'] if task['interval'] else cost
+
+
+def task_costs(tasks, metric_cost):
+    """Return {task id: load} of tasks.
+
+    Jobs never measured, and the ones missing, count as the mean load of
+    the measured jobs.
+    """
+    measured = {}
+    for task in tasks:
+        cost = task_cost(task, metric_cost)
+        if cost is not None:
+            measured[task['id']] = cost
+    default = sum(measured.values()) / len(measured) \
+        if measured else DEFAULT_COST
+    costs = collections.defaultdict(lambda: default)
+    costs.update(measured)
+    return costs
+
+
+def executor_loads(tasks, costs):
+    """Return {executor: load} of the tasks on each executor."""
+    loads = collections.defaultdict(float)
+    for task in tasks:
+        if task['executor']:
+            loads[task['executor']] += costs[task['id']]
+    return dict(loads)
+
+
+class BoundedLoadRing(object):
+    """Consistent hash ring keeping the load of each node under a bound."""
+
+    def __init__(self, weights, vnodes, load_factor):
+        """
+        :param weights: {node: weight} of the nodes
+        :param vnodes: virtual nodes of each node on the ring
+        :param load_factor: max load of a node relative to its weighted
+            share of the total load, at least 1
+        """
+        self.weights = dict((node, max(weight, 1))
+                            for node, weight in weights.items())
+        self.load_factor = max(load_factor, 1.0)
+        points = sorted((_hash('%s-%d' % (node, i)), node)
+                        for node in self.weights for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def walk(self, key):
+        """Yield the nodes in the ring order of key, each one once."""
+        if not self._nodes:
+            return
+        start = bisect.bisect(self._hashes, _hash(key))
+        seen = set()
+        for i in range(len(self._nodes)):
+            node = self._nodes[(start + i) % len(self._nodes)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self.weights):
+                    return
+
+    def bounds(self, total_load):
+        """Return {node: max load} for a total load."""
+        total_weight = sum(self.weights.values())
+        return dict((node, self.load_factor * total_load * weight /
+                     total_weight) for node, weight in self.weights.items())
+
+    def place(self, costs, loads=None):
+        """Place jobs on the nodes.
+
+        Jobs are placed in the ring order of their keys, so a job gets the
+        same node for the same loads. A job fitting on no node goes to the
+        least loaded one, by weight.
+
+        :param costs: {job key: load} of the jobs to place
+        :param loads: {node: load} of the jobs already placed, the ones of
+            unknown nodes are ignored
+        :return: ({job key: node}, {node: load}) of the jobs and of the
+            nodes with the jobs placed
+        """
+        loads = dict((node, (loads or {}).get(node, 0.0))
+                     for node in self.weights)
+        if not loads:
+            return {}, loads
+        bounds = self.bounds(sum(loads.values()) + sum(costs.values()))
+        placed = {}
+        for key in sorted(costs, key=_hash):
+            cost = costs[key]
+            node = next((node for node in self.walk(key)
+                         if loads[node] + cost <= bounds[node]), None)
+            if node is None:
+                node = min(self.weights, key=lambda candidate: (
+                    (loads[candidate] + cost) / self.weights[candidate]))
+            placed[key] = node
+            loads[node] += cost
+        return placed, loads
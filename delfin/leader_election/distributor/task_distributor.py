@@ -13,12 +13,16 @@
 # limitations under the License.
 
 
+import collections
+import threading
+
 import six
 from oslo_config import cfg
 from oslo_log import log
 
 from delfin import db
 from delfin.coordination import ConsistentHashing
+from delfin.leader_election.distributor import placement
 from delfin.task_manager import metrics_rpcapi as task_rpcapi
 
 CONF = cfg.CONF
@@ -26,14 +30,89 @@ LOG = log.getLogger(__name__)
 
 
 class TaskDistributor(object):
+    # One partitioner per process, its coordinator connection and
+    # heartbeat are shared by all the distributions
+    _partitioner = None
+    _partitioner_lock = threading.Lock()
+    # {executor: load} predicted by the last placement
+    _predicted_loads = {}
+
     def __init__(self, ctx):
         self.ctx = ctx
         self.task_rpcapi = task_rpcapi.TaskAPI()
 
+    @classmethod
+    def _get_partitioner(cls):
+        with cls._partitioner_lock:
+            if cls._partitioner is None:
+                partitioner = ConsistentHashing()
+                partitioner.start()
+                cls._partitioner = partitioner
+            return cls._partitioner
+
+    def _get_executors(self, task_ids, job_task_ids=()):
+        """Return {task id: executor} of the tasks to place.
+
+        Without a load factor the tasks are placed on the hash ring.
+        Otherwise they are placed by their load, the other tasks stay
+        where they are and count in the load of their executor.
+
+        :param task_ids: ids of the tasks to place
+        :param job_task_ids: ids of the tasks of other jobs, e.g. failed
+            tasks, which go to the executor of their task
+        """
+        all_ids = set(task_ids).union(job_task_ids)
+        if not all_ids:
+            return {}
+        partitioner = self._get_partitioner()
+        if not CONF.telemetry.placement_load_factor:
+            return partitioner.get_task_executors(all_ids)
+
+        ring = placement.BoundedLoadRing(
+            partitioner.get_member_weights(), CONF.telemetry.placement_vnodes,
+            CONF.telemetry.placement_load_factor)
+        tasks = db.task_get_all(self.ctx, filters={'deleted': False})
+        costs = placement.task_costs(tasks,
+                                     CONF.telemetry.placement_metric_cost)
+        self.load_report(placement.executor_loads(tasks, costs))
+
+        task_ids = set(task_ids)
+        staying = dict((task['id'], task['executor']) for task in tasks
+                       if task['id'] not in task_ids)
+        executors, loads = ring.place(
+            dict((task_id, costs[task_id]) for task_id in task_ids),
+            placement.executor_loads(
+                [task for task in tasks if task['id'] in staying], costs))
+        for task_id in all_ids.difference(executors):
+            executor = staying.get(task_id)
+            if executor not in ring.weights:
+                # Task of a job on a left node, or deleted
+                placed, _ = ring.place({task_id: 0.0}, loads)
+                executor = placed.get(task_id)
+            executors[task_id] = executor
+        TaskDistributor._predicted_loads = loads
+        return executors
+
+    def load_report(self, measured_loads):
+        """Log and return {executor: (predicted, measured load)}.
+
+        The predicted load of an executor is the one of the last
+        placement, its measured load comes from the last collections of
+        the tasks it runs now.
+        """
+        predicted_loads = TaskDistributor._predicted_loads
+        report = {}
+        for executor in sorted(set(predicted_loads).union(measured_loads)):
+            report[executor] = (predicted_loads.get(executor),
+                                measured_loads.get(executor, 0.0))
+            LOG.info('Load of executor %s: predicted %s, measured %.3f'
+                     % (executor, '-' if report[executor][0] is None
+                        else '%.3f' % report[executor][0],
+                        report[executor][1]))
+        return report
+
     def distribute_new_job(self, task_id):
-        partitioner = ConsistentHashing()
-        partitioner.start()
-        executor = partitioner.get_task_executor(task_id)
+        executor = self._get_executors([task_id]).get(task_id)
         try:
             db.task_update(self.ctx, task_id, {'executor': executor})
             LOG.info('Distribute a new job, id: %s' % task_id)
@@ -43,6 +122,84 @@ class TaskDistributor(object):
                       six.text_type(e))
             raise e
 
+    @staticmethod
+    def _moved_jobs(jobs, executor_of):
+        """Return [(job id, old executor, new executor)] of the jobs whose
+        executor changes.
+        """
+        moved = []
+        for job in jobs:
+            executor = executor_of(job)
+            if executor and executor != job['executor']:
+                moved.append((job['id'], job['executor'], executor))
+        return moved
+
+    @staticmethod
+    def _by_executor(moved_tasks, moved_failed_tasks, index):
+        """Return {executor: ([task id], [failed task id])} of the moved
+        jobs, by old executor for index 1 and by new executor for index 2.
+        """
+        jobs = collections.defaultdict(lambda: ([], []))
+        for kind, moved in enumerate((moved_tasks, moved_failed_tasks)):
+            for job in moved:
+                if job[index]:
+                    jobs[job[index]][kind].append(job[0])
+        return jobs
+
+    def distribute_jobs(self, tasks, failed_tasks=(), remove_moved=True):
+        """Place jobs on the ring and move the ones whose executor changed.
+
+        The ring is read once for all the jobs, a failed task goes to the
+        executor of its task. With a load factor, jobs are placed by their
+        load measured in the previous collections. Moved jobs are updated
+        with one bulk update per table, removed from their old executor and
+        assigned to the new one with one cast per executor.
+
+        :param tasks: tasks, with their id and executor
+        :param failed_tasks: failed tasks, with their id, task_id and
+            executor
+        :param remove_moved: whether to remove moved jobs from their old
+            executor, False when it left the group
+        :return: (number of moved tasks, number of moved failed tasks)
+        """
+        if not tasks and not failed_tasks:
+            return 0, 0
+        executors = self._get_executors(
+            [task['id'] for task in tasks],
+            [failed_task['task_id'] for failed_task in failed_tasks])
+        moved_tasks = self._moved_jobs(
+            tasks, lambda task: executors.get(task['id']))
+        moved_failed_tasks = self._moved_jobs(
+            failed_tasks, lambda failed_task: executors.get(
+                failed_task['task_id']))
+        try:
+            if remove_moved:
+                for executor, (ids, failed_ids) in self._by_executor(
+                        moved_tasks, moved_failed_tasks, 1).items():
+                    self.task_rpcapi.remove_jobs(self.ctx, ids, failed_ids,
+                                                 executor)
+            if moved_tasks:
+                db.tasks_update(self.ctx, [
+                    {'id': task_id, 'executor': executor}
+                    for task_id, _, executor in moved_tasks])
+            if moved_failed_tasks:
+                db.failed_tasks_update(self.ctx, [
+                    {'id': failed_task_id, 'executor': executor}
+                    for failed_task_id, _, executor in moved_failed_tasks])
+            for executor, (ids, failed_ids) in self._by_executor(
+                    moved_tasks, moved_failed_tasks, 2).items():
+                self.task_rpcapi.assign_jobs(self.ctx, ids, failed_ids,
+                                             executor)
+        except Exception as e:
+            LOG.error('Failed to distribute jobs, reason: %s',
+                      six.text_type(e))
+            raise e
+        LOG.info('Distributed %d jobs and %d failed jobs, moved %d jobs and '
+                 '%d failed jobs' % (len(tasks), len(failed_tasks),
+                                     len(moved_tasks),
+                                     len(moved_failed_tasks)))
+        return len(moved_tasks), len(moved_failed_tasks)
+
     def distribute_failed_job(self, failed_task_id, executor):
 
         try:
@@ -19,10 +19,11 @@
 from oslo_log import log
 from oslo_utils import importutils
 
+from delfin import db
 from delfin import manager
 from delfin.drivers import manager as driver_manager
 from delfin.drivers import api as driver_api
-from delfin.task_manager.tasks import alerts, telemetry
+from delfin.task_manager.tasks import alerts, resources, telemetry
 
 LOG = log.getLogger(__name__)
 
@@ -44,15 +45,24 @@ class TaskManager(manager.Manager):
         device_obj = cls(context, storage_id)
         device_obj.sync()
 
+    def sync_storage(self, context, storage_id, resource_tasks):
+        LOG.debug("Received the sync_storage job request for storage"
+                  " id:{0}, tasks: {1}".format(storage_id, resource_tasks))
+        task_classes = [importutils.import_class(resource_task)
+                        for resource_task in resource_tasks]
+        resources.StorageSyncJob(context, storage_id, task_classes).run()
+
     def remove_storage_resource(self, context, storage_id, resource_task):
         cls = importutils.import_class(resource_task)
         device_obj = cls(context, storage_id)
-        device_obj.remove()
+        with db.session_scope():
+            device_obj.remove()
 
     def remove_storage_in_cache(self, context, storage_id):
         LOG.info('Remove storage device in memory for storage id:{0}'
                  .format(storage_id))
         driver_api.API().remove_storage(context, storage_id)
+        db.storage_cache_invalidate(storage_id)
         drivers = driver_manager.DriverManager()
         drivers.remove_driver(storage_id)
 
@@ -121,6 +121,26 @@ class MetricsTaskManager(manager.Manager):
                     if len(failed_tasks) == 0 and len(tasks) == 0:
                         self.stop_executor(name, local_executor, storage_id)
 
+    @staticmethod
+    def _for_each_job(func, context, job_ids, executor):
+        # One job failing does not keep the others from being handled
+        for job_id in job_ids:
+            try:
+                func(context, job_id, executor)
+            except Exception as e:
+                LOG.error('Failed to %s %s, reason: %s', func.__name__,
+                          job_id, six.text_type(e))
+
+    def assign_jobs(self, context, task_ids, failed_task_ids, executor):
+        self._for_each_job(self.assign_job, context, task_ids, executor)
+        self._for_each_job(self.assign_failed_job, context, failed_task_ids,
+                           executor)
+
+    def remove_jobs(self, context, task_ids, failed_task_ids, executor):
+        self._for_each_job(self.remove_job, context, task_ids, executor)
+        self._for_each_job(self.remove_failed_job, context, failed_task_ids,
+                           executor)
+
     def schedule_boot_jobs(self, executor):
         """Schedule periodic collection if any task is currently assigned to
         this executor """
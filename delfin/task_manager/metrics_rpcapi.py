@@ -76,6 +76,24 @@ class TaskAPI(object):
                                  failed_task_id=failed_task_id,
                                  executor=executor)
 
+    def assign_jobs(self, context, task_ids, failed_task_ids, executor):
+        rpc_client = self.get_client(str(executor))
+        call_context = rpc_client.prepare(topic=str(executor), version='1.0',
+                                          fanout=True)
+        return call_context.cast(context, 'assign_jobs',
+                                 task_ids=task_ids,
+                                 failed_task_ids=failed_task_ids,
+                                 executor=executor)
+
+    def remove_jobs(self, context, task_ids, failed_task_ids, executor):
+        rpc_client = self.get_client(str(executor))
+        call_context = rpc_client.prepare(topic=str(executor), version='1.0',
+                                          fanout=True)
+        return call_context.cast(context, 'remove_jobs',
+                                 task_ids=task_ids,
+                                 failed_task_ids=failed_task_ids,
+                                 executor=executor)
+
     def create_perf_job(self, context, task_id):
         rpc_client = self.get_client('JobGenerator')
         call_context = rpc_client.prepare(topic='JobGenerator', version='1.0')
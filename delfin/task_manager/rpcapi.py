@@ -47,6 +47,13 @@ class TaskAPI(object):
                                  storage_id=storage_id,
                                  resource_task=resource_task)
 
+    def sync_storage(self, context, storage_id, resource_tasks):
+        call_context = self.client.prepare(version='1.0')
+        return call_context.cast(context,
+                                 'sync_storage',
+                                 storage_id=storage_id,
+                                 resource_tasks=resource_tasks)
+
     def collect_telemetry(self, context, storage_id, telemetry_task, args,
                           start_time, end_time):
         call_context = self.client.prepare(version='1.0')
@@ -0,0 +1,188 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Executor pools of the collection jobs of a process.
+
+Collection jobs run in bounded pools of the scheduler, one per driver or
+one per storage, so a storage whose collections hang only holds the
+workers of its own pool. The pools record how long the jobs waited for
+a worker after their scheduled run time, and how long they ran.
+
+The backfills of failed collection windows run in a pool of their own,
+so they never take the workers of the collections, and a backfill of a
+storage yields while a collection of the storage is running.
+
+Collections also run under a hard timeout: TelemetryTaskTimeout is
+raised in the greenthread of a collection still running at its next I/O,
+and the collection handler records it as failed.
+"""
+import threading
+import time
+
+import eventlet
+from apscheduler.executors.base import run_job
+from apscheduler.executors.pool import ThreadPoolExecutor
+from oslo_config import cfg
+from oslo_log import log
+
+from delfin import context
+from delfin import db
+from delfin import exception
+
+CONF = cfg.CONF
+LOG = log.getLogger(__name__)
+
+DEFAULT_EXECUTOR = 'default'
+BACKFILL_EXECUTOR = 'backfill'
+
+
+def collection_timeout(interval):
+    """Return the timeout in seconds of a collection of a job, or None."""
+    return CONF.telemetry.collection_timeout or interval or None
+
+
+def hard_timeout(seconds):
+    """Context manager raising TelemetryTaskTimeout after seconds, never
+    when seconds is None.
+    """
+    return eventlet.Timeout(seconds,
+                            exception.TelemetryTaskTimeout(seconds))
+
+
+class TimedPoolExecutor(ThreadPoolExecutor):
+    """Thread pool executor recording the wait and run times of jobs."""
+
+    def __init__(self, max_workers, pools):
+        super(TimedPoolExecutor, self).__init__(max_workers)
+        self._pools = pools
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            exc = f.exception()
+            if exc:
+                self._run_job_error(job.id, exc,
+                                    getattr(exc, '__traceback__', None))
+            else:
+                self._run_job_success(job.id, f.result())
+
+        f = self._pool.submit(self._run_job, job, run_times)
+        f.add_done_callback(callback)
+
+    def _run_job(self, job, run_times):
+        start = time.time()
+        self._pools.started(job.id)
+        try:
+            return run_job(job, job._jobstore_alias, run_times,
+                           self._logger.name)
+        finally:
+            self._pools.record(job.id, start - run_times[-1].timestamp(),
+                               time.time() - start)
+
+
+class JobPools(object):
+    """Pools of the collection jobs of the process and their times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {alias: executor}
+        self._executors = {}
+        # {job id: (alias, storage id)}
+        self._jobs = {}
+        # {job id: (runs, max wait, max run)} since the last report
+        self._times = {}
+        # {job id: storage id} of the running collection jobs
+        self._running = {}
+
+    @staticmethod
+    def _pool_key(storage_id):
+        if CONF.telemetry.collection_pool_by == 'storage':
+            return storage_id
+        try:
+            storage = db.storage_get_cached(context.get_admin_context(),
+                                            storage_id)
+            return '%s-%s' % (storage['vendor'], storage['model'])
+        except exception.StorageNotFound:
+            return storage_id
+
+    def executor(self, scheduler, job_id, storage_id, backfill=False):
+        """Return the executor alias of a new job of storage_id, adding
+        its pool to scheduler when needed.
+
+        :param backfill: whether the job backfills failed collection
+            windows, instead of collecting
+        """
+        if CONF.telemetry.collection_pool_by == 'none':
+            return DEFAULT_EXECUTOR
+        if backfill:
+            alias = BACKFILL_EXECUTOR
+            size = CONF.telemetry.backfill_pool_size
+        else:
+            alias = 'collection-%s' % self._pool_key(storage_id)
+            size = CONF.telemetry.collection_pool_size
+        with self._lock:
+            if alias not in self._executors:
+                executor = TimedPoolExecutor(size, self)
+                scheduler.add_executor(executor, alias)
+                self._executors[alias] = executor
+                LOG.info('Added collection job pool %s' % alias)
+            self._jobs[job_id] = (alias, storage_id)
+        return alias
+
+    def release(self, scheduler, job_id):
+        """Forget a removed job, removing its pool when no job uses it."""
+        with self._lock:
+            alias, _ = self._jobs.pop(job_id, (None, None))
+            self._times.pop(job_id, None)
+            if alias is None or any(
+                    job[0] == alias for job in self._jobs.values()):
+                return
+            executor = self._executors.pop(alias)
+        # Running collections end on their own, do not wait for them
+        scheduler.remove_executor(alias, shutdown=False)
+        executor.shutdown(wait=False)
+        LOG.info('Removed collection job pool %s' % alias)
+
+    def started(self, job_id):
+        with self._lock:
+            alias, storage_id = self._jobs.get(job_id, (None, None))
+            if alias and alias != BACKFILL_EXECUTOR:
+                self._running[job_id] = storage_id
+
+    def record(self, job_id, wait, run):
+        """Record the wait and run times of an ended run of a job."""
+        with self._lock:
+            self._running.pop(job_id, None)
+            if job_id not in self._jobs:
+                return
+            runs, max_wait, max_run = self._times.get(job_id, (0, 0.0, 0.0))
+            self._times[job_id] = (runs + 1, max(max_wait, wait),
+                                   max(max_run, run))
+
+    def collecting(self, storage_id):
+        """Return whether a collection job of storage_id is running."""
+        with self._lock:
+            return storage_id in self._running.values()
+
+    def report(self):
+        """Return and forget {job id: (storage id, runs, max wait, max run)}
+        of the jobs run since the last report, times in seconds.
+        """
+        with self._lock:
+            times, self._times = self._times, {}
+            return dict((job_id, (self._jobs[job_id][1],) + job_times)
+                        for job_id, job_times in times.items()
+                        if job_id in self._jobs)
+
+
+# Pools of the jobs scheduled by this process
+pools = JobPools()
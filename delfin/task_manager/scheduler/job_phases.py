@@ -0,0 +1,137 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Phases of the periodic collection jobs of a process.
+
+A job starts at a phase of its interval, a second derived from a hash of
+its key, the storage id, so the jobs of an executor are spread over the
+interval instead of all starting together after a restart or a
+rebalance. A job may be shifted by a part of its interval, so the retry
+job of a storage does not start with its collection job. With jitter, a
+job takes the least used second of a window after its phase, among the
+jobs of the same interval in the process.
+
+The starts of the jobs are counted per second, to report the job
+concurrency.
+"""
+import collections
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_utils import secretutils
+
+CONF = cfg.CONF
+
+
+def hashed_phase(key, interval):
+    """Return the phase of key in an interval, in seconds."""
+    digest = secretutils.md5(str(key).encode('utf-8'),
+                             usedforsecurity=False).hexdigest()
+    return int(digest, 16) % interval
+
+
+def next_run_time(phase, interval, now):
+    """Return the first time after now at phase of the interval."""
+    now = int(now)
+    return now + ((phase - now) % interval or interval)
+
+
+class JobPhases(object):
+    """Phases and starts of the collection jobs of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {job id: (interval, phase)}
+        self._phases = {}
+        # {interval: {phase: jobs}}
+        self._used = collections.defaultdict(collections.Counter)
+        # {epoch second: started jobs}
+        self._starts = collections.Counter()
+
+    def _choose_phase(self, key, interval, offset):
+        phase = (hashed_phase(key, interval) + int(offset * interval)) \
+            % interval
+        window = int(CONF.telemetry.job_phase_jitter * interval)
+        if not window:
+            return phase
+        used = self._used[interval]
+        # Least used second of the window, the earliest one on a tie
+        offset = min(range(window + 1),
+                     key=lambda i: (used[(phase + i) % interval], i))
+        return (phase + offset) % interval
+
+    def reserve(self, job_id, key, interval, now=None, offset=0.0):
+        """Keep the phase of a new job and return its first run time.
+
+        :param job_id: id of the scheduler job
+        :param key: key of the phase of the job, the storage id
+        :param interval: interval of the job, in seconds
+        :param now: epoch time, defaults to the current time
+        :param offset: part of the interval the phase is shifted by
+        :return: epoch time of the first run, now plus the interval when
+            jobs are not spread
+        """
+        now = time.time() if now is None else now
+        interval = max(int(interval), 1)
+        with self._lock:
+            self._release(job_id)
+            if CONF.telemetry.job_phase_spread:
+                phase = self._choose_phase(key, interval, offset)
+            else:
+                phase = int(now) % interval
+            self._phases[job_id] = (interval, phase)
+            self._used[interval][phase] += 1
+        return next_run_time(phase, interval, now)
+
+    def _release(self, job_id):
+        interval, phase = self._phases.pop(job_id, (None, None))
+        if interval is not None:
+            used = self._used[interval]
+            used[phase] -= 1
+            if used[phase] <= 0:
+                del used[phase]
+
+    def release(self, job_id):
+        """Forget the phase of a removed job."""
+        with self._lock:
+            self._release(job_id)
+
+    def __len__(self):
+        return len(self._phases)
+
+    def on_job_submitted(self, event):
+        """Scheduler listener counting the starts of collection jobs."""
+        self.record_start(event.job_id)
+
+    def record_start(self, job_id, now=None):
+        second = int(time.time() if now is None else now)
+        with self._lock:
+            if job_id in self._phases:
+                self._starts[second] += 1
+
+    def peak_concurrency(self, now=None):
+        """Return and forget the max jobs started in one second, over the
+        seconds before now.
+        """
+        now = int(time.time() if now is None else now)
+        with self._lock:
+            seconds = [second for second in self._starts if second < now]
+            peak = max([self._starts[second] for second in seconds] or [0])
+            for second in seconds:
+                del self._starts[second]
+        return peak
+
+
+# Phases of the jobs scheduled by this process
+phases = JobPhases()
@@ -15,7 +15,9 @@
 from datetime import datetime
 
 import six
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
+from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import uuidutils
 
@@ -23,11 +25,16 @@ from delfin import context
 from delfin import db
 from delfin import service
 from delfin import utils
+from delfin.common.metric_batch import MetricBatch
 from delfin.coordination import ConsistentHashing
+from delfin.exporter import base_exporter
 from delfin.leader_election.distributor.task_distributor \
     import TaskDistributor
 from delfin.task_manager import metrics_rpcapi as task_rpcapi
+from delfin.task_manager.scheduler import job_executors
+from delfin.task_manager.scheduler import job_phases
 
+CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
@@ -51,47 +58,56 @@ class SchedulerManager(object):
         if not self.scheduler_started:
             self.scheduler.start()
             self.scheduler_started = True
+            self.scheduler.add_listener(job_phases.phases.on_job_submitted,
+                                        EVENT_JOB_SUBMITTED)
+            interval = CONF.telemetry.job_metrics_report_interval
+            if interval:
+                self.scheduler.add_job(
+                    self.report_job_metrics, 'interval',
+                    seconds=interval,
+                    id=uuidutils.generate_uuid())
+
+    def report_job_metrics(self):
+        """Export the max collection jobs started in one second, and the
+        wait and run times of the jobs, since the last report.
+        """
+        if not len(job_phases.phases):
+            return
+        now = datetime.now().timestamp()
+        timestamp = int(now * 1000)
+        peak = job_phases.phases.peak_concurrency(now)
+        LOG.debug('At most %d collection jobs started in one second' % peak)
+        metrics = MetricBatch()
+        metrics.add_series(
+            'jobConcurrency',
+            {'resource_type': 'executor', 'resource_id': CONF.host,
+             'type': 'RAW', 'unit': 'jobs/s'},
+            {timestamp: peak})
+        for job_id, (storage_id, runs, wait, run) in \
+                job_executors.pools.report().items():
+            LOG.debug('Collection job %s ran %d times, waited %.3fs and ran '
+                      '%.3fs at most' % (job_id, runs, wait, run))
+            labels = {'storage_id': storage_id,
+                      'resource_type': 'collection_job',
+                      'resource_id': job_id, 'type': 'RAW', 'unit': 's'}
+            metrics.add_series('waitTime', labels, {timestamp: wait})
+            metrics.add_series('runTime', labels, {timestamp: run})
+        try:
+            base_exporter.PerformanceExporterManager().dispatch(self.ctx,
+                                                                metrics)
+        except Exception as e:
+            LOG.error('Failed to export the job metrics, reason: %s',
+                      six.text_type(e))
 
     def on_node_join(self, event):
-        # A new node joined the group, all the job would be re-distributed.
-        # If the job is already on the node, it would be ignore and would
-        # not be scheduled again
+        # A new node joined the group, all the jobs are placed on the ring
+        # again and only the ones whose executor changed are moved
         LOG.info('Member %s joined the group %s' % (event.member_id,
                                                     event.group_id))
-        # Get all the jobs
         filters = {'deleted': False}
         tasks = db.task_get_all(self.ctx, filters=filters)
-        distributor = TaskDistributor(self.ctx)
-        partitioner = ConsistentHashing()
-        partitioner.start()
-        for task in tasks:
-            # Get the specific executor
-            origin_executor = task['executor']
-            # If the target executor is different from current executor,
-            # remove the job from old executor and add it to new executor
-            new_executor = partitioner.get_task_executor(task['id'])
-            if new_executor != origin_executor:
-                LOG.info('Re-distribute job %s from %s to %s' %
-                         (task['id'], origin_executor, new_executor))
-                self.task_rpcapi.remove_job(self.ctx, task['id'],
-                                            task['executor'])
-            distributor.distribute_new_job(task['id'])
         failed_tasks = db.failed_task_get_all(self.ctx, filters=filters)
-        for failed_task in failed_tasks:
-            # Get the parent task executor
-            task = db.task_get(self.ctx, failed_task['task_id'])
-            origin_executor = failed_task['executor']
-            new_executor = task['executor']
-            # If the target executor is different from current executor,
-            # remove the job from old executor and add it to new executor
-            if new_executor != origin_executor:
-                LOG.info('Re-distribute failed_job %s from %s to %s' %
-                         (failed_task['id'], origin_executor, new_executor))
-                self.task_rpcapi.remove_failed_job(
-                    self.ctx, failed_task['id'], failed_task['executor'])
-            distributor.distribute_failed_job(failed_task['id'],
-                                              task['executor'])
-        partitioner.stop()
+        TaskDistributor(self.ctx).distribute_jobs(tasks, failed_tasks)
 
     def on_node_leave(self, event):
         LOG.info('Member %s left the group %s' % (event.member_id,
@@ -99,16 +115,11 @@ class SchedulerManager(object):
         filters = {'executor': event.member_id.decode('utf-8'),
                    'deleted': False}
         re_distribute_tasks = db.task_get_all(self.ctx, filters=filters)
-        distributor = TaskDistributor(self.ctx)
-        for task in re_distribute_tasks:
-            distributor.distribute_new_job(task['id'])
-
         re_distribute_failed_tasks = db.failed_task_get_all(self.ctx,
                                                             filters=filters)
-        for failed_task in re_distribute_failed_tasks:
-            task = db.task_get(self.ctx, failed_task['task_id'])
-            executor = task['executor']
-            distributor.distribute_failed_job(failed_task['id'], executor)
+        TaskDistributor(self.ctx).distribute_jobs(
+            re_distribute_tasks, re_distribute_failed_tasks,
+            remove_moved=False)
 
     def schedule_boot_jobs(self):
         # Recover the job in db
@@ -146,15 +157,9 @@ class SchedulerManager(object):
     def recover_job(self):
         filters = {'deleted': False}
         all_tasks = db.task_get_all(self.ctx, filters=filters)
-        distributor = TaskDistributor(self.ctx)
-        for task in all_tasks:
-            distributor.distribute_new_job(task['id'])
+        TaskDistributor(self.ctx).distribute_jobs(all_tasks)
 
     def recover_failed_job(self):
         filters = {'deleted': False}
         all_failed_tasks = db.failed_task_get_all(self.ctx, filters=filters)
-        distributor = TaskDistributor(self.ctx)
-        for failed_task in all_failed_tasks:
-            task = db.task_get(self.ctx, failed_task['task_id'])
-            executor = task['executor']
-            distributor.distribute_failed_job(failed_task['id'], executor)
+        TaskDistributor(self.ctx).distribute_jobs([], all_failed_tasks)
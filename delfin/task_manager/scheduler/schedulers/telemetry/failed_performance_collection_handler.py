@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
 import six
 from oslo_config import cfg
 from oslo_log import log
@@ -21,7 +23,9 @@ from delfin import exception
 from delfin.common.constants import TelemetryJobStatus, TelemetryCollection
 from delfin.db.sqlalchemy.models import FailedTask
 from delfin.db.sqlalchemy.models import Task
+from delfin.drivers import api as driverapi
 from delfin.i18n import _
+from delfin.task_manager.scheduler import job_executors
 from delfin.task_manager.scheduler import schedule_manager
 from delfin.task_manager.tasks.telemetry import PerformanceCollectionTask
 from delfin.task_manager import metrics_rpcapi as metrics_task_rpcapi
@@ -30,6 +34,34 @@ LOG = log.getLogger(__name__)
 CONF = cfg.CONF
 
 
+def coalesce_windows(failed_tasks, max_window):
+    """Merge the overlapping or adjacent windows of failed tasks.
+
+    :param failed_tasks: failed tasks, with their start and end times in
+        milliseconds
+    :param max_window: max length of a merged window in milliseconds, a
+        longer window of one failed task is kept whole
+    :return: [(start time, end time, [failed task])] of the merged
+        windows, by start time
+    """
+    windows = []
+    for failed_task in sorted(failed_tasks, key=lambda failed_task: (
+            failed_task[FailedTask.start_time.name],
+            failed_task[FailedTask.end_time.name])):
+        start_time = failed_task[FailedTask.start_time.name]
+        end_time = failed_task[FailedTask.end_time.name]
+        if windows:
+            last_start, last_end, last_tasks = windows[-1]
+            merged_end = max(end_time, last_end)
+            if start_time <= last_end and \
+                    merged_end - last_start <= max_window:
+                windows[-1] = (last_start, merged_end,
+                               last_tasks + [failed_task])
+                continue
+        windows.append((start_time, end_time, [failed_task]))
+    return windows
+
+
 class FailedPerformanceCollectionHandler(object):
     def __init__(self, ctx, failed_task_id, storage_id, args, job_id,
                  retry_count, start_time, end_time, executor):
@@ -42,10 +74,13 @@ class FailedPerformanceCollectionHandler(object):
         self.start_time = start_time
         self.end_time = end_time
         self.metrics_task_rpcapi = metrics_task_rpcapi.TaskAPI()
+        self.driver_api = driverapi.API()
         self.scheduler_instance = \
             schedule_manager.SchedulerManager().get_scheduler()
         self.result = TelemetryJobStatus.FAILED_JOB_STATUS_INIT
         self.executor = executor
+        # Runs deferred in a row for the collection of the storage
+        self.deferrals = 0
 
     @staticmethod
     def get_instance(ctx, failed_task_id):
@@ -64,26 +99,104 @@ class FailedPerformanceCollectionHandler(object):
         )
 
     def __call__(self):
-        # Upon periodic job callback, if storage is already deleted or soft
-        # deleted,do not proceed with failed performance collection flow
-        try:
-            failed_task = db.failed_task_get(self.ctx, self.failed_task_id)
-            if failed_task["deleted"]:
-                LOG.debug('Storage %s getting deleted, ignoring '
-                          'performance collection cycle for failed task id %s.'
-                          % (self.storage_id, self.failed_task_id))
-                return
-        except exception.FailedTaskNotFound:
-            LOG.debug('Storage %s already deleted, ignoring '
-                      'performance collection cycle for failed task id %s.'
+        # Upon periodic job callback, the failed windows of the job whose
+        # storage is not deleted or soft deleted are backfilled
+        failed_tasks = [
+            failed_task for failed_task in db.failed_task_get_all(
+                self.ctx, filters={FailedTask.job_id.name: self.job_id})
+            if not failed_task[FailedTask.deleted.name]]
+        if not failed_tasks:
+            LOG.debug('Storage %s already deleted or its failed windows '
+                      'collected, ignoring performance collection cycle '
+                      'for failed task id %s.'
                       % (self.storage_id, self.failed_task_id))
             return
 
-        self.retry_count = self.retry_count + 1
+        max_window, oldest_time = self._history_limit()
+        done = []
+        pending = []
+        for failed_task in failed_tasks:
+            if oldest_time and \
+                    failed_task[FailedTask.end_time.name] <= oldest_time:
+                done.append(failed_task)
+            else:
+                pending.append(failed_task)
+        if done:
+            LOG.error("Giving up on %d failed windows of storage id:%s "
+                      "older than the history of the storage"
+                      % (len(done), self.storage_id))
+
+        updates = []
+        deferred = False
+        windows = coalesce_windows(pending, max_window)
+        for start_time, end_time, window_tasks in windows:
+            # Live collections of the storage come first, the windows left
+            # are backfilled in a next cycle, until the backfill was
+            # deferred too many times in a row
+            if self.deferrals < \
+                    TelemetryCollection.MAX_FAILED_JOB_DEFERRALS and \
+                    job_executors.pools.collecting(self.storage_id):
+                LOG.info("Deferring the backfill of storage id:%s during "
+                         "its collection" % self.storage_id)
+                deferred = True
+                break
+            if oldest_time:
+                start_time = max(start_time, oldest_time)
+            succeeded = self._collect(start_time, end_time)
+            for failed_task in window_tasks:
+                retry_count = failed_task[FailedTask.retry_count.name] + 1
+                if succeeded or retry_count >= \
+                        TelemetryCollection.MAX_FAILED_JOB_RETRY_COUNT:
+                    done.append(failed_task)
+                    continue
+                updates.append({
+                    FailedTask.id.name: failed_task[FailedTask.id.name],
+                    FailedTask.retry_count.name: retry_count,
+                    FailedTask.result.name:
+                        TelemetryJobStatus.FAILED_JOB_STATUS_RETRYING})
+            if not succeeded:
+                LOG.error(_("Failed to backfill {0} failed windows of "
+                            "storage id:{1} for start time:{2} and end "
+                            "time:{3}".format(len(window_tasks),
+                                              self.storage_id, start_time,
+                                              end_time)))
+
+        self.deferrals = self.deferrals + 1 if deferred else 0
+        if updates:
+            db.failed_tasks_update(self.ctx, updates)
+        if done:
+            self._stop_tasks(done, len(done) == len(failed_tasks))
+
+    def _history_limit(self):
+        """Return the max window of one collection and the oldest time
+        kept by the storage, in milliseconds, or None when the driver does
+        not tell its performance metric retention window.
+        """
+        max_window = CONF.telemetry.max_failed_task_retry_window
+        retention_window = None
+        try:
+            capabilities = self.driver_api.get_capabilities(self.ctx,
+                                                            self.storage_id)
+            retention_window = \
+                capabilities.get('performance_metric_retention_window')
+        except Exception as e:
+            LOG.error("Failed to get driver capabilities during failed task "
+                      "backfill for storage id :{0}, reason:{1}"
+                      .format(self.storage_id, six.text_type(e)))
+        if not retention_window:
+            return max_window * 1000, None
+        oldest_time = int(time.time() - retention_window) * 1000
+        return min(max_window, retention_window) * 1000, oldest_time
+
+    def _collect(self, start_time, end_time):
         try:
             telemetry = PerformanceCollectionTask()
-            status = telemetry.collect(self.ctx, self.storage_id, self.args,
-                                       self.start_time, self.end_time)
+            # A backfill is bounded like a collection of the same window
+            timeout = job_executors.collection_timeout(
+                (end_time - start_time) // 1000)
+            with job_executors.hard_timeout(timeout):
+                status = telemetry.collect(self.ctx, self.storage_id,
+                                           self.args, start_time, end_time)
 
             if not status:
                 raise exception.TelemetryTaskExecError()
@@ -93,33 +206,22 @@ class FailedPerformanceCollectionHandler(object):
                     "id:{0}, reason:{1}".format(self.storage_id,
                                                 six.text_type(e)))
             LOG.error(msg)
-        else:
-            LOG.info("Successfully completed Performance metrics collection "
-                     "for storage id :{0} ".format(self.storage_id))
-            self.result = TelemetryJobStatus.FAILED_JOB_STATUS_SUCCESS
-            self._stop_task()
-            return
-
-        if self.retry_count >= TelemetryCollection.MAX_FAILED_JOB_RETRY_COUNT:
-            msg = _(
-                "Failed to collect performance metrics of task instance "
-                "id:{0} for start time:{1} and end time:{2} with "
-                "maximum retry. Giving up on "
-                "retry".format(self.failed_task_id, self.start_time,
-                               self.end_time))
-            LOG.error(msg)
-            self._stop_task()
-            return
+            return False
+        LOG.info("Successfully completed Performance metrics collection "
+                 "for storage id :{0} ".format(self.storage_id))
+        return True
 
-        self.result = TelemetryJobStatus.FAILED_JOB_STATUS_RETRYING
-        db.failed_task_update(self.ctx, self.failed_task_id,
-                              {FailedTask.retry_count.name: self.retry_count,
-                               FailedTask.result.name: self.result})
-
-    def _stop_task(self):
-        db.failed_task_update(self.ctx, self.failed_task_id,
-                              {FailedTask.retry_count.name: self.retry_count,
-                               FailedTask.result.name: self.result})
-        self.metrics_task_rpcapi.remove_failed_job(self.ctx,
-                                                   self.failed_task_id,
-                                                   self.executor)
+    def _stop_tasks(self, failed_tasks, last):
+        """Delete the collected or given up failed tasks, the last one of
+        the job through the metrics manager, which removes the job.
+        """
+        failed_task_ids = [failed_task[FailedTask.id.name]
+                           for failed_task in failed_tasks]
+        if last:
+            failed_task_ids, last_id = failed_task_ids[:-1], \
+                failed_task_ids[-1]
+        if failed_task_ids:
+            db.failed_tasks_delete(self.ctx, failed_task_ids)
+        if last:
+            self.metrics_task_rpcapi.remove_failed_job(self.ctx, last_id,
+                                                       self.executor)
@@ -24,12 +24,17 @@ from delfin.common.constants import TelemetryCollection, TelemetryJobStatus
 from delfin.exception import TaskNotFound
 from delfin.i18n import _
 from delfin.task_manager import rpcapi as task_rpcapi
+from delfin.task_manager.scheduler import job_executors
+from delfin.task_manager.scheduler import job_phases
 from delfin.task_manager.scheduler import schedule_manager
 from delfin.task_manager.tasks.telemetry import PerformanceCollectionTask
 
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
+# Part of its interval a failed job starts after the collection job
+FAILED_JOB_PHASE_OFFSET = 0.5
+
 
 class JobHandler(object):
     def __init__(self, ctx, task_id, storage_id, args, interval):
@@ -86,11 +91,7 @@ class JobHandler(object):
         instance = collection_class.get_instance(self.ctx, self.task_id)
         current_time = int(datetime.now().timestamp())
         last_run_time = current_time
-        next_collection_time = last_run_time + job['interval']
         job_id = uuidutils.generate_uuid()
-        next_collection_time = datetime \
-            .fromtimestamp(next_collection_time) \
-            .strftime('%Y-%m-%d %H:%M:%S')
 
         existing_job_id = job['job_id']
 
@@ -98,10 +99,17 @@ class JobHandler(object):
 
         if not (existing_job_id and scheduler_job):
             LOG.info('JobHandler scheduling a new job')
+            next_collection_time = job_phases.phases.reserve(
+                job_id, self.storage_id, job['interval'], current_time)
+            next_collection_time = datetime \
+                .fromtimestamp(next_collection_time) \
+                .strftime('%Y-%m-%d %H:%M:%S')
             self.scheduler.add_job(
                 instance, 'interval', seconds=job['interval'],
                 next_run_time=next_collection_time, id=job_id,
-                misfire_grace_time=int(job['interval'] / 2))
+                misfire_grace_time=int(job['interval'] / 2),
+                executor=job_executors.pools.executor(
+                    self.scheduler, job_id, self.storage_id))
 
             update_task_dict = {'job_id': job_id}
             db.task_update(self.ctx, self.task_id, update_task_dict)
@@ -146,8 +154,10 @@ class JobHandler(object):
     def remove_scheduled_job(self, job_id):
         if job_id in self.job_ids:
             self.job_ids.remove(job_id)
+        job_phases.phases.release(job_id)
         if job_id and self.scheduler.get_job(job_id):
             self.scheduler.remove_job(job_id)
+        job_executors.pools.release(self.scheduler, job_id)
 
     def remove_job(self, task_id):
         try:
@@ -177,6 +187,10 @@ class FailedJobHandler(object):
         if self.stopped:
             return
 
+        with db.session_scope():
+            self._schedule_failed_job(failed_task_id)
+
+    def _schedule_failed_job(self, failed_task_id):
         try:
             job = db.failed_task_get(self.ctx, failed_task_id)
             retry_count = job['retry_count']
@@ -204,21 +218,28 @@ class FailedJobHandler(object):
                                     job_id)
                 return
 
-            if not (job_id and self.scheduler.get_job(job_id)):
-                job_id = uuidutils.generate_uuid()
-                db.failed_task_update(self.ctx, job['id'],
-                                      {'job_id': job_id})
-
-                collection_class = importutils.import_class(
-                    job['method'])
-                instance = \
-                    collection_class.get_instance(self.ctx, job['id'])
-                self.scheduler.add_job(
-                    instance, 'interval',
-                    seconds=job['interval'],
-                    next_run_time=datetime.now(), id=job_id,
-                    misfire_grace_time=int(job['interval'] / 2))
-                self.job_ids.add(job_id)
+            # The failed windows of a task are backfilled by one job
+            job_id = self.backfill_job_id(job['task_id'])
+            db.failed_task_update(self.ctx, job['id'], {'job_id': job_id})
+            self.job_ids.add(job_id)
+            if self.scheduler.get_job(job_id):
+                return
+
+            collection_class = importutils.import_class(job['method'])
+            instance = collection_class.get_instance(self.ctx, job['id'])
+            # Half an interval away from the collection of the storage
+            next_run_time = job_phases.phases.reserve(
+                job_id, job['storage_id'], job['interval'],
+                offset=FAILED_JOB_PHASE_OFFSET)
+            self.scheduler.add_job(
+                instance, 'interval',
+                seconds=job['interval'],
+                next_run_time=datetime.fromtimestamp(next_run_time),
+                id=job_id,
+                misfire_grace_time=int(job['interval'] / 2),
+                executor=job_executors.pools.executor(
+                    self.scheduler, job_id, job['storage_id'],
+                    backfill=True))
 
         except Exception as e:
             LOG.error("Failed to schedule retry tasks for performance "
@@ -226,15 +247,36 @@ class FailedJobHandler(object):
         else:
             LOG.info("Schedule collection completed")
 
+    @staticmethod
+    def backfill_job_id(task_id):
+        """Return the id of the job backfilling the failed tasks of a
+        task.
+        """
+        return 'backfill-%s' % task_id
+
     def _teardown_task(self, ctx, failed_task_id, job_id):
         db.failed_task_delete(ctx, failed_task_id)
+        self._release_job(failed_task_id, job_id)
+
+    def _release_job(self, failed_task_id, job_id):
+        """Remove the job of a removed failed task, unless it still
+        backfills other failed tasks.
+        """
+        if job_id:
+            failed_tasks = db.failed_task_get_all(
+                self.ctx, filters={'job_id': job_id, 'deleted': False})
+            if any(failed_task['id'] != failed_task_id
+                   for failed_task in failed_tasks):
+                return
         self.remove_scheduled_job(job_id)
 
     def remove_scheduled_job(self, job_id):
         if job_id in self.job_ids:
             self.job_ids.remove(job_id)
+        job_phases.phases.release(job_id)
         if job_id and self.scheduler.get_job(job_id):
             self.scheduler.remove_job(job_id)
+        job_executors.pools.release(self.scheduler, job_id)
 
     def stop(self):
         self.stopped = True
@@ -245,9 +287,8 @@ class FailedJobHandler(object):
         try:
             LOG.info("Received failed job %s to remove", failed_task_id)
             job = db.failed_task_get(self.ctx, failed_task_id)
-            job_id = job['job_id']
-            self.remove_scheduled_job(job_id)
             db.failed_task_delete(self.ctx, job['id'])
+            self._release_job(job['id'], job['job_id'])
             LOG.info("Removed failed_task entry  %s ", job['id'])
         except Exception as e:
             LOG.error("Failed to remove periodic scheduling job , reason: %s.",
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
 from datetime import datetime
 
 import six
@@ -26,6 +27,7 @@ from delfin.common.constants import TelemetryCollection
 from delfin.db.sqlalchemy.models import FailedTask
 from delfin.drivers import api as driverapi
 from delfin.task_manager import metrics_rpcapi as metrics_task_rpcapi
+from delfin.task_manager.scheduler import job_executors
 from delfin.task_manager.scheduler import schedule_manager
 from delfin.task_manager.scheduler.schedulers.telemetry. \
     failed_performance_collection_handler import \
@@ -86,11 +88,17 @@ class PerformanceCollectionHandler(object):
             end_time = current_time * 1000
             start_time = end_time - (self.interval * 1000) - (overlap * 1000)
             telemetry = PerformanceCollectionTask()
-            status = telemetry.collect(self.ctx, self.storage_id, self.args,
-                                       start_time, end_time)
+            begin = time.time()
+            with job_executors.hard_timeout(
+                    job_executors.collection_timeout(self.interval)):
+                status = telemetry.collect(self.ctx, self.storage_id,
+                                           self.args, start_time, end_time)
 
+            # The cost of the collection is used to place the job
             db.task_update(self.ctx, self.task_id,
-                           {'last_run_time': current_time})
+                           {'last_run_time': current_time,
+                            'last_duration': time.time() - begin,
+                            'last_metric_count': telemetry.metric_count})
 
             if not status:
                 raise exception.TelemetryTaskExecError()
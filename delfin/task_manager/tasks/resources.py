@@ -13,47 +13,76 @@
 # limitations under the License.
 
 import inspect
+import operator
+import time
 
 import decorator
+from oslo_config import cfg
 from oslo_log import log
+from oslo_utils import timeutils
 
 from delfin import coordination
 from delfin import db
 from delfin import exception
 from delfin.common import constants
 from delfin.drivers import api as driverapi
+from delfin.drivers.utils import concurrency
+from delfin.drivers.utils import shared_calls
 from delfin.i18n import _
 
+CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
+def _set_sync_result(context, storage_id, sync_result):
+    """Subtract the results of finished sync tasks from the sync status."""
+    lock = coordination.Lock(storage_id)
+    with lock, db.session_scope():
+        try:
+            storage = db.storage_get(context, storage_id)
+        except exception.StorageNotFound:
+            LOG.warning('Storage %s not found when set synced' % storage_id)
+        else:
+            # One sync task done, sync status minus 1
+            # When sync status get to 0
+            # means all the sync tasks are completed
+            if storage['sync_status'] != constants.SyncStatus.SYNCED:
+                storage['sync_status'] -= sync_result
+                db.storage_update(context, storage_id,
+                                  {'sync_status': storage['sync_status']})
+
+
+def _storage_deleted(context, storage_id):
+    # When context.read_deleted is 'yes', db.storage_get would
+    # only get the storage whose 'deleted' tag is not default value.
+    # The storage is deleted by another process, the cache may not have
+    # seen it yet
+    context.read_deleted = 'yes'
+    try:
+        db.storage_get(context, storage_id)
+    except exception.StorageNotFound:
+        LOG.debug('Storage %s not found when checking deleted' % storage_id)
+        return False
+    finally:
+        context.read_deleted = 'no'
+    return True
+
+
 def set_synced_after():
     @decorator.decorator
     def _set_synced_after(func, *args, **kwargs):
         call_args = inspect.getcallargs(func, *args, **kwargs)
         self = call_args['self']
+        if self.in_sync_job:
+            # The job sets the sync status once all its tasks are done
+            return func(*args, **kwargs)
         sync_result = constants.ResourceSync.SUCCEED
         ret = None
         try:
             ret = func(*args, **kwargs)
         except Exception:
             sync_result = constants.ResourceSync.FAILED
-        lock = coordination.Lock(self.storage_id)
-        with lock:
-            try:
-                storage = db.storage_get(self.context, self.storage_id)
-            except exception.StorageNotFound:
-                LOG.warning('Storage %s not found when set synced'
-                            % self.storage_id)
-            else:
-                # One sync task done, sync status minus 1
-                # When sync status get to 0
-                # means all the sync tasks are completed
-                if storage['sync_status'] != constants.SyncStatus.SYNCED:
-                    storage['sync_status'] -= sync_result
-                    db.storage_update(self.context, self.storage_id,
-                                      {'sync_status': storage['sync_status']})
-
+        _set_sync_result(self.context, self.storage_id, sync_result)
         return ret
 
     return _set_synced_after
@@ -65,17 +94,9 @@ def check_deleted():
         call_args = inspect.getcallargs(func, *args, **kwargs)
         self = call_args['self']
         ret = func(*args, **kwargs)
-        # When context.read_deleted is 'yes', db.storage_get would
-        # only get the storage whose 'deleted' tag is not default value
-        self.context.read_deleted = 'yes'
-        try:
-            db.storage_get(self.context, self.storage_id)
-        except exception.StorageNotFound:
-            LOG.debug('Storage %s not found when checking deleted'
-                      % self.storage_id)
-        else:
+        if not self.in_sync_job and \
+                _storage_deleted(self.context, self.storage_id):
             self.remove()
-        self.context.read_deleted = 'no'
         return ret
 
     return _check_deleted
@@ -83,38 +104,166 @@ def check_deleted():
 
 class StorageResourceTask(object):
     NATIVE_RESOURCE_ID = None
+    # Table of the resources, and their name in the list_<name>_changes
+    # driver API when they can be synced incrementally
+    TABLE_NAME = None
+    CHANGES_RESOURCE = None
+    # Set when the task runs in a StorageSyncJob
+    in_sync_job = False
 
     def __init__(self, context, storage_id):
         self.storage_id = storage_id
         self.context = context
         self.driver_api = driverapi.API()
 
+    @staticmethod
+    def _changed_columns(resource, db_resource):
+        """Return the columns of resource whose value differs in db_resource.
+
+        Values of all columns are compared at once first, as a fingerprint
+        of the row, so unchanged rows cost a single tuple comparison.
+        """
+        columns = [column for column in resource if column != 'id']
+        values = tuple(resource[column] for column in columns)
+        db_values = tuple(db_resource.get(column) for column in columns)
+        if values == db_values:
+            return {}
+        return dict((column, value) for column, value, db_value
+                    in zip(columns, values, db_values) if value != db_value)
+
     def _classify_resources(self, storage_resources, db_resources, key):
         """
         :param storage_resources:
-        :param db_resources:
+        :param db_resources: iterable over the rows in db, read once
+        :param key: column identifying a resource, or tuple of columns
         :return: it will return three list add_list: the items present in
-        storage but not in current_db. update_list:the items present in
-        storage and in current_db. delete_id_list:the items present not in
+        storage but not in current_db. update_list: the changed columns and
+        the id of the items present in storage and in current_db, unchanged
+        items are left out. delete_id_list:the items present not in
         storage but present in current_db.
         """
-        original_ids_in_db = [resource[key]
-                              for resource in db_resources]
-        delete_id_list = [resource['id'] for resource in db_resources]
+        if isinstance(key, tuple):
+            columns = key
+
+            def key_of(resource):
+                return tuple(resource.get(column) for column in columns)
+        else:
+            key_of = operator.itemgetter(key)
+        db_index = {}
+        db_ids = []
+        for db_resource in db_resources:
+            db_index.setdefault(key_of(db_resource), db_resource)
+            db_ids.append(db_resource['id'])
+        matched_ids = set()
         add_list = []
         update_list = []
 
         for resource in storage_resources:
-            if resource[key] in original_ids_in_db:
-                resource['id'] = db_resources[original_ids_in_db.index(
-                    resource[key])]['id']
-                delete_id_list.remove(resource['id'])
-                update_list.append(resource)
-            else:
+            db_resource = db_index.get(key_of(resource))
+            if db_resource is None:
                 add_list.append(resource)
-
+                continue
+            matched_ids.add(db_resource['id'])
+            changes = self._changed_columns(resource, db_resource)
+            if changes:
+                changes['id'] = db_resource['id']
+                update_list.append(changes)
+
+        delete_id_list = [db_id for db_id in db_ids
+                          if db_id not in matched_ids]
         return add_list, update_list, delete_id_list
 
+    def _sync_rows(self, table_name, storage_resources, key, delete_func,
+                   update_func, create_func):
+        """Write the differences between storage_resources and the rows of
+        the storage in table_name, rows which did not change are left as is.
+
+        :return: (added, updated, deleted) number of rows
+        """
+        db_resources = db.resources_get_all_iter(
+            self.context, table_name, filters={'storage_id': self.storage_id})
+        add_list, update_list, delete_id_list = self._classify_resources(
+            storage_resources, db_resources, key)
+        if delete_id_list:
+            delete_func(self.context, delete_id_list)
+        if update_list:
+            update_func(self.context, update_list)
+        if add_list:
+            create_func(self.context, add_list)
+        return len(add_list), len(update_list), len(delete_id_list)
+
+    def _save_resources(self, storage_resources, db_resources):
+        add_list, update_list, delete_id_list = \
+            self._classify_resources(storage_resources, db_resources,
+                                     self.NATIVE_RESOURCE_ID)
+
+        if delete_id_list:
+            self.db_resources_delete(delete_id_list)
+
+        if update_list:
+            self.db_resources_update(update_list)
+
+        if add_list:
+            self.db_resources_create(add_list)
+        return len(add_list), len(update_list), len(delete_id_list)
+
+    def _sync_changes(self):
+        """Sync the resources changed since the last sync, or all of them
+        when the full sync is due, with the list_*_changes driver API.
+
+        :return: False when the driver does not list the changes
+        """
+        if not self.CHANGES_RESOURCE or not CONF.full_sync_interval:
+            return False
+        if not self.driver_api.supports_resource_changes(
+                self.context, self.storage_id, self.CHANGES_RESOURCE):
+            return False
+        now = timeutils.utcnow()
+        since = None
+        try:
+            mark = db.sync_watermark_get(self.context, self.storage_id,
+                                         self.CHANGES_RESOURCE)
+        except exception.SyncWatermarkNotFound:
+            pass
+        else:
+            if mark['watermark'] and mark['full_synced_at'] and \
+                    (now - mark['full_synced_at']).total_seconds() < \
+                    CONF.full_sync_interval:
+                since = mark['watermark']
+        try:
+            changes = self.driver_api.list_resource_changes(
+                self.context, self.storage_id, self.CHANGES_RESOURCE, since)
+        except NotImplementedError:
+            return False
+
+        changed = changes.get('changed') or []
+        with db.session_scope():
+            if since is None:
+                db_resources = self.db_resource_get_all(
+                    {'storage_id': self.storage_id})
+            else:
+                # Rows of the other resources are left as is, rows of the
+                # deleted ones are not in changed and so get deleted
+                native_ids = [resource[self.NATIVE_RESOURCE_ID]
+                              for resource in changed]
+                native_ids.extend(changes.get('deleted') or [])
+                db_resources = db.resources_get_by_native_ids(
+                    self.context, self.TABLE_NAME, self.storage_id,
+                    self.NATIVE_RESOURCE_ID, native_ids) \
+                    if native_ids else []
+            added, updated, deleted = self._save_resources(changed,
+                                                           db_resources)
+        values = {'watermark': changes.get('watermark')}
+        if since is None:
+            values['full_synced_at'] = now
+        db.sync_watermark_set(self.context, self.storage_id,
+                              self.CHANGES_RESOURCE, values)
+        LOG.info('{} {} sync for storage(id={}): {} added, {} updated, {} '
+                 'deleted'.format(self.__class__.__name__,
+                                  'full' if since is None else 'incremental',
+                                  self.storage_id, added, updated, deleted))
+        return True
+
     @check_deleted()
     @set_synced_after()
     def sync(self):
@@ -124,22 +273,13 @@ class StorageResourceTask(object):
         LOG.info('{} sync for storage(id={}) start'.format(
             self.__class__.__name__, self.storage_id))
         try:
-            # list the storage resources from driver and database
-            storage_resources = self.driver_list_resources()
-            db_resources = self.db_resource_get_all(
-                {'storage_id': self.storage_id})
-
-            add_list, update_list, delete_id_list = self._classify_resources(
-                storage_resources, db_resources, self.NATIVE_RESOURCE_ID)
-
-            if delete_id_list:
-                self.db_resources_delete(delete_id_list)
-
-            if update_list:
-                self.db_resources_update(update_list)
-
-            if add_list:
-                self.db_resources_create(add_list)
+            if not self._sync_changes():
+                # list the storage resources from driver and database
+                storage_resources = self.driver_list_resources()
+                with db.session_scope():
+                    db_resources = self.db_resource_get_all(
+                        {'storage_id': self.storage_id})
+                    self._save_resources(storage_resources, db_resources)
         except NotImplementedError:
             # Ignore this exception because driver may not support it.
             pass
@@ -221,13 +361,16 @@ class StorageDeviceTask(StorageResourceTask):
 
 class StoragePoolTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_storage_pool_id'
+    TABLE_NAME = 'storage_pools'
+    CHANGES_RESOURCE = 'storage_pools'
 
     def driver_list_resources(self):
         return self.driver_api.list_storage_pools(
             self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.storage_pool_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'storage_pools',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.storage_pools_delete(self.context, delete_id_list)
@@ -244,12 +387,15 @@ class StoragePoolTask(StorageResourceTask):
 
 class StorageVolumeTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_volume_id'
+    TABLE_NAME = 'volumes'
+    CHANGES_RESOURCE = 'volumes'
 
     def driver_list_resources(self):
         return self.driver_api.list_volumes(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.volume_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'volumes',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.volumes_delete(self.context, delete_id_list)
@@ -266,12 +412,15 @@ class StorageVolumeTask(StorageResourceTask):
 
 class StorageControllerTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_controller_id'
+    TABLE_NAME = 'controllers'
+    CHANGES_RESOURCE = 'controllers'
 
     def driver_list_resources(self):
         return self.driver_api.list_controllers(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.controller_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'controllers',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.controllers_delete(self.context, delete_id_list)
@@ -288,12 +437,15 @@ class StorageControllerTask(StorageResourceTask):
 
 class StoragePortTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_port_id'
+    TABLE_NAME = 'ports'
+    CHANGES_RESOURCE = 'ports'
 
     def driver_list_resources(self):
         return self.driver_api.list_ports(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.port_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'ports',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.ports_delete(self.context, delete_id_list)
@@ -310,12 +462,15 @@ class StoragePortTask(StorageResourceTask):
 
 class StorageDiskTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_disk_id'
+    TABLE_NAME = 'disks'
+    CHANGES_RESOURCE = 'disks'
 
     def driver_list_resources(self):
         return self.driver_api.list_disks(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.disk_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'disks',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.disks_delete(self.context, delete_id_list)
@@ -332,12 +487,15 @@ class StorageDiskTask(StorageResourceTask):
 
 class StorageQuotaTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_quota_id'
+    TABLE_NAME = 'quota'
+    CHANGES_RESOURCE = 'quotas'
 
     def driver_list_resources(self):
         return self.driver_api.list_quotas(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.quota_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'quota',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.quotas_delete(self.context, delete_id_list)
@@ -354,12 +512,15 @@ class StorageQuotaTask(StorageResourceTask):
 
 class StorageFilesystemTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_filesystem_id'
+    TABLE_NAME = 'filesystems'
+    CHANGES_RESOURCE = 'filesystems'
 
     def driver_list_resources(self):
         return self.driver_api.list_filesystems(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.filesystem_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'filesystems',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.filesystems_delete(self.context, delete_id_list)
@@ -376,12 +537,15 @@ class StorageFilesystemTask(StorageResourceTask):
 
 class StorageQtreeTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_qtree_id'
+    TABLE_NAME = 'qtrees'
+    CHANGES_RESOURCE = 'qtrees'
 
     def driver_list_resources(self):
         return self.driver_api.list_qtrees(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.qtree_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'qtrees',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.qtrees_delete(self.context, delete_id_list)
@@ -398,12 +562,15 @@ class StorageQtreeTask(StorageResourceTask):
 
 class StorageShareTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_share_id'
+    TABLE_NAME = 'shares'
+    CHANGES_RESOURCE = 'shares'
 
     def driver_list_resources(self):
         return self.driver_api.list_shares(self.context, self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.share_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'shares',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.shares_delete(self.context, delete_id_list)
@@ -435,12 +602,16 @@ class StorageHostInitiatorTask(StorageResourceTask):
             storage_host_initiators = self.driver_api \
                 .list_storage_host_initiators(self.context, self.storage_id)
             if storage_host_initiators:
-                db.storage_host_initiators_delete_by_storage(
-                    self.context, self.storage_id)
-                db.storage_host_initiators_create(
-                    self.context, storage_host_initiators)
+                with db.session_scope(transaction=True):
+                    added, updated, deleted = self._sync_rows(
+                        'storage_host_initiators', storage_host_initiators,
+                        'native_storage_host_initiator_id',
+                        db.storage_host_initiators_delete,
+                        db.storage_host_initiators_update,
+                        db.storage_host_initiators_create)
                 LOG.info('Building storage host initiator successful for '
-                         'storage id:{0}'.format(self.storage_id))
+                         'storage id:{0}, add={1}, update={2}, delete={3}'
+                         .format(self.storage_id, added, updated, deleted))
         except AttributeError as e:
             LOG.error(e)
         except NotImplementedError:
@@ -462,14 +633,16 @@ class StorageHostInitiatorTask(StorageResourceTask):
 
 class StorageHostTask(StorageResourceTask):
     NATIVE_RESOURCE_ID = 'native_storage_host_id'
+    TABLE_NAME = 'storage_hosts'
+    CHANGES_RESOURCE = 'storage_hosts'
 
     def driver_list_resources(self):
         return self.driver_api.list_storage_hosts(self.context,
                                                   self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.storage_hosts_get_all(self.context,
-                                        filters=filters)
+        return db.resources_get_all_iter(self.context, 'storage_hosts',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.storage_hosts_delete(self.context, delete_id_list)
@@ -486,6 +659,9 @@ class StorageHostTask(StorageResourceTask):
 
 
 class StorageHostGroupTask(StorageResourceTask):
+    RELATION_KEY = ('native_storage_host_group_id',
+                    'native_storage_host_id')
+
     def __init__(self, context, storage_id):
         super(StorageHostGroupTask, self).__init__(context, storage_id)
 
@@ -504,34 +680,25 @@ class StorageHostGroupTask(StorageResourceTask):
                 .list_storage_host_groups(self.context, self.storage_id)
             storage_host_groups = storage_hg_obj['storage_host_groups']
             storage_host_rels = storage_hg_obj['storage_host_grp_host_rels']
-            if storage_host_groups:
-                db.storage_host_grp_host_rels_delete_by_storage(
-                    self.context, self.storage_id)
-                db.storage_host_grp_host_rels_create(
-                    self.context, storage_host_rels)
-                LOG.info('Building host group relations successful for '
-                         'storage id:{0}'.format(self.storage_id))
-
-            db_storage_host_groups = db.storage_host_groups_get_all(
-                self.context, filters={"storage_id": self.storage_id})
-
-            add_list, update_list, delete_id_list = self._classify_resources(
-                storage_host_groups, db_storage_host_groups,
-                'native_storage_host_group_id')
-
-            LOG.debug('###StorageHostGroupTask for {0}:add={1},delete={2},'
-                      'update={3}'.format(self.storage_id,
-                                          len(add_list),
-                                          len(delete_id_list),
-                                          len(update_list)))
-            if delete_id_list:
-                db.storage_host_groups_delete(self.context, delete_id_list)
-
-            if update_list:
-                db.storage_host_groups_update(self.context, update_list)
-
-            if add_list:
-                db.storage_host_groups_create(self.context, add_list)
+            # Groups and relations of the storage are written together,
+            # only the groups and memberships which changed
+            with db.session_scope(transaction=True):
+                groups = self._sync_rows(
+                    'storage_host_groups', storage_host_groups,
+                    'native_storage_host_group_id',
+                    db.storage_host_groups_delete,
+                    db.storage_host_groups_update,
+                    db.storage_host_groups_create)
+                rels = self._sync_rows(
+                    'storage_host_grp_host_rels', storage_host_rels or [],
+                    self.RELATION_KEY,
+                    db.storage_host_grp_host_rels_delete,
+                    db.storage_host_grp_host_rels_update,
+                    db.storage_host_grp_host_rels_create)
+
+            LOG.debug('###StorageHostGroupTask for {0}:add={1},update={2},'
+                      'delete={3},relations add={4},update={5},delete={6}'
+                      .format(self.storage_id, *(groups + rels)))
 
         except AttributeError as e:
             LOG.error(e)
@@ -554,6 +721,8 @@ class StorageHostGroupTask(StorageResourceTask):
 
 
 class PortGroupTask(StorageResourceTask):
+    RELATION_KEY = ('native_port_group_id', 'native_port_id')
+
     def __init__(self, context, storage_id):
         super(PortGroupTask, self).__init__(context, storage_id)
 
@@ -572,33 +741,22 @@ class PortGroupTask(StorageResourceTask):
                 .list_port_groups(self.context, self.storage_id)
             port_groups = port_groups_obj['port_groups']
             port_group_relation_list = port_groups_obj['port_grp_port_rels']
-            if port_groups:
-                db.port_grp_port_rels_delete_by_storage(
-                    self.context, self.storage_id)
-                db.port_grp_port_rels_create(
-                    self.context, port_group_relation_list)
-                LOG.info('Building port group relations successful for '
-                         'storage id:{0}'.format(self.storage_id))
-
-            db_port_groups = db.port_groups_get_all(
-                self.context, filters={"storage_id": self.storage_id})
-
-            add_list, update_list, delete_id_list = self._classify_resources(
-                port_groups, db_port_groups, 'native_port_group_id')
-
-            LOG.debug('###PortGroupTask for {0}:add={1},delete={2},'
-                      'update={3}'.format(self.storage_id,
-                                          len(add_list),
-                                          len(delete_id_list),
-                                          len(update_list)))
-            if delete_id_list:
-                db.port_groups_delete(self.context, delete_id_list)
-
-            if update_list:
-                db.port_groups_update(self.context, update_list)
-
-            if add_list:
-                db.port_groups_create(self.context, add_list)
+            # Groups and relations of the storage are written together,
+            # only the groups and memberships which changed
+            with db.session_scope(transaction=True):
+                groups = self._sync_rows(
+                    'port_groups', port_groups,
+                    'native_port_group_id', db.port_groups_delete,
+                    db.port_groups_update, db.port_groups_create)
+                rels = self._sync_rows(
+                    'port_grp_port_rels', port_group_relation_list or [],
+                    self.RELATION_KEY, db.port_grp_port_rels_delete,
+                    db.port_grp_port_rels_update,
+                    db.port_grp_port_rels_create)
+
+            LOG.debug('###PortGroupTask for {0}:add={1},update={2},'
+                      'delete={3},relations add={4},update={5},delete={6}'
+                      .format(self.storage_id, *(groups + rels)))
 
         except AttributeError as e:
             LOG.error(e)
@@ -620,6 +778,8 @@ class PortGroupTask(StorageResourceTask):
 
 
 class VolumeGroupTask(StorageResourceTask):
+    RELATION_KEY = ('native_volume_group_id', 'native_volume_id')
+
     def __init__(self, context, storage_id):
         super(VolumeGroupTask, self).__init__(context, storage_id)
 
@@ -638,32 +798,21 @@ class VolumeGroupTask(StorageResourceTask):
                 .list_volume_groups(self.context, self.storage_id)
             volume_groups = volume_groups_obj['volume_groups']
             volume_groups_rels = volume_groups_obj['vol_grp_vol_rels']
-            if volume_groups:
-                db.vol_grp_vol_rels_delete_by_storage(
-                    self.context, self.storage_id)
-                db.vol_grp_vol_rels_create(self.context, volume_groups_rels)
-                LOG.info('Building volume group relations successful for '
-                         'storage id:{0}'.format(self.storage_id))
-
-            db_volume_groups = db.volume_groups_get_all(
-                self.context, filters={"storage_id": self.storage_id})
-
-            add_list, update_list, delete_id_list = self._classify_resources(
-                volume_groups, db_volume_groups, 'native_volume_group_id')
-
-            LOG.debug('###VolumeGroupTask for {0}:add={1},delete={2},'
-                      'update={3}'.format(self.storage_id,
-                                          len(add_list),
-                                          len(delete_id_list),
-                                          len(update_list)))
-            if delete_id_list:
-                db.volume_groups_delete(self.context, delete_id_list)
-
-            if update_list:
-                db.volume_groups_update(self.context, update_list)
-
-            if add_list:
-                db.volume_groups_create(self.context, add_list)
+            # Groups and relations of the storage are written together,
+            # only the groups and memberships which changed
+            with db.session_scope(transaction=True):
+                groups = self._sync_rows(
+                    'volume_groups', volume_groups,
+                    'native_volume_group_id', db.volume_groups_delete,
+                    db.volume_groups_update, db.volume_groups_create)
+                rels = self._sync_rows(
+                    'vol_grp_vol_rels', volume_groups_rels or [],
+                    self.RELATION_KEY, db.vol_grp_vol_rels_delete,
+                    db.vol_grp_vol_rels_update, db.vol_grp_vol_rels_create)
+
+            LOG.debug('###VolumeGroupTask for {0}:add={1},update={2},'
+                      'delete={3},relations add={4},update={5},delete={6}'
+                      .format(self.storage_id, *(groups + rels)))
 
         except AttributeError as e:
             LOG.error(e)
@@ -691,7 +840,8 @@ class MaskingViewTask(StorageResourceTask):
                                                   self.storage_id)
 
     def db_resource_get_all(self, filters):
-        return db.masking_views_get_all(self.context, filters=filters)
+        return db.resources_get_all_iter(self.context, 'masking_views',
+                                         filters=filters)
 
     def db_resources_delete(self, delete_id_list):
         return db.masking_views_delete(self.context, delete_id_list)
@@ -705,3 +855,76 @@ class MaskingViewTask(StorageResourceTask):
     def db_resource_delete_by_storage(self):
         return db.masking_views_delete_by_storage(self.context,
                                                   self.storage_id)
+
+
+class StorageSyncJob(object):
+    """Sync all the resources of a storage in one job.
+
+    The resource tasks run in a pool of CONF.storage_sync_workers. The sync
+    status of the storage is updated once all of them are done, to the
+    value the tasks would have set one by one, and the storage is checked
+    for deletion once.
+
+    The tasks run in a window of shared driver calls: identical driver
+    calls made by several tasks reach the backend once.
+    """
+
+    def __init__(self, context, storage_id, task_classes):
+        self.context = context
+        self.storage_id = storage_id
+        self.tasks = [task_class(context, storage_id)
+                      for task_class in task_classes]
+        for task in self.tasks:
+            task.in_sync_job = True
+        self.window = shared_calls.SyncWindow()
+
+    def _sync_task(self, task):
+        begin = time.time()
+        sync_result = constants.ResourceSync.SUCCEED
+        try:
+            task.sync()
+        except Exception as e:
+            LOG.error('%s sync for storage(id=%s) failed: %s'
+                      % (task.__class__.__name__, self.storage_id, e))
+            sync_result = constants.ResourceSync.FAILED
+        return sync_result, time.time() - begin
+
+    def run(self):
+        """Sync the resources.
+
+        :return: {task class name: (sync result, seconds)}
+        """
+        begin = time.time()
+        with shared_calls.activate(self.window):
+            results = concurrency.map_concurrently(
+                self._sync_task, self.tasks,
+                max_workers=CONF.storage_sync_workers)
+        _set_sync_result(self.context, self.storage_id,
+                         sum(sync_result for sync_result, _ in results))
+        if _storage_deleted(self.context, self.storage_id):
+            for task in self.tasks:
+                task.remove()
+
+        report = dict((task.__class__.__name__, result)
+                      for task, result in zip(self.tasks, results))
+        LOG.info('Storage(id=%s) sync job done in %.3fs: %s'
+                 % (self.storage_id, time.time() - begin,
+                    ', '.join('%s %.3fs%s' % (
+                        name, seconds,
+                        '' if sync_result == constants.ResourceSync.SUCCEED
+                        else ' failed')
+                        for name, (sync_result, seconds)
+                        in sorted(report.items()))))
+        self._log_shared_calls()
+        return report
+
+    def _log_shared_calls(self):
+        saved = self.window.saved_calls()
+        if not saved:
+            return
+        LOG.info('Storage(id=%s) sync job saved %d driver calls: %s'
+                 % (self.storage_id, saved,
+                    ', '.join('%s %d/%d' % (name, executed, requested)
+                              for name, (requested, executed)
+                              in sorted(self.window.report().items())
+                              if requested > executed)))
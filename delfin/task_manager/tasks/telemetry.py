@@ -20,6 +20,7 @@ from oslo_log import log
 from delfin import context, db
 from delfin import exception
 from delfin.common.constants import TelemetryTaskStatus
+from delfin.common.metric_batch import MetricBatch
 from delfin.drivers import api as driver_api
 from delfin.exporter import base_exporter
 from delfin.i18n import _
@@ -41,6 +42,8 @@ class PerformanceCollectionTask(TelemetryTask):
     def __init__(self):
         self.driver_api = driver_api.API()
         self.perf_exporter = base_exporter.PerformanceExporterManager()
+        # Metric points of the last collection, part of its cost
+        self.metric_count = 0
 
     def collect(self, ctx, storage_id, args, start_time, end_time):
         try:
@@ -51,13 +54,15 @@ class PerformanceCollectionTask(TelemetryTask):
                 .collect_perf_metrics(ctx, storage_id,
                                       args,
                                       start_time, end_time)
+            perf_metrics = MetricBatch.from_metrics(perf_metrics)
+            self.metric_count = perf_metrics.point_count
 
             # Fill extra labels to metric by fetching metadata from resource DB
             try:
-                storage_details = db.storage_get(ctx, storage_id)
-                for m in perf_metrics:
-                    m.labels["name"] = storage_details.name
-                    m.labels["serial_number"] = storage_details.serial_number
+                storage_details = db.storage_get_cached(ctx, storage_id)
+                perf_metrics.update_labels({
+                    "name": storage_details['name'],
+                    "serial_number": storage_details['serial_number']})
             except exception.StorageNotFound:
                 LOG.warning(f'Storage(id={storage_id}) has been removed.')
                 return TelemetryTaskStatus.TASK_EXEC_STATUS_SUCCESS
@@ -34,7 +34,7 @@ class AlertProcessorTestCase(unittest.TestCase):
         alert_processor = alert_processor_class()
         return alert_processor
 
-    @mock.patch('delfin.db.storage_get')
+    @mock.patch('delfin.db.storage_get_cached')
     @mock.patch('delfin.drivers.api.API.parse_alert')
     @mock.patch('delfin.exporter.base_exporter'
                 '.AlertExporterManager.dispatch')
@@ -90,7 +90,7 @@ class AlertProcessorTestCase(unittest.TestCase):
         mock_export_model.assert_called_once_with(expected_ctxt,
                                                   [expected_alert_model])
 
-    @mock.patch('delfin.db.storage_get')
+    @mock.patch('delfin.db.storage_get_cached')
     @mock.patch('delfin.drivers.api.API.parse_alert',
                 fakes.parse_alert_exception)
     def test_process_alert_info_exception(self, mock_storage):
@@ -108,7 +108,7 @@ class AlertProcessorTestCase(unittest.TestCase):
                                alert_processor_inst.process_alert_info, alert)
 
     @mock.patch('delfin.context.get_admin_context')
-    @mock.patch('delfin.db.storage_get')
+    @mock.patch('delfin.db.storage_get_cached')
     @mock.patch('delfin.drivers.api.API.parse_alert')
     @mock.patch('delfin.alert_manager.alert_processor.'
                 'AlertProcessor.sync_storage_alert')
@@ -19,6 +19,7 @@ from delfin import exception
 from delfin import test
 from delfin.api.v1.storages import StorageController
 from delfin.common import constants
+from delfin.task_manager.tasks import resources
 from delfin.tests.unit.api import fakes
 
 
@@ -528,3 +529,31 @@ class TestStorageController(test.TestCase):
         }
 
         self.assertDictEqual(expctd_dict, res_dict)
+
+    @mock.patch.object(db, 'storage_get',
+                       mock.Mock(return_value={'id': 'fake_id'}))
+    @mock.patch('delfin.api.v1.storages._set_synced_if_ok')
+    def test_sync(self, mock_set_synced):
+        req = fakes.HTTPRequest.blank('/storages/fake_id/sync')
+        self.controller.sync(req, 'fake_id')
+        resource_count = len(resources.StorageResourceTask.__subclasses__())
+        mock_set_synced.assert_called_once_with(mock.ANY, 'fake_id',
+                                                resource_count)
+        self.task_rpcapi.sync_storage.assert_called_once_with(
+            mock.ANY, 'fake_id', mock.ANY)
+        resource_tasks = self.task_rpcapi.sync_storage.call_args[0][2]
+        self.assertEqual(resource_count, len(resource_tasks))
+        self.assertIn('delfin.task_manager.tasks.resources.StorageDeviceTask',
+                      resource_tasks)
+        self.assertFalse(self.task_rpcapi.sync_storage_resource.called)
+
+    @mock.patch.object(db, 'storage_get',
+                       mock.Mock(return_value={'id': 'fake_id'}))
+    @mock.patch('delfin.api.v1.storages._set_synced_if_ok')
+    def test_sync_per_resource(self, mock_set_synced):
+        self.override_config('storage_sync_batched', False)
+        req = fakes.HTTPRequest.blank('/storages/fake_id/sync')
+        self.controller.sync(req, 'fake_id')
+        self.assertEqual(len(resources.StorageResourceTask.__subclasses__()),
+                         self.task_rpcapi.sync_storage_resource.call_count)
+        self.assertFalse(self.task_rpcapi.sync_storage.called)
@@ -129,6 +129,21 @@ class TestVolumeController(test.TestCase):
 
         self.assertDictEqual(expctd_dict, res_dict)
 
+    def test_list_default_sort(self):
+        mock_get_all = self.mock_object(
+            db, 'volume_get_all',
+            mock.Mock(return_value=fakes.fake_volume_get_all(None)))
+        req = fakes.HTTPRequest.blank('/volumes?sort_dir=asc')
+        self.controller.index(req)
+        mock_get_all.assert_called_once_with(
+            req.environ['delfin.context'], None, 1000, ['storage_id', 'id'],
+            ['asc', 'asc'], {}, 0)
+
+        req = fakes.HTTPRequest.blank('/volumes?sort_key=name')
+        self.controller.index(req)
+        self.assertEqual((['name'], ['desc']),
+                         mock_get_all.call_args[0][3:5])
+
     def test_show(self):
         self.mock_object(
             db, 'volume_get',
@@ -0,0 +1,87 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from delfin.common.constants import metric_struct
+from delfin.common.metric_batch import MetricBatch
+
+volume_labels = {'storage_id': '12345', 'resource_type': 'volume',
+                 'resource_id': 'vol0', 'type': 'RAW', 'unit': 'IOPS'}
+fake_metrics = [
+    metric_struct(name='iops', labels=dict(volume_labels),
+                  values={1622808000000: 10.0, 1622808060000: 12.5}),
+    metric_struct(name='readIops', labels=dict(volume_labels),
+                  values={1622808000000: 4.0}),
+    metric_struct(name='throughput',
+                  labels={'storage_id': '12345', 'resource_type': 'storage',
+                          'resource_id': 'storage0', 'type': 'RAW',
+                          'unit': 'MB/s'},
+                  values={1622808000000: 61.9388895680357}),
+]
+
+
+class TestMetricBatch(TestCase):
+
+    def test_round_trip(self):
+        batch = MetricBatch.from_metrics(fake_metrics)
+        self.assertEqual(3, len(batch))
+        self.assertEqual(4, batch.point_count)
+        self.assertEqual(fake_metrics, batch.to_metrics())
+
+    def test_label_sets_shared(self):
+        batch = MetricBatch.from_metrics(fake_metrics)
+        self.assertEqual(2, len(batch.label_sets))
+        self.assertEqual(batch.label_ids[0], batch.label_ids[1])
+
+    def test_update_labels(self):
+        batch = MetricBatch.from_metrics(fake_metrics)
+        batch.update_labels({'name': 'fake_storage', 'serial_number': 'SN'})
+        for metric in batch:
+            self.assertEqual('fake_storage', metric.labels['name'])
+            self.assertEqual('SN', metric.labels['serial_number'])
+        # Source metrics are left untouched
+        self.assertNotIn('name', fake_metrics[0].labels)
+
+    def test_iter_series(self):
+        batch = MetricBatch.from_metrics(fake_metrics)
+        name, labels, timestamps, values = next(batch.iter_series())
+        self.assertEqual('iops', name)
+        self.assertEqual(volume_labels, labels)
+        self.assertEqual([1622808000000, 1622808060000], list(timestamps))
+        self.assertEqual([10.0, 12.5], list(values))
+
+    def test_from_metrics_passthrough(self):
+        batch = MetricBatch.from_metrics(fake_metrics)
+        self.assertIs(batch, MetricBatch.from_metrics(batch))
+        self.assertFalse(MetricBatch.from_metrics([]))
+
+    def test_extend(self):
+        batch = MetricBatch.from_metrics(fake_metrics[:2])
+        batch.extend(MetricBatch.from_metrics(fake_metrics[2:]))
+        batch.extend(fake_metrics[:1])
+        self.assertEqual(fake_metrics + fake_metrics[:1], batch.to_metrics())
+        self.assertEqual(2, len(batch.label_sets))
+
+    def test_missing_and_integer_values(self):
+        metrics = [
+            metric_struct(name='iops', labels=dict(volume_labels),
+                          values={1622808000000: 10, 1622808060000: None}),
+            metric_struct(name='readIops', labels=dict(volume_labels),
+                          values={1622808000000: None}),
+        ]
+        batch = MetricBatch.from_metrics(metrics)
+        self.assertEqual(metrics, batch.to_metrics())
+        values = batch.to_metrics()[0].values
+        self.assertIsInstance(values[1622808000000], int)
+        self.assertIsNone(values[1622808060000])
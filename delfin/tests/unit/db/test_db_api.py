@@ -12,7 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from unittest import mock
+import os
+import time
+import tracemalloc
+from unittest import mock, skipUnless
+
+from oslo_db.sqlalchemy import engines
+from sqlalchemy import event
 
 from delfin import context, exception
 from delfin import test
@@ -163,8 +169,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_storage_pools_update(self, mock_session):
         storage_pools = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = storage_pools
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(storage_pools[0]['id'],)]
         result = db_api.storage_pools_update(context, storage_pools)
         assert len(result) == 1
 
@@ -275,8 +281,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_controllers_update(self, mock_session):
         controllers = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = controllers
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(controllers[0]['id'],)]
         result = db_api.controllers_update(ctxt, controllers)
         assert len(result) == 1
 
@@ -336,8 +342,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_ports_update(self, mock_session):
         ports = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = ports
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(ports[0]['id'],)]
         result = db_api.ports_update(ctxt, ports)
         assert len(result) == 1
 
@@ -398,8 +404,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_disks_update(self, mock_session):
         disks = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = disks
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(disks[0]['id'],)]
         result = db_api.disks_update(ctxt, disks)
         assert len(result) == 1
 
@@ -460,8 +466,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_filesystems_update(self, mock_session):
         filesystems = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = filesystems
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(filesystems[0]['id'],)]
         result = db_api.filesystems_update(ctxt, filesystems)
         assert len(result) == 1
 
@@ -521,8 +527,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_qtrees_update(self, mock_session):
         qtrees = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = qtrees
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(qtrees[0]['id'],)]
         result = db_api.qtrees_update(ctxt, qtrees)
         assert len(result) == 1
 
@@ -583,8 +589,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_quotas_update(self, mock_session):
         quotas = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = quotas
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(quotas[0]['id'],)]
         result = db_api.quotas_update(ctxt, quotas)
         assert len(result) == 1
 
@@ -645,8 +651,8 @@ class TestSIMDBAPI(test.TestCase):
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
     def test_shares_update(self, mock_session):
         shares = [{'id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bd'}]
-        mock_session.return_value.__enter__.return_value.query.return_value \
-            = shares
+        mock_session.return_value.query.return_value.with_entities \
+            .return_value.filter.return_value = [(shares[0]['id'],)]
         result = db_api.shares_update(ctxt, shares)
         assert len(result) == 1
 
@@ -942,7 +948,8 @@ class TestSIMDBAPI(test.TestCase):
         mock_session.return_value.__enter__.return_value.query.return_value \
             = storage_host_initiator_model_lst
         result = db_api.storage_host_initiators_delete(
-            ctxt, storage_host_initiator_model_lst)
+            ctxt, [initiator['id']
+                   for initiator in storage_host_initiator_model_lst])
         assert result is None
 
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
@@ -984,7 +991,8 @@ class TestSIMDBAPI(test.TestCase):
             = fake_data.fake_storage_host_create()
         mock_session.return_value.__enter__.return_value.query.return_value \
             = storage_host_model_lst
-        result = db_api.storage_hosts_delete(ctxt, storage_host_model_lst)
+        result = db_api.storage_hosts_delete(
+            ctxt, [host['id'] for host in storage_host_model_lst])
         assert result is None
 
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
@@ -1027,8 +1035,8 @@ class TestSIMDBAPI(test.TestCase):
             = fake_data.fake_storage_host_group_create()
         mock_session.return_value.__enter__.return_value.query.return_value \
             = storage_host_group_lst
-        result = db_api.storage_host_groups_delete(ctxt,
-                                                   storage_host_group_lst)
+        result = db_api.storage_host_groups_delete(
+            ctxt, [host_group['id'] for host_group in storage_host_group_lst])
         assert result is None
 
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
@@ -1070,7 +1078,8 @@ class TestSIMDBAPI(test.TestCase):
             = fake_data.fake_port_group_create()
         mock_session.return_value.__enter__.return_value.query.return_value \
             = port_group_lst
-        result = db_api.port_groups_delete(ctxt, port_group_lst)
+        result = db_api.port_groups_delete(
+            ctxt, [port_group['id'] for port_group in port_group_lst])
         assert result is None
 
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
@@ -1112,7 +1121,8 @@ class TestSIMDBAPI(test.TestCase):
             = fake_data.fake_volume_group_create()
         mock_session.return_value.__enter__.return_value.query.return_value \
             = volume_group_lst
-        result = db_api.volume_groups_delete(ctxt, volume_group_lst)
+        result = db_api.volume_groups_delete(
+            ctxt, [volume_group['id'] for volume_group in volume_group_lst])
         assert result is None
 
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
@@ -1154,7 +1164,8 @@ class TestSIMDBAPI(test.TestCase):
             = fake_data.fake_masking_view_create()
         mock_session.return_value.__enter__.return_value.query.return_value \
             = masking_view_lst
-        result = db_api.masking_views_delete(ctxt, masking_view_lst)
+        result = db_api.masking_views_delete(
+            ctxt, [masking_view['id'] for masking_view in masking_view_lst])
         assert result is None
 
     @mock.patch('delfin.db.sqlalchemy.api.get_session')
@@ -1166,3 +1177,377 @@ class TestSIMDBAPI(test.TestCase):
         result = db_api.masking_views_delete_by_storage(
             ctxt, masking_view_lst[0]['storage_id'])
         assert result is None
+
+
+class TestBulkDBAPI(test.TestCase):
+
+    def _create_volumes(self, count):
+        db_api.volumes_create(ctxt, [
+            {'id': 'vol_%d' % i, 'name': 'vol_%d' % i, 'storage_id': 'sid',
+             'native_volume_id': 'native_%d' % i, 'status': 'normal'}
+            for i in range(count)])
+
+    @staticmethod
+    def _state(volume):
+        return volume['name'], volume['status']
+
+    def _volumes(self):
+        volumes = db_api.volume_get_all(ctxt, filters={'storage_id': 'sid'})
+        return dict((volume['id'], volume) for volume in volumes)
+
+    @mock.patch.object(api, '_BULK_CHUNK_SIZE', 2)
+    def test_volumes_update(self):
+        self._create_volumes(5)
+        db_api.volumes_update(ctxt, [
+            {'id': 'vol_0', 'status': 'offline'},
+            {'id': 'vol_1', 'name': 'renamed', 'status': 'offline'},
+            {'id': 'vol_4', 'name': 'renamed'},
+            {'id': 'unknown', 'name': 'renamed'}])
+        volumes = self._volumes()
+        self.assertEqual(5, len(volumes))
+        self.assertEqual(('vol_0', 'offline'),
+                         self._state(volumes['vol_0']))
+        self.assertEqual(('renamed', 'offline'),
+                         self._state(volumes['vol_1']))
+        self.assertEqual(('renamed', 'normal'),
+                         self._state(volumes['vol_4']))
+        self.assertIsNone(volumes['vol_2']['updated_at'])
+        self.assertIsNotNone(volumes['vol_4']['updated_at'])
+
+    def test_storage_pools_update_returns_updated_ids(self):
+        db_api.storage_pools_create(ctxt, [{'id': 'pool_0', 'name': 'pool'}])
+        result = db_api.storage_pools_update(
+            ctxt, [{'id': 'pool_0', 'name': 'new'}, {'id': 'unknown'}])
+        self.assertEqual(['pool_0'], result)
+
+    @mock.patch.object(api, '_BULK_CHUNK_SIZE', 2)
+    def test_volumes_delete(self):
+        self._create_volumes(5)
+        db_api.volumes_delete(ctxt, ['vol_0', 'vol_2', 'vol_3', 'unknown'])
+        self.assertEqual(['vol_1', 'vol_4'], sorted(self._volumes()))
+
+    def test_failed_tasks_update_and_delete(self):
+        ids = [db_api.failed_task_create(ctxt, {
+            'storage_id': 'sid', 'task_id': 1, 'retry_count': 0,
+            'start_time': i, 'end_time': i + 1})['id'] for i in range(3)]
+        db_api.failed_tasks_update(ctxt, [
+            {'id': ids[0], 'retry_count': 1, 'result': 'Retrying'},
+            {'id': ids[1], 'retry_count': 2}])
+        db_api.failed_tasks_delete(ctxt, [ids[2], 'unknown'])
+        failed_tasks = db_api.failed_task_get_all(
+            ctxt, filters={'storage_id': 'sid'})
+        self.assertEqual([(ids[0], 1, 'Retrying'), (ids[1], 2, None)],
+                         sorted((failed_task['id'], failed_task['retry_count'],
+                                 failed_task['result'])
+                                for failed_task in failed_tasks))
+
+    @mock.patch.object(api, '_BULK_CHUNK_SIZE', 2)
+    def test_resources_upsert(self):
+        self._create_volumes(3)
+        db_api.resources_upsert(ctxt, 'volumes', [
+            {'id': 'vol_0', 'name': 'renamed'},
+            {'id': 'vol_1', 'status': 'offline', 'storage_id': 'sid'},
+            {'name': 'added', 'storage_id': 'sid'},
+            {'id': 'vol_9', 'name': 'vol_9', 'storage_id': 'sid'}])
+        volumes = self._volumes()
+        self.assertEqual(5, len(volumes))
+        self.assertEqual('renamed', volumes['vol_0']['name'])
+        self.assertEqual('sid', volumes['vol_0']['storage_id'])
+        self.assertEqual(('vol_1', 'offline'),
+                         self._state(volumes['vol_1']))
+        self.assertIsNotNone(volumes['vol_1']['updated_at'])
+        self.assertIn('vol_9', volumes)
+        self.assertIn('added', [volume['name']
+                                for volume in volumes.values()])
+
+    def test_resources_upsert_unknown_table(self):
+        self.assertRaises(exception.InvalidInput, db_api.resources_upsert,
+                          ctxt, 'unknown', [])
+
+
+class TestStreamingDBAPI(test.TestCase):
+
+    def setUp(self):
+        super(TestStreamingDBAPI, self).setUp()
+        db_api.volumes_create(ctxt, [
+            {'id': 'vol_%02d' % i, 'name': 'vol_%02d' % i,
+             'storage_id': 'storage_%d' % (i % 3),
+             'native_volume_id': 'native_%d' % i, 'status': 'normal'}
+            for i in range(25)])
+
+    def test_resources_get_all_iter(self):
+        rows = list(db_api.resources_get_all_iter(ctxt, 'volumes',
+                                                  page_size=4))
+        self.assertEqual(25, len(rows))
+        self.assertIsInstance(rows[0], dict)
+        self.assertEqual(sorted((row['storage_id'], row['id'])
+                                for row in rows),
+                         [(row['storage_id'], row['id']) for row in rows])
+
+    def test_resources_get_all_iter_of_storage(self):
+        rows = db_api.resources_get_all_iter(
+            ctxt, 'volumes', filters={'storage_id': 'storage_1'},
+            page_size=3)
+        self.assertEqual(['vol_%02d' % i for i in range(1, 25, 3)],
+                         [row['id'] for row in rows])
+
+    def test_resources_get_all_iter_filters(self):
+        rows = db_api.resources_get_all_iter(
+            ctxt, 'volumes', filters={'storage_id': 'storage_1',
+                                      'name~': 'vol_1'}, page_size=2)
+        self.assertEqual(['vol_10', 'vol_13', 'vol_16', 'vol_19'],
+                         [row['id'] for row in rows])
+        rows = db_api.resources_get_all_iter(ctxt, 'volumes',
+                                             filters={'unknown': 'value'})
+        self.assertEqual([], list(rows))
+
+    def test_volume_get_all_keyset(self):
+        ids = []
+        marker = None
+        while True:
+            volumes = db_api.volume_get_all(
+                ctxt, marker=marker, limit=10,
+                sort_keys=['storage_id', 'id'], sort_dirs=['desc', 'desc'])
+            self.assertTrue(all(isinstance(volume, dict)
+                                for volume in volumes))
+            ids.extend(volume['id'] for volume in volumes)
+            if len(volumes) < 10:
+                break
+            marker = volumes[-1]['id']
+        expected = sorted(('storage_%d' % (i % 3), 'vol_%02d' % i)
+                          for i in range(25))
+        self.assertEqual([row_id for _, row_id in reversed(expected)], ids)
+
+    def test_volume_get_all_default_sort(self):
+        volumes = db_api.volume_get_all(ctxt, limit=5)
+        self.assertIsInstance(volumes[0], models.Volume)
+
+    def test_keyset_sort(self):
+        self.assertEqual((['storage_id', 'id'], 'asc'), api._keyset_sort(
+            models.Volume, {}, ['storage_id', 'id', 'created_at'],
+            ['asc', 'asc', 'asc']))
+        self.assertEqual((['id'], 'desc'), api._keyset_sort(
+            models.Volume, {'storage_id': 'storage_1'},
+            ['storage_id', 'id'], ['desc', 'desc']))
+        self.assertIsNone(api._keyset_sort(
+            models.Volume, {}, ['storage_id', 'id'], ['asc', 'desc']))
+        self.assertIsNone(api._keyset_sort(
+            models.Volume, {}, ['created_at', 'id'], ['asc', 'asc']))
+
+
+class TestSessionScope(test.TestCase):
+
+    def setUp(self):
+        super(TestSessionScope, self).setUp()
+        db_api.storage_create(ctxt, {'id': 'sid', 'name': 'storage',
+                                     'sync_status': 0})
+        api.POOL_STATS.reset()
+
+    def _storage_reads(self, count):
+        for _ in range(count):
+            db_api.storage_get(ctxt, 'sid')
+
+    def test_calls_share_one_checkout(self):
+        self._storage_reads(3)
+        self.assertEqual(3, db_api.connection_pool_stats()['checkouts'])
+        api.POOL_STATS.reset()
+        with db_api.session_scope():
+            self._storage_reads(3)
+            db_api.storage_update(ctxt, 'sid', {'name': 'renamed'})
+        self.assertEqual(1, db_api.connection_pool_stats()['checkouts'])
+        self.assertEqual('renamed', db_api.storage_get(ctxt, 'sid')['name'])
+
+    def test_nested_scopes_share_the_connection(self):
+        with db_api.session_scope():
+            self._storage_reads(1)
+            connection = api._SCOPE.scope._connection
+            with db_api.session_scope():
+                self._storage_reads(1)
+                self.assertIs(connection, api._SCOPE.scope._connection)
+            self.assertFalse(connection.closed)
+        self.assertTrue(connection.closed)
+        self.assertIsNone(api._SCOPE.scope)
+        self.assertEqual(1, db_api.connection_pool_stats()['checkouts'])
+
+    def test_unused_scope_does_not_check_out(self):
+        with db_api.session_scope():
+            pass
+        self.assertEqual(0, db_api.connection_pool_stats()['checkouts'])
+
+    def test_scope_is_released_on_error(self):
+        def read_and_fail():
+            with db_api.session_scope():
+                self._storage_reads(1)
+                raise exception.InvalidInput('failure')
+
+        self.assertRaises(exception.InvalidInput, read_and_fail)
+        self.assertIsNone(api._SCOPE.scope)
+        self._storage_reads(1)
+        self.assertEqual(2, db_api.connection_pool_stats()['checkouts'])
+
+    def test_transaction_is_rolled_back_on_error(self):
+        def update_and_fail():
+            with db_api.session_scope(transaction=True):
+                db_api.storage_update(ctxt, 'sid', {'name': 'renamed'})
+                raise exception.InvalidInput('failure')
+
+        self.assertRaises(exception.InvalidInput, update_and_fail)
+        self.assertEqual('storage', db_api.storage_get(ctxt, 'sid')['name'])
+        with db_api.session_scope(transaction=True):
+            db_api.storage_update(ctxt, 'sid', {'name': 'renamed'})
+        self.assertEqual('renamed', db_api.storage_get(ctxt, 'sid')['name'])
+
+    def test_transaction_nested_in_scope(self):
+        with db_api.session_scope():
+            db_api.storage_update(ctxt, 'sid', {'name': 'first'})
+            try:
+                with db_api.session_scope(transaction=True):
+                    db_api.storage_update(ctxt, 'sid', {'name': 'second'})
+                    raise exception.InvalidInput('failure')
+            except exception.InvalidInput:
+                pass
+            self.assertEqual('first',
+                             db_api.storage_get(ctxt, 'sid')['name'])
+        self.assertEqual(1, db_api.connection_pool_stats()['checkouts'])
+
+    @mock.patch.object(api, 'LOG')
+    def test_slow_checkout_is_logged(self, mock_log):
+        self.override_config('pool_checkout_warning_time', 0.001,
+                             group='database')
+        engine = api.get_engine()
+        raw_connection = engine.raw_connection
+
+        with mock.patch('time.monotonic', side_effect=[10.0, 10.5]):
+            raw_connection().close()
+        stats = db_api.connection_pool_stats()
+        self.assertEqual(1, stats['slow_checkouts'])
+        self.assertEqual(0.5, stats['wait_max'])
+        self.assertIn('pool_status', stats)
+        self.assertTrue(mock_log.warning.called)
+
+    def test_pool_pre_ping(self):
+        engine = engines.create_engine('sqlite://', max_retries=0)
+        api._configure_engine(engine)
+        self.assertTrue(event.contains(engine, 'engine_connect',
+                                       engines._connect_ping_listener))
+        self.override_config('pool_pre_ping', False, group='database')
+        engine = engines.create_engine('sqlite://', max_retries=0)
+        api._configure_engine(engine)
+        self.assertFalse(event.contains(engine, 'engine_connect',
+                                        engines._connect_ping_listener))
+
+
+class TestRecordCache(test.TestCase):
+
+    def setUp(self):
+        super(TestRecordCache, self).setUp()
+        db_api.storage_create(ctxt, {'id': 'sid', 'name': 'storage',
+                                     'sync_status': 0})
+        db_api.access_info_create(ctxt, {'storage_id': 'sid',
+                                         'vendor': 'fake_vendor',
+                                         'model': 'fake_model'})
+        db_api.storage_cache_invalidate()
+        self.addCleanup(db_api.storage_cache_invalidate)
+        for cache in (api._STORAGE_CACHE, api._ACCESS_INFO_CACHE):
+            for counter in ('hits', 'misses'):
+                patcher = mock.patch.object(cache, counter, 0)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+
+    def test_storage_get_cached(self):
+        with mock.patch.object(api, 'model_query',
+                               wraps=api.model_query) as query:
+            for _ in range(3):
+                storage = db_api.storage_get_cached(ctxt, 'sid')
+        self.assertEqual('storage', storage['name'])
+        self.assertEqual(1, query.call_count)
+        self.assertEqual({'hits': 2, 'misses': 1, 'hit_ratio': 2 / 3,
+                          'size': 1},
+                         db_api.storage_cache_stats()['storage'])
+
+    def test_records_are_copies(self):
+        storage = db_api.storage_get_cached(ctxt, 'sid')
+        storage['name'] = 'changed'
+        self.assertEqual('storage',
+                         db_api.storage_get_cached(ctxt, 'sid')['name'])
+
+    def test_invalidated_by_writes(self):
+        db_api.storage_get_cached(ctxt, 'sid')
+        db_api.access_info_get_cached(ctxt, 'sid')
+        db_api.storage_update(ctxt, 'sid', {'name': 'renamed'})
+        db_api.access_info_update(ctxt, 'sid', {'model': 'other_model'})
+        self.assertEqual('renamed',
+                         db_api.storage_get_cached(ctxt, 'sid')['name'])
+        self.assertEqual('other_model',
+                         db_api.access_info_get_cached(ctxt, 'sid')['model'])
+
+    def test_read_deleted(self):
+        db_api.storage_get_cached(ctxt, 'sid')
+        db_api.storage_delete(ctxt, 'sid')
+        self.assertRaises(exception.StorageNotFound,
+                          db_api.storage_get_cached, ctxt, 'sid')
+        deleted_ctxt = context.get_admin_context()
+        deleted_ctxt.read_deleted = 'yes'
+        self.assertTrue(
+            db_api.storage_get_cached(deleted_ctxt, 'sid')['deleted'])
+        # Deleted or not, the storage is served from the same record
+        self.assertEqual(1, db_api.storage_cache_stats()['storage']['hits'])
+        self.assertRaises(exception.StorageNotFound,
+                          db_api.storage_get_cached, ctxt, 'unknown')
+
+    def test_disabled(self):
+        self.override_config('record_cache_ttl', 0, group='database')
+        db_api.storage_get_cached(ctxt, 'sid')
+        db_api.storage_get_cached(ctxt, 'sid')
+        self.assertEqual({'hits': 0, 'misses': 0, 'hit_ratio': 0.0,
+                          'size': 0},
+                         db_api.storage_cache_stats()['storage'])
+
+    def test_expiry_and_size(self):
+        self.override_config('record_cache_size', 2, group='database')
+        self.override_config('record_cache_ttl', 60, group='database')
+        cache = api.RecordCache('test')
+        with mock.patch('time.monotonic', return_value=1000):
+            for key in ('a', 'b', 'a', 'c'):
+                cache.get(key, lambda: {'key': key})
+        self.assertEqual(2, len(cache))
+        with mock.patch('time.monotonic', return_value=1061):
+            self.assertEqual({'key': 'new'},
+                             cache.get('a', lambda: {'key': 'new'}))
+        self.assertEqual(1, cache.stats()['hits'])
+
+    def test_load_racing_an_invalidation_is_not_kept(self):
+        cache = api.RecordCache('test')
+
+        def load():
+            cache.invalidate('a')
+            return {'key': 'stale'}
+
+        cache.get('a', load)
+        self.assertEqual(0, len(cache))
+
+
+@skipUnless(os.environ.get('DELFIN_BENCHMARK'),
+            'set DELFIN_BENCHMARK=1 to run benchmarks')
+class BenchmarkStreamingDBAPI(test.TestCase):
+
+    def test_benchmark_100k_volumes(self):
+        api.resources_upsert(ctxt, 'volumes', [
+            {'id': 'vol_%06d' % i, 'name': 'vol_%d' % i,
+             'storage_id': 'storage', 'native_volume_id': 'native_%d' % i,
+             'wwn': 'wwn_%d' % i, 'status': 'normal'}
+            for i in range(100000)])
+        filters = {'storage_id': 'storage'}
+        for name, read in (
+                ('volume_get_all', lambda: db_api.volume_get_all(
+                    ctxt, filters=filters)),
+                ('resources_get_all_iter', lambda: sum(
+                    1 for _ in db_api.resources_get_all_iter(
+                        ctxt, 'volumes', filters=filters)))):
+            tracemalloc.start()
+            begin = time.time()
+            read()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('\n%s of 100000 volumes: %.3fs, peak %.1f MiB'
+                  % (name, time.time() - begin, peak / 1024.0 / 1024))
@@ -0,0 +1,217 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import io
+import os
+import time
+from unittest import TestCase, skipUnless
+
+import sqlalchemy
+from alembic import command
+
+from delfin.db.sqlalchemy import models
+from delfin.db.sqlalchemy.migration import migration
+
+
+# Tables and columns added by the migrations
+NEW_TABLES = ('sync_watermarks',)
+NEW_COLUMNS = {'tasks': ('last_duration', 'last_metric_count')}
+
+
+def create_tables(engine, indexes=True):
+    """Create the tables, without indexes nor new tables as deployments
+    before 001.
+    """
+    models.BASE.metadata.create_all(engine)
+    if not indexes:
+        with engine.begin() as connection:
+            for table in models.BASE.metadata.sorted_tables:
+                if table.name in NEW_TABLES:
+                    table.drop(connection)
+                    continue
+                for index in table.indexes:
+                    index.drop(connection)
+                for column in NEW_COLUMNS.get(table.name, ()):
+                    connection.execute(sqlalchemy.text(
+                        'ALTER TABLE %s DROP COLUMN %s'
+                        % (table.name, column)))
+
+
+def index_names(engine, table):
+    return set(index['name']
+               for index in sqlalchemy.inspect(engine).get_indexes(table))
+
+
+def column_names(engine, table):
+    return set(column['name']
+               for column in sqlalchemy.inspect(engine).get_columns(table))
+
+
+def mysql_upgrade_sql():
+    """DDL of the migrations for MySQL, generated offline."""
+    buffer = io.StringIO()
+    config = migration._alembic_config(None)
+    config.set_main_option('sqlalchemy.url', 'mysql://')
+    config.output_buffer = buffer
+    command.upgrade(config, 'head', sql=True)
+    return buffer.getvalue()
+
+
+class TestMigration(TestCase):
+
+    def setUp(self):
+        super(TestMigration, self).setUp()
+        self.engine = sqlalchemy.create_engine('sqlite://')
+        self.addCleanup(self.engine.dispose)
+
+    def test_upgrade_existing_tables(self):
+        create_tables(self.engine, indexes=False)
+        self.assertEqual(set(), index_names(self.engine, 'volumes'))
+        self.assertIsNone(migration.db_version(self.engine))
+
+        migration.db_sync(self.engine)
+
+        self.assertEqual('004', migration.db_version(self.engine))
+        self.assertEqual({'volumes_native_id_idx', 'volumes_storage_id_idx'},
+                         index_names(self.engine, 'volumes'))
+        self.assertEqual({'tasks_storage_id_deleted_idx',
+                          'tasks_executor_deleted_idx'},
+                         index_names(self.engine, 'tasks'))
+        self.assertEqual({'alert_source_host_idx'},
+                         index_names(self.engine, 'alert_source'))
+        self.assertEqual({'sync_watermarks_storage_id_idx'},
+                         index_names(self.engine, 'sync_watermarks'))
+        self.assertTrue({'last_duration', 'last_metric_count'}.issubset(
+            column_names(self.engine, 'tasks')))
+
+    def test_upgrade_tables_created_from_models(self):
+        create_tables(self.engine)
+        migration.db_sync(self.engine)
+        migration.db_sync(self.engine)
+        self.assertEqual('004', migration.db_version(self.engine))
+        self.assertEqual({'controllers_native_id_idx',
+                          'controllers_mgmt_ip_idx',
+                          'controllers_storage_id_idx'},
+                         index_names(self.engine, 'controllers'))
+
+    def test_models_match_migrations(self):
+        migrated = sqlalchemy.create_engine('sqlite://')
+        self.addCleanup(migrated.dispose)
+        create_tables(migrated, indexes=False)
+        migration.db_sync(migrated)
+        create_tables(self.engine)
+        for table in models.BASE.metadata.tables:
+            self.assertEqual(index_names(self.engine, table),
+                             index_names(migrated, table), table)
+            self.assertEqual(column_names(self.engine, table),
+                             column_names(migrated, table), table)
+
+    def test_mysql_offline_sql(self):
+        sql = mysql_upgrade_sql()
+        self.assertIn('CREATE INDEX volumes_native_id_idx ON volumes '
+                      '(storage_id, native_volume_id)', sql)
+        self.assertIn('CREATE INDEX volumes_storage_id_idx ON volumes '
+                      '(storage_id, id)', sql)
+        self.assertIn('CREATE TABLE sync_watermarks', sql)
+        self.assertIn('ALTER TABLE tasks ADD COLUMN last_duration FLOAT', sql)
+        self.assertIn("UPDATE alembic_version SET version_num='004'", sql)
+
+
+@skipUnless(os.environ.get('DELFIN_BENCHMARK'),
+            'set DELFIN_BENCHMARK=1 to run benchmarks')
+class BenchmarkIndexes(TestCase):
+    """Query plans and timings of the hot lookups, before and after 001.
+
+    Runs on SQLite, and on MySQL too when DELFIN_BENCHMARK_MYSQL_URL is
+    set to the url of an empty scratch database.
+    """
+
+    STORAGES = 50
+    VOLUMES_PER_STORAGE = 2000
+    QUERIES = {
+        'volume sync': (
+            'SELECT * FROM volumes WHERE storage_id = :storage_id',
+            'SELECT * FROM volumes WHERE storage_id = :storage_id '
+            'AND native_volume_id = :native_id'),
+        'trap controller': (
+            'SELECT * FROM controllers WHERE mgmt_ip = :ip '
+            'AND storage_id = :storage_id',),
+        'scheduler tasks': (
+            'SELECT * FROM tasks WHERE executor = :executor '
+            'AND deleted = 0',),
+    }
+
+    def _populate(self, engine):
+        volumes = models.Volume.__table__
+        rows = [{'id': '%d-%d' % (storage, i),
+                 'storage_id': 'storage-%d' % storage,
+                 'native_volume_id': 'native-%d' % i,
+                 'name': 'volume-%d' % i}
+                for storage in range(self.STORAGES)
+                for i in range(self.VOLUMES_PER_STORAGE)]
+        with engine.begin() as connection:
+            connection.execute(volumes.insert(), rows)
+            connection.execute(models.Controller.__table__.insert(), [
+                {'id': str(i), 'storage_id': 'storage-%d' % i,
+                 'mgmt_ip': '10.0.0.%d' % i} for i in range(self.STORAGES)])
+            connection.execute(models.Task.__table__.insert(), [
+                {'storage_id': 'storage-%d' % i, 'deleted': False,
+                 'executor': 'executor-%d' % (i % 3)}
+                for i in range(self.STORAGES)])
+
+    def _explain(self, engine, sql, params):
+        prefix = ('EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite'
+                  else 'EXPLAIN ')
+        with engine.connect() as connection:
+            plan = connection.execute(sqlalchemy.text(prefix + sql), params)
+            return ' | '.join(str(tuple(row)) for row in plan)
+
+    def _time(self, engine, sql, params, repeat=50):
+        begin = time.time()
+        with engine.connect() as connection:
+            for _ in range(repeat):
+                connection.execute(sqlalchemy.text(sql), params).fetchall()
+        return (time.time() - begin) / repeat * 1000
+
+    def _report(self, engine, label):
+        params = {'storage_id': 'storage-7', 'native_id': 'native-42',
+                  'ip': '10.0.0.7', 'executor': 'executor-1'}
+        for name, queries in self.QUERIES.items():
+            for sql in queries:
+                print('\n[%s] %s: %s\n  %.3f ms\n  plan: %s'
+                      % (label, name, sql, self._time(engine, sql, params),
+                         self._explain(engine, sql, params)))
+
+    def _benchmark(self, engine):
+        create_tables(engine, indexes=False)
+        self._populate(engine)
+        self._report(engine, '%s before' % engine.dialect.name)
+        migration.db_sync(engine)
+        self._report(engine, '%s after' % engine.dialect.name)
+
+    def test_sqlite(self):
+        engine = sqlalchemy.create_engine('sqlite://')
+        self.addCleanup(engine.dispose)
+        self._benchmark(engine)
+
+    @skipUnless(os.environ.get('DELFIN_BENCHMARK_MYSQL_URL'),
+                'set DELFIN_BENCHMARK_MYSQL_URL to run on MySQL')
+    def test_mysql(self):
+        engine = sqlalchemy.create_engine(
+            os.environ['DELFIN_BENCHMARK_MYSQL_URL'])
+        self.addCleanup(engine.dispose)
+        self.addCleanup(models.BASE.metadata.drop_all, engine)
+        self._benchmark(engine)
+
+    def test_mysql_ddl(self):
+        print('\n' + mysql_upgrade_sql())
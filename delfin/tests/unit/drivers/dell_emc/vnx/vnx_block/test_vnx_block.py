@@ -11,10 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import csv
+import shutil
 import sys
+import tempfile
 import time
 from unittest import TestCase, mock
 
+from oslo_config import cfg
+
 from delfin.common import constants
 from delfin.drivers.dell_emc.vnx.vnx_block import consts
 from delfin.drivers.dell_emc.vnx.vnx_block.alert_handler import AlertHandler
@@ -691,6 +696,25 @@ METRICS_RESULT = [
 ]
 
 
+def write_archive_csv(file_path, start_time):
+    """Dump the rows of PERFORMANCE_LINES_MAP, one minute apart from
+    start_time, plus rows of an unknown resource and out of the window."""
+    tools = Tools()
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Object Name', 'Poll Time'])
+        for rows in PERFORMANCE_LINES_MAP.values():
+            for minute, row in enumerate(rows):
+                row = list(row)
+                row[1] = tools.timestamp_to_time_str(
+                    start_time + (minute + 1) * 60000, consts.TIME_PATTERN)
+                writer.writerow(row)
+                writer.writerow(['Unknown LUN'] + row[1:])
+            row[1] = tools.timestamp_to_time_str(
+                start_time + 3600000, consts.TIME_PATTERN)
+            writer.writerow(row)
+
+
 def create_driver():
     NaviHandler.login = mock.Mock(return_value={"05.33.000.5.038_test"})
     return VnxBlockStorDriver(**ACCESS_INFO)
@@ -913,16 +937,71 @@ class TestVnxBlocktorageDriver(TestCase):
         }
         start_time = 1625717756000
         end_time = 1625717996000
-        ComponentHandler._filter_performance_data = mock.Mock(
-            side_effect=[PERFORMANCE_LINES_MAP])
+        local_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, local_path)
+
+        def download_archives(archive_name):
+            write_archive_csv(
+                '%s/%s.csv' % (local_path, archive_name.split('.')[0]),
+                start_time)
+
         NaviClient.exec = mock.Mock(
             side_effect=[ARCHIVE_DATAS, SP_DATAS, PORT_DATAS, DISK_DATAS,
                          GET_ALL_LUN_INFOS, NAR_INTERVAL_DATAS])
         ComponentHandler._remove_archive_file = mock.Mock(return_value="")
-        metrics = driver.collect_perf_metrics(context, '12345',
-                                              resource_metrics, start_time,
-                                              end_time)
+        with mock.patch.object(NaviHandler, 'download_archives',
+                               side_effect=download_archives), \
+                mock.patch.object(NaviHandler, 'get_local_file_path',
+                                  return_value=local_path + '/'):
+            metrics = driver.collect_perf_metrics(context, '12345',
+                                                  resource_metrics,
+                                                  start_time, end_time)
         self.assertEqual(metrics[0][1]["resource_id"], '3600485')
+        # Samples of both archives merged, unknown resources and samples
+        # out of the window skipped
+        throughput = [metric for metric in metrics
+                      if metric.name == 'throughput']
+        self.assertEqual(2, len(throughput))
+        sp_a = throughput[0].values
+        self.assertEqual(4, len(sp_a))
+        self.assertEqual(0.28, sp_a[max(sp_a)])
+        iops = [metric for metric in metrics if metric.name == 'iops']
+        self.assertEqual(0, iops[0].values[max(sp_a)])
+
+    def test_filter_performance_data_in_workers(self):
+        start_time = 1625717756000
+        end_time = 1625717996000
+        local_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, local_path)
+        navi_handler = mock.Mock()
+        navi_handler.get_local_file_path.return_value = local_path + '/'
+        navi_handler.download_archives.side_effect = \
+            lambda archive_name: write_archive_csv(
+                '%s/%s.csv' % (local_path, archive_name.split('.')[0]),
+                start_time)
+        handler = ComponentHandler(navi_handler)
+        resource_columns = {'SP A': [13, 16], 'SP B': [13, 16, 40]}
+        archives = ['archive_1.nar', 'archive_2.nar']
+        results = []
+        for workers in (2, 0):
+            cfg.CONF.set_override('vnx_block_archive_workers', workers,
+                                  'storage_driver')
+            self.addCleanup(cfg.CONF.clear_override,
+                            'vnx_block_archive_workers', 'storage_driver')
+            results.append(handler._filter_performance_data(
+                archives, resource_columns, start_time, end_time))
+        for result in results:
+            self.assertEqual(['SP A', 'SP B'], sorted(result))
+            # 4 samples in the window per archive
+            self.assertEqual(8, len(result['SP B']))
+            self.assertEqual([0.9, 0.1, 0.2, 0.3] * 2,
+                             list(result['SP B'].columns[13]))
+            self.assertEqual([2.6, 5.6, 4.6, 6.6] * 2,
+                             list(result['SP B'].columns[16]))
+            # Columns beyond the end of the rows are read as 0
+            self.assertEqual([0.0] * 8, list(result['SP B'].columns[40]))
+        self.assertEqual(list(results[0]['SP B'].timestamps),
+                         list(results[1]['SP B'].timestamps))
 
     def test_get_capabilities(self):
         cap = VnxBlockStorDriver.get_capabilities(context)
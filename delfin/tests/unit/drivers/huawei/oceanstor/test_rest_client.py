@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
 from unittest import TestCase, mock
 from unittest.mock import call
 
@@ -19,7 +20,9 @@ from requests.sessions import Session
 
 from delfin import exception
 from delfin.common import config # noqa
+from delfin.drivers.huawei.oceanstor import consts
 from delfin.drivers.huawei.oceanstor.rest_client import RestClient
+from delfin.drivers.utils import concurrency
 
 
 ACCESS_INFO = {
@@ -456,3 +459,30 @@ class TestOceanStorRestClient(TestCase):
         self.assertEqual(metrics[0].name, 'iops')
         self.assertDictEqual(metrics[0].labels, expected_label)
         self.assertListEqual(list(metrics[0].values.values()), [12])
+
+    @mock.patch.object(RestClient, 'do_call')
+    @mock.patch.object(RestClient, 'login')
+    def test_concurrent_relogin(self, mock_login, mock_do_call):
+        mock_login.return_value = '0123456'
+        rest_client = RestClient(**ACCESS_INFO)
+        rest_client.device_id = '0123456'
+        mock_login.reset_mock()
+        expired = rest_client._session_generation
+        workers = 4
+        barrier = threading.Barrier(workers)
+
+        def do_call(url, data, method, log_filter_flag=False):
+            # Every worker fails on the expired session before any relogin
+            if rest_client._session_generation == expired:
+                barrier.wait(timeout=10)
+                return {"error": {
+                    "code": consts.ERROR_UNAUTHORIZED_TO_SERVER}}
+            return RESP
+        mock_do_call.side_effect = do_call
+
+        results = concurrency.map_concurrently(
+            lambda url: rest_client.call(url, method='GET'),
+            ['/lun/%d' % i for i in range(workers)], max_workers=workers)
+        mock_login.assert_called_once_with()
+        self.assertEqual([RESP] * workers, results)
+        self.assertEqual(2 * workers, mock_do_call.call_count)
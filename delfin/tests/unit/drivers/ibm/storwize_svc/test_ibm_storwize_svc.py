@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
 import sys
 from unittest import TestCase, mock
 
@@ -18,11 +19,6 @@ import paramiko
 
 from delfin.common import constants
 
-try:
-    import xml.etree.cElementTree as ET
-except ImportError:
-    import xml.etree.ElementTree as ET
-
 from delfin.drivers.utils.tools import Tools
 
 sys.modules['delfin.cryptor'] = mock.Mock()
@@ -1083,6 +1079,33 @@ file_nn_node_1612 = """<?xml version="1.0" encoding="utf-8" ?>
   rb="2605359825065" wb="2619220318131" re="1193465"
    we="135040076" rq="49536391" wq="151134080"/>
 """
+stats_files = {
+    'Nv_stats_78N16G4-2_211201_161110': [file_nv_1611],
+    'Nv_stats_78N16G4-2_211201_161210': [file_nv_1612],
+    'Nm_stats_78N16G4-2_211201_161110': [file_nm_1611],
+    'Nm_stats_78N16G4-2_211201_161210': [file_nm_1612],
+    'Nn_stats_78N16G4-2_211201_161110': [file_nn_1611, file_nn_node_1611],
+    'Nn_stats_78N16G4-2_211201_161210': [file_nn_1612, file_nn_node_1612],
+    'Nv_stats_78N16G4-2_211201_161310': [file_nv_1612],
+    'Nm_stats_78N16G4-2_211201_161310': [file_nm_1612],
+    'Nn_stats_78N16G4-2_211201_161310': [file_nn_1612, file_nn_node_1612]
+}
+get_next_file_list = get_file_list + '\n' \
+    '7 Nn_stats_78N16G4-2_211201_161310\n' \
+    '8 Nm_stats_78N16G4-2_211201_161310\n' \
+    '9 Nv_stats_78N16G4-2_211201_161310'
+
+
+def get_stats_file(ssh, file, local_path, remote_path):
+    local_file = os.path.join(local_path, file)
+    with open(local_file, 'w') as f:
+        f.write('<stats>')
+        for element in stats_files[file]:
+            f.write(element.split('?>', 1)[1])
+        f.write('</stats>')
+    return local_file
+
+
 resource_metrics = {
     'volume': [
         'iops', 'readIops', 'writeIops',
@@ -1611,7 +1634,7 @@ class TestStorwizeSvcStorageDriver(TestCase):
         self.assertEqual(port, port_result)
 
     @mock.patch.object(SSHHandler, 'get_fc_port')
-    @mock.patch.object(Tools, 'get_remote_file_to_xml')
+    @mock.patch.object(Tools, 'get_remote_file')
     @mock.patch.object(SSHHandler, 'do_exec')
     @mock.patch.object(SSHPool, 'get')
     def test_collect_perf_metrics(self, mock_ssh_get, mock_file_list,
@@ -1621,20 +1644,51 @@ class TestStorwizeSvcStorageDriver(TestCase):
         storage_id = '12345'
         mock_ssh_get.return_value = {paramiko.SSHClient()}
         mock_file_list.return_value = get_file_list
-        mock_get_file.return_value = [ET.fromstring(file_nv_1611),
-                                      ET.fromstring(file_nv_1612),
-                                      ET.fromstring(file_nm_1611),
-                                      ET.fromstring(file_nm_1612),
-                                      ET.fromstring(file_nn_1611),
-                                      ET.fromstring(file_nn_1612),
-                                      ET.fromstring(file_nn_node_1611),
-                                      ET.fromstring(file_nn_node_1612)
-                                      ]
+        mock_get_file.side_effect = get_stats_file
         mock_fc_port.return_value = perf_get_port_fc
         metrics = self.driver.collect_perf_metrics(context, storage_id,
                                                    resource_metrics,
                                                    start_time, end_time)
         self.assertEqual(metrics[0][1]['resource_name'], 'powerha')
+        # Nn files hold both port and controller counters, each file is
+        # downloaded once
+        self.assertEqual(6, mock_get_file.call_count)
+        resource_types = set(metric.labels['resource_type']
+                             for metric in metrics)
+        self.assertEqual(set(resource_metrics), resource_types)
+
+    @mock.patch.object(SSHHandler, 'get_fc_port')
+    @mock.patch.object(Tools, 'get_remote_file')
+    @mock.patch.object(SSHHandler, 'do_exec')
+    @mock.patch.object(SSHPool, 'get')
+    def test_collect_perf_metrics_from_cached_state(
+            self, mock_ssh_get, mock_file_list, mock_get_file, mock_fc_port):
+        start_time = 1637346270000
+        end_time = 1639346330000
+        storage_id = '67890'
+        mock_ssh_get.return_value = {paramiko.SSHClient()}
+        mock_get_file.side_effect = get_stats_file
+        mock_fc_port.return_value = perf_get_port_fc
+        mock_file_list.return_value = get_file_list
+        self.driver.collect_perf_metrics(context, storage_id,
+                                         resource_metrics,
+                                         start_time, end_time)
+        self.assertEqual(6, mock_get_file.call_count)
+
+        # Next collection only downloads the files added since
+        mock_get_file.reset_mock()
+        mock_file_list.return_value = get_next_file_list
+        metrics = self.driver.collect_perf_metrics(context, storage_id,
+                                                   resource_metrics,
+                                                   start_time, end_time)
+        downloaded = [call[0][1] for call in mock_get_file.call_args_list]
+        self.assertEqual(3, len(downloaded))
+        self.assertTrue(all(name.endswith('161310') for name in downloaded))
+        resource_types = set(metric.labels['resource_type']
+                             for metric in metrics)
+        self.assertEqual(set(resource_metrics), resource_types)
+        for metric in metrics:
+            self.assertEqual(1, len(metric.values))
 
     @mock.patch.object(SSHHandler, 'do_exec')
     @mock.patch.object(SSHPool, 'get')
@@ -0,0 +1,204 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import io
+import os
+import time
+from unittest import TestCase, mock, skipUnless
+
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+from oslo_utils import units
+
+from delfin.common import constants
+from delfin.drivers.ibm.storwize_svc import iostats
+from delfin.drivers.ibm.storwize_svc.ssh_handler import SSHHandler
+
+VOLUME = constants.ResourceType.VOLUME
+VOLUME_TARGETS = list(SSHHandler.VOLUME_PERF_METRICS)
+VOLUME_PERF_MAP = SSHHandler.VOLUME_PERF_METRICS
+
+
+def make_volume_stats(volume_count, step, base=0):
+    """Synthetic Nv dump with counters growing by step per volume."""
+    lines = ['<diskStatsColl xmlns="http://ibm.com/storage/management/'
+             'performance/api/2003/04/diskStats">']
+    for i in range(volume_count):
+        value = base + step * (i + 1)
+        lines.append(
+            '<vdsk idx="%d" id="vol%d" ro="%d" wo="%d" rb="%d" wb="%d" '
+            'ctrhs="%d" ctwhs="%d" ctrs="%d" ctws="%d" xl="%d"/>'
+            % (i, i, value, value, value, value, value // 2, value // 2,
+               value, value, value))
+    lines.append('</diskStatsColl>')
+    return ET.fromstring('\n'.join(lines))
+
+
+class TestCounterFrame(TestCase):
+
+    def test_from_xml(self):
+        frame = iostats.CounterFrame.from_xml(
+            make_volume_stats(3, 10), 60000, VOLUME)
+        self.assertEqual(['0_vol0', '1_vol1', '2_vol2'], frame.keys)
+        self.assertEqual([60000] * 3, list(frame.times))
+        self.assertEqual([10, 20, 30], list(frame.columns['ro']))
+        self.assertEqual([20, 40, 60], list(frame.columns['to']))
+        self.assertEqual([5120, 10240, 15360], list(frame.columns['rb']))
+
+    def test_load_frames_from_stream(self):
+        stats = io.BytesIO(
+            b'<stats xmlns="http://ibm.com/storage/management/performance">'
+            b'<port id="1" fc_wwpn="0x5005" cbr="1" hbr="1" lnbr="1" '
+            b'rmbr="1" cbt="0" hbt="0" lnbt="0" rmbt="0" cer="1" her="1" '
+            b'lner="1" rmer="1" cet="0" het="0" lnet="0" rmet="0"/>'
+            b'<node id="node1" node_id="0x3" ro="5" wo="6" rb="1" wb="2" '
+            b'rq="3" wq="4"><ca dav="0"/></node>'
+            b'</stats>')
+        frames = iostats.load_frames(
+            iostats.iter_stats_file(stats), 60000,
+            [constants.ResourceType.PORT, constants.ResourceType.CONTROLLER])
+        port = frames[constants.ResourceType.PORT]
+        self.assertEqual(['0x5005'], port.keys)
+        self.assertEqual([32], list(port.columns['rb']))
+        self.assertEqual([4], list(port.columns['ro']))
+        controller = frames[constants.ResourceType.CONTROLLER]
+        self.assertEqual(['3_node1'], controller.keys)
+        self.assertEqual([11], list(controller.columns['to']))
+        self.assertEqual([7], list(controller.columns['res_time']))
+
+    def test_from_xml_skips_other_resources(self):
+        frame = iostats.CounterFrame.from_xml(
+            make_volume_stats(3, 10), 60000, constants.ResourceType.DISK)
+        self.assertEqual(0, len(frame))
+
+
+class TestComputeMetrics(TestCase):
+
+    def _compute(self, frames, targets=VOLUME_TARGETS):
+        metric_map = {}
+        last = iostats.CounterFrame()
+        for timestamp, root in frames:
+            frame = iostats.CounterFrame.from_xml(root, timestamp, VOLUME)
+            last = iostats.compute_metrics(last, frame, VOLUME_PERF_MAP,
+                                           targets, metric_map)
+        return metric_map, last
+
+    def test_rates(self):
+        metric_map, _ = self._compute([
+            (0, make_volume_stats(2, 600)),
+            (60000, make_volume_stats(2, 600, base=6000))])
+        volume = metric_map['1_vol1']
+        self.assertEqual({60000: 100}, volume['readIops'])
+        self.assertEqual({60000: 200}, volume['iops'])
+        self.assertEqual({60000: round(6000 * 512 / 60 / units.Mi, 3)},
+                         volume['readThroughput'])
+        self.assertEqual({60000: 3000.0}, volume['readIoSize'])
+        self.assertEqual({60000: 100.0}, volume['responseTime'])
+        self.assertEqual({60000: 50.0}, volume['readCacheHitRatio'])
+        self.assertEqual({60000: 100.0}, volume['cacheHitRatio'])
+
+    def test_counter_reset(self):
+        metric_map, _ = self._compute([
+            (0, make_volume_stats(1, 6000)),
+            (60000, make_volume_stats(1, 600))])
+        self.assertEqual({60000: 10}, metric_map['0_vol0']['readIops'])
+
+    def test_first_sample_only_sets_baseline(self):
+        metric_map, last = self._compute([(0, make_volume_stats(2, 10))])
+        self.assertEqual({}, metric_map)
+        self.assertEqual(2, len(last))
+
+    def test_keeps_missing_resources(self):
+        metric_map, last = self._compute([
+            (0, make_volume_stats(3, 600)),
+            (60000, make_volume_stats(1, 600, base=600)),
+            (120000, make_volume_stats(3, 600, base=1200))])
+        self.assertEqual(3, len(last))
+        self.assertEqual({60000: 10, 120000: 10},
+                         metric_map['0_vol0']['readIops'])
+        # Rate of the resource missing from the second file spans both
+        self.assertEqual({120000: 10}, metric_map['2_vol2']['readIops'])
+
+    def test_sums_samples_of_several_nodes(self):
+        metric_map = {}
+        for _ in range(2):
+            last = iostats.CounterFrame.from_xml(
+                make_volume_stats(1, 600), 0, VOLUME)
+            frame = iostats.CounterFrame.from_xml(
+                make_volume_stats(1, 600, base=600), 60000, VOLUME)
+            iostats.compute_metrics(last, frame, VOLUME_PERF_MAP,
+                                    ['readIops'], metric_map)
+        self.assertEqual({60000: 20}, metric_map['0_vol0']['readIops'])
+
+    def test_average_response_time(self):
+        resource_metrics = {'responseTime': {1: 10.0, 2: 5.0, 3: 1.0},
+                            'iops': {1: 4, 2: 0}}
+        iostats.average_response_time(resource_metrics)
+        self.assertEqual({1: 2.5, 2: 0, 3: 1.0},
+                         resource_metrics['responseTime'])
+
+
+class TestCounterStateCache(TestCase):
+
+    def test_get_and_set(self):
+        cache = iostats.CounterStateCache()
+        self.assertIsNone(cache.get('storage', 'Nv_stats_node1'))
+        frames = {VOLUME: iostats.CounterFrame()}
+        cache.set('storage', 'Nv_stats_node1', 60000, frames)
+        self.assertEqual((60000, frames),
+                         cache.get('storage', 'Nv_stats_node1'))
+        self.assertIsNone(cache.get('other', 'Nv_stats_node1'))
+
+    @mock.patch('time.time')
+    def test_expire(self, mock_time):
+        cache = iostats.CounterStateCache(ttl=60)
+        mock_time.return_value = 1000
+        cache.set('storage', 'Nv_stats_node1', 60000, {})
+        mock_time.return_value = 1061
+        self.assertIsNone(cache.get('storage', 'Nv_stats_node1'))
+        self.assertEqual(0, len(cache))
+
+    def test_size_bound(self):
+        cache = iostats.CounterStateCache(max_entries=2)
+        cache.set('storage', 'Nv_stats_node1', 1, {})
+        cache.set('storage', 'Nv_stats_node2', 1, {})
+        cache.get('storage', 'Nv_stats_node1')
+        cache.set('storage', 'Nv_stats_node3', 1, {})
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('storage', 'Nv_stats_node2'))
+        self.assertIsNotNone(cache.get('storage', 'Nv_stats_node1'))
+
+
+@skipUnless(os.environ.get('DELFIN_BENCHMARK'),
+            'set DELFIN_BENCHMARK=1 to run benchmarks')
+class BenchmarkIostats(TestCase):
+
+    def test_benchmark_10k_volumes(self):
+        files = [(60000 * i, make_volume_stats(10000, 10, base=i * 100000))
+                 for i in range(4)]
+        handler = SSHHandler.__new__(SSHHandler)
+        begin = time.time()
+        metric_map = {}
+        last = iostats.CounterFrame()
+        for timestamp, root in files:
+            frame = iostats.CounterFrame.from_xml(root, timestamp, VOLUME)
+            last = iostats.compute_metrics(last, frame, VOLUME_PERF_MAP,
+                                           VOLUME_TARGETS, metric_map)
+        metrics = []
+        handler.packege_data('12345', VOLUME, metrics, metric_map)
+        print('\n10000 volumes, %d files, %d series: %.3fs'
+              % (len(files), len(metrics), time.time() - begin))
+        self.assertEqual(10000 * len(VOLUME_TARGETS), len(metrics))
@@ -11,12 +11,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import fnmatch
 from unittest import TestCase, mock
 
 import paramiko
 
 from delfin.tests.unit.drivers.netapp.netapp_ontap import test_constans
 from delfin import context
+from delfin.drivers.netapp.dataontap import constants as constant
 from delfin.drivers.netapp.dataontap.netapp_handler import NetAppHandler
 from delfin.drivers.netapp.dataontap.cluster_mode import NetAppCmodeDriver
 from delfin.drivers.utils.ssh_client import SSHPool
@@ -157,33 +159,35 @@ class TestNetAppCmodeDriver(TestCase):
         self.assertEqual(data[0]['host'], '8.44.162.245')
 
     def test_get_storage_performance(self):
-        SSHPool.do_exec = mock.Mock(
-            side_effect=[
-                # storage
-                test_constans.SYSTEM_INFO,
-                # pool
+        # Resource types are collected concurrently, so answer by request
+        # instead of by call order
+        ssh_responses = {
+            constant.CLUSTER_SHOW_COMMAND: test_constans.SYSTEM_INFO,
+            constant.AGGREGATE_SHOW_DETAIL_COMMAND:
                 test_constans.AGGREGATE_DETAIL_INFO,
-                # volume
-                test_constans.LUN_INFO,
-            ])
+            constant.LUN_SHOW_DETAIL_COMMAND: test_constans.LUN_INFO,
+        }
+        SSHPool.do_exec = mock.Mock(
+            side_effect=lambda command: ssh_responses[command])
+        rest_responses = [
+            (constant.CLUSTER_PERF_URL, test_constans.CLUSTER_PER_INFO),
+            (constant.POOL_PERF_URL, test_constans.POOL_PER_INFO),
+            (constant.VOLUME_PERF_URL, test_constans.LUN_PER_INFO),
+            (constant.FC_INFO_URL, test_constans.PORT_REST_INFO),
+            (constant.FC_PERF_URL, test_constans.FC_PER_INFO),
+            (constant.ETH_INFO_URL, test_constans.PORT_REST_INFO),
+            (constant.ETH_PERF_URL, test_constans.ETH_PER_INFO),
+            (constant.FS_INFO_URL, test_constans.FS_REST_INFO),
+            (constant.FS_PERF_URL, test_constans.FS_PER_INFO),
+        ]
+
+        def fake_rest_call(url, data):
+            for url_pattern, response in rest_responses:
+                if fnmatch.fnmatchcase(url, url_pattern.replace('%s', '*')):
+                    return response
+
         self.netapp_client.netapp_handler.do_rest_call = mock.Mock(
-            side_effect=[  # storage
-                test_constans.CLUSTER_PER_INFO,
-                # pool
-                test_constans.POOL_PER_INFO,
-                test_constans.POOL_PER_INFO,
-                test_constans.POOL_PER_INFO,
-                # volume
-                test_constans.LUN_PER_INFO,
-                # port
-                test_constans.PORT_REST_INFO,
-                test_constans.FC_PER_INFO,
-                test_constans.PORT_REST_INFO,
-                test_constans.ETH_PER_INFO,
-                # fs
-                test_constans.FS_REST_INFO,
-                test_constans.FS_PER_INFO,
-            ])
+            side_effect=fake_rest_call)
         data = self.netapp_client.collect_perf_metrics(
             context, test_constans.ACCESS_INFO['storage_id'],
             test_constans.RESOURCE_METRICS,
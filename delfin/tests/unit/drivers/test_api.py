@@ -333,7 +333,7 @@ class TestDriverAPI(TestCase):
 
     @mock.patch.object(FakeStorageDriver, 'parse_alert')
     @mock.patch('delfin.drivers.manager.DriverManager.get_driver')
-    @mock.patch('delfin.db.access_info_get')
+    @mock.patch('delfin.db.access_info_get_cached')
     def test_parse_alert(self, mock_access_info,
                          driver_manager, mock_fake):
         mock_access_info.return_value = ACCESS_INFO
@@ -348,6 +348,31 @@ class TestDriverAPI(TestCase):
         driver_manager.assert_called_once()
         mock_fake.assert_called_once()
 
+    @mock.patch('delfin.drivers.manager.DriverManager.get_driver')
+    def test_supports_resource_changes(self, driver_manager):
+        driver_manager.return_value = FakeStorageDriver()
+        api = API()
+        self.assertTrue(api.supports_resource_changes(context, '12345',
+                                                      'volumes'))
+        self.assertFalse(api.supports_resource_changes(context, '12345',
+                                                       'ports'))
+
+    @mock.patch('delfin.drivers.manager.DriverManager.get_driver')
+    def test_list_resource_changes(self, driver_manager):
+        driver = FakeStorageDriver()
+        driver_manager.return_value = driver
+        api = API()
+        changes = api.list_resource_changes(context, '12345', 'volumes',
+                                            None)
+        self.assertEqual(driver.rd_volumes_count, len(changes['changed']))
+        changes = api.list_resource_changes(context, '12345', 'volumes',
+                                            changes['watermark'])
+        self.assertLessEqual(len(changes['changed']),
+                             driver.rd_volumes_count)
+        self.assertEqual([], changes['deleted'])
+        self.assertRaises(NotImplementedError, api.list_resource_changes,
+                          context, '12345', 'ports', None)
+
     @mock.patch('delfin.drivers.manager.DriverManager.get_driver')
     def test_get_capabilities(self, driver_manager):
         driver_manager.return_value = FakeStorageDriver()
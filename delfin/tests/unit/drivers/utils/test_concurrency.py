@@ -0,0 +1,62 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+from unittest import TestCase
+
+from delfin.drivers.utils import concurrency
+
+
+class TestConcurrency(TestCase):
+
+    def test_results_in_order(self):
+        results = concurrency.map_concurrently(
+            lambda i: time.sleep(0.01 * (5 - i)) or i * i, range(5))
+        self.assertEqual([0, 1, 4, 9, 16], results)
+        self.assertEqual([], concurrency.run_concurrently([]))
+
+    def test_wall_time_of_slowest_call(self):
+        start = time.time()
+        concurrency.map_concurrently(time.sleep, [0.2] * 4)
+        self.assertLess(time.time() - start, 0.6)
+
+    def test_exception_raised(self):
+        def fake_call(i):
+            if i == 2:
+                raise ValueError('fake')
+            return i
+        self.assertRaises(ValueError, concurrency.map_concurrently,
+                          fake_call, range(4))
+
+    def test_cap_shared_by_key(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def fake_call(i):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        callers = [threading.Thread(
+            target=concurrency.map_concurrently,
+            args=(fake_call, range(8)), kwargs={'key': 'fake_storage'})
+            for _ in range(3)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+        self.assertEqual(4, running[1])
@@ -0,0 +1,90 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+from unittest import TestCase
+
+from delfin.drivers.utils import concurrency
+from delfin.drivers.utils import shared_calls
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.calls = []
+
+    @shared_calls.shared_call
+    def get_groups(self, group_type='host'):
+        self.calls.append(('get_groups', group_type))
+        time.sleep(0.05)
+        return [group_type]
+
+    @shared_calls.shared_call
+    def get_members(self, group_id):
+        self.calls.append(('get_members', group_id))
+        if group_id is None:
+            raise ValueError('fake')
+        return [group_id]
+
+    @shared_calls.shared_call
+    def get_filtered(self, filters):
+        self.calls.append(('get_filtered', filters))
+        return []
+
+
+class TestSharedCalls(TestCase):
+
+    def test_without_window(self):
+        client = FakeClient()
+        client.get_groups()
+        client.get_groups()
+        self.assertEqual(2, len(client.calls))
+
+    def test_identical_calls_run_once(self):
+        client = FakeClient()
+        window = shared_calls.SyncWindow()
+        with shared_calls.activate(window):
+            self.assertEqual(['host'], client.get_groups())
+            self.assertEqual(['host'], client.get_groups(group_type='host'))
+            client.get_groups()
+            client.get_groups('port')
+        self.assertIsNone(shared_calls.current_window())
+        self.assertEqual(3, len(client.calls))
+        self.assertEqual({'FakeClient.get_groups': (4, 3)}, window.report())
+        self.assertEqual(1, window.saved_calls())
+
+    def test_concurrent_calls_wait_for_the_first(self):
+        client = FakeClient()
+        window = shared_calls.SyncWindow()
+        with shared_calls.activate(window):
+            results = concurrency.map_concurrently(
+                lambda _: client.get_groups(), range(4))
+        self.assertEqual([['host']] * 4, results)
+        self.assertEqual([('get_groups', 'host')], client.calls)
+        self.assertEqual(3, window.saved_calls())
+
+    def test_errors_are_not_kept(self):
+        client = FakeClient()
+        with shared_calls.activate(shared_calls.SyncWindow()):
+            self.assertRaises(ValueError, client.get_members, None)
+            self.assertRaises(ValueError, client.get_members, None)
+        self.assertEqual(2, len(client.calls))
+
+    def test_unhashable_arguments(self):
+        client = FakeClient()
+        window = shared_calls.SyncWindow()
+        with shared_calls.activate(window):
+            client.get_filtered({'type': 'host'})
+            client.get_filtered({'type': 'host'})
+        self.assertEqual(2, len(client.calls))
+        self.assertEqual({}, window.report())
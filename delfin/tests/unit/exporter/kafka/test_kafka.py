@@ -0,0 +1,190 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import os
+import time
+from unittest import mock, skipUnless, TestCase
+
+from delfin import context
+from delfin.common.constants import metric_struct
+from delfin.common.metric_batch import MetricBatch
+from delfin.drivers import fake_storage
+from delfin.exporter.kafka import kafka
+
+
+class FakeFuture(object):
+    def __init__(self, error=None):
+        self.error = error
+
+    def add_callback(self, func):
+        if not self.error:
+            func(None)
+
+    def add_errback(self, func):
+        if self.error:
+            func(self.error)
+
+
+class FakeKafkaProducer(object):
+    """Local stand-in for KafkaProducer which serializes like the real one.
+    """
+    instances = 0
+
+    def __init__(self, **kwargs):
+        FakeKafkaProducer.instances += 1
+        self.config = kwargs
+        self.messages = []
+
+    def send(self, topic, key=None, value=None):
+        self.messages.append((topic,
+                              self.config['key_serializer'](key),
+                              self.config['value_serializer'](value)))
+        return FakeFuture()
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+
+@mock.patch.object(kafka, 'KafkaProducer', FakeKafkaProducer)
+class TestKafkaExporter(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        driver = fake_storage.FakeStorageDriver()
+        resource_metrics = driver.get_capabilities(
+            context.get_admin_context())['resource_metrics']
+        end_time = int(time.time() * 1000)
+        cls.metrics = driver.collect_perf_metrics(
+            context.get_admin_context(), 'fake_storage_id',
+            resource_metrics, end_time - 5 * 60 * 1000, end_time)
+
+    def setUp(self):
+        kafka.KafkaExporter.close_producer()
+        kafka.KafkaExporter.stats = {'sent': 0, 'failed': 0}
+        FakeKafkaProducer.instances = 0
+
+    def tearDown(self):
+        kafka.KafkaExporter.close_producer()
+
+    def test_producer_reused(self):
+        exporter = kafka.KafkaExporter()
+        exporter.push_to_kafka(self.metrics)
+        exporter.push_to_kafka(MetricBatch.from_metrics(self.metrics))
+        self.assertEqual(1, FakeKafkaProducer.instances)
+        producer = kafka.KafkaExporter.get_producer()
+        self.assertEqual(100, producer.config['linger_ms'])
+        self.assertEqual('gzip', producer.config['compression_type'])
+
+    def test_messages_keyed_and_split(self):
+        kafka.CONF.set_override('kafka_max_series_per_message', 100,
+                                'KAFKA_EXPORTER')
+        self.addCleanup(kafka.CONF.clear_override,
+                        'kafka_max_series_per_message', 'KAFKA_EXPORTER')
+        kafka.KafkaExporter().push_to_kafka(self.metrics)
+        messages = kafka.KafkaExporter.get_producer().messages
+        expected = -(-len(self.metrics) // 100)
+        self.assertEqual(expected, len(messages))
+        self.assertEqual(expected, kafka.KafkaExporter.stats['sent'])
+        series = []
+        for topic, key, value in messages:
+            self.assertEqual('delfin-kafka', topic)
+            self.assertEqual(b'fake_storage_id', key)
+            series.extend(json.loads(value))
+        self.assertEqual(len(self.metrics), len(series))
+        self.assertEqual(self.metrics[0].name, series[0][0])
+        self.assertEqual(self.metrics[0].labels, series[0][1])
+
+    def test_missing_values_serialized_as_null(self):
+        labels = {'storage_id': 'fake_storage_id', 'resource_type': 'volume'}
+        metrics = [metric_struct(name='iops', labels=labels,
+                                 values={1622808000000: None,
+                                         1622808060000: 12})]
+        kafka.KafkaExporter().push_to_kafka(MetricBatch.from_metrics(metrics))
+        topic, key, value = kafka.KafkaExporter.get_producer().messages[0]
+        self.assertNotIn(b'NaN', value)
+        series = json.loads(value)
+        self.assertEqual([['iops', labels,
+                           {'1622808000000': None, '1622808060000': 12}]],
+                         series)
+        self.assertIsInstance(series[0][2]['1622808060000'], int)
+
+    def test_delivery_error_counted(self):
+        producer = kafka.KafkaExporter.get_producer()
+        with mock.patch.object(producer, 'send',
+                               return_value=FakeFuture(Exception('fake'))):
+            kafka.KafkaExporter().push_to_kafka(self.metrics)
+        self.assertEqual(0, kafka.KafkaExporter.stats['sent'])
+        self.assertLess(0, kafka.KafkaExporter.stats['failed'])
+
+
+@skipUnless(os.environ.get('DELFIN_BENCHMARK'),
+            'set DELFIN_BENCHMARK=1 to run benchmarks')
+@mock.patch.object(kafka, 'KafkaProducer', FakeKafkaProducer)
+class BenchmarkKafkaExporter(TestCase):
+
+    cycles = 10
+
+    def _collect(self):
+        driver = fake_storage.FakeStorageDriver()
+        ctx = context.get_admin_context()
+        resource_metrics = driver.get_capabilities(ctx)['resource_metrics']
+        end_time = int(time.time() * 1000)
+        cycles = []
+        for i in range(self.cycles):
+            end = end_time + i * 5 * 60 * 1000
+            cycles.append(MetricBatch.from_metrics(
+                driver.collect_perf_metrics(ctx, 'storage%d' % (i % 2),
+                                            resource_metrics,
+                                            end - 5 * 60 * 1000, end)))
+        return cycles
+
+    def test_benchmark_push_to_kafka(self):
+        cycles = self._collect()
+        total = sum(len(batch) for batch in cycles)
+        self.addCleanup(kafka.KafkaExporter.close_producer)
+        self.addCleanup(kafka.CONF.clear_override, 'kafka_linger_ms',
+                        'KAFKA_EXPORTER')
+        self.addCleanup(kafka.CONF.clear_override,
+                        'kafka_max_series_per_message', 'KAFKA_EXPORTER')
+        for linger_ms in (0, 100):
+            for max_series in (100, 1000):
+                kafka.KafkaExporter.close_producer()
+                kafka.KafkaExporter.stats = {'sent': 0, 'failed': 0}
+                kafka.CONF.set_override('kafka_linger_ms', linger_ms,
+                                        'KAFKA_EXPORTER')
+                kafka.CONF.set_override('kafka_max_series_per_message',
+                                        max_series, 'KAFKA_EXPORTER')
+                exporter = kafka.KafkaExporter()
+                begin = time.time()
+                for batch in cycles:
+                    exporter.push_to_kafka(batch)
+                elapsed = time.time() - begin
+                producer = kafka.KafkaExporter.get_producer()
+                messages = producer.messages
+                print('\nlinger_ms=%d max_series=%d: %d cycles, %d messages,'
+                      ' %.0f messages/s, %.1f series/message'
+                      % (linger_ms, max_series, len(cycles), len(messages),
+                         len(messages) / elapsed, total / len(messages)))
+                self.assertEqual(linger_ms, producer.config['linger_ms'])
+                expected = sum(-(-len(batch) // max_series)
+                               for batch in cycles)
+                self.assertEqual(expected, len(messages))
+                self.assertEqual(expected, kafka.KafkaExporter.stats['sent'])
+                self.assertEqual({b'storage0', b'storage1'},
+                                 {key for _, key, _ in messages})
+                self.assertEqual(total, sum(len(json.loads(value))
+                                            for _, _, value in messages))
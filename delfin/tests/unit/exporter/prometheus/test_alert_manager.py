@@ -0,0 +1,111 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import mock
+
+from delfin import test
+from delfin.exporter.prometheus import alert_manager
+
+GROUP = 'PROMETHEUS_ALERT_MANAGER_EXPORTER'
+
+
+def fake_alert(alert_id, sequence_number=1):
+    return {'alert_id': alert_id, 'sequence_number': sequence_number,
+            'alert_name': 'fake', 'description': 'fake alert'}
+
+
+@mock.patch.object(alert_manager.AlertPusher, '_run', mock.Mock())
+class TestAlertPusher(test.TestCase):
+
+    def setUp(self):
+        super(TestAlertPusher, self).setUp()
+        self.pusher = alert_manager.AlertPusher()
+        self.mock_post = self.mock_object(self.pusher.session, 'post')
+        self.mock_post.return_value.status_code = 200
+        self.mock_object(alert_manager.AlertPusher, 'get_instance',
+                         mock.Mock(return_value=self.pusher))
+
+    def _push(self, alerts):
+        exporter = alert_manager.PrometheusAlertExporter()
+        exporter.push_prometheus_alert(alerts)
+
+    def test_alerts_pushed_once_in_batch(self):
+        self._push([fake_alert('1')])
+        self._push([fake_alert('2'), fake_alert('1')])
+        self.assertTrue(self.pusher.flush())
+        self.assertEqual(1, self.mock_post.call_count)
+        pushed = self.mock_post.call_args[1]['json']
+        self.assertEqual(['1', '2'],
+                         [a['labels']['alert_id'] for a in pushed])
+        self.assertEqual('fake alert', pushed[0]['annotations']['summary'])
+        # Already pushed alerts are not pushed again
+        self._push([fake_alert('1'), fake_alert('1', 2)])
+        self.pusher.flush()
+        pushed = self.mock_post.call_args[1]['json']
+        self.assertEqual([('1', '2')],
+                         [(a['labels']['alert_id'],
+                           a['labels']['sequence_number']) for a in pushed])
+        self.assertEqual({'pushed': 3, 'dropped': 0, 'retried': 0,
+                          'duplicated': 2}, self.pusher.stats)
+
+    def _pushed(self):
+        return [(a['labels']['storage_id'], a['labels']['alert_id'],
+                 a['labels']['category'])
+                for a in self.mock_post.call_args[1]['json']]
+
+    def test_alert_id_shared_by_storages(self):
+        alerts = [dict(fake_alert('snmp', 0), storage_id=storage_id,
+                       category='Fault', occur_time=1)
+                  for storage_id in ('storage1', 'storage2')]
+        self._push(alerts)
+        self.pusher.flush()
+        self.assertEqual([('storage1', 'snmp', 'Fault'),
+                          ('storage2', 'snmp', 'Fault')], self._pushed())
+
+        # Recoveries are not deduplicated, a later fault is a new alert
+        recovery = dict(alerts[0], category='Recovery', occur_time=2)
+        self._push([recovery, recovery, alerts[0],
+                    dict(alerts[0], occur_time=3)])
+        self.pusher.flush()
+        self.assertEqual([('storage1', 'snmp', 'Recovery'),
+                          ('storage1', 'snmp', 'Recovery'),
+                          ('storage1', 'snmp', 'Fault')], self._pushed())
+        self.assertEqual(1, self.pusher.stats['duplicated'])
+
+    def test_alert_without_sequence_number(self):
+        alert = fake_alert('code', None)
+        self._push([alert, alert])
+        self._push([alert])
+        self.pusher.flush()
+        self.assertEqual(3, len(self.mock_post.call_args[1]['json']))
+        self.assertEqual(0, self.pusher.stats['duplicated'])
+        self.assertEqual(0, len(self.pusher.pushed_keys))
+
+    def test_batch_size(self):
+        self.override_config('alert_batch_size', 2, GROUP)
+        self._push([fake_alert(str(i)) for i in range(5)])
+        self.pusher.flush()
+        self.assertEqual(3, self.mock_post.call_count)
+
+    def test_retry_and_drop(self):
+        self.override_config('alert_max_retries', 1, GROUP)
+        self.override_config('alert_queue_size', 3, GROUP)
+        self.mock_post.side_effect = Exception('fake')
+        self._push([fake_alert(str(i)) for i in range(4)])
+        self.assertEqual(1, self.pusher.stats['dropped'])
+        self.assertFalse(self.pusher.flush())
+        self.assertEqual(3, self.pusher.stats['retried'])
+        self.assertEqual(3, len(self.pusher.pending))
+        self.assertFalse(self.pusher.flush())
+        self.assertEqual(4, self.pusher.stats['dropped'])
+        self.assertEqual(0, len(self.pusher.pending))
@@ -33,3 +33,18 @@ class TestPrometheusExporter(TestCase):
         prometheus_obj.metrics_dir = os.getcwd()
         prometheus_obj.push_to_prometheus(fake_metrics)
         self.assertTrue(glob.glob(prometheus_obj.metrics_dir + '/' + '*.prom'))
+
+    def test_missing_values_skipped(self):
+        prometheus_obj = prometheus.PrometheusExporter()
+        prometheus_obj.metrics_dir = os.getcwd()
+        metrics = [metric_struct(name='iops', labels=fake_metrics[0].labels,
+                                 values={1622808000000: None,
+                                         1622808060000: 12})]
+        existing = set(glob.glob('*.prom'))
+        prometheus_obj.push_to_prometheus(metrics)
+        name = (set(glob.glob('*.prom')) - existing).pop()
+        with open(name) as f:
+            lines = [line for line in f if not line.startswith('#')]
+        os.remove(name)
+        self.assertEqual(1, len(lines))
+        self.assertTrue(lines[0].endswith(' 12.000000 1622808060000\n'))
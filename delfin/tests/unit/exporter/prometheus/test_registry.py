@@ -0,0 +1,103 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import gzip
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from oslo_config import cfg
+
+from delfin.common.constants import metric_struct
+from delfin.exporter.prometheus import prometheus
+from delfin.exporter.prometheus import registry
+
+fake_metrics = [metric_struct(name='throughput',
+                              labels={'storage_id': '12345',
+                                      'resource_type': 'storage',
+                                      'resource_id': 'storage0',
+                                      'type': 'RAW', 'unit': 'MB/s'},
+                              values={1622808000000: 61.9388895680357,
+                                      1622808060000: 62.5})]
+
+
+class TestMetricRegistry(TestCase):
+
+    def test_latest_sample_kept(self):
+        metric_registry = registry.MetricRegistry(10)
+        metric_registry.update([['m', 'a="1"', 'help', 1000, 1.0]])
+        metric_registry.update([['m', 'a="1"', 'help', 2000, 2.0],
+                                ['m', 'a="2"', 'help', 2000, 3.0]])
+        data = ''.join(metric_registry.render())
+        self.assertEqual(1, data.count('# HELP m help'))
+        self.assertIn('m{a="1"} 2.000000 2000\n', data)
+        self.assertIn('m{a="2"} 3.000000 2000\n', data)
+        self.assertNotIn('1000\n', data)
+
+    def test_bounded(self):
+        metric_registry = registry.MetricRegistry(2)
+        metric_registry.update([['m', 'a="%s"' % i, 'help', 1000, i]
+                                for i in range(5)])
+        self.assertEqual(2, len(metric_registry))
+        data = ''.join(metric_registry.render())
+        self.assertIn('a="4"', data)
+        self.assertNotIn('a="0"', data)
+
+    def test_expired_series_dropped(self):
+        metric_registry = registry.MetricRegistry(10, retention=-1)
+        metric_registry.update([['m', 'a="1"', 'help', 1000, 1.0]])
+        self.assertEqual('', ''.join(metric_registry.render()))
+        self.assertEqual(0, len(metric_registry))
+
+    def test_gzip_chunks(self):
+        chunks = ['line %d\n' % i for i in range(1000)]
+        data = b''.join(registry.gzip_chunks(chunks))
+        self.assertEqual(''.join(chunks), gzip.decompress(data).decode())
+
+
+class TestMemoryExporterMode(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.socket_path = os.path.join(self.tmp_dir, 'metrics.sock')
+        cfg.CONF.set_override('exporter_mode', 'memory',
+                              'PROMETHEUS_EXPORTER')
+        cfg.CONF.set_override('metrics_socket', self.socket_path,
+                              'PROMETHEUS_EXPORTER')
+        self.addCleanup(cfg.CONF.clear_override, 'exporter_mode',
+                        'PROMETHEUS_EXPORTER')
+        self.addCleanup(cfg.CONF.clear_override, 'metrics_socket',
+                        'PROMETHEUS_EXPORTER')
+
+    def test_push_to_registry(self):
+        metric_registry = registry.MetricRegistry(10)
+        server = registry.start_socket_server(metric_registry,
+                                              self.socket_path)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        prometheus_obj = prometheus.PrometheusExporter()
+        prometheus_obj.metrics_dir = self.tmp_dir
+        prometheus_obj.push_to_prometheus(fake_metrics)
+        for _ in range(50):
+            if len(metric_registry):
+                break
+            time.sleep(0.1)
+        data = ''.join(metric_registry.render())
+        self.assertIn('storage_throughput{storage_id="12345"', data)
+        self.assertIn('62.500000 1622808060000\n', data)
+        self.assertNotIn('1622808000000', data)
+        self.assertFalse([f for f in os.listdir(self.tmp_dir)
+                          if f.endswith('.prom')])
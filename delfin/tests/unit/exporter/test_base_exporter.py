@@ -0,0 +1,142 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from delfin import test
+from delfin.common.constants import metric_struct
+from delfin.common.metric_batch import MetricBatch
+from delfin.exporter import base_exporter
+
+
+def fake_metric(i):
+    return metric_struct(name='iops', labels={'resource_id': str(i)},
+                         values={1000: float(i)})
+
+
+class BlockingExporter(base_exporter.BaseExporter):
+    """Exporter which holds the worker until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def dispatch(self, ctxt, data):
+        self.release.wait(5)
+        self.calls.append(data)
+
+
+class TestExporterWorker(test.TestCase):
+
+    def setUp(self):
+        super(TestExporterWorker, self).setUp()
+        self.spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spill_dir)
+        self.flags(exporter_queue_size=2, exporter_coalesce_size=10,
+                   exporter_spill_dir=self.spill_dir)
+
+    def _wait_for(self, condition):
+        for _ in range(50):
+            if condition():
+                return
+            time.sleep(0.1)
+        self.fail('Condition not met in time')
+
+    def _fill(self, worker, count):
+        # First item is taken by the worker which then blocks
+        worker.put(None, [fake_metric(0)])
+        self._wait_for(worker.queue.empty)
+        for i in range(1, count + 1):
+            worker.put(None, [fake_metric(i)])
+
+    def test_drop_oldest_and_coalesce(self):
+        self.flags(exporter_queue_policy='drop_oldest')
+        exporter = BlockingExporter()
+        worker = base_exporter.ExporterWorker(exporter)
+        self._fill(worker, 4)
+        self.assertEqual(2, worker.get_stats()['queue_depth'])
+        exporter.release.set()
+        self._wait_for(lambda: worker.get_stats()['exports'] == 2)
+        stats = worker.get_stats()
+        self.assertEqual(5, stats['enqueued'])
+        self.assertEqual(2, stats['dropped'])
+        self.assertEqual(3, stats['dispatched'])
+        # The two newest items are pushed in one coalesced call
+        self.assertEqual([fake_metric(3), fake_metric(4)], exporter.calls[1])
+
+    def test_spill_and_replay(self):
+        self.flags(exporter_queue_policy='spill')
+        exporter = BlockingExporter()
+        worker = base_exporter.ExporterWorker(exporter)
+        self._fill(worker, 4)
+        self.assertEqual(2, worker.get_stats()['spilled'])
+        self.assertEqual(2, len(os.listdir(worker.spill_dir)))
+        exporter.release.set()
+        self._wait_for(lambda: worker.get_stats()['dispatched'] == 5)
+        self.assertEqual([], os.listdir(worker.spill_dir))
+        pushed = [m for data in exporter.calls for m in data]
+        pushed.sort(key=lambda m: m.labels['resource_id'])
+        self.assertEqual([fake_metric(i) for i in range(5)], pushed)
+
+    def test_coalesce_metric_batch(self):
+        items = [(0, None, MetricBatch.from_metrics([fake_metric(i)]))
+                 for i in range(3)]
+        data = base_exporter.ExporterWorker._coalesce(items)
+        self.assertIsInstance(data, MetricBatch)
+        self.assertEqual([fake_metric(i) for i in range(3)],
+                         data.to_metrics())
+
+    def test_failed_export_counted(self):
+        exporter = mock.Mock()
+        exporter.dispatch.side_effect = Exception('fake')
+        worker = base_exporter.ExporterWorker(exporter)
+        worker.put(None, [fake_metric(0)])
+        self._wait_for(lambda: worker.get_stats()['exports'] == 1)
+        self.assertEqual(1, worker.get_stats()['failed'])
+
+
+class TestBaseManager(test.TestCase):
+
+    @mock.patch.object(base_exporter.PerformanceExporterManager,
+                       '_get_exporters')
+    def test_async_dispatch_shares_workers(self, mock_get_exporters):
+        self.flags(exporter_dispatch_mode='async')
+        exporter = mock.Mock()
+        mock_get_exporters.return_value = [exporter]
+        self.addCleanup(base_exporter._workers.clear)
+        manager = base_exporter.PerformanceExporterManager()
+        other = base_exporter.PerformanceExporterManager()
+        self.assertIs(manager.workers, other.workers)
+        manager.dispatch(None, [fake_metric(0)])
+        for _ in range(50):
+            if exporter.dispatch.called:
+                break
+            time.sleep(0.1)
+        exporter.dispatch.assert_called_once_with(None, [fake_metric(0)])
+        stats = manager.get_stats()
+        self.assertEqual(1, stats[exporter.__class__.__name__]['dispatched'])
+
+    @mock.patch.object(base_exporter.PerformanceExporterManager,
+                       '_get_exporters')
+    def test_sync_dispatch(self, mock_get_exporters):
+        exporter = mock.Mock()
+        mock_get_exporters.return_value = [exporter]
+        manager = base_exporter.PerformanceExporterManager()
+        manager.dispatch(None, {'alert_id': '1'})
+        exporter.dispatch.assert_called_once_with(None, [{'alert_id': '1'}])
+        self.assertEqual({}, manager.get_stats())
@@ -0,0 +1,107 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from unittest import TestCase
+
+from delfin.leader_election.distributor import placement
+
+
+def make_task(task_id, duration=None, metric_count=None, interval=100,
+              executor=None):
+    return {'id': task_id, 'interval': interval, 'last_duration': duration,
+            'last_metric_count': metric_count, 'executor': executor}
+
+
+class TestTaskCosts(TestCase):
+
+    def test_task_cost(self):
+        self.assertIsNone(placement.task_cost(make_task(1), 0.01))
+        self.assertEqual(0.2, placement.task_cost(
+            make_task(1, duration=10, metric_count=1000), 0.01))
+        self.assertEqual(10, placement.task_cost(
+            make_task(1, duration=10, interval=0), 0.01))
+
+    def test_unmeasured_tasks_cost_the_mean(self):
+        costs = placement.task_costs(
+            [make_task(1, duration=10), make_task(2, duration=30),
+             make_task(3)], 0)
+        self.assertEqual(0.1, costs[1])
+        self.assertEqual(0.2, costs[3])
+        self.assertEqual(0.2, costs[4])
+        self.assertEqual(placement.DEFAULT_COST,
+                         placement.task_costs([make_task(1)], 0)[1])
+
+    def test_executor_loads(self):
+        tasks = [make_task(1, executor='node1'),
+                 make_task(2, executor='node1'),
+                 make_task(3, executor='node2'), make_task(4)]
+        self.assertEqual({'node1': 3, 'node2': 3},
+                         placement.executor_loads(
+                             tasks, {1: 1, 2: 2, 3: 3, 4: 4}))
+
+
+class TestBoundedLoadRing(TestCase):
+
+    NODES = {'node1': 100, 'node2': 100, 'node3': 100}
+
+    def test_walk(self):
+        ring = placement.BoundedLoadRing(self.NODES, 16, 1.25)
+        nodes = list(ring.walk(1))
+        self.assertEqual(sorted(self.NODES), sorted(nodes))
+        self.assertEqual(nodes, list(ring.walk(1)))
+        self.assertEqual([], list(
+            placement.BoundedLoadRing({}, 16, 1.25).walk(1)))
+
+    def test_loads_are_bounded(self):
+        ring = placement.BoundedLoadRing(self.NODES, 16, 1.25)
+        # A few heavy jobs among many light ones
+        costs = dict((i, 10.0 if i % 50 == 0 else 1.0) for i in range(600))
+        placed, loads = ring.place(costs)
+        self.assertEqual(600, len(placed))
+        bound = 1.25 * sum(costs.values()) / 3
+        for node in self.NODES:
+            self.assertLessEqual(loads[node], bound)
+        self.assertAlmostEqual(sum(costs.values()), sum(loads.values()))
+
+    def test_weights(self):
+        ring = placement.BoundedLoadRing({'node1': 100, 'node2': 300},
+                                         64, 1.1)
+        _, loads = ring.place(dict((i, 1.0) for i in range(400)))
+        self.assertLessEqual(loads['node1'], 110)
+        self.assertGreaterEqual(loads['node2'], 290)
+
+    def test_minimal_movement(self):
+        costs = dict((i, 1.0) for i in range(300))
+        before, _ = placement.BoundedLoadRing(
+            self.NODES, 64, 1.25).place(costs)
+        nodes = dict(self.NODES, node4=100)
+        after, loads = placement.BoundedLoadRing(
+            nodes, 64, 1.25).place(costs)
+        moved = [key for key in costs if before[key] != after[key]]
+        # About a quarter of the jobs move, mostly to the new node
+        self.assertLess(len(moved), 300 * 0.4)
+        self.assertGreater(loads['node4'], 0)
+
+    def test_placed_loads(self):
+        ring = placement.BoundedLoadRing({'node1': 1, 'node2': 1}, 16, 1.0)
+        placed, loads = ring.place({1: 1.0, 2: 1.0},
+                                   {'node1': 2.0, 'node3': 5.0})
+        self.assertEqual({1: 'node2', 2: 'node2'}, placed)
+        self.assertEqual({'node1': 2.0, 'node2': 2.0}, loads)
+
+    def test_job_over_every_bound(self):
+        ring = placement.BoundedLoadRing({'node1': 1, 'node2': 1}, 16, 1.0)
+        placed, _ = ring.place({1: 4.0}, {'node1': 9.0, 'node2': 8.0})
+        self.assertEqual({1: 'node2'}, placed)
+        self.assertEqual(({}, {}), placement.BoundedLoadRing(
+            {}, 16, 1.0).place({1: 1.0}))
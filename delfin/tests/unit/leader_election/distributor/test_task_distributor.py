@@ -20,6 +20,7 @@ from delfin import context
 from delfin import db
 from delfin import test
 from delfin.common import constants
+from delfin.db.sqlalchemy import api as db_api
 from delfin.db.sqlalchemy.models import Task
 from delfin.leader_election.distributor.task_distributor import TaskDistributor
 
@@ -38,9 +39,32 @@ fake_telemetry_jobs = [
 ]
 
 
+FAKE_TASKS = [
+    {'id': 1, 'executor': 'node1'},
+    {'id': 2, 'executor': 'node2'},
+    {'id': 3, 'executor': None},
+    {'id': 4, 'executor': 'node1'},
+]
+
+FAKE_FAILED_TASKS = [
+    {'id': 11, 'task_id': 1, 'executor': 'node1'},
+    {'id': 12, 'task_id': 2, 'executor': 'node2'},
+]
+
+# Executors of the tasks on the ring after node3 joined
+RING = {1: 'node1', 2: 'node3', 3: 'node3', 4: 'node1'}
+
+
 class TestTaskDistributor(test.TestCase):
 
-    @mock.patch('delfin.coordination.ConsistentHashing.get_task_executor')
+    def setUp(self):
+        super(TestTaskDistributor, self).setUp()
+        patcher = mock.patch.object(TaskDistributor, '_partitioner', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.override_config('placement_load_factor', 0, group='telemetry')
+
+    @mock.patch('delfin.coordination.ConsistentHashing.get_task_executors')
     @mock.patch('delfin.coordination.ConsistentHashing.start')
     @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.assign_job')
     @mock.patch.object(db, 'task_update')
@@ -48,11 +72,151 @@ class TestTaskDistributor(test.TestCase):
                 mock.Mock(return_value=None))
     def test_distribute_new_job(self, mock_task_update, mock_assign_job,
                                 mock_partitioner_start,
-                                mock_get_task_executor):
+                                mock_get_task_executors):
         ctx = context.get_admin_context()
         task_distributor = TaskDistributor(ctx)
         task_distributor.distribute_new_job('fake_task_id')
         self.assertEqual(mock_assign_job.call_count, 1)
         self.assertEqual(mock_task_update.call_count, 1)
         self.assertEqual(mock_partitioner_start.call_count, 1)
-        self.assertEqual(mock_get_task_executor.call_count, 1)
+        self.assertEqual(mock_get_task_executors.call_count, 1)
+
+        task_distributor.distribute_new_job('fake_task_id')
+        # The partitioner is started once and reused
+        self.assertEqual(mock_partitioner_start.call_count, 1)
+
+    def _distribute_jobs(self, tasks, failed_tasks, **kwargs):
+        partitioner = mock.Mock()
+        partitioner.get_task_executors.side_effect = \
+            lambda task_ids: dict((task_id, RING[task_id])
+                                  for task_id in task_ids)
+        self.mock_object(TaskDistributor, '_get_partitioner',
+                         mock.Mock(return_value=partitioner))
+        distributor = TaskDistributor(context.get_admin_context())
+        distributor.task_rpcapi = mock.Mock()
+        moved = distributor.distribute_jobs(tasks, failed_tasks, **kwargs)
+        self.assertEqual(1, partitioner.get_task_executors.call_count)
+        return distributor.task_rpcapi, moved
+
+    @mock.patch.object(db, 'failed_tasks_update')
+    @mock.patch.object(db, 'tasks_update')
+    def test_distribute_jobs(self, mock_tasks_update,
+                             mock_failed_tasks_update):
+        rpcapi, moved = self._distribute_jobs(FAKE_TASKS, FAKE_FAILED_TASKS)
+        self.assertEqual((2, 1), moved)
+        mock_tasks_update.assert_called_once_with(mock.ANY, [
+            {'id': 2, 'executor': 'node3'}, {'id': 3, 'executor': 'node3'}])
+        mock_failed_tasks_update.assert_called_once_with(
+            mock.ANY, [{'id': 12, 'executor': 'node3'}])
+        rpcapi.remove_jobs.assert_called_once_with(mock.ANY, [2], [12],
+                                                   'node2')
+        rpcapi.assign_jobs.assert_called_once_with(mock.ANY, [2, 3], [12],
+                                                   'node3')
+        self.assertFalse(rpcapi.assign_job.called)
+
+    @mock.patch.object(db, 'failed_tasks_update')
+    @mock.patch.object(db, 'tasks_update')
+    def test_distribute_jobs_unchanged(self, mock_tasks_update,
+                                       mock_failed_tasks_update):
+        rpcapi, moved = self._distribute_jobs(
+            [FAKE_TASKS[0], FAKE_TASKS[3]], [FAKE_FAILED_TASKS[0]])
+        self.assertEqual((0, 0), moved)
+        self.assertFalse(mock_tasks_update.called)
+        self.assertFalse(mock_failed_tasks_update.called)
+        self.assertFalse(rpcapi.remove_jobs.called)
+        self.assertFalse(rpcapi.assign_jobs.called)
+
+    @mock.patch.object(db, 'failed_tasks_update', mock.Mock())
+    @mock.patch.object(db, 'tasks_update', mock.Mock())
+    def test_distribute_jobs_of_left_node(self):
+        rpcapi, moved = self._distribute_jobs(
+            [FAKE_TASKS[1]], [FAKE_FAILED_TASKS[1]], remove_moved=False)
+        self.assertEqual((1, 1), moved)
+        self.assertFalse(rpcapi.remove_jobs.called)
+        rpcapi.assign_jobs.assert_called_once_with(mock.ANY, [2], [12],
+                                                   'node3')
+
+
+class TestTaskDistributorPlacement(test.TestCase):
+
+    def setUp(self):
+        super(TestTaskDistributorPlacement, self).setUp()
+        self.ctx = context.get_admin_context()
+        patcher = mock.patch.object(TaskDistributor, '_predicted_loads', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.override_config('placement_metric_cost', 0, group='telemetry')
+        self.partitioner = mock.Mock()
+        self.partitioner.get_member_weights.return_value = {
+            'node1': 100, 'node2': 100}
+        self.mock_object(TaskDistributor, '_get_partitioner',
+                         mock.Mock(return_value=self.partitioner))
+        self.mock_object(db, 'tasks_update')
+        self.mock_object(db, 'failed_tasks_update')
+
+    def _create_tasks(self, executors, duration=None):
+        tasks = []
+        for executor in executors:
+            tasks.append(db_api.task_create(self.ctx, {
+                'storage_id': uuidutils.generate_uuid(), 'interval': 100,
+                'method': constants.TelemetryCollection
+                .PERFORMANCE_TASK_METHOD, 'executor': executor,
+                'last_duration': duration, 'deleted': False}))
+        return tasks
+
+    def _distributor(self):
+        distributor = TaskDistributor(self.ctx)
+        distributor.task_rpcapi = mock.Mock()
+        return distributor
+
+    def test_distribute_jobs_by_load(self):
+        heavy = self._create_tasks(['node1'] * 2, duration=50)
+        light = self._create_tasks(['node1'] * 10, duration=1)
+        distributor = self._distributor()
+        distributor.distribute_jobs(heavy + light)
+
+        placed = dict((task['id'], task['executor']) for task in heavy + light)
+        for update in db.tasks_update.call_args[0][1]:
+            placed[update['id']] = update['executor']
+        # 1.1 in all, each node stays under 1.25 of its half
+        loads = {'node1': 0.0, 'node2': 0.0}
+        for task in heavy:
+            loads[placed[task['id']]] += 0.5
+        for task in light:
+            loads[placed[task['id']]] += 0.01
+        self.assertLessEqual(max(loads.values()), 1.25 * 1.1 / 2)
+        self.assertFalse(self.partitioner.get_task_executors.called)
+
+        report = distributor.load_report({'node1': 1.1})
+        self.assertEqual(1.1, report['node1'][1])
+        self.assertAlmostEqual(loads['node2'], report['node2'][0])
+        self.assertEqual(0.0, report['node2'][1])
+
+    def test_distribute_jobs_of_left_node(self):
+        staying = self._create_tasks(['node1', 'node2'], duration=10)
+        left = self._create_tasks(['node3'] * 3, duration=10)
+        failed_tasks = [{'id': 11, 'task_id': left[0]['id'],
+                         'executor': 'node3'},
+                        {'id': 12, 'task_id': staying[1]['id'],
+                         'executor': 'node3'}]
+        moved = self._distributor().distribute_jobs(
+            left, failed_tasks, remove_moved=False)
+        self.assertEqual((3, 2), moved)
+        # Only the jobs of the left node move
+        updates = db.tasks_update.call_args[0][1]
+        self.assertEqual(set(task['id'] for task in left),
+                         set(update['id'] for update in updates))
+        executors = dict((update['id'], update['executor'])
+                         for update in updates)
+        failed_updates = db.failed_tasks_update.call_args[0][1]
+        self.assertEqual([
+            {'id': 11, 'executor': executors[left[0]['id']]},
+            {'id': 12, 'executor': 'node2'}], failed_updates)
+
+    def test_distribute_new_job(self):
+        self._create_tasks(['node1'] * 2, duration=10)
+        new_task = self._create_tasks([None])[0]
+        distributor = self._distributor()
+        distributor.distribute_new_job(new_task['id'])
+        distributor.task_rpcapi.assign_job.assert_called_once_with(
+            self.ctx, new_task['id'], 'node2')
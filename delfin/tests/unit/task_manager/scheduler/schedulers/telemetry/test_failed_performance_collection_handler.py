@@ -19,15 +19,15 @@ from oslo_utils import uuidutils
 
 from delfin import context
 from delfin import db
-from delfin import exception
 from delfin import test
 from delfin.common.constants import TelemetryCollection
 from delfin.common.constants import TelemetryTaskStatus, TelemetryJobStatus
 from delfin.db.sqlalchemy.models import FailedTask
 from delfin.db.sqlalchemy.models import Task
+from delfin.task_manager.scheduler import job_executors
 from delfin.task_manager.scheduler.schedulers.telemetry. \
     failed_performance_collection_handler import \
-    FailedPerformanceCollectionHandler
+    FailedPerformanceCollectionHandler, coalesce_windows
 
 fake_failed_job_id = 43
 
@@ -71,131 +71,106 @@ fake_telemetry_job = {
 }
 
 
-def failed_task_not_found_exception(ctx, failed_task_id):
-    raise exception.FailedTaskNotFound("Failed Task not found.")
+def failed_task(failed_task_id, start_time, end_time, retry_count=0):
+    failed_task = fake_failed_job.copy()
+    failed_task.update({FailedTask.id.name: failed_task_id,
+                        FailedTask.start_time.name: start_time,
+                        FailedTask.end_time.name: end_time,
+                        FailedTask.retry_count.name: retry_count})
+    return failed_task
 
 
+@mock.patch.object(db, 'task_get', mock.Mock(return_value=fake_telemetry_job))
+@mock.patch.object(db, 'failed_task_get',
+                   mock.Mock(return_value=fake_failed_job))
 class TestFailedPerformanceCollectionHandler(test.TestCase):
 
-    @mock.patch.object(db, 'task_get',
-                       mock.Mock(return_value=fake_telemetry_job))
-    @mock.patch.object(db, 'failed_task_get',
-                       mock.Mock(return_value=fake_failed_job))
+    def _backfill(self, failed_tasks, capabilities=None):
+        ctx = context.get_admin_context()
+        with mock.patch.object(db, 'failed_task_get_all',
+                               mock.Mock(return_value=failed_tasks)), \
+                mock.patch('delfin.drivers.api.API.get_capabilities',
+                           mock.Mock(return_value=capabilities or {})):
+            failed_job_handler = \
+                FailedPerformanceCollectionHandler.get_instance(
+                    ctx, fake_failed_job_id)
+            failed_job_handler()
+        return ctx
+
     @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job')
-    @mock.patch('delfin.db.failed_task_update')
+    @mock.patch('delfin.db.failed_tasks_delete')
+    @mock.patch('delfin.db.failed_tasks_update')
     @mock.patch('delfin.task_manager.tasks.telemetry'
                 '.PerformanceCollectionTask.collect')
     def test_failed_job_success(self, mock_collect_telemetry,
-                                mock_failed_task_update, mock_failed_job):
+                                mock_failed_tasks_update,
+                                mock_failed_tasks_delete, mock_failed_job):
         mock_collect_telemetry.return_value = TelemetryTaskStatus. \
             TASK_EXEC_STATUS_SUCCESS
-        ctx = context.get_admin_context()
-        failed_job_handler = FailedPerformanceCollectionHandler.get_instance(
-            ctx, fake_failed_job_id)
-        # call failed job
-        failed_job_handler()
+        ctx = self._backfill([fake_failed_job])
+
+        # The last failed task of the job is removed with the job
+        mock_failed_job.assert_called_once_with(ctx, fake_failed_job_id,
+                                                'node1')
+        self.assertFalse(mock_failed_tasks_update.called)
+        self.assertFalse(mock_failed_tasks_delete.called)
 
-        self.assertEqual(mock_failed_job.call_count, 1)
-        mock_failed_task_update.assert_called_once_with(
-            ctx,
-            fake_failed_job_id,
-            {
-                FailedTask.retry_count.name: 1,
-                FailedTask.result.name:
-                    TelemetryJobStatus.FAILED_JOB_STATUS_SUCCESS})
-
-    @mock.patch.object(db, 'task_get',
-                       mock.Mock(return_value=fake_telemetry_job))
-    @mock.patch.object(db, 'failed_task_get',
-                       mock.Mock(return_value=fake_failed_job))
     @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job')
-    @mock.patch('delfin.db.failed_task_update')
-    @mock.patch('delfin.task_manager.rpcapi.TaskAPI.collect_telemetry')
+    @mock.patch('delfin.db.failed_tasks_update')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
     def test_failed_job_failure(self, mock_collect_telemetry,
-                                mock_failed_task_update, mock_failed_job):
+                                mock_failed_tasks_update, mock_failed_job):
         mock_collect_telemetry.return_value = TelemetryTaskStatus. \
             TASK_EXEC_STATUS_FAILURE
-        ctx = context.get_admin_context()
-        failed_job_handler = FailedPerformanceCollectionHandler.get_instance(
-            ctx, fake_failed_job_id)
-        # retry
-        # call failed job
-        failed_job_handler()
+        ctx = self._backfill([fake_failed_job])
 
         self.assertEqual(mock_failed_job.call_count, 0)
-        mock_failed_task_update.assert_called_once_with(
-            ctx,
-            fake_failed_job_id,
-            {
-                FailedTask.retry_count.name: 1,
-                FailedTask.result.name:
-                    TelemetryJobStatus.FAILED_JOB_STATUS_RETRYING})
-
-    @mock.patch.object(db, 'task_get',
-                       mock.Mock(return_value=fake_telemetry_job))
-    @mock.patch.object(db, 'failed_task_get')
+        mock_failed_tasks_update.assert_called_once_with(ctx, [{
+            FailedTask.id.name: fake_failed_job_id,
+            FailedTask.retry_count.name: 1,
+            FailedTask.result.name:
+                TelemetryJobStatus.FAILED_JOB_STATUS_RETRYING}])
+
     @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job')
-    @mock.patch('delfin.db.failed_task_update')
-    @mock.patch('delfin.task_manager.rpcapi.TaskAPI.collect_telemetry')
+    @mock.patch('delfin.db.failed_tasks_update')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
     def test_failed_job_fail_max_times(self, mock_collect_telemetry,
-                                       mock_failed_task_update,
-                                       mock_remove_job,
-                                       mock_failed_task_get):
+                                       mock_failed_tasks_update,
+                                       mock_remove_job):
         mock_collect_telemetry.return_value = TelemetryTaskStatus. \
             TASK_EXEC_STATUS_FAILURE
-
         failed_job = fake_failed_job.copy()
-        failed_job[
-            FailedTask.retry_count.name] = \
+        failed_job[FailedTask.retry_count.name] = \
             TelemetryCollection.MAX_FAILED_JOB_RETRY_COUNT - 1
-        # return with maximum retry count
-        mock_failed_task_get.return_value = failed_job
-
-        ctx = context.get_admin_context()
-        failed_job_handler = FailedPerformanceCollectionHandler.get_instance(
-            ctx, fake_failed_job_id)
-        # call failed job
-        failed_job_handler()
+        self._backfill([failed_job])
 
         self.assertEqual(mock_remove_job.call_count, 1)
-        mock_failed_task_update.assert_called_once_with(
-            ctx,
-            fake_failed_job_id,
-            {
-                FailedTask.retry_count.name:
-                    TelemetryCollection.MAX_FAILED_JOB_RETRY_COUNT,
-                FailedTask.result.name:
-                    TelemetryJobStatus.FAILED_JOB_STATUS_INIT})
-
-    @mock.patch.object(db, 'task_get',
-                       mock.Mock(return_value=fake_telemetry_job))
-    @mock.patch.object(db, 'failed_task_get',
-                       mock.Mock(return_value=fake_deleted_storage_failed_job))
+        self.assertFalse(mock_failed_tasks_update.called)
+
     @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job')
-    @mock.patch('delfin.db.failed_task_update')
-    @mock.patch('delfin.task_manager.rpcapi.TaskAPI.collect_telemetry')
+    @mock.patch('delfin.db.failed_tasks_update')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
     def test_failed_job_deleted_storage(self, mock_collect_telemetry,
-                                        mock_failed_task_update,
-                                        mock_pause_job):
-        ctx = context.get_admin_context()
-        failed_job_handler = FailedPerformanceCollectionHandler.get_instance(
-            ctx, fake_failed_job_id)
-        failed_job_handler()
+                                        mock_failed_tasks_update,
+                                        mock_remove_job):
+        self._backfill([fake_deleted_storage_failed_job])
 
         # Verify that no action performed for deleted storage failed tasks
         self.assertEqual(mock_collect_telemetry.call_count, 0)
-        self.assertEqual(mock_failed_task_update.call_count, 0)
+        self.assertEqual(mock_failed_tasks_update.call_count, 0)
+        self.assertEqual(mock_remove_job.call_count, 0)
 
-    @mock.patch.object(db, 'task_get',
-                       mock.Mock(return_value=fake_telemetry_job))
-    @mock.patch.object(db, 'failed_task_get', failed_task_not_found_exception)
     @mock.patch(
         'delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job',
         mock.Mock())
-    @mock.patch('delfin.db.failed_task_update')
-    @mock.patch('delfin.task_manager.rpcapi.TaskAPI.collect_telemetry')
+    @mock.patch('delfin.db.failed_tasks_update')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
     def test_deleted_storage_exception(self, mock_collect_telemetry,
-                                       mock_failed_task_update):
+                                       mock_failed_tasks_update):
         ctx = context.get_admin_context()
         failed_job_handler = FailedPerformanceCollectionHandler(
             ctx, 1122, '12c2d52f-01bc-41f5-b73f-7abf6f38a2a6', '',
@@ -204,4 +179,111 @@ class TestFailedPerformanceCollectionHandler(test.TestCase):
 
         # Verify that no action performed for deleted storage failed tasks
         self.assertEqual(mock_collect_telemetry.call_count, 0)
-        self.assertEqual(mock_failed_task_update.call_count, 0)
+        self.assertEqual(mock_failed_tasks_update.call_count, 0)
+
+    @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job')
+    @mock.patch('delfin.db.failed_tasks_delete')
+    @mock.patch('delfin.db.failed_tasks_update')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
+    def test_backfill_coalesced_windows(self, mock_collect_telemetry,
+                                        mock_failed_tasks_update,
+                                        mock_failed_tasks_delete,
+                                        mock_remove_job):
+        # An outage of three overlapping windows, and a later one
+        mock_collect_telemetry.side_effect = [True, False]
+        ctx = self._backfill([failed_task(1, 0, 960000),
+                              failed_task(3, 1800000, 2760000),
+                              failed_task(2, 900000, 1860000),
+                              failed_task(4, 9000000, 9960000, 2)])
+
+        self.assertEqual(
+            [(0, 2760000), (9000000, 9960000)],
+            [call[0][3:5] for call in mock_collect_telemetry.call_args_list])
+        mock_failed_tasks_update.assert_called_once_with(ctx, [{
+            FailedTask.id.name: 4,
+            FailedTask.retry_count.name: 3,
+            FailedTask.result.name:
+                TelemetryJobStatus.FAILED_JOB_STATUS_RETRYING}])
+        mock_failed_tasks_delete.assert_called_once_with(ctx, [1, 2, 3])
+        self.assertFalse(mock_remove_job.called)
+
+    @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job')
+    @mock.patch('delfin.db.failed_tasks_delete')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
+    def test_backfill_retention_window(self, mock_collect_telemetry,
+                                       mock_failed_tasks_delete,
+                                       mock_remove_job):
+        mock_collect_telemetry.return_value = True
+        now = int(datetime.now().timestamp()) * 1000
+        ctx = self._backfill([
+            failed_task(1, now - 9000000, now - 8000000),
+            failed_task(2, now - 2900000, now - 2000000),
+            failed_task(3, now - 2000000, now - 1000000),
+            failed_task(4, now - 1000000, now)],
+            {'performance_metric_retention_window': 2500})
+
+        # The expired window is given up, the others are collected from
+        # the oldest time kept in windows of the retention window at most
+        collected = [call[0][3:5]
+                     for call in mock_collect_telemetry.call_args_list]
+        self.assertEqual(2, len(collected))
+        self.assertGreaterEqual(collected[0][0], now - 2500000)
+        self.assertEqual(now - 1000000, collected[0][1])
+        self.assertEqual((now - 1000000, now), collected[1])
+        mock_failed_tasks_delete.assert_called_once_with(ctx, [1, 2, 3])
+        mock_remove_job.assert_called_once_with(ctx, 4, 'node1')
+
+    @mock.patch.object(job_executors.pools, 'collecting',
+                       mock.Mock(return_value=True))
+    @mock.patch('delfin.db.failed_tasks_update')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
+    def test_backfill_yields_to_collection(self, mock_collect_telemetry,
+                                           mock_failed_tasks_update):
+        self._backfill([fake_failed_job])
+
+        self.assertFalse(mock_collect_telemetry.called)
+        self.assertFalse(mock_failed_tasks_update.called)
+
+    @mock.patch.object(job_executors.pools, 'collecting',
+                       mock.Mock(return_value=True))
+    @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.remove_failed_job')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
+    def test_backfill_deferrals_capped(self, mock_collect_telemetry,
+                                       mock_remove_job):
+        mock_collect_telemetry.return_value = True
+        ctx = context.get_admin_context()
+        failed_job_handler = FailedPerformanceCollectionHandler.get_instance(
+            ctx, fake_failed_job_id)
+        with mock.patch.object(db, 'failed_task_get_all',
+                               mock.Mock(return_value=[fake_failed_job])), \
+                mock.patch('delfin.drivers.api.API.get_capabilities',
+                           mock.Mock(return_value={})):
+            for _ in range(TelemetryCollection.MAX_FAILED_JOB_DEFERRALS):
+                failed_job_handler()
+            self.assertFalse(mock_collect_telemetry.called)
+
+            # A storage always collecting does not starve its backfill
+            failed_job_handler()
+        self.assertEqual(1, mock_collect_telemetry.call_count)
+        self.assertEqual(1, mock_remove_job.call_count)
+        self.assertEqual(0, failed_job_handler.deferrals)
+
+
+class TestCoalesceWindows(test.TestCase):
+
+    def test_coalesce_windows(self):
+        failed_tasks = [failed_task(1, 0, 10), failed_task(2, 10, 20),
+                        failed_task(3, 15, 30), failed_task(4, 31, 40),
+                        failed_task(5, 40, 100), failed_task(6, 50, 60)]
+        windows = coalesce_windows(failed_tasks, 30)
+        self.assertEqual(
+            [(0, 30, [1, 2, 3]), (31, 40, [4]), (40, 100, [5]),
+             (50, 60, [6])],
+            [(start, end, [failed_task[FailedTask.id.name]
+                           for failed_task in window_tasks])
+             for start, end, window_tasks in windows])
+        self.assertEqual([], coalesce_windows([], 30))
@@ -21,6 +21,7 @@ from delfin import db
 from delfin import test
 from delfin.common import constants
 from delfin.db.sqlalchemy.models import Task
+from delfin.task_manager.scheduler import job_phases
 from delfin.task_manager.scheduler.schedulers.telemetry.job_handler import \
     JobHandler
 from delfin.task_manager.scheduler.schedulers.telemetry.job_handler import \
@@ -78,6 +79,7 @@ Incorrect_telemetry_jobs = [
 ]
 fake_failed_job = {
     FailedTask.id.name: 43,
+    FailedTask.storage_id.name: uuidutils.generate_uuid(),
     FailedTask.retry_count.name: 0,
     FailedTask.result.name: "Init",
     FailedTask.job_id.name: "fake_job_id",
@@ -116,6 +118,13 @@ class TestTelemetryJob(test.TestCase):
         # call telemetry job scheduling
         telemetry_job.schedule_job(fake_telemetry_job['id'])
         self.assertEqual(mock_add_job.call_count, 1)
+        # The job starts at the phase of its storage in the interval
+        next_run_time = datetime.strptime(
+            mock_add_job.call_args[1]['next_run_time'], '%Y-%m-%d %H:%M:%S')
+        self.assertEqual(
+            job_phases.hashed_phase(fake_telemetry_job['storage_id'], 10),
+            int(next_run_time.timestamp()) % 10)
+        telemetry_job.stop()
 
     @mock.patch.object(db, 'task_delete',
                        mock.Mock())
@@ -157,6 +166,13 @@ class TestFailedTelemetryJob(test.TestCase):
         # call failed job scheduling
         failed_job.schedule_failed_job(fake_failed_job['id'])
         self.assertEqual(mock_add_job.call_count, 1)
+        next_run_time = mock_add_job.call_args[1]['next_run_time']
+        # Half an interval after the collection job of the storage
+        live_phase = job_phases.hashed_phase(fake_failed_job['storage_id'],
+                                             20)
+        self.assertEqual((live_phase + 10) % 20,
+                         int(next_run_time.timestamp()) % 20)
+        failed_job.stop()
 
     @mock.patch.object(db, 'failed_task_get',
                        mock.Mock(return_value=fake_failed_job))
@@ -229,3 +245,100 @@ class TestFailedTelemetryJob(test.TestCase):
         # entry get deleted and job get removed
         self.assertEqual(mock_failed_task_delete.call_count, 1)
         self.assertEqual(mock_remove_job.call_count, 0)
+
+    @mock.patch.object(db, 'task_get',
+                       mock.Mock(return_value=fake_telemetry_job))
+    @mock.patch.object(db, 'failed_task_update')
+    @mock.patch.object(db, 'failed_task_get')
+    @mock.patch(
+        'apscheduler.schedulers.background.BackgroundScheduler.get_job')
+    @mock.patch(
+        'apscheduler.schedulers.background.BackgroundScheduler.add_job')
+    def test_failed_jobs_share_backfill_job(self, mock_add_job, mock_get_job,
+                                            mock_failed_task_get,
+                                            mock_failed_task_update):
+        failed_jobs = {}
+        for failed_task_id in (51, 52):
+            failed_jobs[failed_task_id] = dict(
+                fake_failed_job, id=failed_task_id, job_id=None, task_id=2,
+                retry_count=0, result='Init')
+        mock_failed_task_get.side_effect = \
+            lambda ctx, failed_task_id: failed_jobs[failed_task_id]
+        added = set()
+        mock_add_job.side_effect = \
+            lambda *args, **kwargs: added.add(kwargs['id'])
+        mock_get_job.side_effect = lambda job_id: job_id in added
+
+        failed_job = FailedJobHandler(context.get_admin_context())
+        failed_job.schedule_failed_job(51)
+        failed_job.schedule_failed_job(52)
+
+        # One job backfills the failed windows of the task
+        self.assertEqual(1, mock_add_job.call_count)
+        self.assertEqual({'backfill-2'}, added)
+        self.assertEqual(
+            [(51, {'job_id': 'backfill-2'}), (52, {'job_id': 'backfill-2'})],
+            [call[0][1:] for call in mock_failed_task_update.call_args_list])
+        self.assertEqual('backfill', mock_add_job.call_args[1]['executor'])
+
+    @mock.patch(
+        'apscheduler.schedulers.background.BackgroundScheduler.remove_job')
+    @mock.patch(
+        'apscheduler.schedulers.background.BackgroundScheduler.get_job',
+        mock.Mock(return_value=True))
+    @mock.patch.object(db, 'failed_task_delete')
+    @mock.patch.object(db, 'failed_task_get_all')
+    @mock.patch.object(db, 'failed_task_get')
+    def test_failed_job_removal_with_shared_job(self, mock_failed_task_get,
+                                                mock_failed_get_all,
+                                                mock_failed_task_delete,
+                                                mock_remove_job):
+        failed_job = dict(fake_failed_job, id=51, job_id='backfill-2')
+        mock_failed_task_get.return_value = failed_job
+        mock_failed_get_all.return_value = [
+            dict(failed_job, id=52)]
+
+        handler = FailedJobHandler(context.get_admin_context())
+        handler.remove_failed_job(51)
+
+        # The job still backfills the other failed task
+        mock_failed_task_delete.assert_called_once_with(handler.ctx, 51)
+        self.assertFalse(mock_remove_job.called)
+
+        mock_failed_get_all.return_value = []
+        handler.remove_failed_job(51)
+        mock_remove_job.assert_called_once_with('backfill-2')
+
+    @mock.patch.object(db, 'task_update', mock.Mock())
+    @mock.patch.object(db, 'failed_task_update', mock.Mock())
+    @mock.patch(
+        'apscheduler.schedulers.background.BackgroundScheduler.get_job',
+        mock.Mock(return_value=None))
+    @mock.patch(
+        'apscheduler.schedulers.background.BackgroundScheduler.add_job')
+    def test_backfill_job_apart_from_collection(self, mock_add_job):
+        storage_id = uuidutils.generate_uuid()
+        task = dict(fake_telemetry_job, storage_id=storage_id, interval=900)
+        failed_task = dict(fake_failed_job, storage_id=storage_id,
+                           interval=900, task_id=task['id'], job_id=None,
+                           retry_count=0, result='Init')
+        ctx = context.get_admin_context()
+        with mock.patch.object(db, 'task_get',
+                               mock.Mock(return_value=task)), \
+                mock.patch.object(db, 'failed_task_get',
+                                  mock.Mock(return_value=failed_task)):
+            live = JobHandler(ctx, task['id'], storage_id, task['args'],
+                              task['interval'])
+            live.schedule_job(task['id'])
+            failed = FailedJobHandler(ctx)
+            failed.schedule_failed_job(failed_task['id'])
+
+        live_start, failed_start = [
+            call[1]['next_run_time'] for call in mock_add_job.call_args_list]
+        live_start = datetime.strptime(live_start, '%Y-%m-%d %H:%M:%S')
+        # The collection and the backfill of a storage of the same interval
+        # start half an interval apart
+        self.assertEqual(450, int(failed_start.timestamp() -
+                                  live_start.timestamp()) % 900)
+        live.stop()
+        failed.stop()
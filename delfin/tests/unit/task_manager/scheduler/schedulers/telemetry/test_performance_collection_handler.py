@@ -14,6 +14,7 @@
 
 from unittest import mock
 
+import eventlet
 from oslo_utils import uuidutils
 
 from delfin import context
@@ -23,6 +24,7 @@ from delfin import test
 from delfin.common import constants
 from delfin.common.constants import TelemetryTaskStatus
 from delfin.db.sqlalchemy.models import Task
+from delfin.task_manager.scheduler import job_executors
 from delfin.task_manager.scheduler.schedulers.telemetry. \
     performance_collection_handler import \
     PerformanceCollectionHandler
@@ -74,6 +76,9 @@ class TestPerformanceCollectionHandler(test.TestCase):
 
         self.assertEqual(mock_collect_telemetry.call_count, 1)
         self.assertEqual(mock_task_update.call_count, 1)
+        values = mock_task_update.call_args[0][2]
+        self.assertGreaterEqual(values['last_duration'], 0)
+        self.assertEqual(0, values['last_metric_count'])
 
     @mock.patch('delfin.db.task_update')
     @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.assign_failed_job')
@@ -103,6 +108,34 @@ class TestPerformanceCollectionHandler(test.TestCase):
         self.assertEqual(mock_assign_failed_job.call_count, 1)
         self.assertEqual(mock_task_update.call_count, 1)
 
+    @mock.patch('delfin.db.task_update')
+    @mock.patch('delfin.task_manager.metrics_rpcapi.TaskAPI.assign_failed_job')
+    @mock.patch.object(db, 'task_get',
+                       mock.Mock(return_value=fake_telemetry_job))
+    @mock.patch('delfin.db.failed_task_create')
+    @mock.patch('delfin.task_manager.tasks.telemetry'
+                '.PerformanceCollectionTask.collect')
+    @mock.patch('delfin.drivers.api.API.get_capabilities')
+    @mock.patch.object(job_executors, 'collection_timeout',
+                       mock.Mock(return_value=0.05))
+    def test_performance_collection_timeout(self, mock_get_capabilities,
+                                            mock_collect_telemetry,
+                                            mock_failed_task_create,
+                                            mock_assign_failed_job,
+                                            mock_task_update):
+        mock_get_capabilities.return_value = {}
+        # A collection hanging on its I/O
+        mock_collect_telemetry.side_effect = lambda *args: eventlet.sleep(5)
+        ctx = context.get_admin_context()
+        perf_collection_handler = PerformanceCollectionHandler.get_instance(
+            ctx, fake_task_id)
+        perf_collection_handler()
+
+        # The collection is cancelled and recorded as failed
+        self.assertEqual(mock_failed_task_create.call_count, 1)
+        self.assertEqual(mock_assign_failed_job.call_count, 1)
+        self.assertFalse(mock_task_update.called)
+
     @mock.patch.object(db, 'task_get',
                        mock.Mock(return_value=fake_deleted_telemetry_job))
     @mock.patch('delfin.db.task_update')
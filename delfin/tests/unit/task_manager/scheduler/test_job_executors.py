@@ -0,0 +1,141 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime, timedelta
+from unittest import mock
+
+import eventlet
+from pytz import utc
+
+from delfin import db
+from delfin import exception
+from delfin import test
+from delfin.task_manager.scheduler import job_executors
+
+STORAGES = {
+    'storage1': {'vendor': 'fake_vendor', 'model': 'fake_model'},
+    'storage2': {'vendor': 'fake_vendor', 'model': 'fake_model'},
+    'storage3': {'vendor': 'other_vendor', 'model': 'other_model'},
+}
+
+
+def fake_storage_get(context, storage_id):
+    if storage_id not in STORAGES:
+        raise exception.StorageNotFound(storage_id)
+    return STORAGES[storage_id]
+
+
+class TestJobPools(test.TestCase):
+
+    def setUp(self):
+        super(TestJobPools, self).setUp()
+        self.mock_object(db, 'storage_get_cached', fake_storage_get)
+        self.pools = job_executors.JobPools()
+        self.scheduler = mock.Mock()
+
+    def test_pool_by_driver(self):
+        alias = self.pools.executor(self.scheduler, 'job1', 'storage1')
+        self.assertEqual('collection-fake_vendor-fake_model', alias)
+        self.assertEqual(alias, self.pools.executor(self.scheduler, 'job2',
+                                                    'storage2'))
+        self.assertEqual('collection-other_vendor-other_model',
+                         self.pools.executor(self.scheduler, 'job3',
+                                             'storage3'))
+        self.assertEqual('collection-unknown', self.pools.executor(
+            self.scheduler, 'job4', 'unknown'))
+        self.assertEqual(3, self.scheduler.add_executor.call_count)
+
+        # A pool is removed with its last job
+        self.pools.release(self.scheduler, 'job1')
+        self.assertFalse(self.scheduler.remove_executor.called)
+        self.pools.release(self.scheduler, 'job2')
+        self.scheduler.remove_executor.assert_called_once_with(
+            alias, shutdown=False)
+        self.pools.release(self.scheduler, 'job2')
+        self.assertEqual(1, self.scheduler.remove_executor.call_count)
+
+    def test_pool_by_storage(self):
+        self.override_config('collection_pool_by', 'storage',
+                             group='telemetry')
+        self.assertEqual('collection-storage1', self.pools.executor(
+            self.scheduler, 'job1', 'storage1'))
+        self.assertEqual('collection-storage2', self.pools.executor(
+            self.scheduler, 'job2', 'storage2'))
+
+    def test_default_pool(self):
+        self.override_config('collection_pool_by', 'none', group='telemetry')
+        self.assertEqual('default', self.pools.executor(
+            self.scheduler, 'job1', 'storage1'))
+        self.assertFalse(self.scheduler.add_executor.called)
+        self.pools.release(self.scheduler, 'job1')
+        self.assertFalse(self.scheduler.remove_executor.called)
+
+    def test_backfill_pool(self):
+        self.override_config('backfill_pool_size', 2, group='telemetry')
+        self.assertEqual('backfill', self.pools.executor(
+            self.scheduler, 'job1', 'storage1', backfill=True))
+        self.assertEqual('backfill', self.pools.executor(
+            self.scheduler, 'job2', 'storage3', backfill=True))
+        self.assertEqual(1, self.scheduler.add_executor.call_count)
+        executor = self.scheduler.add_executor.call_args[0][0]
+        self.assertEqual(2, executor._pool._max_workers)
+        executor.shutdown(wait=False)
+
+    def test_collecting(self):
+        self.pools.executor(self.scheduler, 'job1', 'storage1')
+        self.pools.executor(self.scheduler, 'job2', 'storage1',
+                            backfill=True)
+
+        # Backfills do not count as collections of their storage
+        self.pools.started('job2')
+        self.assertFalse(self.pools.collecting('storage1'))
+        self.pools.started('job1')
+        self.assertTrue(self.pools.collecting('storage1'))
+        self.assertFalse(self.pools.collecting('storage2'))
+        self.pools.record('job1', 0.0, 1.0)
+        self.assertFalse(self.pools.collecting('storage1'))
+
+    def test_wait_and_run_times(self):
+        self.pools.executor(self.scheduler, 'job1', 'storage1')
+        executor = self.scheduler.add_executor.call_args[0][0]
+        job = mock.Mock(id='job1', misfire_grace_time=None, args=(),
+                        kwargs={}, func=lambda: eventlet.sleep(0.05))
+        run_times = [datetime.now(utc) - timedelta(seconds=2)]
+        executor._run_job(job, run_times)
+        executor._run_job(job, run_times)
+        report = self.pools.report()
+        storage_id, runs, wait, run = report['job1']
+        self.assertEqual(('storage1', 2), (storage_id, runs))
+        self.assertGreaterEqual(wait, 2)
+        self.assertGreaterEqual(run, 0.05)
+        self.assertEqual({}, self.pools.report())
+        executor.shutdown(wait=False)
+
+
+class TestHardTimeout(test.TestCase):
+
+    def test_timeout(self):
+        def hang():
+            with job_executors.hard_timeout(0.05):
+                eventlet.sleep(5)
+        self.assertRaises(exception.TelemetryTaskTimeout, hang)
+
+    def test_no_timeout(self):
+        with job_executors.hard_timeout(None):
+            eventlet.sleep(0.01)
+
+    def test_collection_timeout(self):
+        self.assertEqual(900, job_executors.collection_timeout(900))
+        self.assertIsNone(job_executors.collection_timeout(0))
+        self.override_config('collection_timeout', 60, group='telemetry')
+        self.assertEqual(60, job_executors.collection_timeout(900))
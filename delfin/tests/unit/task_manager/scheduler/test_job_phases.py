@@ -0,0 +1,98 @@
+# Copyright 2022 The SODA Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import collections
+
+from oslo_utils import uuidutils
+
+from delfin import test
+from delfin.task_manager.scheduler import job_phases
+
+NOW = 1600000000
+
+
+class TestJobPhases(test.TestCase):
+
+    def setUp(self):
+        super(TestJobPhases, self).setUp()
+        self.phases = job_phases.JobPhases()
+
+    def test_next_run_time(self):
+        self.assertEqual(NOW + 5, job_phases.next_run_time(
+            (NOW + 5) % 900, 900, NOW))
+        # A job never starts at once
+        self.assertEqual(NOW + 900, job_phases.next_run_time(
+            NOW % 900, 900, NOW + 0.5))
+
+    def test_phase_of_storage(self):
+        storage_id = uuidutils.generate_uuid()
+        first = self.phases.reserve('job1', storage_id, 900, NOW)
+        self.assertEqual(job_phases.hashed_phase(storage_id, 900),
+                         first % 900)
+        self.assertTrue(NOW < first <= NOW + 900)
+        # Same phase when scheduled again later
+        self.phases.release('job1')
+        again = self.phases.reserve('job2', storage_id, 900, NOW + 7)
+        self.assertEqual(first % 900, again % 900)
+        self.assertEqual(1, len(self.phases))
+
+    def test_offset_phase(self):
+        storage_id = uuidutils.generate_uuid()
+        live = self.phases.reserve('live', storage_id, 900, NOW)
+        failed = self.phases.reserve('failed', storage_id, 900, NOW,
+                                     offset=0.5)
+        self.assertEqual(450, (failed - live) % 900)
+        # A shorter interval dividing the one of the collection never
+        # starts with it either
+        failed = self.phases.reserve('failed', storage_id, 180, NOW,
+                                     offset=0.5)
+        starts = set(failed + i * 180 for i in range(10))
+        self.assertFalse(starts & set(live + i * 900 for i in range(2)))
+
+    def test_jobs_are_spread(self):
+        starts = collections.Counter(
+            self.phases.reserve(i, uuidutils.generate_uuid(), 900, NOW)
+            for i in range(300))
+        # Without spreading all the jobs start at NOW + 900
+        self.assertGreater(len(starts), 200)
+
+    def test_not_spread(self):
+        self.override_config('job_phase_spread', False, group='telemetry')
+        self.assertEqual(NOW + 900, self.phases.reserve('job1', 'storage',
+                                                        900, NOW))
+
+    def test_jitter_takes_free_seconds(self):
+        self.override_config('job_phase_jitter', 0.1, group='telemetry')
+        starts = [self.phases.reserve(i, 'storage', 100, NOW)
+                  for i in range(11)]
+        # Jobs of the same storage take the 11 seconds after the phase
+        phase = job_phases.hashed_phase('storage', 100)
+        self.assertEqual(list(range(11)),
+                         [(start - phase) % 100 for start in starts])
+        # A released second is taken again
+        self.phases.release(5)
+        self.assertEqual(starts[5], self.phases.reserve(11, 'storage', 100,
+                                                        NOW))
+
+    def test_peak_concurrency(self):
+        self.phases.reserve('job1', 'storage1', 900, NOW)
+        self.phases.reserve('job2', 'storage2', 900, NOW)
+        self.phases.record_start('job1', NOW)
+        self.phases.record_start('job2', NOW + 0.5)
+        self.phases.record_start('job1', NOW + 3)
+        self.phases.record_start('other', NOW + 3)
+        self.phases.record_start('job2', NOW + 10)
+        self.assertEqual(2, self.phases.peak_concurrency(NOW + 10))
+        # Seconds reported are forgotten, the current one is kept
+        self.assertEqual(0, self.phases.peak_concurrency(NOW + 10))
+        self.assertEqual(1, self.phases.peak_concurrency(NOW + 11))
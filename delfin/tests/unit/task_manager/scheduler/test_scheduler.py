@@ -18,10 +18,10 @@ from apscheduler.schedulers.background import BackgroundScheduler
 
 from delfin import db
 from delfin import test
-from delfin.coordination import ConsistentHashing
+from delfin.exporter import base_exporter
 from delfin.leader_election.distributor.task_distributor \
     import TaskDistributor
-from delfin.task_manager.metrics_rpcapi import TaskAPI
+from delfin.task_manager.scheduler import job_phases
 from delfin.task_manager.scheduler import schedule_manager
 
 FAKE_TASKS = [
@@ -59,47 +59,62 @@ class TestScheduler(test.TestCase):
         manager.start()
         self.assertEqual(mock_scheduler_start.call_count, 1)
 
-    @mock.patch('tooz.coordination.get_coordinator', mock.Mock())
-    @mock.patch.object(ConsistentHashing, 'get_task_executor')
-    @mock.patch.object(TaskAPI, 'remove_job')
-    @mock.patch.object(TaskDistributor, 'distribute_new_job')
+    @mock.patch.object(base_exporter.PerformanceExporterManager, 'dispatch')
+    def test_report_job_metrics(self, mock_dispatch):
+        phases = job_phases.JobPhases()
+        patcher = mock.patch.object(job_phases, 'phases', phases)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        manager = schedule_manager.SchedulerManager()
+        manager.report_job_metrics()
+        # Nothing to report without collection jobs
+        self.assertFalse(mock_dispatch.called)
+
+        phases.reserve('job1', 'storage1', 900)
+        phases.reserve('job2', 'storage2', 900)
+        phases.record_start('job1', 1000)
+        phases.record_start('job2', 1000)
+        manager.report_job_metrics()
+        metrics = list(mock_dispatch.call_args[0][1])
+        self.assertEqual(1, len(metrics))
+        self.assertEqual('jobConcurrency', metrics[0].name)
+        self.assertEqual('executor', metrics[0].labels['resource_type'])
+        self.assertEqual([2], list(metrics[0].values.values()))
+
+    @mock.patch.object(TaskDistributor, 'distribute_jobs')
+    @mock.patch.object(db, 'failed_task_get_all')
     @mock.patch.object(db, 'task_get_all')
-    def test_on_node_join(self, mock_task_get_all, mock_distribute_new_job,
-                          mock_remove_job, mock_get_task_executor):
-        node1_job_count = 0
-        node2_job_count = 0
-        for job in FAKE_TASKS:
-            if job['executor'] == 'node1':
-                node1_job_count += 1
-            elif job['executor'] == 'node2':
-                node2_job_count += 1
+    def test_on_node_join(self, mock_task_get_all, mock_failed_task_get_all,
+                          mock_distribute_jobs):
         mock_task_get_all.return_value = FAKE_TASKS
-        mock_get_task_executor.return_value = 'node1'
+        mock_failed_task_get_all.return_value = []
         manager = schedule_manager.SchedulerManager()
         manager.on_node_join(mock.Mock(member_id=b'fake_member_id',
                                        group_id='node1'))
         self.assertEqual(mock_task_get_all.call_count, 1)
-        self.assertEqual(mock_distribute_new_job.call_count,
-                         node1_job_count + node2_job_count)
-        self.assertEqual(mock_remove_job.call_count, node2_job_count)
-        self.assertEqual(mock_get_task_executor.call_count,
-                         node1_job_count + node2_job_count)
+        mock_distribute_jobs.assert_called_once_with(FAKE_TASKS, [])
 
-    @mock.patch.object(TaskDistributor, 'distribute_new_job')
+    @mock.patch.object(TaskDistributor, 'distribute_jobs')
+    @mock.patch.object(db, 'failed_task_get_all')
     @mock.patch.object(db, 'task_get_all')
-    def test_on_node_leave(self, mock_task_get_all, mock_distribute_new_job):
+    def test_on_node_leave(self, mock_task_get_all, mock_failed_task_get_all,
+                           mock_distribute_jobs):
         mock_task_get_all.return_value = FAKE_TASKS
+        mock_failed_task_get_all.return_value = []
         manager = schedule_manager.SchedulerManager()
         manager.on_node_leave(mock.Mock(member_id=b'fake_member_id',
                                         group_id='fake_group_id'))
-        self.assertEqual(mock_task_get_all.call_count, 1)
-        self.assertEqual(mock_distribute_new_job.call_count, len(FAKE_TASKS))
+        mock_task_get_all.assert_called_once_with(
+            manager.ctx, filters={'executor': 'fake_member_id',
+                                  'deleted': False})
+        mock_distribute_jobs.assert_called_once_with(
+            FAKE_TASKS, [], remove_moved=False)
 
-    @mock.patch.object(TaskDistributor, 'distribute_new_job')
+    @mock.patch.object(TaskDistributor, 'distribute_jobs')
     @mock.patch.object(db, 'task_get_all')
-    def test_recover_job(self, mock_task_get_all, mock_distribute_new_job):
+    def test_recover_job(self, mock_task_get_all, mock_distribute_jobs):
         mock_task_get_all.return_value = FAKE_TASKS
         manager = schedule_manager.SchedulerManager()
         manager.recover_job()
         self.assertEqual(mock_task_get_all.call_count, 1)
-        self.assertEqual(mock_distribute_new_job.call_count, len(FAKE_TASKS))
+        mock_distribute_jobs.assert_called_once_with(FAKE_TASKS)
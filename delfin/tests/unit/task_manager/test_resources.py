@@ -12,14 +12,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
+import os
+import time
+from unittest import mock, skipUnless
+
+from oslo_utils import timeutils
 
-from unittest import mock
 from delfin.common import config # noqa
+from delfin.common import constants
+from delfin.db.sqlalchemy import api as db_api
+from delfin.drivers import api as driverapi
 from delfin.drivers import fake_storage
+from delfin.drivers.utils import shared_calls
 from delfin.task_manager.tasks import resources
 from delfin.task_manager.tasks.resources import StorageDeviceTask
 
-from delfin import test, context, coordination
+from delfin import test, context, coordination, db, exception
 
 storage = {
     'id': '12c2d52f-01bc-41f5-b73f-7abf6f38a2a6',
@@ -203,70 +212,46 @@ storage_hosts_list = [{
 }
 ]
 
-storage_hg_list = [{
+masking_views_list = [{
     "id": "4e62c66a-39ef-43f2-9690-e936ca876574",
-    "name": "storage_host_group_" + str(id),
-    "description": "storage_host_group_" + str(id),
+    "name": "masking_view_" + str(id),
+    "description": "masking_view_" + str(id),
     "storage_id": "c5c91c98-91aa-40e6-85ac-37a1d3b32bda",
-    "native_storage_host_group_id": "storage_host_group_" + str(id),
+    "native_masking_view_id": "masking_view_" + str(id),
 }
 ]
 
-storage_host_groups_list = {
-    'storage_host_groups': storage_hg_list,
-    'storage_host_grp_host_rels': ''
-}
-empty_shgs_list = {
-    'storage_host_groups': list(),
-    'storage_host_grp_host_rels': ''
-}
 
-pg_list = [{
-    "id": "4e62c66a-39ef-43f2-9690-e936ca876574",
-    "name": "port_group_" + str(id),
-    "description": "port_group_" + str(id),
-    "storage_id": "c5c91c98-91aa-40e6-85ac-37a1d3b32bda",
-    "native_port_group_id": "port_group_" + str(id),
-}
-]
+SYNC_STORAGE_ID = 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda'
 
-port_groups_list = {
-    "port_groups": pg_list,
-    "port_grp_port_rels": '',
-}
 
-empty_port_groups_list = {
-    "port_groups": list(),
-    "port_grp_port_rels": '',
-}
+def make_rows(prefix, key, count, **values):
+    """Rows named and keyed prefix_<i>, as returned by drivers."""
+    return [dict(values, name='%s_%d' % (prefix, i),
+                 storage_id=SYNC_STORAGE_ID, **{key: '%s_%d' % (prefix, i)})
+            for i in range(count)]
 
-vg_list = [{
-    "id": "4e62c66a-39ef-43f2-9690-e936ca876574",
-    "name": "volume_group_" + str(id),
-    "description": "volume_group_" + str(id),
-    "storage_id": "c5c91c98-91aa-40e6-85ac-37a1d3b32bda",
-    "native_volume_group_id": "volume_group_" + str(id),
-}
-]
 
-volume_groups_list = {
-    'volume_groups': vg_list,
-    'vol_grp_vol_rels': ''
-}
+def db_ids(ctxt, table_name, key):
+    """Return {key value: id} of the rows of the synced storage."""
+    rows = db.resources_get_all_iter(
+        ctxt, table_name, filters={'storage_id': SYNC_STORAGE_ID})
+    if isinstance(key, tuple):
+        return dict((tuple(row[column] for column in key), row['id'])
+                    for row in rows)
+    return dict((row[key], row['id']) for row in rows)
 
-empty_volume_groups_list = {
-    'volume_groups': list(),
-    'vol_grp_vol_rels': ''
-}
 
-masking_views_list = [{
-    "id": "4e62c66a-39ef-43f2-9690-e936ca876574",
-    "name": "masking_view_" + str(id),
-    "description": "masking_view_" + str(id),
-    "storage_id": "c5c91c98-91aa-40e6-85ac-37a1d3b32bda",
-    "native_masking_view_id": "masking_view_" + str(id),
-}
-]
+def renamed(resources):
+    """DB rows of resources, as saved before the resources were renamed."""
+    return [dict(resource, name='old_' + resource['name'])
+            for resource in resources]
+
+
+# Tasks of drivers which do not list the changes of their resources
+full_sync_only = mock.patch(
+    'delfin.drivers.api.API.supports_resource_changes',
+    mock.Mock(return_value=False))
 
 
 class TestStorageDeviceTask(test.TestCase):
@@ -286,7 +271,8 @@ class TestStorageDeviceTask(test.TestCase):
     @mock.patch('delfin.db.alert_source_delete')
     def test_sync_successful(self, alert_source_delete, access_info_delete,
                              mock_storage_delete, mock_storage_get,
-                             mock_storage_update, mock_get_storage, get_lock):
+                             mock_storage_update, mock_get_storage,
+                             get_lock):
         storage_obj = resources.StorageDeviceTask(
             context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
 
@@ -317,10 +303,11 @@ class TestStorageDeviceTask(test.TestCase):
             context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
 
 
+@full_sync_only
 class TestStoragePoolTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_storage_pools')
-    @mock.patch('delfin.db.storage_pool_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.storage_pools_delete')
     @mock.patch('delfin.db.storage_pools_update')
     @mock.patch('delfin.db.storage_pools_create')
@@ -347,7 +334,7 @@ class TestStoragePoolTask(test.TestCase):
 
         # update the new pool of DB
         mock_list_pools.return_value = pools_list
-        mock_pool_get_all.return_value = pools_list
+        mock_pool_get_all.return_value = renamed(pools_list)
         pool_obj.sync()
         self.assertTrue(mock_pool_update.called)
 
@@ -365,10 +352,11 @@ class TestStoragePoolTask(test.TestCase):
         self.assertTrue(mock_pool_del.called)
 
 
+@full_sync_only
 class TestStorageVolumeTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_volumes')
-    @mock.patch('delfin.db.volume_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.volumes_delete')
     @mock.patch('delfin.db.volumes_update')
     @mock.patch('delfin.db.volumes_create')
@@ -393,7 +381,7 @@ class TestStorageVolumeTask(test.TestCase):
 
         # update the volumes to DB
         mock_list_vols.return_value = vols_list
-        mock_vol_get_all.return_value = vols_list
+        mock_vol_get_all.return_value = renamed(vols_list)
         vol_obj.sync()
         self.assertTrue(mock_vol_update.called)
 
@@ -411,10 +399,11 @@ class TestStorageVolumeTask(test.TestCase):
         self.assertTrue(mock_vol_del.called)
 
 
+@full_sync_only
 class TestStoragecontrollerTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_controllers')
-    @mock.patch('delfin.db.controller_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.controllers_delete')
     @mock.patch('delfin.db.controllers_update')
     @mock.patch('delfin.db.controllers_create')
@@ -442,7 +431,7 @@ class TestStoragecontrollerTask(test.TestCase):
 
         # update the new controller of DB
         mock_list_controllers.return_value = controllers_list
-        mock_controller_get_all.return_value = controllers_list
+        mock_controller_get_all.return_value = renamed(controllers_list)
         controller_obj.sync()
         self.assertTrue(mock_controller_update.called)
 
@@ -460,10 +449,11 @@ class TestStoragecontrollerTask(test.TestCase):
         self.assertTrue(mock_controller_del.called)
 
 
+@full_sync_only
 class TestStoragePortTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_ports')
-    @mock.patch('delfin.db.port_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.ports_delete')
     @mock.patch('delfin.db.ports_update')
     @mock.patch('delfin.db.ports_create')
@@ -488,7 +478,7 @@ class TestStoragePortTask(test.TestCase):
 
         # update the ports to DB
         mock_list_ports.return_value = ports_list
-        mock_port_get_all.return_value = ports_list
+        mock_port_get_all.return_value = renamed(ports_list)
         port_obj.sync()
         self.assertTrue(mock_port_update.called)
 
@@ -506,10 +496,11 @@ class TestStoragePortTask(test.TestCase):
         self.assertTrue(mock_port_del.called)
 
 
+@full_sync_only
 class TestStorageDiskTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_disks')
-    @mock.patch('delfin.db.disk_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.disks_delete')
     @mock.patch('delfin.db.disks_update')
     @mock.patch('delfin.db.disks_create')
@@ -534,7 +525,7 @@ class TestStorageDiskTask(test.TestCase):
 
         # update the disks to DB
         mock_list_disks.return_value = disks_list
-        mock_disk_get_all.return_value = disks_list
+        mock_disk_get_all.return_value = renamed(disks_list)
         disk_obj.sync()
         self.assertTrue(mock_disk_update.called)
 
@@ -552,11 +543,12 @@ class TestStorageDiskTask(test.TestCase):
         self.assertTrue(mock_disk_del.called)
 
 
+@full_sync_only
 class TestStorageQuotaTask(test.TestCase):
     # @mock.patch('delfin.drivers.api.API.list_quotas', 'get_lock')
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_quotas')
-    @mock.patch('delfin.db.quota_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.quotas_delete')
     @mock.patch('delfin.db.quotas_update')
     @mock.patch('delfin.db.quotas_create')
@@ -584,7 +576,7 @@ class TestStorageQuotaTask(test.TestCase):
 
         # update the quotas to DB
         mock_list_quotas.return_value = quotas_list
-        mock_quota_get_all.return_value = quotas_list
+        mock_quota_get_all.return_value = renamed(quotas_list)
         quota_obj.sync()
         self.assertTrue(mock_quota_update.called)
 
@@ -602,10 +594,11 @@ class TestStorageQuotaTask(test.TestCase):
         self.assertTrue(mock_quota_del.called)
 
 
+@full_sync_only
 class TestStorageFilesystemTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_filesystems')
-    @mock.patch('delfin.db.filesystem_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.filesystems_delete')
     @mock.patch('delfin.db.filesystems_update')
     @mock.patch('delfin.db.filesystems_create')
@@ -633,7 +626,7 @@ class TestStorageFilesystemTask(test.TestCase):
 
         # update the filesystems to DB
         mock_list_filesystems.return_value = filesystems_list
-        mock_filesystem_get_all.return_value = filesystems_list
+        mock_filesystem_get_all.return_value = renamed(filesystems_list)
         filesystem_obj.sync()
         self.assertTrue(mock_filesystem_update.called)
 
@@ -651,11 +644,12 @@ class TestStorageFilesystemTask(test.TestCase):
         self.assertTrue(mock_filesystem_del.called)
 
 
+@full_sync_only
 class TestStorageQtreeTask(test.TestCase):
     # @mock.patch('delfin.drivers.api.API.list_qtrees', 'get_lock')
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_qtrees')
-    @mock.patch('delfin.db.qtree_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.qtrees_delete')
     @mock.patch('delfin.db.qtrees_update')
     @mock.patch('delfin.db.qtrees_create')
@@ -683,7 +677,7 @@ class TestStorageQtreeTask(test.TestCase):
 
         # update the qtrees to DB
         mock_list_qtrees.return_value = qtrees_list
-        mock_qtree_get_all.return_value = qtrees_list
+        mock_qtree_get_all.return_value = renamed(qtrees_list)
         qtree_obj.sync()
         self.assertTrue(mock_qtree_update.called)
 
@@ -701,10 +695,11 @@ class TestStorageQtreeTask(test.TestCase):
         self.assertTrue(mock_qtree_del.called)
 
 
+@full_sync_only
 class TestStorageShareTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_shares')
-    @mock.patch('delfin.db.share_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.shares_delete')
     @mock.patch('delfin.db.shares_update')
     @mock.patch('delfin.db.shares_create')
@@ -729,7 +724,7 @@ class TestStorageShareTask(test.TestCase):
 
         # update the shares to DB
         mock_list_shares.return_value = shares_list
-        mock_share_get_all.return_value = shares_list
+        mock_share_get_all.return_value = renamed(shares_list)
         share_obj.sync()
         self.assertTrue(mock_share_update.called)
 
@@ -750,23 +745,37 @@ class TestStorageShareTask(test.TestCase):
 class TestStorageHostInitiatorTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_storage_host_initiators')
-    @mock.patch('delfin.db.storage_host_initiators_delete_by_storage')
-    @mock.patch('delfin.db.storage_host_initiators_create')
-    def test_sync_successful(self, mock_storage_host_initiator_create,
-                             mock_storage_host_initiator_delete_by_storage,
-                             mock_list_storage_host_initiators, get_lock):
-        storage_host_initiator_obj = resources.StorageHostInitiatorTask(
-            context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
-
-        # Collect the storage host initiators from fake_storage
-        fake_storage_obj = fake_storage.FakeStorageDriver()
-
-        # Add the storage host initiators to DB
-        mock_list_storage_host_initiators.return_value \
-            = fake_storage_obj.list_storage_host_initiators(context)
-        storage_host_initiator_obj.sync()
-        self.assertTrue(mock_storage_host_initiator_delete_by_storage.called)
-        self.assertTrue(mock_storage_host_initiator_create.called)
+    def test_sync_successful(self, mock_list_storage_host_initiators,
+                             get_lock):
+        ctxt = context.get_admin_context()
+        task = resources.StorageHostInitiatorTask(ctxt, SYNC_STORAGE_ID)
+        initiators = make_rows('initiator', 'native_storage_host_initiator_id',
+                               3, status='online')
+        mock_list_storage_host_initiators.return_value = initiators
+        task.sync()
+        ids = db_ids(ctxt, 'storage_host_initiators',
+                     'native_storage_host_initiator_id')
+        self.assertEqual(['initiator_0', 'initiator_1', 'initiator_2'],
+                         sorted(ids))
+
+        # Only the changed initiators are written, ids are kept
+        initiators = make_rows('initiator', 'native_storage_host_initiator_id',
+                               4, status='online')[1:]
+        initiators[0]['status'] = 'offline'
+        mock_list_storage_host_initiators.return_value = initiators
+        with mock.patch('delfin.db.storage_host_initiators_create',
+                        wraps=db.storage_host_initiators_create) as create:
+            task.sync()
+        self.assertEqual([['initiator_3']],
+                         [[row['name'] for row in call[0][1]]
+                          for call in create.call_args_list])
+        new_ids = db_ids(ctxt, 'storage_host_initiators',
+                         'native_storage_host_initiator_id')
+        self.assertEqual(['initiator_1', 'initiator_2', 'initiator_3'],
+                         sorted(new_ids))
+        self.assertEqual(ids['initiator_1'], new_ids['initiator_1'])
+        self.assertEqual('offline', db.storage_host_initiators_get(
+            ctxt, new_ids['initiator_1'])['status'])
 
     @mock.patch('delfin.db.storage_host_initiators_delete_by_storage')
     def test_remove(self, mock_storage_host_initiators_del):
@@ -776,10 +785,11 @@ class TestStorageHostInitiatorTask(test.TestCase):
         self.assertTrue(mock_storage_host_initiators_del.called)
 
 
+@full_sync_only
 class TestStorageHostTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_storage_hosts')
-    @mock.patch('delfin.db.storage_hosts_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.storage_hosts_delete')
     @mock.patch('delfin.db.storage_hosts_update')
     @mock.patch('delfin.db.storage_hosts_create')
@@ -809,7 +819,7 @@ class TestStorageHostTask(test.TestCase):
         mock_list_storage_hosts.return_value \
             = storage_hosts_list
         mock_storage_hosts_get_all.return_value \
-            = storage_hosts_list
+            = renamed(storage_hosts_list)
         storage_host_obj.sync()
         self.assertTrue(mock_storage_host_update.called)
 
@@ -828,49 +838,55 @@ class TestStorageHostTask(test.TestCase):
         self.assertTrue(mock_storage_hosts_del.called)
 
 
-class TestStorageHostGroupTask(test.TestCase):
-    @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
-    @mock.patch('delfin.drivers.api.API.list_storage_host_groups')
-    @mock.patch('delfin.db.storage_host_groups_get_all')
-    @mock.patch('delfin.db.storage_host_groups_delete')
-    @mock.patch('delfin.db.storage_host_groups_update')
-    @mock.patch('delfin.db.storage_host_groups_create')
-    def test_sync_successful(self, mock_storage_host_group_create,
-                             mock_storage_host_group_update,
-                             mock_storage_host_group_del,
-                             mock_storage_host_groups_get_all,
-                             mock_list_storage_host_groups, get_lock):
-        storage_host_group_obj = resources.StorageHostGroupTask(
-            context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
-        storage_host_group_obj.sync()
-        self.assertTrue(mock_list_storage_host_groups.called)
-        self.assertTrue(mock_storage_host_groups_get_all.called)
-        self.assertTrue(get_lock.called)
-
-        # Collect the storage host groups from fake_storage
-        fake_storage_obj = fake_storage.FakeStorageDriver()
+class GroupTaskTestMixin(object):
+    """Sync tests shared by the tasks of groups and of their relations."""
 
-        # Add the storage host groups to DB
-        mock_list_storage_host_groups.return_value \
-            = fake_storage_obj.list_storage_host_groups(context)
-        mock_storage_host_groups_get_all.return_value = list()
-        storage_host_group_obj.sync()
-        self.assertTrue(mock_storage_host_group_create.called)
-
-        # Update the storage host groups to DB
-        mock_list_storage_host_groups.return_value \
-            = storage_host_groups_list
-        mock_storage_host_groups_get_all.return_value \
-            = storage_hg_list
-        storage_host_group_obj.sync()
-        self.assertTrue(mock_storage_host_group_update.called)
-
-        # Delete the storage host groups to DB
-        mock_list_storage_host_groups.return_value = empty_shgs_list
-        mock_storage_host_groups_get_all.return_value \
-            = storage_hg_list
-        storage_host_group_obj.sync()
-        self.assertTrue(mock_storage_host_group_del.called)
+    def _sync(self, groups, rels):
+        ctxt = context.get_admin_context()
+        task = self.TASK(ctxt, SYNC_STORAGE_ID)
+        group_key, member_key = self.TASK.RELATION_KEY
+        result = {self.GROUPS: groups,
+                  self.RELATIONS: [{'storage_id': SYNC_STORAGE_ID,
+                                    group_key: group, member_key: member}
+                                   for group, member in rels]}
+        with mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock'), \
+                mock.patch.object(driverapi.API, self.LIST_FUNC,
+                                  return_value=result):
+            task.sync()
+        return (db_ids(ctxt, self.GROUPS, self.TASK.RELATION_KEY[0]),
+                db_ids(ctxt, self.RELATIONS, self.TASK.RELATION_KEY))
+
+    def test_sync_diff(self):
+        groups = make_rows('group', self.TASK.RELATION_KEY[0], 2)
+        _, rel_ids = self._sync(groups, [('group_0', 'member_0'),
+                                         ('group_0', 'member_1'),
+                                         ('group_1', 'member_1')])
+        self.assertEqual(3, len(rel_ids))
+
+        # Membership changes only touch the changed relations
+        group_ids, new_rel_ids = self._sync(
+            groups[:1], [('group_0', 'member_0'), ('group_0', 'member_2')])
+        self.assertEqual(['group_0'], list(group_ids))
+        self.assertEqual([('group_0', 'member_0'), ('group_0', 'member_2')],
+                         sorted(new_rel_ids))
+        self.assertEqual(rel_ids[('group_0', 'member_0')],
+                         new_rel_ids[('group_0', 'member_0')])
+
+    def test_sync_is_one_transaction(self):
+        groups = make_rows('group', self.TASK.RELATION_KEY[0], 2)
+        with mock.patch('delfin.db.%s_create' % self.RELATIONS,
+                        side_effect=exception.DelfinException):
+            group_ids, rel_ids = self._sync(groups,
+                                            [('group_0', 'member_0')])
+        self.assertEqual({}, group_ids)
+        self.assertEqual({}, rel_ids)
+
+
+class TestStorageHostGroupTask(GroupTaskTestMixin, test.TestCase):
+    TASK = resources.StorageHostGroupTask
+    LIST_FUNC = 'list_storage_host_groups'
+    GROUPS = 'storage_host_groups'
+    RELATIONS = 'storage_host_grp_host_rels'
 
     @mock.patch('delfin.db.storage_host_groups_delete_by_storage')
     def test_remove(self, mock_storage_host_groups_del):
@@ -880,49 +896,11 @@ class TestStorageHostGroupTask(test.TestCase):
         self.assertTrue(mock_storage_host_groups_del.called)
 
 
-class TestVolumeGroupTask(test.TestCase):
-    @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
-    @mock.patch('delfin.drivers.api.API.list_volume_groups')
-    @mock.patch('delfin.db.volume_groups_get_all')
-    @mock.patch('delfin.db.volume_groups_delete')
-    @mock.patch('delfin.db.volume_groups_update')
-    @mock.patch('delfin.db.volume_groups_create')
-    def test_sync_successful(self, mock_volume_group_create,
-                             mock_volume_group_update,
-                             mock_volume_group_del,
-                             mock_volume_groups_get_all,
-                             mock_list_volume_groups, get_lock):
-        volume_group_obj = resources.VolumeGroupTask(
-            context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
-        volume_group_obj.sync()
-        self.assertTrue(mock_list_volume_groups.called)
-        self.assertTrue(mock_volume_groups_get_all.called)
-        self.assertTrue(get_lock.called)
-
-        # Collect the volume groups from fake_storage
-        fake_storage_obj = fake_storage.FakeStorageDriver()
-
-        # Add the volume groups to DB
-        mock_list_volume_groups.return_value \
-            = fake_storage_obj.list_volume_groups(context)
-        mock_volume_groups_get_all.return_value = list()
-        volume_group_obj.sync()
-        self.assertTrue(mock_volume_group_create.called)
-
-        # Update the volume groups to DB
-        mock_list_volume_groups.return_value \
-            = volume_groups_list
-        mock_volume_groups_get_all.return_value \
-            = vg_list
-        volume_group_obj.sync()
-        self.assertTrue(mock_volume_group_update.called)
-
-        # Delete the volume groups to DB
-        mock_list_volume_groups.return_value = empty_volume_groups_list
-        mock_volume_groups_get_all.return_value \
-            = vg_list
-        volume_group_obj.sync()
-        self.assertTrue(mock_volume_group_del.called)
+class TestVolumeGroupTask(GroupTaskTestMixin, test.TestCase):
+    TASK = resources.VolumeGroupTask
+    LIST_FUNC = 'list_volume_groups'
+    GROUPS = 'volume_groups'
+    RELATIONS = 'vol_grp_vol_rels'
 
     @mock.patch('delfin.db.volume_groups_delete_by_storage')
     def test_remove(self, mock_volume_groups_del):
@@ -932,50 +910,11 @@ class TestVolumeGroupTask(test.TestCase):
         self.assertTrue(mock_volume_groups_del.called)
 
 
-class TestPortGroupTask(test.TestCase):
-    @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
-    @mock.patch('delfin.drivers.api.API.list_port_groups')
-    @mock.patch('delfin.db.port_groups_get_all')
-    @mock.patch('delfin.db.port_groups_delete')
-    @mock.patch('delfin.db.port_groups_update')
-    @mock.patch('delfin.db.port_groups_create')
-    def test_sync_successful(self, mock_port_group_create,
-                             mock_port_group_update,
-                             mock_port_group_del,
-                             mock_port_groups_get_all,
-                             mock_list_port_groups, get_lock):
-        ctxt = context.get_admin_context()
-        port_group_obj = resources.PortGroupTask(
-            ctxt, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
-        port_group_obj.sync()
-        self.assertTrue(mock_list_port_groups.called)
-        self.assertTrue(mock_port_groups_get_all.called)
-        self.assertTrue(get_lock.called)
-
-        # Collect the storage host groups from fake_storage
-        fake_storage_obj = fake_storage.FakeStorageDriver()
-
-        # Add the storage host groups to DB
-        mock_list_port_groups.return_value \
-            = fake_storage_obj.list_port_groups(context)
-        mock_port_groups_get_all.return_value = list()
-        port_group_obj.sync()
-        self.assertTrue(mock_port_group_create.called)
-
-        # Update the storage host groups to DB
-        mock_list_port_groups.return_value \
-            = port_groups_list
-        mock_port_groups_get_all.return_value \
-            = pg_list
-        port_group_obj.sync()
-        self.assertTrue(mock_port_group_update.called)
-
-        # Delete the storage host groups to DB
-        mock_list_port_groups.return_value = empty_port_groups_list
-        mock_port_groups_get_all.return_value \
-            = pg_list
-        port_group_obj.sync()
-        self.assertTrue(mock_port_group_del.called)
+class TestPortGroupTask(GroupTaskTestMixin, test.TestCase):
+    TASK = resources.PortGroupTask
+    LIST_FUNC = 'list_port_groups'
+    GROUPS = 'port_groups'
+    RELATIONS = 'port_grp_port_rels'
 
     @mock.patch('delfin.db.port_groups_delete_by_storage')
     def test_remove(self, mock_port_groups_del):
@@ -988,7 +927,7 @@ class TestPortGroupTask(test.TestCase):
 class TestMaskingViewTask(test.TestCase):
     @mock.patch.object(coordination.LOCK_COORDINATOR, 'get_lock')
     @mock.patch('delfin.drivers.api.API.list_masking_views')
-    @mock.patch('delfin.db.masking_views_get_all')
+    @mock.patch('delfin.db.resources_get_all_iter')
     @mock.patch('delfin.db.masking_views_delete')
     @mock.patch('delfin.db.masking_views_update')
     @mock.patch('delfin.db.masking_views_create')
@@ -1019,7 +958,7 @@ class TestMaskingViewTask(test.TestCase):
         mock_list_masking_views.return_value \
             = masking_views_list
         mock_masking_views_get_all.return_value \
-            = masking_views_list
+            = renamed(masking_views_list)
         masking_view_obj.sync()
         self.assertTrue(mock_masking_view_update.called)
 
@@ -1036,3 +975,278 @@ class TestMaskingViewTask(test.TestCase):
             context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
         masking_view_obj.remove()
         self.assertTrue(mock_masking_views_del.called)
+
+
+def make_volumes(count, prefix='vol'):
+    return [{'id': '%s_id_%d' % (prefix, i),
+             'name': '%s_%d' % (prefix, i),
+             'storage_id': 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda',
+             'native_volume_id': 'native_%d' % i,
+             'status': 'normal',
+             'total_capacity': 1024 * 1024,
+             'used_capacity': i} for i in range(count)]
+
+
+class TestClassifyResources(test.TestCase):
+
+    def setUp(self):
+        super(TestClassifyResources, self).setUp()
+        self.task = resources.StorageVolumeTask(
+            context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
+
+    def test_classify(self):
+        db_volumes = make_volumes(4)
+        volumes = [dict(volume) for volume in db_volumes[1:]]
+        for volume in volumes:
+            del volume['id']
+        volumes[1]['used_capacity'] = 100
+        volumes.append(make_volumes(5, prefix='new')[4])
+        add_list, update_list, delete_id_list = \
+            self.task._classify_resources(volumes, db_volumes,
+                                          'native_volume_id')
+        self.assertEqual([volumes[3]], add_list)
+        self.assertEqual([{'id': 'vol_id_2', 'used_capacity': 100}],
+                         update_list)
+        self.assertEqual(['vol_id_0'], delete_id_list)
+
+    def test_classify_unchanged(self):
+        db_volumes = make_volumes(3)
+        add_list, update_list, delete_id_list = \
+            self.task._classify_resources(make_volumes(3), db_volumes,
+                                          'native_volume_id')
+        self.assertEqual(([], [], []),
+                         (add_list, update_list, delete_id_list))
+
+    def test_classify_duplicated_keys(self):
+        db_volumes = make_volumes(2) + make_volumes(1, prefix='dup')
+        volumes = make_volumes(1) + make_volumes(1)
+        add_list, update_list, delete_id_list = \
+            self.task._classify_resources(volumes, db_volumes,
+                                          'native_volume_id')
+        self.assertEqual([], add_list)
+        self.assertEqual([], update_list)
+        self.assertEqual(['vol_id_1', 'dup_id_0'], delete_id_list)
+
+
+class TestIncrementalSync(test.TestCase):
+
+    def setUp(self):
+        super(TestIncrementalSync, self).setUp()
+        self.ctxt = context.get_admin_context()
+        get_lock = mock.patch.object(coordination.LOCK_COORDINATOR,
+                                     'get_lock')
+        get_lock.start()
+        self.addCleanup(get_lock.stop)
+        self.task = resources.StorageVolumeTask(self.ctxt, SYNC_STORAGE_ID)
+        self.task.in_sync_job = True
+        self.supports_changes = self.mock_object(
+            self.task.driver_api, 'supports_resource_changes',
+            mock.Mock(return_value=True))
+        self.list_changes = self.mock_object(
+            self.task.driver_api, 'list_resource_changes')
+        self.list_volumes = self.mock_object(
+            self.task.driver_api, 'list_volumes',
+            mock.Mock(return_value=[]))
+        db.volumes_create(self.ctxt, make_rows('stale', 'native_volume_id',
+                                               1))
+
+    def _sync(self, changed, deleted=None, watermark='w1'):
+        self.list_changes.return_value = {'changed': changed,
+                                          'deleted': deleted or [],
+                                          'watermark': watermark}
+        self.task.sync()
+        return self.list_changes.call_args[0][3]
+
+    def _volume_names(self):
+        return dict((row['native_volume_id'], row['name']) for row in
+                    db.resources_get_all_iter(
+                        self.ctxt, 'volumes',
+                        filters={'storage_id': SYNC_STORAGE_ID}))
+
+    def test_first_sync_is_full(self):
+        since = self._sync(make_rows('vol', 'native_volume_id', 3))
+        self.assertIsNone(since)
+        self.assertEqual({'vol_0', 'vol_1', 'vol_2'},
+                         set(self._volume_names()))
+        mark = db.sync_watermark_get(self.ctxt, SYNC_STORAGE_ID, 'volumes')
+        self.assertEqual('w1', mark['watermark'])
+        self.assertIsNotNone(mark['full_synced_at'])
+        self.assertFalse(self.list_volumes.called)
+
+    def test_incremental_sync(self):
+        self._sync(make_rows('vol', 'native_volume_id', 3))
+        changed = renamed(make_rows('vol', 'native_volume_id', 1)) + \
+            make_rows('new', 'native_volume_id', 1)
+        since = self._sync(changed, deleted=['vol_2'], watermark='w2')
+        self.assertEqual('w1', since)
+        self.assertEqual({'vol_0': 'old_vol_0', 'vol_1': 'vol_1',
+                          'new_0': 'new_0'}, self._volume_names())
+        self.assertEqual('w2', db.sync_watermark_get(
+            self.ctxt, SYNC_STORAGE_ID, 'volumes')['watermark'])
+
+    def test_full_sync_when_due(self):
+        self._sync(make_rows('vol', 'native_volume_id', 2))
+        self.override_config('full_sync_interval', 60)
+        db.sync_watermark_set(self.ctxt, SYNC_STORAGE_ID, 'volumes', {
+            'full_synced_at': timeutils.utcnow() - datetime.timedelta(
+                seconds=61)})
+        since = self._sync(make_rows('vol', 'native_volume_id', 1))
+        self.assertIsNone(since)
+        self.assertEqual({'vol_0': 'vol_0'}, self._volume_names())
+
+    @mock.patch.object(db, 'sync_watermark_get')
+    def test_driver_without_changes(self, mock_watermark_get):
+        self.supports_changes.return_value = False
+        self.list_volumes.return_value = make_rows('vol', 'native_volume_id',
+                                                   2)
+        self.task.sync()
+        self.assertEqual({'vol_0', 'vol_1'}, set(self._volume_names()))
+        self.supports_changes.assert_called_once_with(
+            self.ctxt, SYNC_STORAGE_ID, 'volumes')
+        self.assertFalse(mock_watermark_get.called)
+        self.assertFalse(self.list_changes.called)
+        self.assertRaises(exception.SyncWatermarkNotFound,
+                          db_api.sync_watermark_get, self.ctxt,
+                          SYNC_STORAGE_ID, 'volumes')
+
+    def test_incremental_sync_disabled(self):
+        self.override_config('full_sync_interval', 0)
+        self.task.sync()
+        self.assertFalse(self.list_changes.called)
+        self.assertTrue(self.list_volumes.called)
+
+    def test_watermarks_deleted_with_storage(self):
+        self._sync(make_rows('vol', 'native_volume_id', 1))
+        db.storage_delete(self.ctxt, SYNC_STORAGE_ID)
+        self.assertRaises(exception.SyncWatermarkNotFound,
+                          db.sync_watermark_get, self.ctxt, SYNC_STORAGE_ID,
+                          'volumes')
+
+
+class FakeSyncTask(object):
+    in_sync_job = False
+
+    def __init__(self, context, storage_id):
+        self.context = context
+        self.storage_id = storage_id
+        self.removed = False
+
+    def sync(self):
+        pass
+
+    def remove(self):
+        self.removed = True
+
+
+class FailedSyncTask(FakeSyncTask):
+
+    def sync(self):
+        raise exception.StorageBackendException('sync failed')
+
+
+class TestStorageSyncJob(test.TestCase):
+
+    def setUp(self):
+        super(TestStorageSyncJob, self).setUp()
+        self.ctxt = context.get_admin_context()
+        db.storage_create(self.ctxt, {'id': SYNC_STORAGE_ID,
+                                      'name': 'sync_storage',
+                                      'sync_status':
+                                      3 * constants.ResourceSync.START})
+        get_lock = mock.patch.object(coordination.LOCK_COORDINATOR,
+                                     'get_lock')
+        get_lock.start()
+        self.addCleanup(get_lock.stop)
+
+    def _run(self, task_classes):
+        job = resources.StorageSyncJob(self.ctxt, SYNC_STORAGE_ID,
+                                       task_classes)
+        return job, job.run()
+
+    @mock.patch('delfin.db.storage_update', wraps=db.storage_update)
+    def test_run(self, mock_storage_update):
+        job, report = self._run([FakeSyncTask, FakeSyncTask, FakeSyncTask])
+        self.assertTrue(all(task.in_sync_job for task in job.tasks))
+        mock_storage_update.assert_called_once_with(
+            self.ctxt, SYNC_STORAGE_ID, {'sync_status': 0})
+        self.assertEqual(0, db.storage_get(
+            self.ctxt, SYNC_STORAGE_ID)['sync_status'])
+        self.assertEqual(['FakeSyncTask'], list(report))
+        self.assertFalse(any(task.removed for task in job.tasks))
+
+    def test_run_with_failed_task(self):
+        _, report = self._run([FakeSyncTask, FailedSyncTask, FakeSyncTask])
+        # A failed task leaves the storage out of synced state, as it does
+        # when run as a job of its own
+        self.assertEqual(3 * constants.ResourceSync.START
+                         - 2 * constants.ResourceSync.SUCCEED
+                         - constants.ResourceSync.FAILED,
+                         db.storage_get(self.ctxt,
+                                        SYNC_STORAGE_ID)['sync_status'])
+        self.assertEqual(constants.ResourceSync.FAILED,
+                         report['FailedSyncTask'][0])
+        self.assertEqual(constants.ResourceSync.SUCCEED,
+                         report['FakeSyncTask'][0])
+
+    def test_run_storage_deleted(self):
+        db.storage_delete(self.ctxt, SYNC_STORAGE_ID)
+        job, _ = self._run([FakeSyncTask, FailedSyncTask])
+        self.assertTrue(all(task.removed for task in job.tasks))
+
+    def test_run_shares_driver_calls(self):
+        client = mock.Mock(return_value=['group'])
+
+        class SharedCallTask(FakeSyncTask):
+
+            @shared_calls.shared_call
+            def list_groups(self):
+                return client()
+
+            def sync(self):
+                self.list_groups()
+
+        job, _ = self._run([SharedCallTask, SharedCallTask, FakeSyncTask])
+        self.assertEqual(1, client.call_count)
+        self.assertEqual(1, job.window.saved_calls())
+
+    def test_run_storage_deleted_stale_cache(self):
+        # The cache of this process has not seen the delete yet
+        self.mock_object(db, 'storage_get_cached', mock.Mock(
+            side_effect=exception.StorageNotFound(SYNC_STORAGE_ID)))
+        db.storage_delete(self.ctxt, SYNC_STORAGE_ID)
+        job, _ = self._run([FakeSyncTask])
+        self.assertTrue(all(task.removed for task in job.tasks))
+
+    @full_sync_only
+    @mock.patch.object(resources, '_storage_deleted')
+    def test_task_decorators_skipped_in_job(self, mock_storage_deleted):
+        task = resources.StorageVolumeTask(self.ctxt, SYNC_STORAGE_ID)
+        task.in_sync_job = True
+        self.mock_object(task.driver_api, 'list_volumes',
+                         mock.Mock(return_value=[]))
+        task.sync()
+        self.assertEqual(3 * constants.ResourceSync.START, db.storage_get(
+            self.ctxt, SYNC_STORAGE_ID)['sync_status'])
+        self.assertFalse(mock_storage_deleted.called)
+
+
+@skipUnless(os.environ.get('DELFIN_BENCHMARK'),
+            'set DELFIN_BENCHMARK=1 to run benchmarks')
+class BenchmarkClassifyResources(test.TestCase):
+
+    def test_benchmark_classify(self):
+        task = resources.StorageVolumeTask(
+            context, 'c5c91c98-91aa-40e6-85ac-37a1d3b32bda')
+        for count in (1000, 10000, 100000):
+            db_volumes = make_volumes(count)
+            volumes = make_volumes(count + count // 10)[count // 10:]
+            for volume in volumes[::100]:
+                volume['status'] = 'abnormal'
+            begin = time.time()
+            add_list, update_list, delete_id_list = task._classify_resources(
+                volumes, db_volumes, 'native_volume_id')
+            print('\n%d volumes, %d added, %d updated, %d deleted: %.3fs'
+                  % (count, len(add_list), len(update_list),
+                     len(delete_id_list), time.time() - begin))
+            self.assertEqual(count // 10, len(add_list))
+            self.assertEqual(count // 10, len(delete_id_list))
@@ -43,7 +43,7 @@ fake_storage = {
 
 class TestPerformanceCollectionTask(test.TestCase):
 
-    @mock.patch.object(db, 'storage_get',
+    @mock.patch.object(db, 'storage_get_cached',
                        mock.Mock(return_value=fake_storage))
     @mock.patch('delfin.exporter.base_exporter.PerformanceExporterManager'
                 '.dispatch')
@@ -57,7 +57,7 @@ class TestPerformanceCollectionTask(test.TestCase):
         self.assertEqual(mock_collect_perf_metrics.call_count, 1)
         self.assertEqual(mock_dispatch.call_count, 1)
 
-    @mock.patch.object(db, 'storage_get',
+    @mock.patch.object(db, 'storage_get_cached',
                        mock.Mock(return_value=fake_storage))
     @mock.patch('logging.LoggerAdapter.error')
     @mock.patch('delfin.exporter.base_exporter.PerformanceExporterManager'
@@ -148,3 +148,27 @@ class ConsistentHashingTestCase(test.TestCase):
         part.start()
         part.watch_group_change()
         self.assertTrue(crd.run_watchers.called)
+
+    @mock.patch('tooz.partitioner.Partitioner')
+    def test_get_task_executors(self, mock_partitioner):
+        part = mock_partitioner.return_value
+        part.members_for_object.side_effect = \
+            lambda task_id: {b'node%d' % (task_id % 2)}
+        partitioner = coordination.ConsistentHashing()
+        partitioner.start()
+        self.assertEqual({1: 'node1', 2: 'node0', 3: 'node1'},
+                         partitioner.get_task_executors([1, 2, 3]))
+        self.assertEqual(1, mock_partitioner.call_count)
+        self.assertTrue(part.stop.called)
+        self.assertEqual('node0', partitioner.get_task_executor(4))
+
+    def test_get_member_weights(self):
+        crd = self.get_coordinator.return_value
+        crd.get_members.return_value.get.return_value = [b'node0', b'node1']
+        crd.get_member_capabilities.side_effect = lambda group, member: \
+            mock.Mock(get=mock.Mock(return_value={'weight': 100}
+                                    if member == b'node0' else {}))
+        partitioner = coordination.ConsistentHashing()
+        partitioner.start()
+        self.assertEqual({'node0': 100, 'node1': 1},
+                         partitioner.get_member_weights())